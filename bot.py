@@ -1,3 +1,4 @@
+import asyncio
 import json
 import nonebot
 from nonebot.adapters.console import Adapter as ConsoleAdapter
@@ -9,26 +10,15 @@ from nonebot.message import event_preprocessor
 
 from nextbot.command_config import sync_registered_commands_to_db
 from nextbot.data_dir import DATA_DIR
+from nextbot.item_catalog import load_catalog
+from nextbot.server_status import start_status_poller, stop_status_poller
 from nextbot.signin_reset import start_signin_reset_worker
+from nextbot.stats import start_stats_flush_worker, stop_stats_flush_worker
+from nextbot.tshock_api import close_server_clients
+from server.screenshot import start_browser_pool, stop_browser_pool
 from server.web_server import start_web_server
 from nextbot.access_control import get_group_ids, get_owner_ids
-from nextbot.db import (
-    DB_PATH,
-    Base,
-    ensure_command_config_schema,
-    ensure_default_groups,
-    ensure_default_stats,
-    ensure_red_packet_schema,
-    ensure_warehouse_schema,
-    ensure_sign_record_schema,
-    ensure_user_ban_schema,
-    ensure_user_dice_schema,
-    ensure_user_guess_schema,
-    ensure_user_rob_schema,
-    ensure_user_signin_schema,
-    get_engine,
-    init_db,
-)
+from nextbot.db import DB_PATH, init_db
 
 ENV_PATH = DATA_DIR / ".env"
 DEFAULT_ENV_CONTENT = (
@@ -49,6 +39,7 @@ DEFAULT_ENV_CONTENT = (
     "COMMAND_DISABLED_MODE=reply\n"
     "COMMAND_DISABLED_MESSAGE=该命令暂时关闭~\n"
     "RENDER_THEME=auto\n"
+    "RENDER_MODE=direct\n"
     "LOGIN_NOTIFY_ALL_GROUPS=false\n"
     "PLAYER_NOTIFY_MODE=all\n"
     "PLAYER_NOTIFY_GROUP_ID=\n"
@@ -63,6 +54,23 @@ DEFAULT_ENV_CONTENT = (
     "GROUP_FAREWELL_TEMPLATE={nickname}（{user_id}）离开了本群\n"
     "GROUP_AUTO_BAN_ON_LEAVE_ENABLED=false\n"
     "GROUP_AUTO_BAN_ON_LEAVE_NOTIFY=false\n"
+    "\n"
+    "SQLITE_JOURNAL_MODE=wal\n"
+    "SQLITE_SYNCHRONOUS=normal\n"
+    "SQLITE_BUSY_TIMEOUT_MS=5000\n"
+    "SQLITE_CACHE_SIZE_KIB=16384\n"
+    "SQLITE_MMAP_SIZE_MIB=128\n"
+    "STATS_FLUSH_INTERVAL_SECONDS=5\n"
+    "SCREENSHOT_POOL_SIZE=2\n"
+    "SCREENSHOT_PAGE_MAX_USES=100\n"
+    "RENDER_DEBUG_DIR=\n"
+    "RENDER_DEBUG_RETENTION_HOURS=24\n"
+    "TSHOCK_API_TIMEOUT=5\n"
+    "TSHOCK_API_CONNECT_TIMEOUT=3\n"
+    "TSHOCK_API_MAX_CONNECTIONS=10\n"
+    "TSHOCK_API_KEEPALIVE_EXPIRY=30\n"
+    "SERVER_STATUS_POLL_INTERVAL_SECONDS=10\n"
+    "SERVER_STATUS_MAX_AGE_SECONDS=20\n"
 )
 
 
@@ -152,30 +160,49 @@ async def _filter_allowed_messages(event: Event) -> None:
 async def _init_database() -> None:
     if not DB_PATH.exists():
         logger.info("app.db 不存在，开始初始化数据库")
-        init_db()
-        logger.info("数据库初始化完成")
     else:
         logger.info("检测到 app.db，检查表结构")
-        Base.metadata.create_all(get_engine())
-        ensure_command_config_schema()
-        ensure_user_signin_schema()
-        ensure_sign_record_schema()
-        ensure_user_ban_schema()
-        ensure_user_rob_schema()
-        ensure_user_guess_schema()
-        ensure_user_dice_schema()
-        ensure_red_packet_schema()
-        ensure_warehouse_schema()
-        ensure_default_groups()
-        ensure_default_stats()
-        logger.info("表结构检查完成")
+    schema_version = init_db()
+    logger.info(f"表结构检查完成：version={schema_version}")
 
     sync_registered_commands_to_db()
     logger.info("命令配置同步完成")
     from nextbot.command_config import register_alias_matchers
     register_alias_matchers()
     start_signin_reset_worker()
+    start_stats_flush_worker()
     start_web_server()
+    start_status_poller()
+
+
+@driver.on_startup
+async def _load_item_catalog() -> None:
+    item_count, prefix_count = await asyncio.to_thread(load_catalog)
+    logger.info(f"物品目录加载完成：items={item_count} prefixes={prefix_count}")
+
+
+@driver.on_startup
+async def _start_screenshot_browser() -> None:
+    try:
+        await start_browser_pool()
+    except Exception as exc:
+        logger.warning(f"截图浏览器启动失败，将在首次截图时重试：reason={exc}")
+
+
+@driver.on_shutdown
+async def _flush_pending_stats() -> None:
+    stop_stats_flush_worker()
+
+
+@driver.on_shutdown
+async def _stop_screenshot_browser() -> None:
+    await stop_browser_pool()
+
+
+@driver.on_shutdown
+async def _close_tshock_clients() -> None:
+    await stop_status_poller()
+    await close_server_clients()
 
 nonebot.load_plugins("nextbot/plugins")
 
@@ -1,20 +1,24 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
 from nonebot.log import logger
 
 from nextbot.access_control import get_owner_ids
-from nextbot.db import Server, User, get_session
+from nextbot.db import Server, User, db_session
 from nextbot.time_utils import db_now_utc_naive
 from nextbot.tshock_api import (
-    TShockRequestError,
+    fan_out,
     get_error_reason,
+    get_request_error_reason,
     is_success,
     request_server_api,
 )
 
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
 BanDBCode = Literal["not_found", "owner_protected", "already_banned", "banned"]
 
 
@@ -26,58 +30,48 @@ class BanDBResult:
     previous_reason: str = ""
 
 
-def apply_ban_to_db(user_id: str, reason: str) -> BanDBResult:
-    session = get_session()
-    try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        if user is None:
-            return BanDBResult(code="not_found")
-        if str(user.user_id) in get_owner_ids():
-            return BanDBResult(
-                code="owner_protected",
-                user_name=user.name,
-                user_qq=str(user.user_id),
-            )
-        if user.is_banned:
-            return BanDBResult(
-                code="already_banned",
-                user_name=user.name,
-                user_qq=str(user.user_id),
-                previous_reason=user.ban_reason or "",
-            )
-        user.is_banned = True
-        user.banned_at = db_now_utc_naive()
-        user.ban_reason = reason
-        session.commit()
+def apply_ban_to_db(session: Session, user_id: str, reason: str) -> BanDBResult:
+    """封禁的读-判断-写，需通过 ``run_db_transaction`` 调用。"""
+    user = session.query(User).filter(User.user_id == user_id).first()
+    if user is None:
+        return BanDBResult(code="not_found")
+    if str(user.user_id) in get_owner_ids():
         return BanDBResult(
-            code="banned",
+            code="owner_protected",
             user_name=user.name,
             user_qq=str(user.user_id),
         )
-    finally:
-        session.close()
+    if user.is_banned:
+        return BanDBResult(
+            code="already_banned",
+            user_name=user.name,
+            user_qq=str(user.user_id),
+            previous_reason=user.ban_reason or "",
+        )
+    user.is_banned = True
+    user.banned_at = db_now_utc_naive()
+    user.ban_reason = reason
+    return BanDBResult(
+        code="banned",
+        user_name=user.name,
+        user_qq=str(user.user_id),
+    )
 
 
 async def sync_user_to_blacklist(user_name: str, reason: str) -> list[str]:
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
     lines: list[str] = []
     if not servers:
         lines.append("🖥️ 同步服务器黑名单结果：ℹ️ 暂无服务器")
         return lines
 
-    lines.append("🖥️ 同步服务器黑名单结果：")
-    for server in servers:
-        try:
-            check_response = await request_server_api(server, "/nextbot/blacklist")
-        except TShockRequestError:
-            lines.append(f"{server.id}.{server.name}：❌ 添加失败，无法连接服务器")
-            continue
-
+    async def sync_one(server: Server) -> str:
+        check_response = await request_server_api(server, "/nextbot/blacklist")
         if is_success(check_response):
             entries = check_response.payload.get("entries", [])
             already_exists = any(
@@ -86,23 +80,22 @@ async def sync_user_to_blacklist(user_name: str, reason: str) -> list[str]:
                 if isinstance(e, dict)
             )
             if already_exists:
-                lines.append(f"{server.id}.{server.name}：ℹ️ 已存在于黑名单中")
-                continue
-
-        try:
-            response = await request_server_api(
-                server,
-                f"/nextbot/blacklist/add/{user_name}",
-                params={"reason": reason},
-            )
-        except TShockRequestError:
-            lines.append(f"{server.id}.{server.name}：❌ 添加失败，无法连接服务器")
-            continue
+                return "ℹ️ 已存在于黑名单中"
 
+        response = await request_server_api(
+            server,
+            f"/nextbot/blacklist/add/{user_name}",
+            params={"reason": reason},
+        )
         if is_success(response):
-            lines.append(f"{server.id}.{server.name}：✅ 添加成功")
-        else:
-            lines.append(f"{server.id}.{server.name}：❌ 添加失败，{get_error_reason(response)}")
+            return "✅ 添加成功"
+        return f"❌ 添加失败，{get_error_reason(response)}"
+
+    lines.append("🖥️ 同步服务器黑名单结果：")
+    for result in await fan_out(servers, sync_one, calls_per_server=2):
+        server = result.server
+        status = result.value or f"❌ 添加失败，{get_request_error_reason(result.error)}"
+        lines.append(f"{server.id}.{server.name}：{status}")
 
     logger.info(
         f"黑名单同步完成：user_name={user_name} server_count={len(servers)}"
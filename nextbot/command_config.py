@@ -5,22 +5,31 @@ import hashlib
 import inspect
 import json
 import threading
+import time
 import typing
 from dataclasses import dataclass
 from datetime import datetime
 from functools import wraps
 from typing import Any, NoReturn
 
-from nonebot import get_driver, on_command
+from nonebot import get_driver, on_message
+from nonebot.adapters import Bot, Event
+from nonebot.consts import CMD_KEY, PREFIX_KEY
+from nonebot.dependencies import Dependent
+from nonebot.exception import MatcherException
 from nonebot.log import logger
-from nonebot.matcher import current_matcher
+from nonebot.matcher import Matcher, current_matcher
+from nonebot.message import event_preprocessor
 from nonebot.params import CommandArg
+from nonebot.rule import TRIE_VALUE, Rule, TrieRule
+from nonebot.typing import T_State
 
 from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 
-from nextbot.db import CommandConfig, User, get_session
-from nextbot.stats import increment_command_execute_total
+from nextbot.db import CommandConfig, get_session, run_db
+from nextbot.stats import increment_command_execute_total, record_command_execution
 from nextbot.time_utils import db_now_utc_naive
+from nextbot.user_cache import UserSnapshot, get_cached_user, load_user_snapshot
 
 _ALLOWED_PARAM_TYPES = {"bool", "int", "float", "string"}
 _DEFAULT_DISABLED_MODE = "reply"
@@ -76,6 +85,22 @@ _runtime_cache_ready = False
 _current_command_context: contextvars.ContextVar[RuntimeCommandState | None] = (
     contextvars.ContextVar("nextbot_current_command_context", default=None)
 )
+_current_command_outcome: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "nextbot_current_command_outcome", default="success"
+)
+_current_user_context: contextvars.ContextVar[UserSnapshot | None] = (
+    contextvars.ContextVar("nextbot_current_user_context", default=None)
+)
+
+_ALIAS_STATE_KEY = "nextbot_alias_command_key"
+# alias -> command_key，整体替换而不是原地修改，读取方无需加锁
+_alias_table: dict[str, str] = {}
+_alias_table_version = 0
+# 以下只在事件循环中读写：已写入 TrieRule 的别名前缀及其对应的别名表版本
+_alias_prefixes: set[str] = set()
+_alias_prefix_version = 0
+_alias_handlers: dict[str, Dependent[Any]] = {}
+_alias_dispatch_matcher: type[Matcher] | None = None
 
 
 def _json_dumps(value: Any) -> str:
@@ -349,18 +374,20 @@ def _get_disabled_policy() -> tuple[str, str]:
     return mode, message
 
 
-def _check_user_banned(user_id: str) -> str:
-    session = get_session()
-    try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        if user is not None and user.is_banned:
-            reason = str(user.ban_reason or "").strip()
-            if reason:
-                return f"🚫 你已被封禁\n原因：{reason}\n如有疑问，请联系管理员"
-            return "🚫 你已被封禁\n如有疑问，请联系管理员"
-    finally:
-        session.close()
-    return ""
+async def _load_current_user(user_id: str) -> UserSnapshot | None:
+    hit, user = get_cached_user(user_id)
+    if hit:
+        return user
+    return await run_db(load_user_snapshot, user_id)
+
+
+def _build_ban_message(user: UserSnapshot | None) -> str:
+    if user is None or not user.is_banned:
+        return ""
+    reason = user.ban_reason.strip()
+    if reason:
+        return f"🚫 你已被封禁\n原因：{reason}\n如有疑问，请联系管理员"
+    return "🚫 你已被封禁\n如有疑问，请联系管理员"
 
 
 def _coerce_enabled(value: Any) -> bool:
@@ -439,10 +466,20 @@ def refresh_runtime_cache() -> None:
     for row in rows:
         runtime[row.command_key] = _to_runtime_state(row)
 
+    alias_table = {
+        alias: state.command_key
+        for state in runtime.values()
+        if state.is_registered
+        for alias in state.aliases
+    }
+
     with _registry_lock:
-        global _runtime_cache, _runtime_cache_ready
+        global _runtime_cache, _runtime_cache_ready, _alias_table, _alias_table_version
         _runtime_cache = runtime
         _runtime_cache_ready = True
+        if alias_table != _alias_table:
+            _alias_table = alias_table
+            _alias_table_version += 1
 
 
 def _ensure_runtime_cache_loaded() -> None:
@@ -535,6 +572,21 @@ def raise_command_usage() -> NoReturn:
     raise CommandUsageError
 
 
+def get_current_user() -> UserSnapshot | None:
+    """当前命令调用者的用户快照（只读），未注册或不在命令上下文中时为 None。
+
+    需要修改用户行（扣金币、改名等）的处理器仍应在自己的事务中查询 User。
+    """
+    return _current_user_context.get()
+
+
+def set_current_command_outcome(outcome: str) -> None:
+    """标记当前命令的执行结果，用于按命令统计（如权限不足时标记 denied）。"""
+    if _current_command_context.get() is None:
+        return
+    _current_command_outcome.set(outcome)
+
+
 def _serialize_runtime_state(item: RuntimeCommandState) -> dict[str, Any]:
     return {
         "command_key": item.command_key,
@@ -826,29 +878,85 @@ def update_command_aliases(
 _original_handlers: dict[str, Any] = {}
 
 
-def register_alias_matchers() -> None:
-    _ensure_runtime_cache_loaded()
+def _sync_alias_prefixes() -> None:
+    """把别名表同步到 NoneBot 的命令前缀树，只能在事件循环中调用。"""
+    global _alias_prefix_version
     with _registry_lock:
-        items = list(_runtime_cache.values())
-
-    count = 0
-    for state in items:
-        if not state.is_registered or not state.aliases:
+        table = _alias_table
+        version = _alias_table_version
+    if version == _alias_prefix_version:
+        return
+
+    command_start = get_driver().config.command_start
+    wanted: dict[str, TRIE_VALUE] = {
+        f"{start}{alias}": TRIE_VALUE(start, (alias,))
+        for alias in table
+        for start in command_start
+    }
+    for prefix in _alias_prefixes - wanted.keys():
+        TrieRule.prefix.pop(prefix, None)
+        _alias_prefixes.discard(prefix)
+    for prefix, value in wanted.items():
+        if prefix in _alias_prefixes:
             continue
-        original = _original_handlers.get(state.command_key)
-        if original is None:
+        if prefix in TrieRule.prefix:
+            logger.warning(f"命令别名与已有命令重复，已跳过：prefix={prefix}")
             continue
+        TrieRule.prefix[prefix] = value
+        _alias_prefixes.add(prefix)
+    _alias_prefix_version = version
+    logger.info(f"命令别名已生效：count={len(table)} version={version}")
 
-        for alias in state.aliases:
-            alias_matcher = on_command(alias)
-            alias_matcher.handle()(original)
-            count += 1
-            logger.info(
-                f"注册命令别名：alias={alias} command_key={state.command_key}"
-            )
 
-    if count > 0:
-        logger.info(f"命令别名注册完成：count={count}")
+@event_preprocessor
+async def _apply_alias_updates() -> None:
+    # WebUI 修改别名后，在下一条事件解析命令前把新别名写入前缀树
+    if _alias_table_version != _alias_prefix_version:
+        _sync_alias_prefixes()
+
+
+def _get_alias_handler(command_key: str) -> Dependent[Any] | None:
+    handler = _alias_handlers.get(command_key)
+    if handler is not None:
+        return handler
+    original = _original_handlers.get(command_key)
+    if original is None:
+        return None
+    handler = Dependent[Any].parse(
+        call=original, allow_types=Matcher.HANDLER_PARAM_TYPES
+    )
+    _alias_handlers[command_key] = handler
+    return handler
+
+
+async def _match_alias(state: T_State) -> bool:
+    command = state[PREFIX_KEY].get(CMD_KEY)
+    if not command or len(command) != 1:
+        return False
+    command_key = _alias_table.get(command[0])
+    if command_key is None or command_key not in _original_handlers:
+        return False
+    state[_ALIAS_STATE_KEY] = command_key
+    return True
+
+
+async def _dispatch_alias(
+    matcher: Matcher, bot: Bot, event: Event, state: T_State
+) -> None:
+    handler = _get_alias_handler(state[_ALIAS_STATE_KEY])
+    if handler is None:
+        return
+    await handler(matcher=matcher, bot=bot, event=event, state=state)
+
+
+def register_alias_matchers() -> None:
+    """注册唯一的别名分发 matcher；别名修改后无需重启即可生效。"""
+    global _alias_dispatch_matcher
+    _ensure_runtime_cache_loaded()
+    if _alias_dispatch_matcher is None:
+        _alias_dispatch_matcher = on_message(rule=Rule(_match_alias), priority=1, block=True)
+        _alias_dispatch_matcher.handle()(_dispatch_alias)
+    _sync_alias_prefixes()
 
 
 def command_control(
@@ -929,12 +1037,16 @@ def command_control(
         async def wrapper(*args, **kwargs):
             state = _get_runtime_state(normalized_key)
             context_token = _current_command_context.set(state)
+            outcome_token = _current_command_outcome.set("success")
+            user_token = _current_user_context.set(None)
+            started_at = time.perf_counter()
             try:
                 try:
                     increment_command_execute_total()
                 except Exception:
                     logger.exception(f"命令计数写入失败：command_key={normalized_key}")
                 if not state.enabled:
+                    _current_command_outcome.set("disabled")
                     bot, event = _resolve_bot_event(resolved_signature, args, kwargs)
                     mode, message = _get_disabled_policy()
                     if mode == "reply" and bot is not None and event is not None:
@@ -943,20 +1055,36 @@ def command_control(
 
                 bot, event = _resolve_bot_event(resolved_signature, args, kwargs)
                 if bot is not None and event is not None:
-                    ban_msg = _check_user_banned(event.get_user_id())
+                    user = await _load_current_user(event.get_user_id())
+                    _current_user_context.set(user)
+                    ban_msg = _build_ban_message(user)
                     if ban_msg:
+                        _current_command_outcome.set("banned")
                         at = OBV11MessageSegment.at(int(event.get_user_id()))
                         await bot.send(event, at + "\n" + ban_msg)
                         return None
 
                 return await func(*args, **kwargs)
             except CommandUsageError:
+                _current_command_outcome.set("usage_error")
                 bot, event = _resolve_bot_event(resolved_signature, args, kwargs)
                 if bot is not None and event is not None:
                     actual_cmd = _get_raw_command()
                     await bot.send(event, _build_usage_message(state.usage, actual_command=actual_cmd))
                 return None
+            except MatcherException:
+                # finish()/reject() 等流程控制异常，不算执行失败
+                raise
+            except Exception:
+                _current_command_outcome.set("error")
+                raise
             finally:
+                latency_ms = (time.perf_counter() - started_at) * 1000
+                record_command_execution(
+                    normalized_key, _current_command_outcome.get(), latency_ms
+                )
+                _current_user_context.reset(user_token)
+                _current_command_outcome.reset(outcome_token)
                 _current_command_context.reset(context_token)
 
         setattr(wrapper, "__signature__", resolved_signature)
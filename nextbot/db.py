@@ -1,13 +1,38 @@
 from __future__ import annotations
 
-import sqlite3
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
-
-from sqlalchemy import Boolean, DateTime, Float, Integer, String, Text, UniqueConstraint
+from typing import Any, Callable, Optional, TypeVar
+
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+    text,
+)
 from sqlalchemy.engine import Engine, create_engine
-from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, sessionmaker
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Mapped,
+    Query,
+    Session,
+    mapped_column,
+    sessionmaker,
+)
+from sqlalchemy.pool import QueuePool
 
 from nextbot.data_dir import DATA_DIR
 from nextbot.time_utils import db_now_utc_naive
@@ -17,6 +42,8 @@ DB_PATH = DATA_DIR / "app.db"
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 STAT_COMMAND_EXECUTE_TOTAL = "command.execute.total"
 
+T = TypeVar("T")
+
 
 class Base(DeclarativeBase):
     pass
@@ -35,6 +62,7 @@ class Server(Base):
 
 class User(Base):
     __tablename__ = "user"
+    __table_args__ = (Index("ix_user_coins", "coins"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[str] = mapped_column(String, nullable=False, unique=True)
@@ -68,6 +96,12 @@ class User(Base):
     )
 
 
+# 按名字查人走 user_cache 的内存名称索引；这个表达式索引服务于直接查库的
+# func.lower(User.name) == name.lower()（user_cache._lower_name_query，
+# 名称索引基准的对照组和手工排查），由 scripts/check_query_plans.py 检查
+Index("ix_user_name_lower", func.lower(User.name))
+
+
 class Group(Base):
     __tablename__ = "user_group"
 
@@ -103,6 +137,10 @@ class CommandConfig(Base):
 
 class UserSignRecord(Base):
     __tablename__ = "user_sign_record"
+    __table_args__ = (
+        Index("ix_user_sign_record_date_created", "sign_date", "created_at"),
+        Index("ix_user_sign_record_user_date", "user_id", "sign_date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[str] = mapped_column(String, nullable=False)
@@ -123,8 +161,32 @@ class SystemStat(Base):
     )
 
 
+class CommandMetric(Base):
+    __tablename__ = "command_metric"
+
+    command_key: Mapped[str] = mapped_column(String, primary_key=True)
+    invoke_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    success_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    denied_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    disabled_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    banned_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    usage_error_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_latency_ms: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    max_latency_ms: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    # 与 nextbot.stats.COMMAND_LATENCY_BUCKETS_MS 对应的计数，最后一位为溢出桶
+    latency_buckets_json: Mapped[str] = mapped_column(Text, nullable=False, default="[]")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=db_now_utc_naive
+    )
+
+
 class RedPacket(Base):
     __tablename__ = "red_packet"
+    __table_args__ = (
+        Index("ix_red_packet_sender_created", "sender_user_id", "created_at"),
+        Index("ix_red_packet_status_created", "status", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String, unique=True, nullable=False)
@@ -270,388 +332,324 @@ class LotteryPrize(Base):
     )
 
 
-def get_engine() -> Engine:
-    return create_engine(
-        DATABASE_URL,
-        future=True,
-        echo=False,
-        connect_args={"check_same_thread": False},
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=db_now_utc_naive
     )
 
 
-def init_db() -> None:
-    engine = get_engine()
-    Base.metadata.create_all(engine)
-    ensure_command_config_schema()
-    ensure_user_signin_schema()
-    ensure_sign_record_schema()
-    ensure_user_ban_schema()
-    ensure_user_rob_schema()
-    ensure_user_guess_schema()
-    ensure_user_dice_schema()
-    ensure_red_packet_schema()
-    ensure_shop_schema()
-    ensure_lottery_schema()
-    ensure_default_groups()
-    ensure_default_stats()
+_SQLITE_JOURNAL_MODES = {"delete", "truncate", "persist", "memory", "wal", "off"}
+_SQLITE_SYNCHRONOUS_MODES = {"off", "normal", "full", "extra"}
 
 
-def get_session() -> Session:
-    engine = get_engine()
-    session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-    return session_factory()
+@dataclass(frozen=True)
+class DatabaseSettings:
+    journal_mode: str = "wal"
+    synchronous: str = "normal"
+    busy_timeout_ms: int = 5000
+    cache_size_kib: int = 16384
+    mmap_size_mib: int = 128
+    pool_size: int = 5
+    max_overflow: int = 10
+    executor_workers: int = 4
 
 
-def ensure_default_groups() -> None:
-    session = get_session()
-    try:
-        guest = session.query(Group).filter(Group.name == "guest").first()
-        if guest is None:
-            session.add(Group(name="guest", permissions="about,ban.list,economy.dice,economy.guess_number,economy.red_packet.grab,economy.red_packet.list_all,economy.red_packet.list_own,economy.red_packet.send,economy.red_packet.withdraw,economy.rob,economy.sign,economy.transfer,leaderboard.coins,leaderboard.daily_sign,leaderboard.deaths,lottery.draw,lottery.list,lottery.view,leaderboard.dice_income,leaderboard.dice_win_rate,leaderboard.fishing,leaderboard.guess_number_income,leaderboard.guess_number_win_rate,leaderboard.online_time,leaderboard.rob_income,leaderboard.rob_loss,leaderboard.rob_penalty,leaderboard.rob_success_rate,leaderboard.signin,leaderboard.streak,leaderboard.total_online_time,menu.root,menu.search,player_query.inventory.self,player_query.inventory.user,player_query.kick.self,player_query.online,player_query.progress,security.login.confirm,security.login.reject,server.list,server.send,shop.buy,shop.list,shop.view,system.tutorial,user.info.self,user.info.user,user.register,user.whitelist.sync,warehouse.claim_self,warehouse.drop_self,warehouse.list_self,warehouse.list_user,warehouse.recycle_self", inherits=""))
-
-        default = session.query(Group).filter(Group.name == "default").first()
-        if default is None:
-            session.add(
-                Group(
-                    name="default",
-                    permissions="",
-                    inherits="guest",
-                )
-            )
-        session.commit()
-    finally:
-        session.close()
+_engine_lock = threading.Lock()
+_engine: Engine | None = None
+_session_factory: sessionmaker[Session] | None = None
+_async_session_factory: sessionmaker[Session] | None = None
+_executor: ThreadPoolExecutor | None = None
 
 
-def ensure_default_stats() -> None:
-    session = get_session()
+def _read_setting(name: str) -> Any:
+    # NoneBot loads `.env` into the driver config; fall back to the process
+    # environment for scripts that import this module without `nonebot.init()`.
     try:
-        command_total = (
-            session.query(SystemStat)
-            .filter(SystemStat.stat_key == STAT_COMMAND_EXECUTE_TOTAL)
-            .first()
-        )
-        if command_total is None:
-            session.add(
-                SystemStat(
-                    stat_key=STAT_COMMAND_EXECUTE_TOTAL,
-                    stat_value=0,
-                )
-            )
-        session.commit()
-    finally:
-        session.close()
+        from nonebot import get_driver
+
+        raw_value = getattr(get_driver().config, name, None)
+    except ValueError:
+        raw_value = None
+    if raw_value is None:
+        raw_value = os.environ.get(name.upper())
+    return raw_value
 
 
-def ensure_command_config_schema() -> None:
-    if not DB_PATH.exists():
-        return
+def _parse_choice(raw_value: Any, choices: set[str], default: str) -> str:
+    text = str(raw_value if raw_value is not None else "").strip().lower()
+    return text if text in choices else default
 
-    conn = sqlite3.connect(str(DB_PATH))
+
+def _parse_non_negative_int(raw_value: Any, default: int) -> int:
+    if raw_value is None or isinstance(raw_value, bool):
+        return default
     try:
-        rows = conn.execute('PRAGMA table_info("command_config")').fetchall()
-        if not rows:
-            return
-
-        columns = {str(row[1]) for row in rows}
-        changed = False
-        if "usage" not in columns:
-            conn.execute(
-                'ALTER TABLE "command_config" ADD COLUMN "usage" TEXT NOT NULL DEFAULT ""'
+        value = int(str(raw_value).strip())
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+def load_database_settings() -> DatabaseSettings:
+    defaults = DatabaseSettings()
+    return DatabaseSettings(
+        journal_mode=_parse_choice(
+            _read_setting("sqlite_journal_mode"),
+            _SQLITE_JOURNAL_MODES,
+            defaults.journal_mode,
+        ),
+        synchronous=_parse_choice(
+            _read_setting("sqlite_synchronous"),
+            _SQLITE_SYNCHRONOUS_MODES,
+            defaults.synchronous,
+        ),
+        busy_timeout_ms=_parse_non_negative_int(
+            _read_setting("sqlite_busy_timeout_ms"), defaults.busy_timeout_ms
+        ),
+        cache_size_kib=_parse_non_negative_int(
+            _read_setting("sqlite_cache_size_kib"), defaults.cache_size_kib
+        ),
+        mmap_size_mib=_parse_non_negative_int(
+            _read_setting("sqlite_mmap_size_mib"), defaults.mmap_size_mib
+        ),
+        pool_size=max(
+            _parse_non_negative_int(_read_setting("sqlite_pool_size"), defaults.pool_size),
+            1,
+        ),
+        max_overflow=_parse_non_negative_int(
+            _read_setting("sqlite_max_overflow"), defaults.max_overflow
+        ),
+        executor_workers=max(
+            _parse_non_negative_int(
+                _read_setting("sqlite_executor_workers"), defaults.executor_workers
+            ),
+            1,
+        ),
+    )
+
+
+def _install_sqlite_pragmas(engine: Engine, settings: DatabaseSettings) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection: Any, _connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={settings.journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={settings.synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={settings.busy_timeout_ms}")
+            # Negative cache_size is interpreted by SQLite as KiB, not pages.
+            cursor.execute(f"PRAGMA cache_size=-{settings.cache_size_kib}")
+            cursor.execute(f"PRAGMA mmap_size={settings.mmap_size_mib * 1024 * 1024}")
+        finally:
+            cursor.close()
+
+
+def create_db_engine(
+    url: str = DATABASE_URL,
+    settings: DatabaseSettings | None = None,
+) -> Engine:
+    runtime_settings = settings or load_database_settings()
+    engine = create_engine(
+        url,
+        future=True,
+        echo=False,
+        poolclass=QueuePool,
+        pool_size=runtime_settings.pool_size,
+        max_overflow=runtime_settings.max_overflow,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": runtime_settings.busy_timeout_ms / 1000,
+        },
+    )
+    _install_sqlite_pragmas(engine, runtime_settings)
+    return engine
+
+
+def get_engine() -> Engine:
+    global _engine, _session_factory, _async_session_factory, _executor
+    engine = _engine
+    if engine is not None:
+        return engine
+    with _engine_lock:
+        if _engine is None:
+            settings = load_database_settings()
+            _engine = create_db_engine(settings=settings)
+            _session_factory = sessionmaker(
+                bind=_engine, autoflush=False, autocommit=False
             )
-            changed = True
-        if "aliases_json" not in columns:
-            conn.execute(
-                'ALTER TABLE "command_config" ADD COLUMN "aliases_json" TEXT NOT NULL DEFAULT \'[]\''
+            # Async callers read attributes back on the event loop after
+            # commit, so instances must not expire (a refresh would be a
+            # blocking query on the loop thread).
+            _async_session_factory = sessionmaker(
+                bind=_engine,
+                autoflush=False,
+                autocommit=False,
+                expire_on_commit=False,
             )
-            changed = True
-        if "category" not in columns:
-            conn.execute(
-                'ALTER TABLE "command_config" ADD COLUMN "category" TEXT NOT NULL DEFAULT \'\''
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.executor_workers,
+                thread_name_prefix="nextbot-db",
             )
-            changed = True
-        if changed:
-            conn.commit()
-    finally:
-        conn.close()
+        return _engine
 
 
-def ensure_warehouse_schema() -> None:
-    if not DB_PATH.exists():
-        return
+def dispose_engine() -> None:
+    global _engine, _session_factory, _async_session_factory, _executor
+    with _engine_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+        _async_session_factory = None
+        _executor = None
 
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        rows = conn.execute('PRAGMA table_info("warehouse_item")').fetchall()
-        if not rows:
-            return
-
-        columns = {str(row[1]) for row in rows}
-        changed = False
-        if "value" not in columns:
-            conn.execute(
-                'ALTER TABLE "warehouse_item" ADD COLUMN "value" INTEGER NOT NULL DEFAULT 0'
-            )
-            changed = True
-        if changed:
-            conn.commit()
-    finally:
-        conn.close()
 
+def init_db() -> int:
+    from nextbot.db_migrations import run_migrations
 
-def ensure_lottery_schema() -> None:
-    # Tables themselves are created by Base.metadata.create_all; this hook
-    # exists so future column additions can ALTER without dropping data.
-    if not DB_PATH.exists():
-        return
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        pass
-    finally:
-        conn.close()
+    return run_migrations(get_engine())
 
 
-def ensure_shop_schema() -> None:
-    # Tables themselves are created by Base.metadata.create_all; this hook
-    # patches existing tables when new columns are added.
-    if not DB_PATH.exists():
-        return
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        rows = conn.execute('PRAGMA table_info("shop_item")').fetchall()
-        if not rows:
-            return
-        columns = {str(row[1]) for row in rows}
-        changed = False
-        if "show_command" not in columns:
-            conn.execute(
-                'ALTER TABLE "shop_item" ADD COLUMN "show_command" BOOLEAN NOT NULL DEFAULT 0'
-            )
-            changed = True
-        if "require_online" not in columns:
-            conn.execute(
-                'ALTER TABLE "shop_item" ADD COLUMN "require_online" BOOLEAN NOT NULL DEFAULT 0'
-            )
-            changed = True
-        if "actual_value" not in columns:
-            conn.execute('ALTER TABLE "shop_item" ADD COLUMN "actual_value" INTEGER')
-            changed = True
-        if "is_mystery" not in columns:
-            conn.execute(
-                'ALTER TABLE "shop_item" ADD COLUMN "is_mystery" BOOLEAN NOT NULL DEFAULT 0'
-            )
-            changed = True
-        if changed:
-            conn.commit()
-    finally:
-        conn.close()
+def get_session() -> Session:
+    session_factory = _session_factory
+    if session_factory is None:
+        get_engine()
+        session_factory = _session_factory
+    assert session_factory is not None
+    return session_factory()
 
 
-def ensure_user_signin_schema() -> None:
-    if not DB_PATH.exists():
-        return
+def _get_executor() -> ThreadPoolExecutor:
+    executor = _executor
+    if executor is None:
+        get_engine()
+        executor = _executor
+    assert executor is not None
+    return executor
 
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        rows = conn.execute('PRAGMA table_info("user")').fetchall()
-        if not rows:
-            return
-
-        columns = {str(row[1]) for row in rows}
-        changed = False
-        if "signed_today" not in columns:
-            conn.execute(
-                'ALTER TABLE "user" ADD COLUMN "signed_today" INTEGER NOT NULL DEFAULT 0'
-            )
-            changed = True
-        if "last_sign_date" not in columns:
-            conn.execute(
-                'ALTER TABLE "user" ADD COLUMN "last_sign_date" TEXT NOT NULL DEFAULT ""'
-            )
-            changed = True
-        if "sign_streak" not in columns:
-            conn.execute(
-                'ALTER TABLE "user" ADD COLUMN "sign_streak" INTEGER NOT NULL DEFAULT 0'
-            )
-            changed = True
-        if "sign_total" not in columns:
-            conn.execute(
-                'ALTER TABLE "user" ADD COLUMN "sign_total" INTEGER NOT NULL DEFAULT 0'
-            )
-            changed = True
-        if changed:
-            conn.commit()
-    finally:
-        conn.close()
 
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在数据库线程池中执行同步函数，避免阻塞事件循环。"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(func, *args, **kwargs)
+    )
 
-def ensure_sign_record_schema() -> None:
-    if not DB_PATH.exists():
-        return
 
-    conn = sqlite3.connect(str(DB_PATH))
+def _run_in_transaction(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    session_factory = _async_session_factory
+    if session_factory is None:
+        get_engine()
+        session_factory = _async_session_factory
+    assert session_factory is not None
+    session = session_factory()
     try:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS "user_sign_record" (
-                "id" INTEGER PRIMARY KEY AUTOINCREMENT,
-                "user_id" TEXT NOT NULL,
-                "sign_date" TEXT NOT NULL,
-                "streak" INTEGER NOT NULL DEFAULT 1,
-                "created_at" DATETIME NOT NULL
-            )
-            """
-        )
-        conn.commit()
+        # pysqlite 只在第一条写语句前隐式 BEGIN，读到的余额可能已被其他连接改写；
+        # 显式 BEGIN IMMEDIATE 在读取前就拿到写锁，整个读-判断-写过程不会交错
+        session.execute(text("BEGIN IMMEDIATE"))
+        result = func(session, *args, **kwargs)
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    else:
+        return result
     finally:
-        conn.close()
+        session.close()
 
 
-def ensure_user_ban_schema() -> None:
-    if not DB_PATH.exists():
-        return
+async def run_db_transaction(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在数据库线程池中以单个 BEGIN IMMEDIATE 事务执行 ``func(session, ...)``。
 
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        rows = conn.execute('PRAGMA table_info("user")').fetchall()
-        if not rows:
-            return
-
-        columns = {str(row[1]) for row in rows}
-        changed = False
-        if "is_banned" not in columns:
-            conn.execute(
-                'ALTER TABLE "user" ADD COLUMN "is_banned" INTEGER NOT NULL DEFAULT 0'
-            )
-            changed = True
-        if "banned_at" not in columns:
-            conn.execute(
-                'ALTER TABLE "user" ADD COLUMN "banned_at" DATETIME'
-            )
-            changed = True
-        if "ban_reason" not in columns:
-            conn.execute(
-                'ALTER TABLE "user" ADD COLUMN "ban_reason" TEXT NOT NULL DEFAULT ""'
-            )
-            changed = True
-        if changed:
-            conn.commit()
-    finally:
-        conn.close()
+    用于余额等读-判断-写操作：``func`` 返回后提交，抛出异常时回滚。
+    ``func`` 中不要 await，也不要自行提交。
+    """
+    return await run_db(_run_in_transaction, func, *args, **kwargs)
 
 
-def ensure_user_rob_schema() -> None:
-    if not DB_PATH.exists():
-        return
+class AsyncDBSession:
+    """供 async 代码使用的会话包装。
 
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        rows = conn.execute('PRAGMA table_info("user")').fetchall()
-        if not rows:
-            return
-
-        columns = {str(row[1]) for row in rows}
-        changed = False
-        for col in ("rob_total_count", "rob_success_count", "rob_total_gain", "rob_total_loss", "rob_total_penalty"):
-            if col not in columns:
-                conn.execute(
-                    f'ALTER TABLE "user" ADD COLUMN "{col}" INTEGER NOT NULL DEFAULT 0'
-                )
-                changed = True
-        if "last_rob_time" not in columns:
-            conn.execute(
-                'ALTER TABLE "user" ADD COLUMN "last_rob_time" DATETIME'
-            )
-            changed = True
-        if changed:
-            conn.commit()
-    finally:
-        conn.close()
+    构造 Query、``add``、``delete`` 不产生 I/O，直接在事件循环上执行；
+    所有会访问数据库的操作都需要 ``await``，并在数据库线程池中执行。
+    同一个会话的操作按 await 顺序串行执行，不会被多个线程同时使用。
+    """
 
+    def __init__(self) -> None:
+        session_factory = _async_session_factory
+        if session_factory is None:
+            get_engine()
+            session_factory = _async_session_factory
+        assert session_factory is not None
+        self.sync_session: Session = session_factory()
 
-def ensure_user_guess_schema() -> None:
-    if not DB_PATH.exists():
-        return
+    async def __aenter__(self) -> AsyncDBSession:
+        return self
 
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        rows = conn.execute('PRAGMA table_info("user")').fetchall()
-        if not rows:
-            return
-
-        columns = {str(row[1]) for row in rows}
-        changed = False
-        for col in ("guess_total_count", "guess_win_count", "guess_total_gain", "guess_total_loss"):
-            if col not in columns:
-                conn.execute(
-                    f'ALTER TABLE "user" ADD COLUMN "{col}" INTEGER NOT NULL DEFAULT 0'
-                )
-                changed = True
-        if changed:
-            conn.commit()
-    finally:
-        conn.close()
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        try:
+            if exc_type is not None:
+                await self.rollback()
+        finally:
+            await self.close()
 
+    def query(self, *entities: Any) -> Query[Any]:
+        return self.sync_session.query(*entities)
 
-def ensure_user_dice_schema() -> None:
-    if not DB_PATH.exists():
-        return
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
 
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        rows = conn.execute('PRAGMA table_info("user")').fetchall()
-        if not rows:
-            return
-
-        columns = {str(row[1]) for row in rows}
-        changed = False
-        for col in ("dice_total_count", "dice_win_count", "dice_total_gain", "dice_total_loss"):
-            if col not in columns:
-                conn.execute(
-                    f'ALTER TABLE "user" ADD COLUMN "{col}" INTEGER NOT NULL DEFAULT 0'
-                )
-                changed = True
-        if changed:
-            conn.commit()
-    finally:
-        conn.close()
+    def add_all(self, instances: Any) -> None:
+        self.sync_session.add_all(instances)
 
+    def delete(self, instance: Any) -> None:
+        self.sync_session.delete(instance)
 
-def ensure_red_packet_schema() -> None:
-    if not DB_PATH.exists():
-        return
+    async def run_sync(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_db(func, self.sync_session, *args, **kwargs)
 
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS "red_packet" (
-                "id" INTEGER PRIMARY KEY AUTOINCREMENT,
-                "name" TEXT NOT NULL UNIQUE,
-                "sender_user_id" TEXT NOT NULL,
-                "type" TEXT NOT NULL,
-                "total_amount" INTEGER NOT NULL,
-                "total_count" INTEGER NOT NULL,
-                "remaining_amount" INTEGER NOT NULL,
-                "remaining_count" INTEGER NOT NULL,
-                "status" TEXT NOT NULL DEFAULT 'active',
-                "created_at" DATETIME NOT NULL,
-                "closed_at" DATETIME
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS "red_packet_claim" (
-                "id" INTEGER PRIMARY KEY AUTOINCREMENT,
-                "red_packet_id" INTEGER NOT NULL,
-                "claimer_user_id" TEXT NOT NULL,
-                "amount" INTEGER NOT NULL,
-                "claimed_at" DATETIME NOT NULL,
-                CONSTRAINT "uq_redpacket_claimer" UNIQUE ("red_packet_id", "claimer_user_id")
-            )
-            """
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    async def first(self, query: Query[Any]) -> Any:
+        return await run_db(query.first)
+
+    async def all(self, query: Query[Any]) -> list[Any]:
+        return await run_db(query.all)
+
+    async def count(self, query: Query[Any]) -> int:
+        return await run_db(query.count)
+
+    async def scalar(self, query: Query[Any]) -> Any:
+        return await run_db(query.scalar)
+
+    async def update(self, query: Query[Any], values: Any, **kwargs: Any) -> int:
+        return await run_db(query.update, values, **kwargs)
+
+    async def delete_rows(self, query: Query[Any], **kwargs: Any) -> int:
+        return await run_db(query.delete, **kwargs)
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        return await run_db(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def flush(self) -> None:
+        await run_db(self.sync_session.flush)
+
+    async def refresh(self, instance: Any) -> None:
+        await run_db(self.sync_session.refresh, instance)
+
+    async def commit(self) -> None:
+        await run_db(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_db(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_db(self.sync_session.close)
+
+
+def db_session() -> AsyncDBSession:
+    """创建异步会话，可用于 ``async with db_session() as session``。"""
+    return AsyncDBSession()
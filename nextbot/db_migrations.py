@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+
+from nonebot.log import logger
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from nextbot.db import (
+    STAT_COMMAND_EXECUTE_TOTAL,
+    Base,
+    CommandMetric,
+    Group,
+    RedPacket,
+    SchemaVersion,
+    SystemStat,
+    User,
+    UserSignRecord,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection, Engine
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+_GUEST_DEFAULT_PERMISSIONS = ",".join(
+    (
+    "about",
+    "ban.list",
+    "economy.dice",
+    "economy.guess_number",
+    "economy.red_packet.grab",
+    "economy.red_packet.list_all",
+    "economy.red_packet.list_own",
+    "economy.red_packet.send",
+    "economy.red_packet.withdraw",
+    "economy.rob",
+    "economy.sign",
+    "economy.transfer",
+    "leaderboard.coins",
+    "leaderboard.daily_sign",
+    "leaderboard.deaths",
+    "lottery.draw",
+    "lottery.list",
+    "lottery.view",
+    "leaderboard.dice_income",
+    "leaderboard.dice_win_rate",
+    "leaderboard.fishing",
+    "leaderboard.guess_number_income",
+    "leaderboard.guess_number_win_rate",
+    "leaderboard.online_time",
+    "leaderboard.rob_income",
+    "leaderboard.rob_loss",
+    "leaderboard.rob_penalty",
+    "leaderboard.rob_success_rate",
+    "leaderboard.signin",
+    "leaderboard.streak",
+    "leaderboard.total_online_time",
+    "menu.root",
+    "menu.search",
+    "player_query.inventory.self",
+    "player_query.inventory.user",
+    "player_query.kick.self",
+    "player_query.online",
+    "player_query.progress",
+    "security.login.confirm",
+    "security.login.reject",
+    "server.list",
+    "server.send",
+    "shop.buy",
+    "shop.list",
+    "shop.view",
+    "system.tutorial",
+    "user.info.self",
+    "user.info.user",
+    "user.register",
+    "user.whitelist.sync",
+    "warehouse.claim_self",
+    "warehouse.drop_self",
+    "warehouse.list_self",
+    "warehouse.list_user",
+    "warehouse.recycle_self",
+    )
+)
+
+# 旧版本通过 ensure_*_schema 逐步追加的列；新库由 create_all 直接建出完整表结构。
+_LEGACY_COLUMNS: dict[str, dict[str, str]] = {
+    "command_config": {
+        "usage": 'TEXT NOT NULL DEFAULT ""',
+        "aliases_json": "TEXT NOT NULL DEFAULT '[]'",
+        "category": "TEXT NOT NULL DEFAULT ''",
+    },
+    "user": {
+        "signed_today": "INTEGER NOT NULL DEFAULT 0",
+        "last_sign_date": 'TEXT NOT NULL DEFAULT ""',
+        "sign_streak": "INTEGER NOT NULL DEFAULT 0",
+        "sign_total": "INTEGER NOT NULL DEFAULT 0",
+        "is_banned": "INTEGER NOT NULL DEFAULT 0",
+        "banned_at": "DATETIME",
+        "ban_reason": 'TEXT NOT NULL DEFAULT ""',
+        "rob_total_count": "INTEGER NOT NULL DEFAULT 0",
+        "rob_success_count": "INTEGER NOT NULL DEFAULT 0",
+        "rob_total_gain": "INTEGER NOT NULL DEFAULT 0",
+        "rob_total_loss": "INTEGER NOT NULL DEFAULT 0",
+        "rob_total_penalty": "INTEGER NOT NULL DEFAULT 0",
+        "last_rob_time": "DATETIME",
+        "guess_total_count": "INTEGER NOT NULL DEFAULT 0",
+        "guess_win_count": "INTEGER NOT NULL DEFAULT 0",
+        "guess_total_gain": "INTEGER NOT NULL DEFAULT 0",
+        "guess_total_loss": "INTEGER NOT NULL DEFAULT 0",
+        "dice_total_count": "INTEGER NOT NULL DEFAULT 0",
+        "dice_win_count": "INTEGER NOT NULL DEFAULT 0",
+        "dice_total_gain": "INTEGER NOT NULL DEFAULT 0",
+        "dice_total_loss": "INTEGER NOT NULL DEFAULT 0",
+    },
+    "warehouse_item": {
+        "value": "INTEGER NOT NULL DEFAULT 0",
+    },
+    "shop_item": {
+        "show_command": "BOOLEAN NOT NULL DEFAULT 0",
+        "require_online": "BOOLEAN NOT NULL DEFAULT 0",
+        "actual_value": "INTEGER",
+        "is_mystery": "BOOLEAN NOT NULL DEFAULT 0",
+    },
+}
+
+
+def _add_missing_columns(conn: Connection, table: str, columns: dict[str, str]) -> None:
+    rows = conn.exec_driver_sql(f'PRAGMA table_info("{table}")').fetchall()
+    existing = {str(row[1]) for row in rows}
+    for column, ddl in columns.items():
+        if column not in existing:
+            conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {ddl}')
+
+
+def _seed_defaults(conn: Connection) -> None:
+    session = Session(bind=conn)
+    try:
+        if session.get(Group, "guest") is None:
+            session.add(
+                Group(
+                    name="guest", permissions=_GUEST_DEFAULT_PERMISSIONS, inherits=""
+                )
+            )
+        if session.get(Group, "default") is None:
+            session.add(Group(name="default", permissions="", inherits="guest"))
+        if session.get(SystemStat, STAT_COMMAND_EXECUTE_TOTAL) is None:
+            session.add(SystemStat(stat_key=STAT_COMMAND_EXECUTE_TOTAL, stat_value=0))
+        session.flush()
+    finally:
+        session.close()
+
+
+def _migrate_baseline(conn: Connection) -> None:
+    Base.metadata.create_all(conn)
+    for table, columns in _LEGACY_COLUMNS.items():
+        _add_missing_columns(conn, table, columns)
+    _seed_defaults(conn)
+
+
+_HOT_QUERY_INDEX_NAMES: dict[type[Base], tuple[str, ...]] = {
+    User: ("ix_user_name_lower", "ix_user_coins"),
+    UserSignRecord: (
+        "ix_user_sign_record_date_created",
+        "ix_user_sign_record_user_date",
+    ),
+    RedPacket: ("ix_red_packet_sender_created", "ix_red_packet_status_created"),
+}
+
+
+def _migrate_hot_query_indexes(conn: Connection) -> None:
+    for model, names in _HOT_QUERY_INDEX_NAMES.items():
+        indexes = {index.name: index for index in model.__table__.indexes}
+        for name in names:
+            # checkfirst 反射不到表达式索引，直接用 IF NOT EXISTS
+            conn.execute(CreateIndex(indexes[name], if_not_exists=True))
+
+
+def _migrate_command_metrics(conn: Connection) -> None:
+    CommandMetric.__table__.create(conn, checkfirst=True)
+
+
+# 按 version 递增追加，已发布的步骤不要修改或重新编号。
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "baseline", _migrate_baseline),
+    Migration(2, "hot_query_indexes", _migrate_hot_query_indexes),
+    Migration(3, "command_metrics", _migrate_command_metrics),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: Connection) -> int:
+    try:
+        value = conn.execute(select(func.max(SchemaVersion.version))).scalar()
+    except OperationalError:
+        # 旧库或新库都还没有 schema_version 表
+        return 0
+    return int(value or 0)
+
+
+def run_migrations(engine: Engine) -> int:
+    """把数据库升级到最新版本，返回升级后的版本号。"""
+    with engine.connect() as conn:
+        current = get_schema_version(conn)
+        conn.commit()
+        if current >= LATEST_VERSION:
+            return current
+
+        # pysqlite 不会为 DDL 自动开启事务，这里显式开启，保证整次升级原子提交
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            # 拿到写锁后重新读取，避免多个进程重复执行同一步迁移
+            current = get_schema_version(conn)
+            for item in MIGRATIONS:
+                if item.version <= current:
+                    continue
+                logger.info(f"执行数据库迁移：version={item.version}，name={item.name}")
+                item.upgrade(conn)
+                SchemaVersion.__table__.create(conn, checkfirst=True)
+                conn.execute(
+                    SchemaVersion.__table__.insert().values(
+                        version=item.version,
+                        name=item.name,
+                    )
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    logger.info(f"数据库迁移完成：from_version={current}，to_version={LATEST_VERSION}")
+    return LATEST_VERSION
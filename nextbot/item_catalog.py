@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import heapq
+import json
+import threading
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from nonebot.log import logger
+
+from server.static_assets import DICTS_DIR
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+ITEM_DICT_PATH = DICTS_DIR / "item.json"
+PREFIX_DICT_PATH = DICTS_DIR / "prefix.json"
+
+DEFAULT_SEARCH_LIMIT = 20
+
+
+@dataclass(frozen=True)
+class ItemMatch:
+    item_id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class _Catalog:
+    """只读的物品目录，加载后整体替换，读取时不需要加锁。"""
+
+    # 下标即 ID，缺失的 ID 为空字符串
+    item_names: tuple[str, ...]
+    prefix_names: tuple[str, ...]
+    # 归一化后的物品名，供子串校验和排序
+    folded_names: tuple[str, ...]
+    # 单字与相邻两字 -> 名称中含有该片段的物品 ID，升序
+    grams: dict[str, array]
+    item_count: int
+    prefix_count: int
+
+
+_catalog: _Catalog | None = None
+_load_lock = threading.Lock()
+
+
+def _fold(text: str) -> str:
+    # NFKC 把全角括号、全角字母数字统一为半角，再忽略大小写
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _query_grams(folded: str) -> set[str]:
+    if len(folded) == 1:
+        return {folded}
+    return {folded[i:i + 2] for i in range(len(folded) - 1)}
+
+
+def _load_names(path: Path) -> dict[int, str]:
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        logger.warning(f"加载 dict 失败：{path}")
+        return {}
+    out: dict[int, str] = {}
+    if isinstance(raw, list):
+        for entry in raw:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                eid = int(entry.get("id", 0))
+            except (TypeError, ValueError):
+                continue
+            name = str(entry.get("name", "")).strip()
+            if eid > 0 and name:
+                out[eid] = name
+    return out
+
+
+def _to_array(names: dict[int, str]) -> tuple[str, ...]:
+    size = max(names, default=0) + 1
+    return tuple(names.get(index, "") for index in range(size))
+
+
+def _build_catalog() -> _Catalog:
+    item_map = _load_names(ITEM_DICT_PATH)
+    prefix_map = _load_names(PREFIX_DICT_PATH)
+    item_names = _to_array(item_map)
+    folded_names = tuple(_fold(name) for name in item_names)
+
+    grams: dict[str, array] = {}
+    for item_id, folded in enumerate(folded_names):
+        if not folded:
+            continue
+        for gram in set(folded) | _query_grams(folded):
+            postings = grams.get(gram)
+            if postings is None:
+                postings = grams[gram] = array("I")
+            postings.append(item_id)
+
+    return _Catalog(
+        item_names=item_names,
+        prefix_names=_to_array(prefix_map),
+        folded_names=folded_names,
+        grams=grams,
+        item_count=len(item_map),
+        prefix_count=len(prefix_map),
+    )
+
+
+def load_catalog() -> tuple[int, int]:
+    """加载物品与前缀名称并建立搜索索引，已加载时直接返回。返回 (物品数, 前缀数)。"""
+    global _catalog  # noqa: PLW0603
+    with _load_lock:
+        if _catalog is None:
+            _catalog = _build_catalog()
+        return _catalog.item_count, _catalog.prefix_count
+
+
+def _get_catalog() -> _Catalog:
+    if _catalog is None:
+        load_catalog()
+    assert _catalog is not None
+    return _catalog
+
+
+def _lookup(names: tuple[str, ...], entry_id: int) -> str | None:
+    entry_id = int(entry_id)
+    if 0 < entry_id < len(names):
+        return names[entry_id] or None
+    return None
+
+
+def name(item_id: int) -> str | None:
+    """物品中文名，未知 ID 返回 None。"""
+    return _lookup(_get_catalog().item_names, item_id)
+
+
+def prefix_name(prefix_id: int) -> str | None:
+    """前缀中文名，未知 ID 或 0 返回 None。"""
+    return _lookup(_get_catalog().prefix_names, prefix_id)
+
+
+def item_names_for(item_ids: Iterable[int]) -> dict[str, str]:
+    """只取页面用到的物品名称，键为字符串 ID，可直接写入渲染数据。"""
+    names = _get_catalog().item_names
+    out: dict[str, str] = {}
+    for item_id in item_ids:
+        item_name = _lookup(names, item_id)
+        if item_name is not None:
+            out[str(item_id)] = item_name
+    return out
+
+
+def prefix_names_for(prefix_ids: Iterable[int]) -> dict[str, str]:
+    names = _get_catalog().prefix_names
+    out: dict[str, str] = {}
+    for prefix_id in prefix_ids:
+        item_prefix = _lookup(names, prefix_id)
+        if item_prefix is not None:
+            out[str(prefix_id)] = item_prefix
+    return out
+
+
+def _candidate_ids(catalog: _Catalog, folded: str) -> Iterable[int] | None:
+    """包含查询全部两字片段的物品 ID，有片段不在索引中时返回 None。"""
+    postings: list[array] = []
+    for gram in _query_grams(folded):
+        gram_postings = catalog.grams.get(gram)
+        if gram_postings is None:
+            return None
+        postings.append(gram_postings)
+    # 从最短的倒排表出发，其余片段用集合求交，最后由调用方校验片段是否连续出现
+    postings.sort(key=len)
+    if len(postings) == 1:
+        return postings[0]
+    common = set(postings[1]).intersection(*postings[2:])
+    return (item_id for item_id in postings[0] if item_id in common)
+
+
+def search(query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[ItemMatch]:
+    """按名称子串搜索物品，纯数字时优先返回该 ID 的物品。
+
+    排序：名称完全相同 > 名称以查询开头 > 其余，同级按名称长度、ID 升序。
+    """
+    folded = _fold(str(query)).strip()
+    if not folded or limit <= 0:
+        return []
+    catalog = _get_catalog()
+
+    matches: list[ItemMatch] = []
+    exact_id = -1
+    if folded.isdigit():
+        exact_id = int(folded)
+        exact_name = _lookup(catalog.item_names, exact_id)
+        if exact_name is not None:
+            matches.append(ItemMatch(item_id=exact_id, name=exact_name))
+
+    candidates = _candidate_ids(catalog, folded)
+    if candidates is None:
+        return matches
+
+    def rank(item_id: int) -> tuple[int, int, int]:
+        folded_name = catalog.folded_names[item_id]
+        if folded_name == folded:
+            level = 0
+        elif folded_name.startswith(folded):
+            level = 1
+        else:
+            level = 2
+        return level, len(folded_name), item_id
+
+    hits = (
+        item_id
+        for item_id in candidates
+        if item_id != exact_id and folded in catalog.folded_names[item_id]
+    )
+    matches.extend(
+        ItemMatch(item_id=item_id, name=catalog.item_names[item_id])
+        for item_id in heapq.nsmallest(limit - len(matches), hits, key=rank)
+    )
+    return matches
@@ -1,15 +1,46 @@
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 from typing import Any
 
-from sqlalchemy import func
-
-from nextbot.db import User, get_session
+from nextbot.user_cache import find_user_ids_by_name
 
 from nonebot.log import logger
 
 
+_PARSED_MESSAGE_ATTR = "_nextbot_parsed_message"
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class ParsedMessage:
+    """一条消息转换后的纯文本，以及按命令名缓存的参数切分结果。"""
+
+    __slots__ = ("text", "_args_text", "_args")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._args_text: dict[str, str | None] = {}
+        self._args: dict[str, list[str]] = {}
+
+    def args_text(self, command_name: str) -> str | None:
+        if command_name in self._args_text:
+            return self._args_text[command_name]
+        args_text = _extract_args_text(self.text, command_name) if self.text else None
+        self._args_text[command_name] = args_text
+        return args_text
+
+    def args(self, command_name: str) -> list[str]:
+        cached = self._args.get(command_name)
+        if cached is not None:
+            return list(cached)
+        args_text = self.args_text(command_name)
+        args = args_text.split() if args_text else []
+        self._args[command_name] = args
+        logger.debug(f"消息解析器：command={command_name} text={self.text} args={args}")
+        return list(args)
+
+
 def _message_segments_from_event(event: Any) -> list[Any]:
     original_message = getattr(event, "original_message", None)
     if original_message is None:
@@ -41,51 +72,41 @@ def _segments_to_plain_text(segments: list[Any]) -> str:
 
     text = "".join(parts)
     # Normalize duplicated whitespace generated by mixed segments.
-    return re.sub(r"\s+", " ", text).strip()
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=512)
+def _command_pattern(command_name: str) -> re.Pattern[str]:
+    return re.compile(rf"^/?{re.escape(command_name)}(?:\s+|$)")
 
 
 def _extract_args_text(text: str, command_name: str) -> str | None:
-    cmd = re.escape(command_name)
-    match = re.match(rf"^/?{cmd}(?:\s+|$)", text)
+    match = _command_pattern(command_name).match(text)
     if match is None:
         return None
     return text[match.end() :].strip()
 
 
-def parse_command_args(event: Any, command_name: str) -> list[str]:
-    segments = _message_segments_from_event(event)
-    if not segments:
-        return []
+def get_parsed_message(event: Any) -> ParsedMessage:
+    """同一事件只解析一次消息段，结果挂在事件对象上复用。"""
+    parsed = getattr(event, _PARSED_MESSAGE_ATTR, None)
+    if isinstance(parsed, ParsedMessage):
+        return parsed
 
-    text = _segments_to_plain_text(segments)
-    if not text:
-        return []
+    parsed = ParsedMessage(_segments_to_plain_text(_message_segments_from_event(event)))
+    try:
+        setattr(event, _PARSED_MESSAGE_ATTR, parsed)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return parsed
 
-    args_text = _extract_args_text(text, command_name)
-    if args_text is None:
-        return []
 
-    if not args_text:
-        logger.info(f"消息解析器：command={command_name} text={text} args=[]")
-        return []
-    args = args_text.split()
-    logger.info(f"消息解析器：command={command_name} text={text} args={args}")
-    return args
+def parse_command_args(event: Any, command_name: str) -> list[str]:
+    return get_parsed_message(event).args(command_name)
 
 
 def parse_command_text(event: Any, command_name: str) -> str | None:
-    segments = _message_segments_from_event(event)
-    if not segments:
-        return None
-
-    text = _segments_to_plain_text(segments)
-    if not text:
-        return None
-
-    args_text = _extract_args_text(text, command_name)
-    if args_text is None:
-        return None
-    return args_text
+    return get_parsed_message(event).args_text(command_name)
 
 
 def parse_command_args_with_fallback(
@@ -107,7 +128,7 @@ def parse_command_text_with_fallback(
     return getattr(arg, "extract_plain_text", lambda: "")().strip()
 
 
-def resolve_user_id_arg_with_fallback(
+async def resolve_user_id_arg_with_fallback(
     event: Any,
     arg: Any,
     command_name: str,
@@ -126,18 +147,7 @@ def resolve_user_id_arg_with_fallback(
     if token.isdigit():
         return token, None
 
-    session = get_session()
-    try:
-        matched = (
-            session.query(User)
-            .filter(func.lower(User.name) == token.lower())
-            .order_by(User.id.asc())
-            .limit(2)
-            .all()
-        )
-    finally:
-        session.close()
-
+    matched = await find_user_ids_by_name(token)
     if not matched:
         logger.info(
             f"消息解析器：command={command_name} 用户参数解析失败 reason=name_not_found token={token}"
@@ -149,7 +159,7 @@ def resolve_user_id_arg_with_fallback(
         )
         return None, "name_ambiguous"
 
-    resolved = str(matched[0].user_id).strip()
+    resolved = matched[0]
     logger.info(
         f"消息解析器：command={command_name} 用户参数解析成功 source=name token={token} user_id={resolved}"
     )
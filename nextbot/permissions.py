@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import threading
 from typing import Iterable
 
 from nonebot.log import logger
 
 from nextbot.access_control import get_owner_ids
-from nextbot.db import Group, User, get_session
+from nextbot.command_config import get_current_user, set_current_command_outcome
+from nextbot.db import Group, get_session, run_db
+from nextbot.user_cache import UserSnapshot, get_cached_user, load_user_snapshot
 
 
 def _split_values(value: str) -> list[str]:
@@ -23,48 +26,175 @@ def _match_permission(granted: str, required: str) -> bool:
     return granted == required
 
 
-def get_effective_permissions(user_id: str) -> set[str]:
-    session = get_session()
-    try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        if user is None:
-            group_name = "guest"
-            user_perms: set[str] = set()
-        else:
-            group_name = user.group or "guest"
-            user_perms = set(_split_values(user.permissions))
-
-        group_perms = _get_group_permissions(session, group_name, set())
-        return user_perms | group_perms
-    finally:
-        session.close()
+class _WildcardTrie:
+    """按 ``.`` 分段的前缀树，``a.b.*`` 匹配所有以 ``a.b.`` 开头的权限。"""
+
+    __slots__ = ("children", "terminal")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _WildcardTrie] = {}
+        self.terminal = False
+
+    def insert(self, prefix: str) -> None:
+        node = self
+        for segment in prefix.split("."):
+            child = node.children.get(segment)
+            if child is None:
+                child = _WildcardTrie()
+                node.children[segment] = child
+            node = child
+        node.terminal = True
+
+    def matches(self, required: str) -> bool:
+        node = self
+        segments = required.split(".")
+        for index, segment in enumerate(segments):
+            node = node.children.get(segment)
+            if node is None:
+                return False
+            if node.terminal and index < len(segments) - 1:
+                return True
+        return False
+
 
+class CompiledPermissions:
+    __slots__ = ("exact", "wildcards")
 
-def _get_group_permissions(
-    session,
-    group_name: str,
+    def __init__(self, perms: Iterable[str]) -> None:
+        exact: set[str] = set()
+        wildcards = _WildcardTrie()
+        for granted in perms:
+            exact.add(granted)
+            if granted.endswith(".*"):
+                wildcards.insert(granted[:-2])
+        self.exact = frozenset(exact)
+        self.wildcards = wildcards
+
+    def allows(self, required: str) -> bool:
+        return required in self.exact or self.wildcards.matches(required)
+
+
+# user_group 表编译后的结果：组名 -> 展开继承后的权限集合
+_compiled_groups: dict[str, CompiledPermissions] | None = None
+_compiled_groups_generation = 0
+_compiled_groups_lock = threading.Lock()
+
+
+def invalidate_permission_cache() -> None:
+    """身份组的权限或继承关系变更后调用，下次检查时重新编译。"""
+    global _compiled_groups, _compiled_groups_generation
+    with _compiled_groups_lock:
+        _compiled_groups = None
+        _compiled_groups_generation += 1
+
+
+def _flatten_group(
+    name: str,
+    raw_groups: dict[str, tuple[list[str], list[str]]],
     visited: set[str],
 ) -> set[str]:
-    if group_name in visited:
-        return set()
-    visited.add(group_name)
-
-    group = session.query(Group).filter(Group.name == group_name).first()
-    if group is None:
+    if name in visited or name not in raw_groups:
         return set()
+    visited.add(name)
 
-    perms = set(_split_values(group.permissions))
-    for parent in _split_values(group.inherits):
-        perms |= _get_group_permissions(session, parent, visited)
+    own, parents = raw_groups[name]
+    perms = set(own)
+    for parent in parents:
+        perms |= _flatten_group(parent, raw_groups, visited)
     return perms
 
 
+def _compile_groups(session) -> dict[str, CompiledPermissions]:
+    raw_groups = {
+        str(name): (_split_values(permissions or ""), _split_values(inherits or ""))
+        for name, permissions, inherits in session.query(
+            Group.name, Group.permissions, Group.inherits
+        ).all()
+    }
+    return {
+        name: CompiledPermissions(_flatten_group(name, raw_groups, set()))
+        for name in raw_groups
+    }
+
+
+def _peek_compiled_groups() -> dict[str, CompiledPermissions] | None:
+    with _compiled_groups_lock:
+        return _compiled_groups
+
+
+def _get_compiled_groups() -> dict[str, CompiledPermissions]:
+    global _compiled_groups
+    with _compiled_groups_lock:
+        compiled = _compiled_groups
+        generation = _compiled_groups_generation
+    if compiled is not None:
+        return compiled
+
+    session = get_session()
+    try:
+        compiled = _compile_groups(session)
+    finally:
+        session.close()
+    with _compiled_groups_lock:
+        # 编译期间发生过失效则不写回，避免缓存旧数据
+        if generation == _compiled_groups_generation:
+            _compiled_groups = compiled
+    return compiled
+
+
+def _user_allows(
+    user: UserSnapshot | None,
+    permission: str,
+    groups: dict[str, CompiledPermissions],
+) -> bool:
+    if user is None:
+        group_name = "guest"
+    else:
+        if any(
+            _match_permission(granted, permission)
+            for granted in _split_values(user.permissions)
+        ):
+            return True
+        group_name = user.group or "guest"
+    group_perms = groups.get(group_name)
+    return group_perms is not None and group_perms.allows(permission)
+
+
+def get_effective_permissions(user_id: str) -> set[str]:
+    user = load_user_snapshot(user_id)
+    if user is None:
+        group_name = "guest"
+        user_perms: set[str] = set()
+    else:
+        group_name = user.group or "guest"
+        user_perms = set(_split_values(user.permissions))
+
+    group_perms = _get_compiled_groups().get(group_name)
+    if group_perms is None:
+        return user_perms
+    return user_perms | set(group_perms.exact)
+
+
 def has_permission(user_id: str, permission: str) -> bool:
     owner_ids = get_owner_ids()
     if user_id in owner_ids:
         return True
-    perms = get_effective_permissions(user_id)
-    return any(_match_permission(granted, permission) for granted in perms)
+    return _user_allows(load_user_snapshot(user_id), permission, _get_compiled_groups())
+
+
+def check_permission_cached(user_id: str, permission: str) -> bool | None:
+    """只用内存中的用户快照和身份组缓存判断权限，缓存未命中时返回 None。"""
+    if user_id in get_owner_ids():
+        return True
+    groups = _peek_compiled_groups()
+    if groups is None:
+        return None
+    user = get_current_user()
+    if user is None or user.user_id != user_id:
+        hit, user = get_cached_user(user_id)
+        if not hit:
+            return None
+    return _user_allows(user, permission, groups)
 
 
 def require_permission(permission: str):
@@ -99,7 +229,11 @@ def require_permission(permission: str):
                 return await func(*args, **kwargs)
 
             user_id = event.get_user_id()
-            if not has_permission(user_id, permission):
+            allowed = check_permission_cached(user_id, permission)
+            if allowed is None:
+                allowed = await run_db(has_permission, user_id, permission)
+            if not allowed:
+                set_current_command_outcome("denied")
                 logger.info(
                     f"权限不足：user_id={user_id} permission={permission}"
                 )
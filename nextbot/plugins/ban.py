@@ -1,6 +1,4 @@
-import base64
 import math
-from pathlib import Path
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
@@ -8,18 +6,16 @@ from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
 
-from nextbot.access_control import get_owner_ids
 from nextbot.ban_core import apply_ban_to_db, sync_user_to_blacklist
 from nextbot.command_config import command_control, get_current_param, raise_command_usage
-from nextbot.db import Server, User, get_session
+from nextbot.db import Server, User, db_session, run_db_transaction
 from nextbot.message_parser import parse_command_args_with_fallback, resolve_user_id_arg_with_fallback
 from nextbot.permissions import require_permission
-from nextbot.render_utils import resolve_render_theme
-from nextbot.time_utils import beijing_filename_timestamp, db_now_utc_naive
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
 from nextbot.time_utils import format_beijing_datetime
 from nextbot.tshock_api import TShockRequestError, get_error_reason, is_success, request_server_api
 from nextbot.text_utils import EMOJI_USER, reply_failure, reply_success
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
+from server.screenshot import ScreenshotOptions
 from server.web_server import create_ban_list_page
 
 ban_matcher = on_command("封禁用户")
@@ -33,12 +29,6 @@ BAN_LIST_SCREENSHOT_OPTIONS = ScreenshotOptions(
 )
 
 
-def _to_base64_image_uri(path: Path) -> str:
-    raw = path.read_bytes()
-    encoded = base64.b64encode(raw).decode("ascii")
-    return f"base64://{encoded}"
-
-
 @ban_matcher.handle()
 @command_control(
     command_key="admin.ban",
@@ -52,7 +42,7 @@ def _to_base64_image_uri(path: Path) -> str:
 async def handle_ban(bot: Bot, event: Event, arg: Message = CommandArg()) -> None:
     at = OBV11MessageSegment.at(int(event.get_user_id()))
 
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event, arg, "封禁用户", arg_index=0,
     )
     if parse_error == "missing":
@@ -73,7 +63,7 @@ async def handle_ban(bot: Bot, event: Event, arg: Message = CommandArg()) -> Non
     if not reason:
         raise_command_usage()
 
-    result = apply_ban_to_db(target_user_id, reason)
+    result = await run_db_transaction(apply_ban_to_db, target_user_id, reason)
     if result.code == "not_found":
         await bot.send(event, at + " " + reply_failure("封禁", "未找到该用户"))
         return
@@ -140,22 +130,21 @@ async def handle_ban_list(bot: Bot, event: Event, arg: Message = CommandArg()) -
 
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
-    session = get_session()
+    session = db_session()
     try:
-        banned_users = (
+        banned_users = await session.all(
             session.query(User)
             .filter(User.is_banned == True)
             .order_by(User.banned_at.asc())
-            .all()
         )
     finally:
-        session.close()
+        await session.close()
 
     total = len(banned_users)
     total_pages = max(1, math.ceil(total / limit))
 
     if total == 0:
-        page_url = create_ban_list_page(
+        render_page = create_ban_list_page(
             page=1, total_pages=1, entries=[], theme=resolve_render_theme(),
         )
     else:
@@ -175,32 +164,24 @@ async def handle_ban_list(bot: Bot, event: Event, arg: Message = CommandArg()) -
             }
             for i, u in enumerate(page_users)
         ]
-        page_url = create_ban_list_page(
+        render_page = create_ban_list_page(
             page=page, total_pages=total_pages, entries=entries, theme=resolve_render_theme(),
         )
 
     logger.info(
-        f"封禁列表渲染地址：page={page}/{total_pages} total={total} internal_url={page_url}"
+        f"封禁列表渲染：page={page}/{total_pages} total={total}"
     )
 
-    screenshot_path = Path("/tmp") / f"ban-list-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=BAN_LIST_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", f"{exc}"))
-        return
-
-    logger.info(f"封禁列表截图成功：page={page}/{total_pages} file={screenshot_path}")
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=BAN_LIST_SCREENSHOT_OPTIONS,
+        file_prefix="ban-list",
+        failure_action="查询",
+    ):
         return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info(f"封禁列表截图成功：page={page}/{total_pages}")
 
 
 @unban_matcher.handle()
@@ -216,7 +197,7 @@ async def handle_ban_list(bot: Bot, event: Event, arg: Message = CommandArg()) -
 async def handle_unban(bot: Bot, event: Event, arg: Message = CommandArg()) -> None:
     at = OBV11MessageSegment.at(int(event.get_user_id()))
 
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event, arg, "解封用户", arg_index=0,
     )
     if parse_error == "missing":
@@ -234,9 +215,9 @@ async def handle_unban(bot: Bot, event: Event, arg: Message = CommandArg()) -> N
     if len(args) != 1:
         raise_command_usage()
 
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == target_user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == target_user_id))
         if user is None:
             await bot.send(event, at + " " + reply_failure("解封", "未找到该用户"))
             return
@@ -248,20 +229,20 @@ async def handle_unban(bot: Bot, event: Event, arg: Message = CommandArg()) -> N
         user.is_banned = False
         user.banned_at = None
         user.ban_reason = ""
-        session.commit()
+        await session.commit()
 
         user_name = user.name
         user_qq = user.user_id
     finally:
-        session.close()
+        await session.close()
 
     logger.info(f"用户解封成功：user_id={user_qq} name={user_name}")
 
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
     lines: list[str] = [
         reply_success("解封"),
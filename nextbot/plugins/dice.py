@@ -6,9 +6,10 @@ from nonebot.adapters import Bot, Event, Message
 from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
+from sqlalchemy.orm import Session
 
 from nextbot.command_config import command_control, get_current_param, raise_command_usage
-from nextbot.db import User, get_session
+from nextbot.db import User, run_db_transaction
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.permissions import require_permission
 from nextbot.time_utils import db_now_utc_naive
@@ -132,42 +133,39 @@ async def handle_dice(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
                 await bot.send(event, at + " " + reply_failure("掷骰子", f"冷却中，还需等待 {remaining_s} 秒"))
                 return
 
-    session = get_session()
-    try:
+    # 掷骰子
+    d1 = random.randint(1, 6)
+    d2 = random.randint(1, 6)
+    d3 = random.randint(1, 6)
+    total = d1 + d2 + d3
+    is_triple = d1 == d2 == d3
+
+    # 判定结果
+    big_multiplier = max(1, int(get_current_param("big_multiplier", 2)))
+    small_multiplier = max(1, int(get_current_param("small_multiplier", 2)))
+    triple_multiplier = max(1, int(get_current_param("triple_multiplier", 10)))
+
+    payout = 0
+    if choice == "豹子":
+        if is_triple:
+            payout = cost * triple_multiplier
+    elif choice == "大":
+        if not is_triple and total >= 11:
+            payout = cost * big_multiplier
+    elif choice == "小":
+        if not is_triple and total <= 10:
+            payout = cost * small_multiplier
+    net = payout - cost
+
+    def apply_dice(session: Session) -> tuple[str, int]:
         user = session.query(User).filter(User.user_id == user_id).first()
         if user is None:
-            await bot.send(event, at + " " + reply_failure("掷骰子", "请先注册账号"))
-            return
+            return "请先注册账号", 0
 
         coins = int(user.coins or 0)
         if coins < cost:
-            await bot.send(event, at + " " + reply_failure("掷骰子", f"金币不足（当前 {coins}）"))
-            return
-
-        # 掷骰子
-        d1 = random.randint(1, 6)
-        d2 = random.randint(1, 6)
-        d3 = random.randint(1, 6)
-        total = d1 + d2 + d3
-        is_triple = d1 == d2 == d3
-
-        # 判定结果
-        big_multiplier = max(1, int(get_current_param("big_multiplier", 2)))
-        small_multiplier = max(1, int(get_current_param("small_multiplier", 2)))
-        triple_multiplier = max(1, int(get_current_param("triple_multiplier", 10)))
-
-        payout = 0
-        if choice == "豹子":
-            if is_triple:
-                payout = cost * triple_multiplier
-        elif choice == "大":
-            if not is_triple and total >= 11:
-                payout = cost * big_multiplier
-        elif choice == "小":
-            if not is_triple and total <= 10:
-                payout = cost * small_multiplier
-
-        net = payout - cost
+            return f"金币不足（当前 {coins}）", coins
+
         user.coins = coins + net
         user.dice_total_count = int(user.dice_total_count or 0) + 1
         if net > 0:
@@ -175,11 +173,12 @@ async def handle_dice(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
             user.dice_total_gain = int(user.dice_total_gain or 0) + net
         elif net < 0:
             user.dice_total_loss = int(user.dice_total_loss or 0) + abs(net)
-        session.commit()
+        return "", int(user.coins)
 
-        final_coins = int(user.coins)
-    finally:
-        session.close()
+    error, final_coins = await run_db_transaction(apply_dice)
+    if error:
+        await bot.send(event, at + " " + reply_failure("掷骰子", error))
+        return
 
     _cooldown_map[user_id] = now
 
@@ -3,6 +3,7 @@ from __future__ import annotations
 import random
 from dataclasses import dataclass
 from datetime import date, timedelta
+from typing import Literal
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
@@ -15,7 +16,9 @@ from nextbot.command_config import (
     get_current_param,
     raise_command_usage,
 )
-from nextbot.db import User, UserSignRecord, get_session
+from sqlalchemy.orm import Session
+
+from nextbot.db import User, UserSignRecord, run_db_transaction
 from nextbot.message_parser import parse_command_args_with_fallback, resolve_user_id_arg_with_fallback
 from nextbot.permissions import require_permission
 from nextbot.text_utils import (
@@ -52,6 +55,25 @@ class SignResult:
     streak_reward: int
 
 
+@dataclass(frozen=True)
+class SignOutcome:
+    code: Literal["not_registered", "already_signed", "signed"]
+    user_name: str = ""
+    base_reward: int = 0
+    streak: SignResult | None = None
+    total_reward: int = 0
+    coins: int = 0
+    today_order: int = 0
+
+
+@dataclass(frozen=True)
+class CoinsOutcome:
+    code: Literal["not_found", "target_not_found", "insufficient", "ok"]
+    user_name: str = ""
+    coins: int = 0
+    target_name: str = ""
+
+
 def _today_text() -> str:
     return beijing_today_text()
 
@@ -82,6 +104,87 @@ def _resolve_streak_reward(
     )
 
 
+def _apply_sign(
+    session: Session,
+    user_id: str,
+    *,
+    today_text: str,
+    base_reward: int,
+    enable_streak: bool,
+    streak_bonus_per_day: int,
+    max_streak_bonus: int,
+) -> SignOutcome:
+    user = session.query(User).filter(User.user_id == user_id).first()
+    if user is None:
+        return SignOutcome(code="not_registered")
+
+    last_sign_date = str(user.last_sign_date or "").strip()
+    if bool(user.signed_today) or last_sign_date == today_text:
+        return SignOutcome(code="already_signed")
+
+    streak_result = _resolve_streak_reward(
+        last_sign_date=last_sign_date,
+        current_streak=int(user.sign_streak or 0),
+        enable_streak=enable_streak,
+        streak_bonus_per_day=streak_bonus_per_day,
+        max_streak_bonus=max_streak_bonus,
+        today_text=today_text,
+    )
+    total_reward = base_reward + streak_result.streak_reward
+
+    user.coins = int(user.coins or 0) + total_reward
+    user.signed_today = True
+    user.last_sign_date = today_text
+    user.sign_streak = streak_result.next_streak
+    user.sign_total = int(user.sign_total or 0) + 1
+    session.add(UserSignRecord(
+        user_id=user_id,
+        sign_date=today_text,
+        streak=streak_result.next_streak,
+    ))
+    session.flush()
+
+    today_order = (
+        session.query(UserSignRecord)
+        .filter(UserSignRecord.sign_date == today_text)
+        .count()
+    )
+    return SignOutcome(
+        code="signed",
+        user_name=str(user.name),
+        base_reward=base_reward,
+        streak=streak_result,
+        total_reward=total_reward,
+        coins=int(user.coins),
+        today_order=today_order,
+    )
+
+
+def _apply_transfer(
+    session: Session, sender_id: str, target_user_id: str, amount: int,
+) -> CoinsOutcome:
+    sender = session.query(User).filter(User.user_id == sender_id).first()
+    if sender is None:
+        return CoinsOutcome(code="not_found")
+
+    target = session.query(User).filter(User.user_id == target_user_id).first()
+    if target is None:
+        return CoinsOutcome(code="target_not_found")
+
+    sender_coins = int(sender.coins or 0)
+    if sender_coins < amount:
+        return CoinsOutcome(code="insufficient", coins=sender_coins)
+
+    sender.coins = sender_coins - amount
+    target.coins = int(target.coins or 0) + amount
+    return CoinsOutcome(
+        code="ok",
+        user_name=str(sender.name),
+        coins=int(sender.coins),
+        target_name=str(target.name),
+    )
+
+
 @sign_matcher.handle()
 @command_control(
     command_key="economy.sign",
@@ -154,78 +257,55 @@ async def handle_sign(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
 
     user_id = event.get_user_id()
     today_text = _today_text()
-    session = get_session()
-    try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        if user is None:
-            await bot.send(event, at + " " + reply_failure("签到", "请先注册账号"))
-            return
-
-        last_sign_date = str(user.last_sign_date or "").strip()
-        if bool(user.signed_today) or last_sign_date == today_text:
-            await bot.send(event, at + " " + reply_failure("签到", "今天已经签到过了"))
-            return
-
-        base_reward = random.randint(min_coins, max_coins)
-        streak_result = _resolve_streak_reward(
-            last_sign_date=last_sign_date,
-            current_streak=int(user.sign_streak or 0),
-            enable_streak=enable_streak,
-            streak_bonus_per_day=streak_bonus_per_day,
-            max_streak_bonus=max_streak_bonus,
-            today_text=today_text,
-        )
-        total_reward = base_reward + streak_result.streak_reward
-
-        user.coins = int(user.coins or 0) + total_reward
-        user.signed_today = True
-        user.last_sign_date = today_text
-        user.sign_streak = streak_result.next_streak
-        user.sign_total = int(user.sign_total or 0) + 1
-        session.add(UserSignRecord(
-            user_id=user_id,
-            sign_date=today_text,
-            streak=streak_result.next_streak,
-        ))
-        session.commit()
-
-        today_order = (
-            session.query(UserSignRecord)
-            .filter(UserSignRecord.sign_date == today_text)
-            .count()
-        )
-
-        logger.info(
-            "签到成功："
-            f"user_id={user.user_id} name={user.name} base_reward={base_reward} "
-            f"streak_reward={streak_result.streak_reward} total_reward={total_reward} "
-            f"streak={streak_result.next_streak} coins={user.coins} today_order={today_order}"
-        )
-        lines = [
-            f"{EMOJI_CHART} 签到排名：第 {today_order} 位",
-            f"{EMOJI_COIN} 获得金币：{base_reward}",
-            f"{EMOJI_FIRE} 连续签到：{streak_result.next_streak} 天",
+
+    outcome = await run_db_transaction(
+        _apply_sign,
+        user_id,
+        today_text=today_text,
+        base_reward=random.randint(min_coins, max_coins),
+        enable_streak=enable_streak,
+        streak_bonus_per_day=streak_bonus_per_day,
+        max_streak_bonus=max_streak_bonus,
+    )
+    if outcome.code == "not_registered":
+        await bot.send(event, at + " " + reply_failure("签到", "请先注册账号"))
+        return
+    if outcome.code == "already_signed":
+        await bot.send(event, at + " " + reply_failure("签到", "今天已经签到过了"))
+        return
+
+    streak_result = outcome.streak
+    assert streak_result is not None
+    logger.info(
+        "签到成功："
+        f"user_id={user_id} name={outcome.user_name} base_reward={outcome.base_reward} "
+        f"streak_reward={streak_result.streak_reward} total_reward={outcome.total_reward} "
+        f"streak={streak_result.next_streak} coins={outcome.coins} "
+        f"today_order={outcome.today_order}"
+    )
+    lines = [
+        f"{EMOJI_CHART} 签到排名：第 {outcome.today_order} 位",
+        f"{EMOJI_COIN} 获得金币：{outcome.base_reward}",
+        f"{EMOJI_FIRE} 连续签到：{streak_result.next_streak} 天",
+    ]
+    if enable_streak:
+        lines.append(f"{EMOJI_COIN} 连续签到奖励：{streak_result.streak_reward}")
+    else:
+        lines.append(f"{EMOJI_COIN} 连续签到奖励：未开启")
+    lines.extend(
+        [
+            f"{EMOJI_COIN} 本次总获得：{outcome.total_reward}",
+            f"{EMOJI_COIN} 当前金币：{outcome.coins}",
         ]
-        if enable_streak:
-            lines.append(f"{EMOJI_COIN} 连续签到奖励：{streak_result.streak_reward}")
-        else:
-            lines.append(f"{EMOJI_COIN} 连续签到奖励：未开启")
-        lines.extend(
-            [
-                f"{EMOJI_COIN} 本次总获得：{total_reward}",
-                f"{EMOJI_COIN} 当前金币：{user.coins}",
-            ]
-        )
-        await bot.send(
-            event,
-            at + "\n" + reply_block(
-                reply_success("签到"),
-                lines,
-                hint="明日继续签到可获得连续奖励",
-            ),
-        )
-    finally:
-        session.close()
+    )
+    await bot.send(
+        event,
+        at + "\n" + reply_block(
+            reply_success("签到"),
+            lines,
+            hint="明日继续签到可获得连续奖励",
+        ),
+    )
 
 
 @transfer_matcher.handle()
@@ -244,7 +324,7 @@ async def handle_transfer(bot: Bot, event: Event, arg: Message = CommandArg()) -
         raise_command_usage()
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event, arg, "转账", arg_index=0
     )
     if parse_error == "missing":
@@ -274,45 +354,33 @@ async def handle_transfer(bot: Bot, event: Event, arg: Message = CommandArg()) -
         await bot.send(event, at + " " + reply_failure("转账", "不能转账给自己"))
         return
 
-    session = get_session()
-    try:
-        sender = session.query(User).filter(User.user_id == sender_id).first()
-        if sender is None:
-            await bot.send(event, at + " " + reply_failure("转账", "请先注册账号"))
-            return
-
-        target = session.query(User).filter(User.user_id == target_user_id).first()
-        if target is None:
-            await bot.send(event, at + " " + reply_failure("转账", "目标用户不存在"))
-            return
-
-        sender_coins = int(sender.coins or 0)
-        if sender_coins < amount:
-            await bot.send(event, at + " " + reply_failure("转账", f"金币不足（当前：{sender_coins}）"))
-            return
-
-        sender.coins = sender_coins - amount
-        target.coins = int(target.coins or 0) + amount
-        session.commit()
-
-        logger.info(
-            f"转账成功：sender_id={sender.user_id} sender_name={sender.name} "
-            f"target_id={target.user_id} target_name={target.name} "
-            f"amount={amount} sender_remaining={sender.coins}"
-        )
-        await bot.send(
-            event,
-            at + "\n" + reply_block(
-                reply_success("转账"),
-                [
-                    f"{EMOJI_COIN} 转出金币：{amount}",
-                    f"{EMOJI_USER} 转账对象：{target.name}（{target.user_id}）",
-                    f"{EMOJI_COIN} 当前余额：{sender.coins}",
-                ],
-            ),
-        )
-    finally:
-        session.close()
+    outcome = await run_db_transaction(_apply_transfer, sender_id, target_user_id, amount)
+    if outcome.code == "not_found":
+        await bot.send(event, at + " " + reply_failure("转账", "请先注册账号"))
+        return
+    if outcome.code == "target_not_found":
+        await bot.send(event, at + " " + reply_failure("转账", "目标用户不存在"))
+        return
+    if outcome.code == "insufficient":
+        await bot.send(event, at + " " + reply_failure("转账", f"金币不足（当前：{outcome.coins}）"))
+        return
+
+    logger.info(
+        f"转账成功：sender_id={sender_id} sender_name={outcome.user_name} "
+        f"target_id={target_user_id} target_name={outcome.target_name} "
+        f"amount={amount} sender_remaining={outcome.coins}"
+    )
+    await bot.send(
+        event,
+        at + "\n" + reply_block(
+            reply_success("转账"),
+            [
+                f"{EMOJI_COIN} 转出金币：{amount}",
+                f"{EMOJI_USER} 转账对象：{outcome.target_name}（{target_user_id}）",
+                f"{EMOJI_COIN} 当前余额：{outcome.coins}",
+            ],
+        ),
+    )
 
 
 @add_coins_matcher.handle()
@@ -333,7 +401,7 @@ async def handle_add_coins(
         raise_command_usage()
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event,
         arg,
         "添加金币",
@@ -355,19 +423,19 @@ async def handle_add_coins(
         await bot.send(event, at + " " + reply_failure("添加", "数量必须为正整数"))
         return
 
-    session = get_session()
-    try:
+    def apply_add(session: Session) -> CoinsOutcome:
         user = session.query(User).filter(User.user_id == target_user_id).first()
         if user is None:
-            await bot.send(event, at + " " + reply_failure("添加", "用户不存在"))
-            return
+            return CoinsOutcome(code="not_found")
+        user.coins = int(user.coins or 0) + amount
+        return CoinsOutcome(code="ok", user_name=str(user.name), coins=int(user.coins))
 
-        user.coins += amount
-        session.commit()
-        coins = user.coins
-        user_name = user.name
-    finally:
-        session.close()
+    outcome = await run_db_transaction(apply_add)
+    if outcome.code == "not_found":
+        await bot.send(event, at + " " + reply_failure("添加", "用户不存在"))
+        return
+    coins = outcome.coins
+    user_name = outcome.user_name
 
     logger.info(
         f"添加金币成功：user_id={target_user_id} name={user_name} amount={amount} coins={coins}"
@@ -403,7 +471,7 @@ async def handle_remove_coins(
         raise_command_usage()
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event,
         arg,
         "扣除金币",
@@ -425,23 +493,25 @@ async def handle_remove_coins(
         await bot.send(event, at + " " + reply_failure("扣除", "数量必须为正整数"))
         return
 
-    session = get_session()
-    try:
+    def apply_remove(session: Session) -> CoinsOutcome:
         user = session.query(User).filter(User.user_id == target_user_id).first()
         if user is None:
-            await bot.send(event, at + " " + reply_failure("扣除", "用户不存在"))
-            return
-
-        if user.coins < amount:
-            await bot.send(event, at + " " + reply_failure("扣除", f"金币不足，当前仅有 {user.coins}"))
-            return
-
-        user.coins -= amount
-        session.commit()
-        coins = user.coins
-        user_name = user.name
-    finally:
-        session.close()
+            return CoinsOutcome(code="not_found")
+        current = int(user.coins or 0)
+        if current < amount:
+            return CoinsOutcome(code="insufficient", coins=current)
+        user.coins = current - amount
+        return CoinsOutcome(code="ok", user_name=str(user.name), coins=int(user.coins))
+
+    outcome = await run_db_transaction(apply_remove)
+    if outcome.code == "not_found":
+        await bot.send(event, at + " " + reply_failure("扣除", "用户不存在"))
+        return
+    if outcome.code == "insufficient":
+        await bot.send(event, at + " " + reply_failure("扣除", f"金币不足，当前仅有 {outcome.coins}"))
+        return
+    coins = outcome.coins
+    user_name = outcome.user_name
 
     logger.info(
         f"扣除金币成功：user_id={target_user_id} name={user_name} amount={amount} coins={coins}"
@@ -5,11 +5,12 @@ from nonebot.log import logger
 from nonebot.params import CommandArg
 
 from nextbot.command_config import command_control, raise_command_usage
-from nextbot.db import Group, User, get_session
+from nextbot.db import Group, User, db_session
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.permissions import (
     add_inherit,
     add_permission,
+    invalidate_permission_cache,
     remove_inherit,
     remove_permission,
     require_permission,
@@ -40,11 +41,11 @@ async def handle_list_groups(
     if args:
         raise_command_usage()
 
-    session = get_session()
+    session = db_session()
     try:
-        groups = session.query(Group).order_by(Group.name.asc()).all()
+        groups = await session.all(session.query(Group).order_by(Group.name.asc()))
     finally:
-        session.close()
+        await session.close()
 
     if not groups:
         await bot.send(event, "ℹ️ 暂无身份组")
@@ -81,17 +82,18 @@ async def handle_add_group(
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
     name = args[0]
-    session = get_session()
+    session = db_session()
     try:
-        exists = session.query(Group).filter(Group.name == name).first()
+        exists = await session.first(session.query(Group).filter(Group.name == name))
         if exists is not None:
             await bot.send(event, at + " " + reply_failure("添加", "身份组已存在"))
             return
 
         session.add(Group(name=name, permissions="", inherits=""))
-        session.commit()
+        await session.commit()
+        invalidate_permission_cache()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(f"添加身份组成功：name={name}")
     await bot.send(event, at + " " + reply_success("添加"))
@@ -120,27 +122,30 @@ async def handle_delete_group(
         await bot.send(event, at + " " + reply_failure("删除", "系统内置身份组不可删除"))
         return
 
-    session = get_session()
+    session = db_session()
     try:
-        group = session.query(Group).filter(Group.name == name).first()
+        group = await session.first(session.query(Group).filter(Group.name == name))
         if group is None:
             await bot.send(event, at + " " + reply_failure("删除", "身份组不存在"))
             return
 
         session.delete(group)
-        session.flush()
+        await session.flush()
 
-        session.query(User).filter(User.group == name).update(
-            {User.group: "guest"}, synchronize_session=False
+        await session.update(
+            session.query(User).filter(User.group == name),
+            {User.group: "guest"},
+            synchronize_session=False,
         )
-        all_groups = session.query(Group).all()
+        all_groups = await session.all(session.query(Group))
         for g in all_groups:
             parents = {p.strip() for p in g.inherits.split(",") if p.strip()}
             if name in parents:
                 g.inherits = remove_inherit(g.inherits, name)
-        session.commit()
+        await session.commit()
+        invalidate_permission_cache()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(f"删除身份组成功：name={name}")
     await bot.send(event, at + " " + reply_success("删除"))
@@ -169,18 +174,19 @@ async def handle_inherit_group(
         await bot.send(event, at + " " + reply_failure("修改", "不能继承到自身"))
         return
 
-    session = get_session()
+    session = db_session()
     try:
-        child_group = session.query(Group).filter(Group.name == child).first()
-        parent_group = session.query(Group).filter(Group.name == parent).first()
+        child_group = await session.first(session.query(Group).filter(Group.name == child))
+        parent_group = await session.first(session.query(Group).filter(Group.name == parent))
         if child_group is None or parent_group is None:
             await bot.send(event, at + " " + reply_failure("修改", "身份组不存在"))
             return
 
         child_group.inherits = add_inherit(child_group.inherits, parent)
-        session.commit()
+        await session.commit()
+        invalidate_permission_cache()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(f"身份组继承成功：{child} -> {parent}")
     await bot.send(
@@ -214,17 +220,18 @@ async def handle_clear_inherit_group(
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
     name = args[0]
-    session = get_session()
+    session = db_session()
     try:
-        group = session.query(Group).filter(Group.name == name).first()
+        group = await session.first(session.query(Group).filter(Group.name == name))
         if group is None:
             await bot.send(event, at + " " + reply_failure("修改", "身份组不存在"))
             return
 
         group.inherits = ""
-        session.commit()
+        await session.commit()
+        invalidate_permission_cache()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(f"取消身份组继承成功：name={name}")
     await bot.send(
@@ -258,17 +265,18 @@ async def handle_add_group_perm(
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
     name, permission = args
-    session = get_session()
+    session = db_session()
     try:
-        group = session.query(Group).filter(Group.name == name).first()
+        group = await session.first(session.query(Group).filter(Group.name == name))
         if group is None:
             await bot.send(event, at + " " + reply_failure("添加", "身份组不存在"))
             return
 
         group.permissions = add_permission(group.permissions, permission)
-        session.commit()
+        await session.commit()
+        invalidate_permission_cache()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(f"添加身份组权限成功：name={name} permission={permission}")
     await bot.send(
@@ -302,17 +310,18 @@ async def handle_remove_group_perm(
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
     name, permission = args
-    session = get_session()
+    session = db_session()
     try:
-        group = session.query(Group).filter(Group.name == name).first()
+        group = await session.first(session.query(Group).filter(Group.name == name))
         if group is None:
             await bot.send(event, at + " " + reply_failure("删除", "身份组不存在"))
             return
 
         group.permissions = remove_permission(group.permissions, permission)
-        session.commit()
+        await session.commit()
+        invalidate_permission_cache()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(f"删除身份组权限成功：name={name} permission={permission}")
     await bot.send(
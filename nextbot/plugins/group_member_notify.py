@@ -16,7 +16,7 @@ from nonebot.log import logger
 
 from nextbot.access_control import get_group_ids, get_owner_ids
 from nextbot.ban_core import apply_ban_to_db, sync_user_to_blacklist
-from nextbot.db import User, get_session
+from nextbot.db import User, get_session, run_db, run_db_transaction
 from nextbot.text_utils import EMOJI_USER, reply_success
 
 increase_matcher = on_notice()
@@ -155,7 +155,7 @@ async def handle_auto_ban_on_leave(bot: Bot, event: GroupDecreaseNoticeEvent) ->
         )
         return
 
-    user_name, already_banned = _lookup_user_name_and_ban_status(user_id)
+    user_name, already_banned = await run_db(_lookup_user_name_and_ban_status, user_id)
     if user_name is None:
         logger.info(
             f"退群自动封禁跳过未注册用户：group_id={event.group_id}，user_id={user_id}"
@@ -170,7 +170,7 @@ async def handle_auto_ban_on_leave(bot: Bot, event: GroupDecreaseNoticeEvent) ->
     sub_type = str(event.sub_type or "")
     reason = f"{_AUTO_BAN_REASON}（{sub_type}）" if sub_type else _AUTO_BAN_REASON
 
-    result = apply_ban_to_db(user_id, reason)
+    result = await run_db_transaction(apply_ban_to_db, user_id, reason)
     if result.code != "banned":
         logger.warning(
             f"退群自动封禁未落库：group_id={event.group_id}，user_id={user_id}，code={result.code}"
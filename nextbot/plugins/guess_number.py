@@ -6,9 +6,10 @@ from nonebot.adapters import Bot, Event, Message
 from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
+from sqlalchemy.orm import Session
 
 from nextbot.command_config import command_control, get_current_param, raise_command_usage
-from nextbot.db import User, get_session
+from nextbot.db import User, run_db_transaction
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.permissions import require_permission
 from nextbot.time_utils import db_now_utc_naive
@@ -163,47 +164,45 @@ async def handle_guess_number(bot: Bot, event: Event, arg: Message = CommandArg(
                 await bot.send(event, at + " " + reply_failure("猜数字", f"冷却中，还需等待 {remaining_s} 秒"))
                 return
 
-    session = get_session()
-    try:
+    # 生成答案
+    answer = random.randint(1, range_max)
+    diff = abs(guess - answer)
+
+    # 判定结果
+    exact_multiplier = max(1, int(get_current_param("exact_multiplier", 10)))
+    near_range = max(1, int(get_current_param("near_range", 5)))
+    near_multiplier = max(1, int(get_current_param("near_multiplier", 5)))
+    close_range = max(1, int(get_current_param("close_range", 10)))
+    close_multiplier = max(1, int(get_current_param("close_multiplier", 2)))
+    far_range = max(1, int(get_current_param("far_range", 25)))
+
+    if diff == 0:
+        result_type = "命中"
+        payout = cost * exact_multiplier
+    elif diff <= near_range:
+        result_type = "极近"
+        payout = cost * near_multiplier
+    elif diff <= close_range:
+        result_type = "接近"
+        payout = cost * close_multiplier
+    elif diff <= far_range:
+        result_type = "偏离"
+        payout = cost // 2
+    else:
+        result_type = "远离"
+        payout = 0
+
+    net = payout - cost
+
+    def apply_guess(session: Session) -> tuple[str, int]:
         user = session.query(User).filter(User.user_id == user_id).first()
         if user is None:
-            await bot.send(event, at + " " + reply_failure("猜数字", "请先注册账号"))
-            return
+            return "请先注册账号", 0
 
         coins = int(user.coins or 0)
         if coins < cost:
-            await bot.send(event, at + " " + reply_failure("猜数字", f"金币不足（当前 {coins}）"))
-            return
-
-        # 生成答案
-        answer = random.randint(1, range_max)
-        diff = abs(guess - answer)
-
-        # 判定结果
-        exact_multiplier = max(1, int(get_current_param("exact_multiplier", 10)))
-        near_range = max(1, int(get_current_param("near_range", 5)))
-        near_multiplier = max(1, int(get_current_param("near_multiplier", 5)))
-        close_range = max(1, int(get_current_param("close_range", 10)))
-        close_multiplier = max(1, int(get_current_param("close_multiplier", 2)))
-        far_range = max(1, int(get_current_param("far_range", 25)))
-
-        if diff == 0:
-            result_type = "命中"
-            payout = cost * exact_multiplier
-        elif diff <= near_range:
-            result_type = "极近"
-            payout = cost * near_multiplier
-        elif diff <= close_range:
-            result_type = "接近"
-            payout = cost * close_multiplier
-        elif diff <= far_range:
-            result_type = "偏离"
-            payout = cost // 2
-        else:
-            result_type = "远离"
-            payout = 0
+            return f"金币不足（当前 {coins}）", coins
 
-        net = payout - cost
         user.coins = coins + net
         user.guess_total_count = int(user.guess_total_count or 0) + 1
         if net > 0:
@@ -211,11 +210,12 @@ async def handle_guess_number(bot: Bot, event: Event, arg: Message = CommandArg(
             user.guess_total_gain = int(user.guess_total_gain or 0) + net
         elif net < 0:
             user.guess_total_loss = int(user.guess_total_loss or 0) + abs(net)
-        session.commit()
+        return "", int(user.coins)
 
-        final_coins = int(user.coins)
-    finally:
-        session.close()
+    error, final_coins = await run_db_transaction(apply_guess)
+    if error:
+        await bot.send(event, at + " " + reply_failure("猜数字", error))
+        return
 
     _cooldown_map[user_id] = now
 
@@ -1,12 +1,10 @@
 from __future__ import annotations
 
-import base64
 import math
-from pathlib import Path
+from typing import TYPE_CHECKING
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
-from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
 
@@ -15,26 +13,31 @@ from nextbot.command_config import (
     get_current_param,
     raise_command_usage,
 )
-from nextbot.db import Server, User, UserSignRecord, get_session
+from nextbot.db import Server, User, UserSignRecord, db_session
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.tshock_api import (
     TShockRequestError,
+    fan_out,
     get_error_reason,
     is_success,
     request_server_api,
 )
 from nextbot.permissions import require_permission
-from nextbot.render_utils import resolve_render_theme
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
 from nextbot.time_utils import (
-    beijing_filename_timestamp,
     beijing_today_text,
     format_online_seconds,
     utc_naive_to_beijing,
 )
 from nextbot.text_utils import reply_failure
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
+from server.screenshot import ScreenshotOptions
 from server.web_server import create_leaderboard_page
 
+if TYPE_CHECKING:
+    from datetime import datetime
+
+    from sqlalchemy.orm import Query, Session
+
 coins_leaderboard_matcher = on_command("金币排行榜")
 streak_leaderboard_matcher = on_command("连续签到排行榜")
 signin_leaderboard_matcher = on_command("签到排行榜")
@@ -52,6 +55,7 @@ guess_win_rate_leaderboard_matcher = on_command("猜数字胜率排行榜")
 dice_income_leaderboard_matcher = on_command("掷骰子排行榜")
 dice_win_rate_leaderboard_matcher = on_command("掷骰子胜率排行榜")
 
+
 LEADERBOARD_SCREENSHOT_OPTIONS = ScreenshotOptions(
     viewport_width=900,
     viewport_height=800,
@@ -59,11 +63,44 @@ LEADERBOARD_SCREENSHOT_OPTIONS = ScreenshotOptions(
 )
 
 
-def _to_base64_image_uri(path: Path) -> str:
-    raw = path.read_bytes()
-    encoded = base64.b64encode(raw).decode("ascii")
-    return f"base64://{encoded}"
+# 以下查询构造函数同时供 scripts/check_query_plans.py 检查执行计划
+
+
+def _coins_page_query(session: Session, offset: int, limit: int) -> Query:
+    return session.query(User).order_by(User.coins.desc()).offset(offset).limit(limit)
+
+
+def _coins_above_query(session: Session, coins: int) -> Query:
+    return session.query(User).filter(User.coins > coins)
+
+
+def _signin_today_query(session: Session, today: str) -> Query:
+    return session.query(UserSignRecord).filter(UserSignRecord.sign_date == today)
+
+
+def _signin_today_page_query(
+    session: Session, today: str, offset: int, limit: int
+) -> Query:
+    return (
+        session.query(UserSignRecord, User.name)
+        .join(User, User.user_id == UserSignRecord.user_id)
+        .filter(UserSignRecord.sign_date == today)
+        .order_by(UserSignRecord.created_at.asc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def _signin_today_caller_query(session: Session, today: str, user_id: str) -> Query:
+    return _signin_today_query(session, today).filter(UserSignRecord.user_id == user_id)
+
 
+def _signin_today_before_query(
+    session: Session, today: str, created_at: datetime
+) -> Query:
+    return _signin_today_query(session, today).filter(
+        UserSignRecord.created_at < created_at
+    )
 
 
 def _parse_page_arg(args: list[str], command_name: str) -> int | None:
@@ -93,7 +130,7 @@ async def _render_and_send(
     self_entry: dict | None = None,
     theme: str,
 ) -> None:
-    page_url = create_leaderboard_page(
+    render_page = create_leaderboard_page(
         title=title,
         value_label=value_label,
         page=page,
@@ -103,27 +140,19 @@ async def _render_and_send(
         theme=theme,
     )
     logger.info(
-        f"{title}渲染地址：page={page}/{total_pages} entry_count={len(entries)} internal_url={page_url}"
+        f"{title}渲染：page={page}/{total_pages} entry_count={len(entries)}"
     )
 
-    screenshot_path = Path("/tmp") / f"{file_prefix}-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=LEADERBOARD_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", f"{exc}"))
-        return
-
-    logger.info(f"{title}截图成功：page={page}/{total_pages} file={screenshot_path}")
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=LEADERBOARD_SCREENSHOT_OPTIONS,
+        file_prefix=file_prefix,
+        failure_action="查询",
+    ):
         return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info(f"{title}截图成功：page={page}/{total_pages}")
 
 
 @coins_leaderboard_matcher.handle()
@@ -162,33 +191,29 @@ async def handle_coins_leaderboard(
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        total_count = session.query(User).count()
+        total_count = await session.count(session.query(User))
         total_pages = max(1, math.ceil(total_count / limit))
         if page > total_pages:
             await bot.send(event, reply_failure("查询", f"超出总页数（共 {total_pages} 页）"))
             return
         offset = (page - 1) * limit
-        users = (
-            session.query(User)
-            .order_by(User.coins.desc())
-            .offset(offset)
-            .limit(limit)
-            .all()
-        )
+        users = await session.all(_coins_page_query(session, offset, limit))
         entries = [
             {"rank": offset + i + 1, "name": u.name, "user_id": u.user_id, "value": int(u.coins or 0)}
             for i, u in enumerate(users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None:
             caller_coins = int(caller.coins or 0)
-            caller_rank = session.query(User).filter(User.coins > caller_coins).count() + 1
+            caller_rank = await session.count(
+                _coins_above_query(session, caller_coins)
+            ) + 1
             self_entry = {"rank": caller_rank, "name": caller.name, "value": caller_coins}
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -240,33 +265,34 @@ async def handle_streak_leaderboard(
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        total_count = session.query(User).count()
+        total_count = await session.count(session.query(User))
         total_pages = max(1, math.ceil(total_count / limit))
         if page > total_pages:
             await bot.send(event, reply_failure("查询", f"超出总页数（共 {total_pages} 页）"))
             return
         offset = (page - 1) * limit
-        users = (
+        users = await session.all(
             session.query(User)
             .order_by(User.sign_streak.desc())
             .offset(offset)
             .limit(limit)
-            .all()
         )
         entries = [
             {"rank": offset + i + 1, "name": u.name, "user_id": u.user_id, "value": int(u.sign_streak or 0)}
             for i, u in enumerate(users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None:
             caller_streak = int(caller.sign_streak or 0)
-            caller_rank = session.query(User).filter(User.sign_streak > caller_streak).count() + 1
+            caller_rank = await session.count(
+                session.query(User).filter(User.sign_streak > caller_streak)
+            ) + 1
             self_entry = {"rank": caller_rank, "name": caller.name, "value": caller_streak}
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -318,33 +344,34 @@ async def handle_signin_leaderboard(
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        total_count = session.query(User).count()
+        total_count = await session.count(session.query(User))
         total_pages = max(1, math.ceil(total_count / limit))
         if page > total_pages:
             await bot.send(event, reply_failure("查询", f"超出总页数（共 {total_pages} 页）"))
             return
         offset = (page - 1) * limit
-        users = (
+        users = await session.all(
             session.query(User)
             .order_by(User.sign_total.desc())
             .offset(offset)
             .limit(limit)
-            .all()
         )
         entries = [
             {"rank": offset + i + 1, "name": u.name, "user_id": u.user_id, "value": int(u.sign_total or 0)}
             for i, u in enumerate(users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None:
             caller_total = int(caller.sign_total or 0)
-            caller_rank = session.query(User).filter(User.sign_total > caller_total).count() + 1
+            caller_rank = await session.count(
+                session.query(User).filter(User.sign_total > caller_total)
+            ) + 1
             self_entry = {"rank": caller_rank, "name": caller.name, "value": caller_total}
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -400,14 +427,14 @@ async def handle_deaths_leaderboard(
 
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
         caller_id = event.get_user_id()
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         caller_name = caller.name if caller is not None else None
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, reply_failure("查询", "服务器不存在"))
@@ -511,14 +538,14 @@ async def handle_fishing_leaderboard(
 
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
         caller_id = event.get_user_id()
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         caller_name = caller.name if caller is not None else None
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, reply_failure("查询", "服务器不存在"))
@@ -622,14 +649,14 @@ async def handle_online_time_leaderboard(
 
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
         caller_id = event.get_user_id()
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         caller_name = caller.name if caller is not None else None
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, reply_failure("查询", "服务器不存在"))
@@ -732,14 +759,14 @@ async def handle_total_online_time_leaderboard(
 
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
         caller_id = event.get_user_id()
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         caller_name = caller.name if caller is not None else None
     finally:
-        session.close()
+        await session.close()
 
     if not servers:
         await bot.send(event, reply_failure("查询", "暂无服务器"))
@@ -748,10 +775,14 @@ async def handle_total_online_time_leaderboard(
     # 汇总各服务器数据，按用户名累加
     totals: dict[str, int] = {}
     success_count = 0
-    for server in servers:
-        try:
-            response = await request_server_api(server, "/nextbot/leaderboards/online-time")
-        except TShockRequestError:
+    results = await fan_out(
+        servers,
+        lambda server: request_server_api(server, "/nextbot/leaderboards/online-time"),
+    )
+    for result in results:
+        server = result.server
+        response = result.value
+        if response is None:
             logger.info(f"总在线时长排行榜：server_id={server.id} 无法连接，已跳过")
             continue
         if not is_success(response):
@@ -854,26 +885,16 @@ async def handle_daily_sign_leaderboard(
     today = beijing_today_text()
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        total_count = (
-            session.query(UserSignRecord)
-            .filter(UserSignRecord.sign_date == today)
-            .count()
-        )
+        total_count = await session.count(_signin_today_query(session, today))
         total_pages = max(1, math.ceil(total_count / limit))
         if page > total_pages:
             await bot.send(event, reply_failure("查询", f"超出总页数（共 {total_pages} 页）"))
             return
         offset = (page - 1) * limit
-        records = (
-            session.query(UserSignRecord, User.name)
-            .join(User, User.user_id == UserSignRecord.user_id)
-            .filter(UserSignRecord.sign_date == today)
-            .order_by(UserSignRecord.created_at.asc())
-            .offset(offset)
-            .limit(limit)
-            .all()
+        records = await session.all(
+            _signin_today_page_query(session, today, offset, limit)
         )
         entries = [
             {
@@ -886,25 +907,17 @@ async def handle_daily_sign_leaderboard(
         ]
 
         self_entry = None
-        caller_record = (
-            session.query(UserSignRecord)
-            .filter(
-                UserSignRecord.sign_date == today,
-                UserSignRecord.user_id == caller_id,
-            )
-            .first()
+        caller_record = await session.first(
+            _signin_today_caller_query(session, today, caller_id)
         )
         if caller_record is not None:
             caller_rank = (
-                session.query(UserSignRecord)
-                .filter(
-                    UserSignRecord.sign_date == today,
-                    UserSignRecord.created_at < caller_record.created_at,
+                await session.count(
+                    _signin_today_before_query(session, today, caller_record.created_at)
                 )
-                .count()
                 + 1
             )
-            caller_user = session.query(User).filter(User.user_id == caller_id).first()
+            caller_user = await session.first(session.query(User).filter(User.user_id == caller_id))
             caller_name = caller_user.name if caller_user else ""
             self_entry = {
                 "rank": caller_rank,
@@ -912,7 +925,7 @@ async def handle_daily_sign_leaderboard(
                 "value": _format_sign_time(caller_record.created_at),
             }
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -968,9 +981,9 @@ async def handle_rob_income_leaderboard(
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        all_users = session.query(User).filter(User.rob_total_count > 0).all()
+        all_users = await session.all(session.query(User).filter(User.rob_total_count > 0))
         sorted_users = sorted(all_users, key=_rob_net_income, reverse=True)
         total_count = len(sorted_users)
         total_pages = max(1, math.ceil(total_count / limit))
@@ -983,14 +996,14 @@ async def handle_rob_income_leaderboard(
             {"rank": offset + i + 1, "name": u.name, "user_id": u.user_id, "value": _rob_net_income(u)}
             for i, u in enumerate(page_users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None and int(caller.rob_total_count or 0) > 0:
             caller_income = _rob_net_income(caller)
             caller_rank = sum(1 for u in sorted_users if _rob_net_income(u) > caller_income) + 1
             self_entry = {"rank": caller_rank, "name": caller.name, "value": caller_income}
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -1042,34 +1055,35 @@ async def handle_rob_loss_leaderboard(
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        total_count = session.query(User).filter(User.rob_total_loss > 0).count()
+        total_count = await session.count(session.query(User).filter(User.rob_total_loss > 0))
         total_pages = max(1, math.ceil(total_count / limit))
         if page > total_pages:
             await bot.send(event, reply_failure("查询", f"超出总页数（共 {total_pages} 页）"))
             return
         offset = (page - 1) * limit
-        users = (
+        users = await session.all(
             session.query(User)
             .filter(User.rob_total_loss > 0)
             .order_by(User.rob_total_loss.desc())
             .offset(offset)
             .limit(limit)
-            .all()
         )
         entries = [
             {"rank": offset + i + 1, "name": u.name, "user_id": u.user_id, "value": int(u.rob_total_loss or 0)}
             for i, u in enumerate(users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None and int(caller.rob_total_loss or 0) > 0:
             caller_loss = int(caller.rob_total_loss or 0)
-            caller_rank = session.query(User).filter(User.rob_total_loss > caller_loss).count() + 1
+            caller_rank = await session.count(
+                session.query(User).filter(User.rob_total_loss > caller_loss)
+            ) + 1
             self_entry = {"rank": caller_rank, "name": caller.name, "value": caller_loss}
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -1121,34 +1135,35 @@ async def handle_rob_penalty_leaderboard(
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        total_count = session.query(User).filter(User.rob_total_penalty > 0).count()
+        total_count = await session.count(session.query(User).filter(User.rob_total_penalty > 0))
         total_pages = max(1, math.ceil(total_count / limit))
         if page > total_pages:
             await bot.send(event, reply_failure("查询", f"超出总页数（共 {total_pages} 页）"))
             return
         offset = (page - 1) * limit
-        users = (
+        users = await session.all(
             session.query(User)
             .filter(User.rob_total_penalty > 0)
             .order_by(User.rob_total_penalty.desc())
             .offset(offset)
             .limit(limit)
-            .all()
         )
         entries = [
             {"rank": offset + i + 1, "name": u.name, "user_id": u.user_id, "value": int(u.rob_total_penalty or 0)}
             for i, u in enumerate(users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None and int(caller.rob_total_penalty or 0) > 0:
             caller_penalty = int(caller.rob_total_penalty or 0)
-            caller_rank = session.query(User).filter(User.rob_total_penalty > caller_penalty).count() + 1
+            caller_rank = await session.count(
+                session.query(User).filter(User.rob_total_penalty > caller_penalty)
+            ) + 1
             self_entry = {"rank": caller_rank, "name": caller.name, "value": caller_penalty}
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -1209,12 +1224,11 @@ async def handle_rob_success_rate_leaderboard(
     min_rob_count = max(1, int(get_current_param("min_rob_count", 10)))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        all_users = (
+        all_users = await session.all(
             session.query(User)
             .filter(User.rob_total_count >= min_rob_count)
-            .all()
         )
 
         def _success_rate(u: User) -> float:
@@ -1240,7 +1254,7 @@ async def handle_rob_success_rate_leaderboard(
             }
             for i, u in enumerate(page_users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None and int(caller.rob_total_count or 0) >= min_rob_count:
             caller_rate = _success_rate(caller)
@@ -1251,7 +1265,7 @@ async def handle_rob_success_rate_leaderboard(
                 "value": f"{caller_rate * 100:.1f}%（{int(caller.rob_success_count or 0)}/{int(caller.rob_total_count or 0)}）",
             }
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -1325,9 +1339,9 @@ async def handle_guess_income_leaderboard(
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        all_users = session.query(User).filter(User.guess_total_count > 0).all()
+        all_users = await session.all(session.query(User).filter(User.guess_total_count > 0))
         sorted_users = sorted(all_users, key=_guess_net_income, reverse=True)
         total_count = len(sorted_users)
         total_pages = max(1, math.ceil(total_count / limit))
@@ -1340,14 +1354,14 @@ async def handle_guess_income_leaderboard(
             {"rank": offset + i + 1, "name": u.name, "user_id": u.user_id, "value": _guess_net_income(u)}
             for i, u in enumerate(page_users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None and int(caller.guess_total_count or 0) > 0:
             caller_income = _guess_net_income(caller)
             caller_rank = sum(1 for u in sorted_users if _guess_net_income(u) > caller_income) + 1
             self_entry = {"rank": caller_rank, "name": caller.name, "value": caller_income}
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -1408,12 +1422,11 @@ async def handle_guess_win_rate_leaderboard(
     min_play_count = max(1, int(get_current_param("min_play_count", 1)))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        all_users = (
+        all_users = await session.all(
             session.query(User)
             .filter(User.guess_total_count >= min_play_count)
-            .all()
         )
 
         def _sort_key(u: User) -> tuple[float, int]:
@@ -1436,7 +1449,7 @@ async def handle_guess_win_rate_leaderboard(
             }
             for i, u in enumerate(page_users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None and int(caller.guess_total_count or 0) >= min_play_count:
             caller_rate = _guess_win_rate(caller)
@@ -1448,7 +1461,7 @@ async def handle_guess_win_rate_leaderboard(
                 "value": f"{caller_rate * 100:.1f}%（{int(caller.guess_win_count or 0)}/{int(caller.guess_total_count or 0)}）",
             }
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -1500,9 +1513,9 @@ async def handle_dice_income_leaderboard(
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        all_users = session.query(User).filter(User.dice_total_count > 0).all()
+        all_users = await session.all(session.query(User).filter(User.dice_total_count > 0))
         sorted_users = sorted(all_users, key=_dice_net_income, reverse=True)
         total_count = len(sorted_users)
         total_pages = max(1, math.ceil(total_count / limit))
@@ -1515,14 +1528,14 @@ async def handle_dice_income_leaderboard(
             {"rank": offset + i + 1, "name": u.name, "user_id": u.user_id, "value": _dice_net_income(u)}
             for i, u in enumerate(page_users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None and int(caller.dice_total_count or 0) > 0:
             caller_income = _dice_net_income(caller)
             caller_rank = sum(1 for u in sorted_users if _dice_net_income(u) > caller_income) + 1
             self_entry = {"rank": caller_rank, "name": caller.name, "value": caller_income}
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -1583,12 +1596,11 @@ async def handle_dice_win_rate_leaderboard(
     min_play_count = max(1, int(get_current_param("min_play_count", 1)))
 
     caller_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        all_users = (
+        all_users = await session.all(
             session.query(User)
             .filter(User.dice_total_count >= min_play_count)
-            .all()
         )
 
         def _sort_key(u: User) -> tuple[float, int]:
@@ -1611,7 +1623,7 @@ async def handle_dice_win_rate_leaderboard(
             }
             for i, u in enumerate(page_users)
         ]
-        caller = session.query(User).filter(User.user_id == caller_id).first()
+        caller = await session.first(session.query(User).filter(User.user_id == caller_id))
         self_entry = None
         if caller is not None and int(caller.dice_total_count or 0) >= min_play_count:
             caller_rate = _dice_win_rate(caller)
@@ -1623,7 +1635,7 @@ async def handle_dice_win_rate_leaderboard(
                 "value": f"{caller_rate * 100:.1f}%（{int(caller.dice_win_count or 0)}/{int(caller.dice_total_count or 0)}）",
             }
     finally:
-        session.close()
+        await session.close()
 
     await _render_and_send(
         bot, event,
@@ -1,15 +1,15 @@
 from __future__ import annotations
 
-import base64
 import math
 import random
-from pathlib import Path
+from dataclasses import dataclass
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
 from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
+from sqlalchemy.orm import Session
 
 from nextbot.command_config import command_control, get_current_param, raise_command_usage
 from nextbot.db import (
@@ -19,16 +19,18 @@ from nextbot.db import (
     Server,
     User,
     WarehouseItem,
-    get_session,
+    db_session,
+    run_db_transaction,
 )
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.permissions import require_permission
-from nextbot.render_utils import resolve_render_theme
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
+from nextbot.server_status import check_player_online
 from nextbot.text_utils import reply_failure
-from nextbot.time_utils import beijing_filename_timestamp, db_now_utc_naive
+from nextbot.time_utils import db_now_utc_naive
 from nextbot.tshock_api import TShockRequestError, get_error_reason, is_success, request_server_api
 from nextbot.warehouse_lock import warehouse_lock
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
+from server.screenshot import ScreenshotOptions
 from server.web_server import (
     create_lottery_list_page,
     create_lottery_result_page,
@@ -50,11 +52,6 @@ LOTTERY_RESULT_SCREENSHOT_OPTIONS = ScreenshotOptions(
 )
 
 
-def _to_base64_image_uri(path: Path) -> str:
-    raw = path.read_bytes()
-    return f"base64://{base64.b64encode(raw).decode('ascii')}"
-
-
 def _load_pool_by_selector(session, selector: str) -> LotteryPool | None:
     if selector.isdigit():
         pool = session.query(LotteryPool).filter(LotteryPool.id == int(selector)).first()
@@ -117,23 +114,16 @@ async def _issue_raw_command(server: Server, cmd: str) -> tuple[bool, str]:
 
 
 async def _check_player_online(server: Server, player_name: str) -> bool:
-    try:
-        resp = await request_server_api(
-            server, "/v2/server/status", params={"players": "true"},
-        )
-    except TShockRequestError:
-        return False
-    if not is_success(resp):
-        return False
-    players = resp.payload.get("players")
-    if not isinstance(players, list):
-        return False
-    name_lower = player_name.lower()
-    for p in players:
-        nickname = str(p.get("nickname", "")).strip() if isinstance(p, dict) else str(p).strip()
-        if nickname.lower() == name_lower:
-            return True
-    return False
+    online, _ = await check_player_online(server, player_name)
+    return online is True
+
+
+@dataclass(frozen=True)
+class DrawCharge:
+    error: str = ""
+    final_coins: int = 0
+    item_value_gained: int = 0
+    coin_delta: int = 0
 
 
 def _find_empty_slots(session, user_id: str, needed: int) -> list[int]:
@@ -187,20 +177,18 @@ async def handle_lottery_list(bot: Bot, event: Event, arg: Message = CommandArg(
 
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
-    session = get_session()
+    session = db_session()
     try:
-        pools = (
+        pools = await session.all(
             session.query(LotteryPool)
             .filter(LotteryPool.enabled.is_(True))
             .order_by(LotteryPool.sort_order.asc(), LotteryPool.id.asc())
-            .all()
         )
         all_entries: list[dict[str, object]] = []
         for pool in pools:
-            count = (
+            count = await session.count(
                 session.query(LotteryPrize)
                 .filter(LotteryPrize.pool_id == pool.id, LotteryPrize.enabled.is_(True))
-                .count()
             )
             all_entries.append({
                 "pool_id": int(pool.id),
@@ -210,7 +198,7 @@ async def handle_lottery_list(bot: Bot, event: Event, arg: Message = CommandArg(
                 "cost_per_draw": int(pool.cost_per_draw or 0),
             })
     finally:
-        session.close()
+        await session.close()
 
     total = len(all_entries)
     if total == 0:
@@ -224,32 +212,23 @@ async def handle_lottery_list(bot: Bot, event: Event, arg: Message = CommandArg(
     offset = (page - 1) * limit
     render_entries = all_entries[offset:offset + limit]
 
-    page_url = create_lottery_list_page(
+    render_page = create_lottery_list_page(
         entries=render_entries, page=page, total_pages=total_pages,
         total=total, theme=resolve_render_theme(),
     )
     logger.info(
-        f"奖池列表渲染地址：page={page}/{total_pages} total={total} "
-        f"item_count={len(render_entries)} internal_url={page_url}"
+        f"奖池列表渲染：page={page}/{total_pages} total={total} "
+        f"item_count={len(render_entries)}"
     )
 
-    screenshot_path = Path("/tmp") / f"lottery-list-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=LOTTERY_LIST_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", str(exc)))
-        return
-
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
-        return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=LOTTERY_LIST_SCREENSHOT_OPTIONS,
+        file_prefix="lottery-list",
+        failure_action="查询",
+    )
 
 
 # ---------- 查看奖池 ----------
@@ -292,23 +271,23 @@ async def handle_lottery_view(bot: Bot, event: Event, arg: Message = CommandArg(
 
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
-    session = get_session()
+    session = db_session()
     try:
-        pool = _load_pool_by_selector(session, selector)
+        pool = await session.run_sync(_load_pool_by_selector, selector)
         if pool is None:
             await bot.send(event, reply_failure("查询", f"未找到奖池「{selector}」"))
             return
         if not pool.enabled:
             await bot.send(event, reply_failure("查询", "该奖池未上架"))
             return
-        prizes = _list_active_prizes(session, int(pool.id))
+        prizes = await session.run_sync(_list_active_prizes, int(pool.id))
         pool_id = int(pool.id)
         pool_name = str(pool.name)
         pool_desc = str(pool.description or "")
         cost_per_draw = int(pool.cost_per_draw or 0)
 
         server_label_map: dict[int, str] = {
-            int(s.id): str(s.name) for s in session.query(Server).all()
+            int(s.id): str(s.name) for s in await session.all(session.query(Server))
         }
         resolved, miss_pct = _resolve_probabilities(prizes)
         prob_by_id = {p.id: prob for p, prob in resolved}
@@ -342,7 +321,7 @@ async def handle_lottery_view(bot: Bot, event: Event, arg: Message = CommandArg(
                 entry["coin_amount"] = int(prize.coin_amount or 0)
             all_entries.append(entry)
     finally:
-        session.close()
+        await session.close()
 
     total = len(all_entries)
     total_pages = max(1, math.ceil(total / limit)) if total > 0 else 1
@@ -352,7 +331,7 @@ async def handle_lottery_view(bot: Bot, event: Event, arg: Message = CommandArg(
     offset = (page - 1) * limit
     render_prizes = all_entries[offset:offset + limit]
 
-    page_url = create_lottery_view_page(
+    render_page = create_lottery_view_page(
         pool_id=pool_id, pool_name=pool_name, pool_description=pool_desc,
         cost_per_draw=cost_per_draw, prizes=render_prizes,
         miss_probability=float(miss_pct),
@@ -360,27 +339,18 @@ async def handle_lottery_view(bot: Bot, event: Event, arg: Message = CommandArg(
         theme=resolve_render_theme(),
     )
     logger.info(
-        f"奖池详情渲染地址：pool_id={pool_id} page={page}/{total_pages} "
-        f"total={total} miss_pct={miss_pct:.2f} internal_url={page_url}"
+        f"奖池详情渲染：pool_id={pool_id} page={page}/{total_pages} "
+        f"total={total} miss_pct={miss_pct:.2f}"
     )
 
-    screenshot_path = Path("/tmp") / f"lottery-view-{pool_id}-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=LOTTERY_VIEW_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", str(exc)))
-        return
-
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
-        return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=LOTTERY_VIEW_SCREENSHOT_OPTIONS,
+        file_prefix=f"lottery-view-{pool_id}",
+        failure_action="查询",
+    )
 
 
 # ---------- 抽奖 ----------
@@ -430,21 +400,21 @@ async def handle_lottery_draw(bot: Bot, event: Event, arg: Message = CommandArg(
         return
 
     # Load pool + prizes + player info
-    session = get_session()
+    session = db_session()
     try:
-        pool = _load_pool_by_selector(session, selector)
+        pool = await session.run_sync(_load_pool_by_selector, selector)
         if pool is None:
             await bot.send(event, at + " " + reply_failure("抽奖", f"未找到奖池「{selector}」"))
             return
         if not pool.enabled:
             await bot.send(event, at + " " + reply_failure("抽奖", "该奖池未上架"))
             return
-        prizes = _list_active_prizes(session, int(pool.id))
+        prizes = await session.run_sync(_list_active_prizes, int(pool.id))
         if not prizes:
             await bot.send(event, at + " " + reply_failure("抽奖", "该奖池暂无可中奖的奖品"))
             return
 
-        user = session.query(User).filter(User.user_id == user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == user_id))
         if user is None:
             await bot.send(event, at + " " + reply_failure("抽奖", "请先注册账号"))
             return
@@ -482,12 +452,12 @@ async def handle_lottery_draw(bot: Bot, event: Event, arg: Message = CommandArg(
             for p in prizes
         }
         all_servers_snapshot = [
-            {"id": int(s.id), "name": str(s.name)} for s in session.query(Server).all()
+            {"id": int(s.id), "name": str(s.name)} for s in await session.all(session.query(Server))
         ]
         resolved, miss_pct = _resolve_probabilities(prizes)
         draw_prob_by_id = {int(p.id): float(prob) for p, prob in resolved}
     finally:
-        session.close()
+        await session.close()
 
     # Roll dice N times
     rolled_prize_ids: list[int | None] = []
@@ -518,11 +488,11 @@ async def handle_lottery_draw(bot: Bot, event: Event, arg: Message = CommandArg(
         return ok
 
     # Re-load Server objects (need actual ORM instances)
-    session = get_session()
+    session = db_session()
     try:
-        all_servers_orm = {int(s.id): s for s in session.query(Server).all()}
+        all_servers_orm = {int(s.id): s for s in await session.all(session.query(Server))}
     finally:
-        session.close()
+        await session.close()
 
     # For each command-prize hit, decide which servers to send to
     cmd_plan: list[tuple[int, list[Server]]] = []  # (prize_id, [servers_to_send])
@@ -555,101 +525,75 @@ async def handle_lottery_draw(bot: Bot, event: Event, arg: Message = CommandArg(
 
         cmd_plan.append((pid, target_servers))
 
+    def apply_draw(session: Session) -> DrawCharge:
+        empty_slots: list[int] = []
+        if needed_slots > 0:
+            empty_slots = _find_empty_slots(session, user_id, needed_slots)
+            if len(empty_slots) < needed_slots:
+                return DrawCharge(error=f"仓库剩余空格不足（需要 {needed_slots} 格，剩余 {len(empty_slots)} 格）")
+
+        # Charge + insert items + add coins
+        user = session.query(User).filter(User.user_id == user_id).first()
+        if user is None:
+            return DrawCharge(error="用户记录已变更，请重试")
+        current_coins = int(user.coins or 0)
+        if current_coins < total_cost:
+            return DrawCharge(error=f"金币不足（需要 {total_cost}，当前 {current_coins}）")
+
+        user.coins = current_coins - total_cost
+        # Insert item prizes (tracking total appraised value gained)
+        slot_iter = iter(empty_slots)
+        item_value_gained = 0
+        for pid in item_prize_ids:
+            snap = prize_snapshots[pid]
+            count = bucket[pid]
+            total_qty = snap["quantity"] * count
+            actual_value = snap.get("actual_value")
+            if actual_value is not None:
+                unit_value = max(0, int(actual_value))
+            else:
+                per_pack = max(1, snap["quantity"])
+                unit_value = snap["unit_price"] // per_pack if per_pack > 0 else 0
+            item_value_gained += unit_value * total_qty
+            session.add(WarehouseItem(
+                user_id=user_id,
+                slot_index=next(slot_iter),
+                item_id=snap["item_id"],
+                prefix_id=snap["prefix_id"],
+                quantity=total_qty,
+                min_tier=snap["min_tier"],
+                value=int(unit_value),
+                created_at=db_now_utc_naive(),
+            ))
+
+        # Apply coin prizes
+        coin_delta = 0
+        for pid, count in bucket.items():
+            if pid is None:
+                continue
+            snap = prize_snapshots[pid]
+            if snap["kind"] == "coin":
+                coin_delta += int(snap["coin_amount"]) * count
+        if coin_delta:
+            user.coins = int(user.coins) + coin_delta
+        return DrawCharge(
+            final_coins=int(user.coins),
+            item_value_gained=item_value_gained,
+            coin_delta=coin_delta,
+        )
+
     if needed_slots > 0:
         async with warehouse_lock(user_id):
-            session = get_session()
-            try:
-                empty_slots = _find_empty_slots(session, user_id, needed_slots)
-                if len(empty_slots) < needed_slots:
-                    await bot.send(
-                        event,
-                        at + " " + reply_failure("抽奖", f"仓库剩余空格不足（需要 {needed_slots} 格，剩余 {len(empty_slots)} 格）"),
-                    )
-                    return
-
-                # Charge + insert items + add coins
-                user = session.query(User).filter(User.user_id == user_id).first()
-                if user is None:
-                    await bot.send(event, at + " " + reply_failure("抽奖", "用户记录已变更，请重试"))
-                    return
-                current_coins = int(user.coins or 0)
-                if current_coins < total_cost:
-                    await bot.send(
-                        event,
-                        at + " " + reply_failure("抽奖", f"金币不足（需要 {total_cost}，当前 {current_coins}）"),
-                    )
-                    return
-
-                user.coins = current_coins - total_cost
-                # Insert item prizes (tracking total appraised value gained)
-                slot_iter = iter(empty_slots)
-                item_value_gained = 0
-                for pid in item_prize_ids:
-                    snap = prize_snapshots[pid]
-                    count = bucket[pid]
-                    total_qty = snap["quantity"] * count
-                    actual_value = snap.get("actual_value")
-                    if actual_value is not None:
-                        unit_value = max(0, int(actual_value))
-                    else:
-                        per_pack = max(1, snap["quantity"])
-                        unit_value = snap["unit_price"] // per_pack if per_pack > 0 else 0
-                    item_value_gained += unit_value * total_qty
-                    session.add(WarehouseItem(
-                        user_id=user_id,
-                        slot_index=next(slot_iter),
-                        item_id=snap["item_id"],
-                        prefix_id=snap["prefix_id"],
-                        quantity=total_qty,
-                        min_tier=snap["min_tier"],
-                        value=int(unit_value),
-                        created_at=db_now_utc_naive(),
-                    ))
-
-                # Apply coin prizes
-                coin_delta = 0
-                for pid, count in bucket.items():
-                    if pid is None:
-                        continue
-                    snap = prize_snapshots[pid]
-                    if snap["kind"] == "coin":
-                        coin_delta += int(snap["coin_amount"]) * count
-                if coin_delta:
-                    user.coins = int(user.coins) + coin_delta
-                final_coins = int(user.coins)
-                session.commit()
-            finally:
-                session.close()
+            charge = await run_db_transaction(apply_draw)
     else:
         # No item prizes — still need to charge + apply coin prizes
-        item_value_gained = 0
-        session = get_session()
-        try:
-            user = session.query(User).filter(User.user_id == user_id).first()
-            if user is None:
-                await bot.send(event, at + " " + reply_failure("抽奖", "用户记录已变更，请重试"))
-                return
-            current_coins = int(user.coins or 0)
-            if current_coins < total_cost:
-                await bot.send(
-                    event,
-                    at + " " + reply_failure("抽奖", f"金币不足（需要 {total_cost}，当前 {current_coins}）"),
-                )
-                return
-            user.coins = current_coins - total_cost
-            coin_delta = 0
-            for pid, count in bucket.items():
-                if pid is None:
-                    continue
-                snap = prize_snapshots[pid]
-                if snap["kind"] == "coin":
-                    coin_delta += int(snap["coin_amount"]) * count
-            if coin_delta:
-                user.coins = int(user.coins) + coin_delta
-            final_coins = int(user.coins)
-            session.commit()
-        finally:
-            session.close()
+        charge = await run_db_transaction(apply_draw)
+    if charge.error:
+        await bot.send(event, at + " " + reply_failure("抽奖", charge.error))
+        return
+    final_coins = charge.final_coins
+    item_value_gained = charge.item_value_gained
+    coin_delta = charge.coin_delta
 
     # Execute command prizes (after charging — failures don't refund)
     cmd_results: list[dict[str, object]] = []
@@ -697,7 +641,7 @@ async def handle_lottery_draw(bot: Bot, event: Event, arg: Message = CommandArg(
                 entry["coin_amount"] = snap["coin_amount"]
             outcomes.append(entry)
 
-    page_url = create_lottery_result_page(
+    render_page = create_lottery_result_page(
         pool_id=pool_id, pool_name=pool_name,
         user_user_id=user_id, user_user_name=player_name,
         user_coins_after=final_coins, draw_count=draw_count,
@@ -707,28 +651,21 @@ async def handle_lottery_draw(bot: Bot, event: Event, arg: Message = CommandArg(
         command_results=cmd_results, theme=resolve_render_theme(),
     )
     logger.info(
-        f"抽奖结果渲染地址：user_id={user_id} pool_id={pool_id} draws={draw_count} "
+        f"抽奖结果渲染：user_id={user_id} pool_id={pool_id} draws={draw_count} "
         f"cost={total_cost} coin_delta={coin_delta} item_value_gained={item_value_gained} "
         f"item_slots={needed_slots} cmd_executions={len(cmd_results)} "
-        f"skipped={len(cmd_skip_reasons)} internal_url={page_url}"
+        f"skipped={len(cmd_skip_reasons)}"
     )
 
-    screenshot_path = Path("/tmp") / f"lottery-result-{pool_id}-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=LOTTERY_RESULT_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, at + " " + reply_failure("抽奖", str(exc)))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=LOTTERY_RESULT_SCREENSHOT_OPTIONS,
+        file_prefix=f"lottery-result-{pool_id}",
+        failure_action="抽奖",
+        failure_prefix=at + " ",
+    ):
         return
-
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, at + " " + reply_failure("抽奖", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
-        if cmd_skip_reasons:
-            await bot.send(event, at + " ⚠️ 部分指令奖品已跳过：" + "；".join(cmd_skip_reasons))
-        return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    if cmd_skip_reasons:
+        await bot.send(event, at + " ⚠️ 部分指令奖品已跳过：" + "；".join(cmd_skip_reasons))
@@ -1,9 +1,6 @@
-import base64
-from pathlib import Path
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
-from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
 
@@ -13,7 +10,7 @@ from nextbot.command_config import (
     raise_command_usage,
 )
 from nextbot.message_parser import parse_command_args_with_fallback
-from nextbot.render_utils import resolve_render_theme
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
 from nextbot.permissions import require_permission
 from nextbot.text_utils import (
     EMOJI_CHART,
@@ -32,8 +29,7 @@ from nextbot.text_utils import (
     reply_failure,
     reply_list,
 )
-from nextbot.time_utils import beijing_filename_timestamp
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
+from server.screenshot import ScreenshotOptions
 from server.web_server import create_menu_page
 
 menu_matcher = on_command("菜单")
@@ -82,49 +78,25 @@ CATEGORY_EMOJI = {
 }
 
 
-def _to_base64_image_uri(path: Path) -> str:
-    raw = path.read_bytes()
-    encoded = base64.b64encode(raw).decode("ascii")
-    return f"base64://{encoded}"
-
-
 async def _render_and_send_menu(
     bot: Bot,
     event: Event,
     title: str,
     render_commands: list[dict[str, str]],
 ) -> None:
-    page_url = create_menu_page(title=title, commands=render_commands, theme=resolve_render_theme())
-    logger.info(
-        f"{title}渲染地址："
-        f"command_count={len(render_commands)} "
-        f"internal_url={page_url}"
-    )
-
-    screenshot_path = Path("/tmp") / f"menu-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(
-            page_url,
-            screenshot_path,
-            options=MENU_SCREENSHOT_OPTIONS,
-        )
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("生成", f"{exc}"))
+    render_page = create_menu_page(title=title, commands=render_commands, theme=resolve_render_theme())
+    logger.info(f"{title}渲染：command_count={len(render_commands)}")
+
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=MENU_SCREENSHOT_OPTIONS,
+        file_prefix="menu",
+        failure_action="生成",
+    ):
         return
-
-    logger.info(
-        f"{title}截图成功：command_count={len(render_commands)} file={screenshot_path}"
-    )
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("生成", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
-        return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info(f"{title}截图成功：command_count={len(render_commands)}")
 
 
 def _group_by_category(items: list[dict]) -> tuple[list[str], dict[str, list[dict]]]:
@@ -1,5 +1,3 @@
-import base64
-from pathlib import Path
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
@@ -9,7 +7,7 @@ from nonebot.params import CommandArg
 
 from nextbot.access_control import get_owner_ids, get_owner_ids_ordered
 from nextbot.command_config import command_control, get_current_param, raise_command_usage
-from nextbot.db import Group, User, get_session
+from nextbot.db import Group, User, db_session
 from nextbot.message_parser import (
     parse_command_args_with_fallback,
     resolve_user_id_arg_with_fallback,
@@ -19,10 +17,9 @@ from nextbot.permissions import (
     remove_permission,
     require_permission,
 )
-from nextbot.render_utils import resolve_render_theme
-from nextbot.time_utils import beijing_filename_timestamp
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
 from nextbot.text_utils import EMOJI_GROUP, EMOJI_LOCK, EMOJI_USER, reply_block, reply_failure, reply_success
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
+from server.screenshot import ScreenshotOptions
 from server.web_server import create_admin_list_page
 
 add_user_perm_matcher = on_command("添加用户权限")
@@ -63,7 +60,7 @@ async def handle_add_user_perm(
         raise_command_usage()
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
-    user_id, parse_error = resolve_user_id_arg_with_fallback(
+    user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event,
         arg,
         "添加用户权限",
@@ -81,18 +78,18 @@ async def handle_add_user_perm(
         return
 
     permission = args[1]
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == user_id))
         if user is None:
             await bot.send(event, at + " " + reply_failure("添加", "用户不存在"))
             return
 
         user.permissions = add_permission(user.permissions, permission)
         target_name = str(user.name)
-        session.commit()
+        await session.commit()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(f"添加用户权限成功：user_id={user_id} permission={permission}")
     await bot.send(
@@ -125,7 +122,7 @@ async def handle_remove_user_perm(
         raise_command_usage()
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
-    user_id, parse_error = resolve_user_id_arg_with_fallback(
+    user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event,
         arg,
         "删除用户权限",
@@ -143,18 +140,18 @@ async def handle_remove_user_perm(
         return
 
     permission = args[1]
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == user_id))
         if user is None:
             await bot.send(event, at + " " + reply_failure("删除", "用户不存在"))
             return
 
         user.permissions = remove_permission(user.permissions, permission)
         target_name = str(user.name)
-        session.commit()
+        await session.commit()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(f"删除用户权限成功：user_id={user_id} permission={permission}")
     await bot.send(
@@ -187,7 +184,7 @@ async def handle_set_user_group(
         raise_command_usage()
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event,
         arg,
         "修改用户身份组",
@@ -205,23 +202,23 @@ async def handle_set_user_group(
         return
 
     group_name = args[1]
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == target_user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == target_user_id))
         if user is None:
             await bot.send(event, at + " " + reply_failure("修改", "用户不存在"))
             return
 
-        group = session.query(Group).filter(Group.name == group_name).first()
+        group = await session.first(session.query(Group).filter(Group.name == group_name))
         if group is None:
             await bot.send(event, at + " " + reply_failure("修改", "身份组不存在"))
             return
 
         user.group = group_name
         target_name = str(user.name)
-        session.commit()
+        await session.commit()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(
         f"修改用户身份组成功：user_id={target_user_id} group={group_name}"
@@ -276,24 +273,16 @@ async def handle_admin_list(bot: Bot, event: Event, arg: Message = CommandArg())
         admins.append({"user_id": qq, "nickname": nickname})
         logger.info(f"管理员昵称获取：qq={qq} nickname={nickname!r}")
 
-    page_url = create_admin_list_page(admins=admins, theme=resolve_render_theme())
-    logger.info(f"管理员列表渲染地址：admin_count={len(admins)} internal_url={page_url}")
+    render_page = create_admin_list_page(admins=admins, theme=resolve_render_theme())
+    logger.info(f"管理员列表渲染：admin_count={len(admins)}")
 
-    screenshot_path = Path("/tmp") / f"admin-list-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=ADMIN_LIST_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", f"{exc}"))
-        return
-
-    logger.info(f"管理员列表截图成功：file={screenshot_path}")
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            raw = screenshot_path.read_bytes()
-            image_uri = f"base64://{base64.b64encode(raw).decode('ascii')}"
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=ADMIN_LIST_SCREENSHOT_OPTIONS,
+        file_prefix="admin-list",
+        failure_action="查询",
+    ):
         return
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info("管理员列表截图成功")
@@ -1,5 +1,3 @@
-import base64
-from pathlib import Path
 from urllib.parse import urlparse, urlunparse
 
 from nonebot import get_driver, on_command
@@ -8,24 +6,29 @@ from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
 
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
+from server.screenshot import ScreenshotOptions
 from server.web_server import create_inventory_page, create_progress_page
 from nextbot.command_config import (
     command_control,
     get_current_param,
+    get_current_user,
     raise_command_usage,
 )
-from nextbot.db import Server, User, get_session
+from nextbot.db import Server, User, db_session
 from nextbot.message_parser import (
     parse_command_args_with_fallback,
     resolve_user_id_arg_with_fallback,
 )
 from nextbot.permissions import require_permission
-from nextbot.render_utils import resolve_render_theme
-from nextbot.time_utils import beijing_filename_timestamp, format_online_seconds
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
+from nextbot.server_status import get_server_status
+from nextbot.time_utils import format_online_seconds
 from nextbot.tshock_api import (
     TShockRequestError,
+    TShockResponse,
+    fan_out,
     get_error_reason,
+    get_request_error_reason,
     is_success,
     request_server_api,
 )
@@ -105,12 +108,6 @@ def _parse_user_info_texts(response_payload: dict[str, object]) -> dict[str, str
     }
 
 
-def _to_base64_image_uri(path: Path) -> str:
-    raw = path.read_bytes()
-    encoded = base64.b64encode(raw).decode("ascii")
-    return f"base64://{encoded}"
-
-
 def _to_public_render_url(url: str) -> str:
     config = get_driver().config
     base_url = str(getattr(config, "web_server_public_base_url", "")).strip()
@@ -155,62 +152,37 @@ async def handle_online(
     if args:
         raise_command_usage()
 
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
     if not servers:
         await bot.send(event, reply_failure("查询", "暂无服务器"))
         return
 
+    # 后台轮询的快照足够新时直接使用，否则实时查询
     lines: list[str] = []
-    for i, server in enumerate(servers):
+    for i, result in enumerate(await fan_out(servers, get_server_status)):
+        server = result.server
         if i > 0:
             lines.append("")
         lines.append(f"{server.id}.{server.name}")
-        try:
-            response = await request_server_api(
-                server,
-                "/v2/server/status",
-                params={"players": "true"},
-            )
-        except TShockRequestError:
-            lines.append("❌ 查询失败，无法连接服务器")
+        status = result.value
+        if status is None:
+            lines.append(f"❌ 查询失败，{get_request_error_reason(result.error)}")
             continue
-
-        if not is_success(response):
-            lines.append(f"❌ 查询失败，{get_error_reason(response)}")
-            continue
-
-        players = response.payload.get("players")
-        if not isinstance(players, list):
-            lines.append("❌ 查询失败，返回数据格式错误")
+        if not status.ok:
+            lines.append(f"❌ 查询失败，{status.error}")
             continue
 
-        playercount = response.payload.get("playercount")
-        maxplayers = response.payload.get("maxplayers")
-        if not isinstance(playercount, int) or not isinstance(maxplayers, int):
-            lines.append("❌ 查询失败，返回数据格式错误")
-            continue
-
-        if not players:
+        if not status.players:
             lines.append("ℹ️ 无玩家在线")
             continue
 
-        lines.append(f"在线玩家（{playercount}/{maxplayers}）")
-        nicknames: list[str] = []
-        for player in players:
-            if isinstance(player, dict):
-                nickname = str(player.get("nickname", "")).strip()
-                if nickname:
-                    nicknames.append(nickname)
-                    continue
-            nicknames.append(str(player))
-
-        player_names = ",".join(nicknames)
-        lines.append(player_names)
+        lines.append(f"在线玩家（{status.playercount}/{status.maxplayers}）")
+        lines.append(",".join(status.players))
 
     logger.info(f"在线查询完成：server_count={len(servers)}")
     await bot.send(event, "🖥️ 服务器在线状态\n" + "\n".join(lines))
@@ -235,12 +207,12 @@ async def handle_self_kick(
 
     user_id = event.get_user_id()
     at = OBV11MessageSegment.at(int(user_id))
-    session = get_session()
+    user = get_current_user()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
     if user is None:
         await bot.send(event, at + " " + reply_failure("执行", "未注册账号"))
@@ -250,18 +222,23 @@ async def handle_self_kick(
         await bot.send(event, at + " " + reply_failure("执行", "暂无服务器"))
         return
 
+    async def kick(server: Server) -> TShockResponse:
+        return await request_server_api(
+            server,
+            "/v3/server/rawcmd",
+            params={"cmd": f"/kick {user.name}"},
+        )
+
     lines: list[str] = []
-    for server in servers:
-        try:
-            response = await request_server_api(
-                server,
-                "/v3/server/rawcmd",
-                params={"cmd": f"/kick {user.name}"},
+    for result in await fan_out(servers, kick):
+        server = result.server
+        if result.value is None:
+            lines.append(
+                f"{server.id}.{server.name}：❌ 执行失败，{get_request_error_reason(result.error)}"
             )
-        except TShockRequestError:
-            lines.append(f"{server.id}.{server.name}：❌ 执行失败，无法连接服务器")
             continue
 
+        response = result.value
         if is_success(response):
             lines.append(f"{server.id}.{server.name}：✅ 执行成功")
             continue
@@ -319,7 +296,7 @@ async def handle_user_inventory(
         server_id = int(args[0])
     except ValueError:
         raise_command_usage()
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event,
         arg,
         "用户背包",
@@ -337,12 +314,14 @@ async def handle_user_inventory(
         await bot.send(event, reply_failure("查询", "用户参数解析失败"))
         return
 
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
-        target_user = session.query(User).filter(User.user_id == target_user_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
+        target_user = await session.first(
+            session.query(User).filter(User.user_id == target_user_id)
+        )
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, reply_failure("查询", "服务器不存在"))
@@ -356,8 +335,8 @@ async def handle_user_inventory(
             server,
             f"/nextbot/users/{target_user.name}/inventory",
         )
-    except TShockRequestError:
-        await bot.send(event, reply_failure("查询", "无法连接服务器"))
+    except TShockRequestError as exc:
+        await bot.send(event, reply_failure("查询", get_request_error_reason(exc)))
         return
 
     if not is_success(response):
@@ -374,8 +353,8 @@ async def handle_user_inventory(
             server,
             f"/nextbot/users/{target_user.name}/stats",
         )
-    except TShockRequestError:
-        await bot.send(event, reply_failure("查询", "无法连接服务器"))
+    except TShockRequestError as exc:
+        await bot.send(event, reply_failure("查询", get_request_error_reason(exc)))
         return
 
     if not is_success(info_response):
@@ -387,7 +366,7 @@ async def handle_user_inventory(
         await bot.send(event, reply_failure("查询", "返回数据格式错误"))
         return
 
-    page_url = create_inventory_page(
+    render_page = create_inventory_page(
         user_id=target_user.user_id,
         user_name=target_user.name,
         server_id=server.id,
@@ -403,39 +382,23 @@ async def handle_user_inventory(
         slots=[item for item in inventory if isinstance(item, dict)],
         theme=resolve_render_theme(),
     )
-    public_page_url = _to_public_render_url(page_url)
     logger.info(
-        "用户背包渲染地址："
-        f"server_id={server.id} target_user_id={target_user.user_id} "
-        f"internal_url={page_url} public_url={public_page_url}"
+        f"用户背包渲染：server_id={server.id} target_user_id={target_user.user_id}"
     )
     if bool(get_current_param("send_link", False)):
+        public_page_url = _to_public_render_url(render_page.publish())
+        logger.info(f"用户背包分享链接：public_url={public_page_url}")
         await bot.send(event, f"ℹ️ 用户背包链接：{public_page_url}")
-    screenshot_path = Path("/tmp") / (
-        f"inventory-{server.id}-{target_user.user_id}-{beijing_filename_timestamp()}.png"
-    )
-    try:
-        await screenshot_url(
-            page_url,
-            screenshot_path,
-            options=INVENTORY_SCREENSHOT_OPTIONS,
-        )
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", f"{exc}"))
-        return
-
-    logger.info(
-        f"用户背包截图成功：server_id={server.id} target_user_id={target_user.user_id} file={screenshot_path}"
-    )
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=INVENTORY_SCREENSHOT_OPTIONS,
+        file_prefix=f"inventory-{server.id}-{target_user.user_id}",
+        failure_action="查询",
+    ):
         return
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info(f"用户背包截图成功：server_id={server.id} target_user_id={target_user.user_id}")
 
 
 @my_inventory_matcher.handle()
@@ -483,13 +446,12 @@ async def handle_my_inventory(
     except ValueError:
         raise_command_usage()
 
-    user_id = event.get_user_id()
-    session = get_session()
+    user = get_current_user()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
-        user = session.query(User).filter(User.user_id == user_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, reply_failure("查询", "服务器不存在"))
@@ -503,8 +465,8 @@ async def handle_my_inventory(
             server,
             f"/nextbot/users/{user.name}/inventory",
         )
-    except TShockRequestError:
-        await bot.send(event, reply_failure("查询", "无法连接服务器"))
+    except TShockRequestError as exc:
+        await bot.send(event, reply_failure("查询", get_request_error_reason(exc)))
         return
 
     if not is_success(response):
@@ -521,8 +483,8 @@ async def handle_my_inventory(
             server,
             f"/nextbot/users/{user.name}/stats",
         )
-    except TShockRequestError:
-        await bot.send(event, reply_failure("查询", "无法连接服务器"))
+    except TShockRequestError as exc:
+        await bot.send(event, reply_failure("查询", get_request_error_reason(exc)))
         return
 
     if not is_success(info_response):
@@ -534,7 +496,7 @@ async def handle_my_inventory(
         await bot.send(event, reply_failure("查询", "返回数据格式错误"))
         return
 
-    page_url = create_inventory_page(
+    render_page = create_inventory_page(
         user_id=user.user_id,
         user_name=user.name,
         server_id=server.id,
@@ -550,40 +512,22 @@ async def handle_my_inventory(
         slots=[item for item in inventory if isinstance(item, dict)],
         theme=resolve_render_theme(),
     )
-    public_page_url = _to_public_render_url(page_url)
-    logger.info(
-        "我的背包渲染地址："
-        f"server_id={server.id} user_id={user.user_id} "
-        f"internal_url={page_url} public_url={public_page_url}"
-    )
+    logger.info(f"我的背包渲染：server_id={server.id} user_id={user.user_id}")
     if bool(get_current_param("send_link", False)):
+        public_page_url = _to_public_render_url(render_page.publish())
+        logger.info(f"我的背包分享链接：public_url={public_page_url}")
         await bot.send(event, f"ℹ️ 我的背包链接：{public_page_url}")
 
-    screenshot_path = Path("/tmp") / (
-        f"inventory-{server.id}-{user.user_id}-{beijing_filename_timestamp()}.png"
-    )
-    try:
-        await screenshot_url(
-            page_url,
-            screenshot_path,
-            options=INVENTORY_SCREENSHOT_OPTIONS,
-        )
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", f"{exc}"))
-        return
-
-    logger.info(
-        f"我的背包截图成功：server_id={server.id} user_id={user.user_id} file={screenshot_path}"
-    )
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=INVENTORY_SCREENSHOT_OPTIONS,
+        file_prefix=f"inventory-{server.id}-{user.user_id}",
+        failure_action="查询",
+    ):
         return
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info(f"我的背包截图成功：server_id={server.id} user_id={user.user_id}")
 
 
 @progress_matcher.handle()
@@ -608,11 +552,11 @@ async def handle_world_progress(
     except ValueError:
         raise_command_usage()
 
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, reply_failure("查询", "服务器不存在"))
@@ -623,8 +567,8 @@ async def handle_world_progress(
             server,
             "/nextbot/world/progress",
         )
-    except TShockRequestError:
-        await bot.send(event, reply_failure("查询", "无法连接服务器"))
+    except TShockRequestError as exc:
+        await bot.send(event, reply_failure("查询", get_request_error_reason(exc)))
         return
 
     if not is_success(response):
@@ -640,40 +584,21 @@ async def handle_world_progress(
         await bot.send(event, reply_failure("查询", "返回数据格式错误"))
         return
 
-    page_url = create_progress_page(
+    render_page = create_progress_page(
         server_id=server.id,
         server_name=server.name,
         progress=progress,
         theme=resolve_render_theme(),
     )
-    logger.info(
-        "世界进度渲染地址："
-        f"server_id={server.id} "
-        f"internal_url={page_url}"
-    )
-
-    screenshot_path = Path("/tmp") / (
-        f"progress-{server.id}-{beijing_filename_timestamp()}.png"
-    )
-    try:
-        await screenshot_url(
-            page_url,
-            screenshot_path,
-            options=PROGRESS_SCREENSHOT_OPTIONS,
-        )
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", f"{exc}"))
-        return
+    logger.info(f"世界进度渲染：server_id={server.id}")
 
-    logger.info(
-        f"世界进度截图成功：server_id={server.id} file={screenshot_path}"
-    )
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=PROGRESS_SCREENSHOT_OPTIONS,
+        file_prefix=f"progress-{server.id}",
+        failure_action="查询",
+    ):
         return
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info(f"世界进度截图成功：server_id={server.id}")
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-import base64
 import math
 import random
-from pathlib import Path
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
@@ -14,10 +14,10 @@ from sqlalchemy import update as sa_update
 from sqlalchemy.exc import IntegrityError
 
 from nextbot.command_config import command_control, get_current_param, raise_command_usage
-from nextbot.db import RedPacket, RedPacketClaim, User, get_session
+from nextbot.db import RedPacket, RedPacketClaim, User, db_session, run_db_transaction
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.permissions import require_permission
-from nextbot.render_utils import resolve_render_theme
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
 from nextbot.text_utils import (
     EMOJI_CHART,
     EMOJI_COIN,
@@ -28,9 +28,12 @@ from nextbot.text_utils import (
     reply_failure,
     reply_success,
 )
-from nextbot.time_utils import beijing_filename_timestamp, db_now_utc_naive, format_beijing_datetime
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
-from server.web_server import create_red_packet_all_page, create_red_packet_own_page
+from nextbot.time_utils import db_now_utc_naive, format_beijing_datetime
+from server.screenshot import ScreenshotOptions
+from server.web_server import RenderPage, create_red_packet_all_page, create_red_packet_own_page
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Query, Session
 
 send_matcher = on_command("发红包")
 grab_matcher = on_command("抢红包")
@@ -49,12 +52,6 @@ _RED_PACKET_SCREENSHOT_OPTIONS = ScreenshotOptions(
 )
 
 
-def _to_base64_image_uri(path: Path) -> str:
-    raw = path.read_bytes()
-    encoded = base64.b64encode(raw).decode("ascii")
-    return f"base64://{encoded}"
-
-
 def _draw_equal(remaining_amount: int, remaining_count: int, base: int) -> int:
     if remaining_count <= 1:
         return remaining_amount
@@ -72,7 +69,17 @@ def _draw_lucky(remaining_amount: int, remaining_count: int) -> int:
     return random.randint(1, high)
 
 
-def _claim_slot_atomic(session, packet_id: int, draw_amount: int) -> bool:
+@dataclass(frozen=True)
+class GrabOutcome:
+    error: str = ""
+    packet_name: str = ""
+    packet_type: str = ""
+    total_amount: int = 0
+    draw_amount: int = 0
+    taken_amount: int = 0
+
+
+def _claim_slot_atomic(session: Session, packet_id: int, draw_amount: int) -> bool:
     stmt = (
         sa_update(RedPacket)
         .where(RedPacket.id == packet_id)
@@ -88,6 +95,37 @@ def _claim_slot_atomic(session, packet_id: int, draw_amount: int) -> bool:
     return result.rowcount > 0
 
 
+# 以下查询构造函数同时供 scripts/check_query_plans.py 检查执行计划
+
+
+def _own_packets_query(session: Session, user_id: str) -> Query:
+    return session.query(RedPacket).filter(RedPacket.sender_user_id == user_id)
+
+
+def _own_packets_page_query(
+    session: Session, user_id: str, offset: int, limit: int
+) -> Query:
+    return (
+        _own_packets_query(session, user_id)
+        .order_by(RedPacket.created_at.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def _active_packets_query(session: Session) -> Query:
+    return session.query(RedPacket).filter(RedPacket.status == "active")
+
+
+def _active_packets_page_query(session: Session, offset: int, limit: int) -> Query:
+    return (
+        _active_packets_query(session)
+        .order_by(RedPacket.created_at.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+
 @send_matcher.handle()
 @command_control(
     command_key="economy.red_packet.send",
@@ -160,27 +198,21 @@ async def handle_send(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
         return
 
     user_id = event.get_user_id()
-    session = get_session()
-    try:
+
+    def apply_send(session: Session) -> str:
         existing = session.query(RedPacket).filter(RedPacket.name == name).first()
         if existing is not None:
-            await bot.send(event, at + " " + reply_failure("发红包", "红包名称已被使用过，请换一个"))
-            return
+            return "红包名称已被使用过，请换一个"
 
         sender = session.query(User).filter(User.user_id == user_id).first()
         if sender is None:
-            await bot.send(event, at + " " + reply_failure("发红包", "请先注册账号"))
-            return
+            return "请先注册账号"
         sender_coins = int(sender.coins or 0)
         if sender_coins < total_amount:
-            await bot.send(
-                event,
-                at + " " + reply_failure("发红包", f"金币不足（当前 {sender_coins}，需 {total_amount}）"),
-            )
-            return
+            return f"金币不足（当前 {sender_coins}，需 {total_amount}）"
 
         sender.coins = sender_coins - total_amount
-        packet = RedPacket(
+        session.add(RedPacket(
             name=name,
             sender_user_id=user_id,
             type=type_en,
@@ -189,11 +221,13 @@ async def handle_send(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
             remaining_amount=total_amount,
             remaining_count=count,
             status="active",
-        )
-        session.add(packet)
-        session.commit()
-    finally:
-        session.close()
+        ))
+        return ""
+
+    error = await run_db_transaction(apply_send)
+    if error:
+        await bot.send(event, at + " " + reply_failure("发红包", error))
+        return
 
     logger.info(
         f"发红包成功：user_id={user_id}，name={name}，type={type_en}，"
@@ -235,15 +269,12 @@ async def handle_grab(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
 
     user_id = event.get_user_id()
 
-    session = get_session()
-    try:
+    def apply_grab(session: Session) -> GrabOutcome:
         packet = session.query(RedPacket).filter(RedPacket.name == name).first()
         if packet is None:
-            await bot.send(event, at + " " + reply_failure("抢红包", "红包不存在"))
-            return
+            return GrabOutcome(error="红包不存在")
         if packet.status != "active":
-            await bot.send(event, at + " " + reply_failure("抢红包", "该红包已关闭"))
-            return
+            return GrabOutcome(error="该红包已关闭")
 
         already = (
             session.query(RedPacketClaim)
@@ -252,14 +283,12 @@ async def handle_grab(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
             .first()
         )
         if already is not None:
-            await bot.send(event, at + " " + reply_failure("抢红包", "你已经抢过这个红包了"))
-            return
+            return GrabOutcome(error="你已经抢过这个红包了")
 
         remaining_amount = int(packet.remaining_amount)
         remaining_count = int(packet.remaining_count)
         if remaining_count <= 0 or remaining_amount <= 0:
-            await bot.send(event, at + " " + reply_failure("抢红包", "该红包已关闭"))
-            return
+            return GrabOutcome(error="该红包已关闭")
 
         if packet.type == "lucky":
             draw_amount = _draw_lucky(remaining_amount, remaining_count)
@@ -269,47 +298,47 @@ async def handle_grab(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
         draw_amount = max(1, draw_amount)
 
         packet_id = int(packet.id)
-        packet_name = str(packet.name)
-        packet_type = str(packet.type)
-        packet_total_amount = int(packet.total_amount)
-        packet_total_count = int(packet.total_count)
-
         if not _claim_slot_atomic(session, packet_id, draw_amount):
-            session.rollback()
-            await bot.send(event, at + " " + reply_failure("抢红包", "手慢了一步"))
-            return
+            return GrabOutcome(error="手慢了一步")
 
-        claim = RedPacketClaim(
+        session.add(RedPacketClaim(
             red_packet_id=packet_id,
             claimer_user_id=user_id,
             amount=draw_amount,
-        )
-        session.add(claim)
+        ))
         try:
             session.flush()
         except IntegrityError:
             session.rollback()
-            await bot.send(event, at + " " + reply_failure("抢红包", "你已经抢过这个红包了"))
-            return
+            return GrabOutcome(error="你已经抢过这个红包了")
 
         grabber = session.query(User).filter(User.user_id == user_id).first()
         if grabber is None:
             session.rollback()
-            await bot.send(event, at + " " + reply_failure("抢红包", "请先注册账号"))
-            return
+            return GrabOutcome(error="请先注册账号")
         grabber.coins = int(grabber.coins or 0) + draw_amount
 
-        refreshed_packet = session.query(RedPacket).filter(RedPacket.id == packet_id).first()
-        if refreshed_packet is not None and int(refreshed_packet.remaining_count) == 0:
-            refreshed_packet.status = "exhausted"
-            refreshed_packet.closed_at = db_now_utc_naive()
-
-        session.commit()
-        taken_amount = packet_total_amount - (
-            int(refreshed_packet.remaining_amount) if refreshed_packet is not None else 0
+        session.refresh(packet)
+        if int(packet.remaining_count) == 0:
+            packet.status = "exhausted"
+            packet.closed_at = db_now_utc_naive()
+        return GrabOutcome(
+            packet_name=str(packet.name),
+            packet_type=str(packet.type),
+            total_amount=int(packet.total_amount),
+            draw_amount=draw_amount,
+            taken_amount=int(packet.total_amount) - int(packet.remaining_amount),
         )
-    finally:
-        session.close()
+
+    outcome = await run_db_transaction(apply_grab)
+    if outcome.error:
+        await bot.send(event, at + " " + reply_failure("抢红包", outcome.error))
+        return
+    packet_name = outcome.packet_name
+    packet_type = outcome.packet_type
+    packet_total_amount = outcome.total_amount
+    draw_amount = outcome.draw_amount
+    taken_amount = outcome.taken_amount
 
     type_zh = _TYPE_EN_TO_ZH.get(packet_type, packet_type)
     logger.info(
@@ -351,44 +380,29 @@ async def handle_withdraw(bot: Bot, event: Event, arg: Message = CommandArg()) -
 
     user_id = event.get_user_id()
 
-    session = get_session()
-    try:
+    def apply_withdraw(session: Session) -> tuple[str, int]:
         packet = session.query(RedPacket).filter(RedPacket.name == name).first()
         if packet is None:
-            await bot.send(event, at + " " + reply_failure("收回红包", "红包不存在"))
-            return
+            return "红包不存在", 0
         if packet.sender_user_id != user_id:
-            await bot.send(event, at + " " + reply_failure("收回红包", "只能收回自己发的红包"))
-            return
+            return "只能收回自己发的红包", 0
         if packet.status != "active":
-            await bot.send(event, at + " " + reply_failure("收回红包", "该红包已关闭"))
-            return
-
-        packet_id = int(packet.id)
-        stmt = (
-            sa_update(RedPacket)
-            .where(RedPacket.id == packet_id)
-            .where(RedPacket.status == "active")
-            .values(status="withdrawn", closed_at=db_now_utc_naive())
-        )
-        result = session.execute(stmt)
-        if result.rowcount == 0:
-            session.rollback()
-            await bot.send(event, at + " " + reply_failure("收回红包", "该红包已关闭"))
-            return
-
-        refreshed_packet = session.query(RedPacket).filter(RedPacket.id == packet_id).first()
-        refund_amount = int(refreshed_packet.remaining_amount) if refreshed_packet else 0
+            return "该红包已关闭", 0
 
         sender = session.query(User).filter(User.user_id == user_id).first()
         if sender is None:
-            session.rollback()
-            await bot.send(event, at + " " + reply_failure("收回红包", "请先注册账号"))
-            return
+            return "请先注册账号", 0
+
+        refund_amount = int(packet.remaining_amount)
+        packet.status = "withdrawn"
+        packet.closed_at = db_now_utc_naive()
         sender.coins = int(sender.coins or 0) + refund_amount
-        session.commit()
-    finally:
-        session.close()
+        return "", refund_amount
+
+    error, refund_amount = await run_db_transaction(apply_withdraw)
+    if error:
+        await bot.send(event, at + " " + reply_failure("收回红包", error))
+        return
 
     logger.info(
         f"收回红包成功：user_id={user_id}，name={name}，refund_amount={refund_amount}"
@@ -409,27 +423,19 @@ async def _send_red_packet_image(
     bot: Bot,
     event: Event,
     *,
-    page_url: str,
+    render_page: RenderPage,
     file_prefix: str,
 ) -> None:
-    screenshot_path = Path("/tmp") / f"{file_prefix}-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=_RED_PACKET_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", str(exc)))
-        return
-
-    logger.info(f"红包列表截图成功：file={screenshot_path}")
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=_RED_PACKET_SCREENSHOT_OPTIONS,
+        file_prefix=file_prefix,
+        failure_action="查询",
+    ):
         return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info("红包列表截图成功")
 
 
 @list_own_matcher.handle()
@@ -472,28 +478,19 @@ async def handle_list_own(bot: Bot, event: Event, arg: Message = CommandArg()) -
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
     user_id = event.get_user_id()
 
-    session = get_session()
+    session = db_session()
     try:
-        total = (
-            session.query(RedPacket)
-            .filter(RedPacket.sender_user_id == user_id)
-            .count()
-        )
+        total = await session.count(_own_packets_query(session, user_id))
         total_pages = max(1, math.ceil(total / limit)) if total > 0 else 1
         if total > 0 and page > total_pages:
             await bot.send(event, reply_failure("查询", f"超出总页数（共 {total_pages} 页）"))
             return
         offset = (page - 1) * limit
-        packets = (
-            session.query(RedPacket)
-            .filter(RedPacket.sender_user_id == user_id)
-            .order_by(RedPacket.created_at.desc())
-            .offset(offset)
-            .limit(limit)
-            .all()
+        packets = await session.all(
+            _own_packets_page_query(session, user_id, offset, limit)
         )
     finally:
-        session.close()
+        await session.close()
 
     entries: list[dict[str, object]] = []
     for i, packet in enumerate(packets):
@@ -516,13 +513,13 @@ async def handle_list_own(bot: Bot, event: Event, arg: Message = CommandArg()) -
             }
         )
 
-    page_url = create_red_packet_own_page(
+    render_page = create_red_packet_own_page(
         page=page, total_pages=total_pages, entries=entries, theme=resolve_render_theme(),
     )
     logger.info(
-        f"我的红包渲染地址：user_id={user_id} page={page}/{total_pages} total={total} internal_url={page_url}"
+        f"我的红包渲染：user_id={user_id} page={page}/{total_pages} total={total}"
     )
-    await _send_red_packet_image(bot, event, page_url=page_url, file_prefix="red-packet-own")
+    await _send_red_packet_image(bot, event, render_page=render_page, file_prefix="red-packet-own")
 
 
 @list_all_matcher.handle()
@@ -564,35 +561,26 @@ async def handle_list_all(bot: Bot, event: Event, arg: Message = CommandArg()) -
 
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
-    session = get_session()
+    session = db_session()
     try:
-        total = (
-            session.query(RedPacket)
-            .filter(RedPacket.status == "active")
-            .count()
-        )
+        total = await session.count(_active_packets_query(session))
         total_pages = max(1, math.ceil(total / limit)) if total > 0 else 1
         if total > 0 and page > total_pages:
             await bot.send(event, reply_failure("查询", f"超出总页数（共 {total_pages} 页）"))
             return
         offset = (page - 1) * limit
-        packets = (
-            session.query(RedPacket)
-            .filter(RedPacket.status == "active")
-            .order_by(RedPacket.created_at.desc())
-            .offset(offset)
-            .limit(limit)
-            .all()
+        packets = await session.all(
+            _active_packets_page_query(session, offset, limit)
         )
         sender_ids = {p.sender_user_id for p in packets}
         senders = (
-            session.query(User).filter(User.user_id.in_(sender_ids)).all()
+            await session.all(session.query(User).filter(User.user_id.in_(sender_ids)))
             if sender_ids
             else []
         )
         name_map = {u.user_id: u.name for u in senders}
     finally:
-        session.close()
+        await session.close()
 
     entries: list[dict[str, object]] = []
     for i, packet in enumerate(packets):
@@ -611,10 +599,10 @@ async def handle_list_all(bot: Bot, event: Event, arg: Message = CommandArg()) -
             }
         )
 
-    page_url = create_red_packet_all_page(
+    render_page = create_red_packet_all_page(
         page=page, total_pages=total_pages, entries=entries, theme=resolve_render_theme(),
     )
     logger.info(
-        f"红包列表渲染地址：page={page}/{total_pages} total={total} internal_url={page_url}"
+        f"红包列表渲染：page={page}/{total_pages} total={total}"
     )
-    await _send_red_packet_image(bot, event, page_url=page_url, file_prefix="red-packet-all")
+    await _send_red_packet_image(bot, event, render_page=render_page, file_prefix="red-packet-all")
@@ -1,4 +1,5 @@
 import random
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 from nonebot import on_command
@@ -6,9 +7,10 @@ from nonebot.adapters import Bot, Event, Message
 from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
+from sqlalchemy.orm import Session
 
 from nextbot.command_config import command_control, get_current_param, raise_command_usage
-from nextbot.db import User, get_session
+from nextbot.db import User, run_db_transaction
 from nextbot.message_parser import parse_command_args_with_fallback, resolve_user_id_arg_with_fallback
 from nextbot.permissions import require_permission
 from nextbot.time_utils import db_now_utc_naive
@@ -17,6 +19,15 @@ from nextbot.text_utils import reply_failure
 rob_matcher = on_command("抢劫")
 
 
+@dataclass(frozen=True)
+class RobOutcome:
+    error: str = ""
+    result_type: str = ""
+    amount: int = 0
+    robber_name: str = ""
+    victim_name: str = ""
+
+
 @rob_matcher.handle()
 @command_control(
     command_key="economy.rob",
@@ -137,7 +148,7 @@ rob_matcher = on_command("抢劫")
 async def handle_rob(bot: Bot, event: Event, arg: Message = CommandArg()) -> None:
     at = OBV11MessageSegment.at(int(event.get_user_id()))
 
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event, arg, "抢劫", arg_index=0,
     )
     if parse_error == "missing":
@@ -173,17 +184,14 @@ async def handle_rob(bot: Bot, event: Event, arg: Message = CommandArg()) -> Non
     police_rate = max(0, min(int(get_current_param("police_rate", 10)), 100))
     min_coins_to_rob = max(1, int(get_current_param("min_coins_to_rob", 1)))
 
-    session = get_session()
-    try:
+    def apply_rob(session: Session) -> RobOutcome:
         robber = session.query(User).filter(User.user_id == robber_id).first()
         if robber is None:
-            await bot.send(event, at + " " + reply_failure("抢劫", "请先注册账号"))
-            return
+            return RobOutcome(error=reply_failure("抢劫", "请先注册账号"))
 
         victim = session.query(User).filter(User.user_id == target_user_id).first()
         if victim is None:
-            await bot.send(event, at + " " + reply_failure("抢劫", "对方未注册账号"))
-            return
+            return RobOutcome(error=reply_failure("抢劫", "对方未注册账号"))
 
         # 冷却检查
         now = db_now_utc_naive()
@@ -193,27 +201,21 @@ async def handle_rob(bot: Bot, event: Event, arg: Message = CommandArg()) -> Non
                 remaining = timedelta(minutes=cooldown_minutes) - elapsed
                 remaining_minutes = int(remaining.total_seconds() // 60)
                 remaining_seconds = int(remaining.total_seconds() % 60)
-                await bot.send(
-                    event,
-                    at + " " + reply_failure("抢劫", f"冷却中，还需等待 {remaining_minutes} 分 {remaining_seconds} 秒"),
+                return RobOutcome(
+                    error=reply_failure("抢劫", f"冷却中，还需等待 {remaining_minutes} 分 {remaining_seconds} 秒"),
                 )
-                return
 
         # 金币检查
         robber_coins = int(robber.coins or 0)
         victim_coins = int(victim.coins or 0)
         if victim_coins <= 0:
-            await bot.send(event, at + " " + reply_failure("抢劫", "对方身无分文"))
-            return
+            return RobOutcome(error=reply_failure("抢劫", "对方身无分文"))
         if robber_coins <= 0:
-            await bot.send(event, at + " " + reply_failure("抢劫", "你身无分文"))
-            return
+            return RobOutcome(error=reply_failure("抢劫", "你身无分文"))
         if robber_coins < min_coins_to_rob:
-            await bot.send(event, at + " " + reply_failure("抢劫", f"你的金币不足 {min_coins_to_rob}"))
-            return
+            return RobOutcome(error=reply_failure("抢劫", f"你的金币不足 {min_coins_to_rob}"))
         if victim_coins < min_coins_to_rob:
-            await bot.send(event, at + " " + reply_failure("抢劫", f"对方金币不足 {min_coins_to_rob}"))
-            return
+            return RobOutcome(error=reply_failure("抢劫", f"对方金币不足 {min_coins_to_rob}"))
 
         # 抽签决定结果
         roll = random.randint(1, 100)
@@ -267,12 +269,21 @@ async def handle_rob(bot: Bot, event: Event, arg: Message = CommandArg()) -> Non
             robber.rob_total_penalty = int(robber.rob_total_penalty or 0) + amount
 
         robber.last_rob_time = now
-        session.commit()
+        return RobOutcome(
+            result_type=result_type,
+            amount=amount,
+            robber_name=str(robber.name),
+            victim_name=str(victim.name),
+        )
 
-        robber_name = str(robber.name)
-        victim_name = str(victim.name)
-    finally:
-        session.close()
+    outcome = await run_db_transaction(apply_rob)
+    if outcome.error:
+        await bot.send(event, at + " " + outcome.error)
+        return
+    result_type = outcome.result_type
+    amount = outcome.amount
+    robber_name = outcome.robber_name
+    victim_name = outcome.victim_name
 
     victim_display = f"{victim_name}（{target_user_id}）"
     messages = {
@@ -9,12 +9,13 @@ from nonebot.log import logger
 from nonebot.params import CommandArg
 
 from nextbot.command_config import command_control, raise_command_usage
-from nextbot.db import Server, User, get_session
+from nextbot.db import Server, User, get_session, run_db
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.permissions import require_permission
 from nextbot.tshock_api import (
-    TShockRequestError,
+    fan_out,
     get_error_reason,
+    get_request_error_reason,
     is_success,
     request_server_api,
 )
@@ -42,11 +43,11 @@ async def _broadcast_login_action(
     path = path_template.format(user=quote(user_name, safe=""))
     results: list[tuple[Server, bool, str]] = []
     success_count = 0
-    for server in servers:
-        try:
-            response = await request_server_api(server, path)
-        except TShockRequestError:
-            results.append((server, False, "无法连接服务器"))
+    for result in await fan_out(servers, lambda server: request_server_api(server, path)):
+        server = result.server
+        response = result.value
+        if response is None:
+            results.append((server, False, get_request_error_reason(result.error)))
             continue
 
         if is_success(response):
@@ -112,7 +113,7 @@ async def handle_confirm_login(
 
     user_id = event.get_user_id()
     at = OBV11MessageSegment.at(int(user_id))
-    user, servers = _load_self_and_servers(user_id)
+    user, servers = await run_db(_load_self_and_servers, user_id)
     if user is None:
         await bot.send(event, at + " " + reply_failure("允许", "未注册账号"))
         return
@@ -151,7 +152,7 @@ async def handle_reject_login(
 
     user_id = event.get_user_id()
     at = OBV11MessageSegment.at(int(user_id))
-    user, servers = _load_self_and_servers(user_id)
+    user, servers = await run_db(_load_self_and_servers, user_id)
     if user is None:
         await bot.send(event, at + " " + reply_failure("拒绝", "未注册账号"))
         return
@@ -5,11 +5,12 @@ from nonebot.log import logger
 from nonebot.params import CommandArg
 
 from nextbot.command_config import command_control, raise_command_usage
-from nextbot.db import Server, get_session
+from nextbot.db import Server, db_session
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.permissions import require_permission
 from nextbot.tshock_api import (
     TShockRequestError,
+    close_server_clients,
     get_error_reason,
     is_success,
     request_server_api,
@@ -40,9 +41,9 @@ async def handle_add_server(
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
     name, ip, game_port, restapi_port, token = args
-    session = get_session()
+    session = db_session()
     try:
-        count = session.query(Server).count()
+        count = await session.count(session.query(Server))
         server = Server(
             id=count + 1,
             name=name,
@@ -52,9 +53,9 @@ async def handle_add_server(
             token=token,
         )
         session.add(server)
-        session.commit()
+        await session.commit()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(
         f"添加服务器成功：ID={count + 1} name={name} ip={ip} game_port={game_port} restapi_port={restapi_port}"
@@ -95,9 +96,9 @@ async def handle_delete_server(
         raise_command_usage()
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == target_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == target_id))
         if server is None:
             await bot.send(event, at + " " + reply_failure("删除", "服务器不存在"))
             return
@@ -105,15 +106,19 @@ async def handle_delete_server(
         deleted_id = server.id
         deleted_name = server.name
         session.delete(server)
-        session.flush()
+        await session.flush()
 
-        session.query(Server).filter(Server.id > deleted_id).update(
-            {Server.id: Server.id - 1}, synchronize_session=False
+        await session.update(
+            session.query(Server).filter(Server.id > deleted_id),
+            {Server.id: Server.id - 1},
+            synchronize_session=False,
         )
-        session.commit()
+        await session.commit()
     finally:
-        session.close()
+        await session.close()
 
+    # 后续服务器的 ID 整体前移，已有连接池都不再对应原来的服务器
+    await close_server_clients()
     logger.info(f"删除服务器成功：ID={deleted_id}")
     await bot.send(
         event,
@@ -144,11 +149,11 @@ async def handle_list_servers(
     if args:
         raise_command_usage()
 
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
     if not servers:
         await bot.send(event, "ℹ️ 暂无服务器")
@@ -189,18 +194,18 @@ async def handle_test_server(
         raise_command_usage()
 
     at = OBV11MessageSegment.at(int(event.get_user_id()))
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == target_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == target_id))
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, at + " " + reply_failure("测试", "服务器不存在"))
         return
 
     try:
-        response = await request_server_api(server, "/tokentest")
+        response = await request_server_api(server, "/tokentest", probe=True)
     except TShockRequestError:
         logger.info(
             f"测试连通性失败：id={target_id} ip={server.ip} port={server.restapi_port}"
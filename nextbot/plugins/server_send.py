@@ -6,8 +6,8 @@ from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
 
-from nextbot.command_config import command_control, raise_command_usage
-from nextbot.db import Server, User, get_session
+from nextbot.command_config import command_control, get_current_user, raise_command_usage
+from nextbot.db import Server, db_session
 from nextbot.message_parser import parse_command_text_with_fallback
 from nextbot.permissions import require_permission
 from nextbot.tshock_api import (
@@ -61,12 +61,12 @@ async def handle_send(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
     target_id, content = parsed
     user_id = event.get_user_id()
 
-    session = get_session()
+    user = get_current_user()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-        server = session.query(Server).filter(Server.id == target_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == target_id))
     finally:
-        session.close()
+        await session.close()
 
     if user is None:
         await bot.send(event, at + " " + reply_failure("发送", "请先注册账号"))
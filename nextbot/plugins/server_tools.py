@@ -9,7 +9,7 @@ from nonebot.log import logger
 from nonebot.params import CommandArg
 
 from nextbot.command_config import command_control, raise_command_usage
-from nextbot.db import Server, get_session
+from nextbot.db import Server, db_session
 from nextbot.message_parser import (
     parse_command_args_with_fallback,
     parse_command_text_with_fallback,
@@ -79,11 +79,11 @@ async def handle_execute(
 
     target_id, command = parsed
     at = OBV11MessageSegment.at(int(event.get_user_id()))
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == target_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == target_id))
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, at + " " + reply_failure("执行", "服务器不存在"))
@@ -153,11 +153,11 @@ async def handle_map_image(
     except ValueError:
         raise_command_usage()
 
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, reply_failure("查询", "服务器不存在"))
@@ -211,11 +211,11 @@ async def handle_download_map(
     except ValueError:
         raise_command_usage()
 
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         await bot.send(event, reply_failure("下载", "服务器不存在"))
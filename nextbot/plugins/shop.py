@@ -1,14 +1,13 @@
 from __future__ import annotations
 
-import base64
 import math
-from pathlib import Path
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
 from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
+from sqlalchemy.orm import Session
 
 from nextbot.command_config import command_control, get_current_param, raise_command_usage
 from nextbot.db import (
@@ -18,12 +17,14 @@ from nextbot.db import (
     ShopItem,
     User,
     WarehouseItem,
-    get_session,
+    db_session,
+    run_db_transaction,
 )
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.permissions import require_permission
 from nextbot.progression import PROGRESSION_KEY_TO_ZH
-from nextbot.render_utils import resolve_render_theme
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
+from nextbot.server_status import check_player_online
 from nextbot.text_utils import (
     EMOJI_COIN,
     EMOJI_SERVER,
@@ -35,10 +36,10 @@ from nextbot.text_utils import (
     reply_failure,
     reply_success,
 )
-from nextbot.time_utils import beijing_filename_timestamp, db_now_utc_naive
+from nextbot.time_utils import db_now_utc_naive
 from nextbot.tshock_api import TShockRequestError, get_error_reason, is_success, request_server_api
 from nextbot.warehouse_lock import warehouse_lock
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
+from server.screenshot import ScreenshotOptions
 from server.web_server import create_shop_list_page, create_shop_view_page
 
 shop_list_matcher = on_command("商店列表")
@@ -58,12 +59,6 @@ SHOP_LIST_SCREENSHOT_OPTIONS = ScreenshotOptions(
 )
 
 
-def _to_base64_image_uri(path: Path) -> str:
-    raw = path.read_bytes()
-    encoded = base64.b64encode(raw).decode("ascii")
-    return f"base64://{encoded}"
-
-
 def _load_shop_by_selector(session, selector: str) -> Shop | None:
     if selector.isdigit():
         shop = session.query(Shop).filter(Shop.id == int(selector)).first()
@@ -92,26 +87,7 @@ async def _issue_raw_command(server: Server, cmd: str) -> tuple[bool, str]:
 
 
 async def _check_player_online(server: Server, player_name: str) -> tuple[bool | None, str]:
-    try:
-        resp = await request_server_api(
-            server, "/v2/server/status", params={"players": "true"},
-        )
-    except TShockRequestError:
-        return None, "无法连接服务器"
-    if not is_success(resp):
-        return None, get_error_reason(resp)
-    players = resp.payload.get("players")
-    if not isinstance(players, list):
-        return None, "返回数据格式错误"
-    name_lower = player_name.lower()
-    for p in players:
-        if isinstance(p, dict):
-            nickname = str(p.get("nickname", "")).strip()
-        else:
-            nickname = str(p).strip()
-        if nickname.lower() == name_lower:
-            return True, ""
-    return False, ""
+    return await check_player_online(server, player_name)
 
 
 def _find_first_empty_slot(session, user_id: str) -> int | None:
@@ -166,20 +142,18 @@ async def handle_shop_list(bot: Bot, event: Event, arg: Message = CommandArg())
 
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
-    session = get_session()
+    session = db_session()
     try:
-        shops = (
+        shops = await session.all(
             session.query(Shop)
             .filter(Shop.enabled.is_(True))
             .order_by(Shop.sort_order.asc(), Shop.id.asc())
-            .all()
         )
         all_entries: list[dict[str, object]] = []
         for shop in shops:
-            count = (
+            count = await session.count(
                 session.query(ShopItem)
                 .filter(ShopItem.shop_id == shop.id, ShopItem.enabled.is_(True))
-                .count()
             )
             all_entries.append({
                 "shop_id": int(shop.id),
@@ -188,7 +162,7 @@ async def handle_shop_list(bot: Bot, event: Event, arg: Message = CommandArg())
                 "item_count": int(count),
             })
     finally:
-        session.close()
+        await session.close()
 
     total = len(all_entries)
     if total == 0:
@@ -202,7 +176,7 @@ async def handle_shop_list(bot: Bot, event: Event, arg: Message = CommandArg())
     offset = (page - 1) * limit
     render_entries = all_entries[offset:offset + limit]
 
-    page_url = create_shop_list_page(
+    render_page = create_shop_list_page(
         entries=render_entries,
         page=page,
         total_pages=total_pages,
@@ -210,27 +184,18 @@ async def handle_shop_list(bot: Bot, event: Event, arg: Message = CommandArg())
         theme=resolve_render_theme(),
     )
     logger.info(
-        f"商店列表渲染地址：page={page}/{total_pages} total={total} "
-        f"item_count={len(render_entries)} internal_url={page_url}"
+        f"商店列表渲染：page={page}/{total_pages} total={total} "
+        f"item_count={len(render_entries)}"
     )
 
-    screenshot_path = Path("/tmp") / f"shop-list-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=SHOP_LIST_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", str(exc)))
-        return
-
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
-        return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=SHOP_LIST_SCREENSHOT_OPTIONS,
+        file_prefix="shop-list",
+        failure_action="查询",
+    )
 
 
 @shop_view_matcher.handle()
@@ -276,17 +241,17 @@ async def handle_shop_view(bot: Bot, event: Event, arg: Message = CommandArg())
     limit = max(1, min(int(get_current_param("limit", 10)), 50))
 
     user_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        shop = _load_shop_by_selector(session, selector)
+        shop = await session.run_sync(_load_shop_by_selector, selector)
         if shop is None:
             await bot.send(event, reply_failure("查询", f"未找到商店「{selector}」"))
             return
         if not shop.enabled:
             await bot.send(event, reply_failure("查询", "该商店未上架"))
             return
-        items = _list_active_items(session, int(shop.id))
-        user = session.query(User).filter(User.user_id == user_id).first()
+        items = await session.run_sync(_list_active_items, int(shop.id))
+        user = await session.first(session.query(User).filter(User.user_id == user_id))
         user_name = str(user.name) if user is not None else "未注册用户"
         user_coins = int(user.coins) if user is not None else 0
         shop_id = int(shop.id)
@@ -294,7 +259,7 @@ async def handle_shop_view(bot: Bot, event: Event, arg: Message = CommandArg())
         shop_desc = str(shop.description or "")
 
         server_label_map: dict[int, str] = {
-            int(s.id): str(s.name) for s in session.query(Server).all()
+            int(s.id): str(s.name) for s in await session.all(session.query(Server))
         }
         all_entries = []
         for it in items:
@@ -327,7 +292,7 @@ async def handle_shop_view(bot: Bot, event: Event, arg: Message = CommandArg())
                 entry["command_template"] = str(it.command_template or "") if show_command else ""
             all_entries.append(entry)
     finally:
-        session.close()
+        await session.close()
 
     total = len(all_entries)
     total_pages = max(1, math.ceil(total / limit)) if total > 0 else 1
@@ -337,7 +302,7 @@ async def handle_shop_view(bot: Bot, event: Event, arg: Message = CommandArg())
     offset = (page - 1) * limit
     render_items = all_entries[offset:offset + limit]
 
-    page_url = create_shop_view_page(
+    render_page = create_shop_view_page(
         shop_id=shop_id,
         shop_name=shop_name,
         shop_description=shop_desc,
@@ -351,26 +316,17 @@ async def handle_shop_view(bot: Bot, event: Event, arg: Message = CommandArg())
         theme=resolve_render_theme(),
     )
     logger.info(
-        f"商店详情渲染地址：shop_id={shop_id} page={page}/{total_pages} "
-        f"total={total} item_count={len(render_items)} internal_url={page_url}"
+        f"商店详情渲染：shop_id={shop_id} page={page}/{total_pages} "
+        f"total={total} item_count={len(render_items)}"
+    )
+    await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=SHOP_VIEW_SCREENSHOT_OPTIONS,
+        file_prefix=f"shop-{shop_id}",
+        failure_action="查询",
     )
-    screenshot_path = Path("/tmp") / f"shop-{shop_id}-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=SHOP_VIEW_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", str(exc)))
-        return
-
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
-        return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
 
 
 @shop_buy_matcher.handle()
@@ -403,20 +359,19 @@ async def handle_shop_buy(bot: Bot, event: Event, arg: Message = CommandArg()) -
         return
 
     # First pass: load shop, validate, pick the target item by shop_item_id
-    session = get_session()
+    session = db_session()
     try:
-        shop = session.query(Shop).filter(Shop.id == shop_id).first()
+        shop = await session.first(session.query(Shop).filter(Shop.id == shop_id))
         if shop is None or not shop.enabled:
             await bot.send(event, at + " " + reply_failure("购买", "商店不存在或未上架"))
             return
-        target = (
+        target = await session.first(
             session.query(ShopItem)
             .filter(
                 ShopItem.id == shop_item_id,
                 ShopItem.shop_id == shop_id,
                 ShopItem.enabled.is_(True),
             )
-            .first()
         )
         if target is None:
             await bot.send(event, at + " " + reply_failure("购买", "商品不存在或未上架"))
@@ -438,7 +393,7 @@ async def handle_shop_buy(bot: Bot, event: Event, arg: Message = CommandArg()) -
         target_require_online = bool(getattr(target, "require_online", False))
         shop_name = str(shop.name)
     finally:
-        session.close()
+        await session.close()
 
     total_price = target_price * buy_count
 
@@ -476,45 +431,40 @@ async def _buy_item(
     actual_value: int | None,
 ) -> None:
     total_quantity = quantity_per_pack * buy_count
-    async with warehouse_lock(user_id):
-        session = get_session()
-        try:
-            user = session.query(User).filter(User.user_id == user_id).first()
-            if user is None:
-                await bot.send(event, at + " " + reply_failure("购买", "请先注册账号"))
-                return
-            coins = int(user.coins or 0)
-            if coins < total_price:
-                await bot.send(
-                    event,
-                    at + " " + reply_failure("购买", f"金币不足（需要 {total_price}，当前 {coins}）"),
-                )
-                return
-            empty_slot = _find_first_empty_slot(session, user_id)
-            if empty_slot is None:
-                await bot.send(event, at + " " + reply_failure("购买", "仓库已满，请先释放格子"))
-                return
+    if actual_value is not None:
+        unit_value = max(0, int(actual_value))
+    else:
+        unit_value = unit_price // quantity_per_pack if quantity_per_pack > 0 else 0
 
-            user.coins = coins - total_price
-            if actual_value is not None:
-                unit_value = max(0, int(actual_value))
-            else:
-                unit_value = unit_price // quantity_per_pack if quantity_per_pack > 0 else 0
-            new_item = WarehouseItem(
-                user_id=user_id,
-                slot_index=empty_slot,
-                item_id=item_id,
-                prefix_id=prefix_id,
-                quantity=total_quantity,
-                min_tier=min_tier,
-                value=int(unit_value),
-                created_at=db_now_utc_naive(),
-            )
-            session.add(new_item)
-            session.commit()
-            final_coins = int(user.coins)
-        finally:
-            session.close()
+    def apply_buy(session: Session) -> tuple[str, int, int]:
+        user = session.query(User).filter(User.user_id == user_id).first()
+        if user is None:
+            return "请先注册账号", 0, 0
+        coins = int(user.coins or 0)
+        if coins < total_price:
+            return f"金币不足（需要 {total_price}，当前 {coins}）", 0, 0
+        empty_slot = _find_first_empty_slot(session, user_id)
+        if empty_slot is None:
+            return "仓库已满，请先释放格子", 0, 0
+
+        user.coins = coins - total_price
+        session.add(WarehouseItem(
+            user_id=user_id,
+            slot_index=empty_slot,
+            item_id=item_id,
+            prefix_id=prefix_id,
+            quantity=total_quantity,
+            min_tier=min_tier,
+            value=int(unit_value),
+            created_at=db_now_utc_naive(),
+        ))
+        return "", empty_slot, int(user.coins)
+
+    async with warehouse_lock(user_id):
+        error, empty_slot, final_coins = await run_db_transaction(apply_buy)
+    if error:
+        await bot.send(event, at + " " + reply_failure("购买", error))
+        return
 
     lines = [
         f"{EMOJI_SHOP} 商店：{shop_name}（ID {shop_id}）",
@@ -547,9 +497,9 @@ async def _buy_command(
     require_online: bool,
 ) -> None:
     # Load player + servers; optionally verify online
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == user_id))
         if user is None:
             await bot.send(event, at + " " + reply_failure("购买", "请先注册账号"))
             return
@@ -562,16 +512,16 @@ async def _buy_command(
             return
         player_name = str(user.name)
         if target_server_id is None:
-            servers = session.query(Server).order_by(Server.id.asc()).all()
+            servers = await session.all(session.query(Server).order_by(Server.id.asc()))
             servers = list(servers)
         else:
-            srv = session.query(Server).filter(Server.id == target_server_id).first()
+            srv = await session.first(session.query(Server).filter(Server.id == target_server_id))
             if srv is None:
                 await bot.send(event, at + " " + reply_failure("购买", "目标服务器已不存在"))
                 return
             servers = [srv]
     finally:
-        session.close()
+        await session.close()
 
     if not servers:
         await bot.send(event, at + " " + reply_failure("购买", "暂无可用服务器"))
@@ -605,24 +555,20 @@ async def _buy_command(
         online_servers = list(servers)
 
     # Charge coins now (commit), then execute commands
-    session = get_session()
-    try:
+    def apply_charge(session: Session) -> tuple[str, int]:
         user = session.query(User).filter(User.user_id == user_id).first()
         if user is None:
-            await bot.send(event, at + " " + reply_failure("购买", "用户记录已变更，请重试"))
-            return
+            return "用户记录已变更，请重试", 0
         coins = int(user.coins or 0)
         if coins < total_price:
-            await bot.send(
-                event,
-                at + " " + reply_failure("购买", f"金币不足（需要 {total_price}，当前 {coins}）"),
-            )
-            return
+            return f"金币不足（需要 {total_price}，当前 {coins}）", coins
         user.coins = coins - total_price
-        session.commit()
-        final_coins = int(user.coins)
-    finally:
-        session.close()
+        return "", int(user.coins)
+
+    error, final_coins = await run_db_transaction(apply_charge)
+    if error:
+        await bot.send(event, at + " " + reply_failure("购买", error))
+        return
 
     cmd = command_template.replace("{player}", player_name)
 
@@ -1,11 +1,8 @@
 from __future__ import annotations
 
-import base64
-from pathlib import Path
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
-from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
 
@@ -13,10 +10,9 @@ from nextbot.command_config import command_control, raise_command_usage
 from nextbot.message_parser import parse_command_args_with_fallback
 from nextbot.permissions import require_permission
 from nextbot.plugins.tutorial_data import get_tutorial, list_tutorials
-from nextbot.render_utils import resolve_render_theme
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
 from nextbot.text_utils import EMOJI_GUIDE, reply_failure, reply_list
-from nextbot.time_utils import beijing_filename_timestamp
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
+from server.screenshot import ScreenshotOptions
 from server.web_server import create_tutorial_page
 
 tutorial_matcher = on_command("使用教程")
@@ -28,12 +24,6 @@ TUTORIAL_SCREENSHOT_OPTIONS = ScreenshotOptions(
 )
 
 
-def _to_base64_image_uri(path: Path) -> str:
-    raw = path.read_bytes()
-    encoded = base64.b64encode(raw).decode("ascii")
-    return f"base64://{encoded}"
-
-
 @tutorial_matcher.handle()
 @command_control(
     command_key="system.tutorial",
@@ -89,34 +79,22 @@ async def handle_tutorial(bot: Bot, event: Event, arg: Message = CommandArg()) -
 
     user_id = event.get_user_id()
 
-    page_url = create_tutorial_page(
+    render_page = create_tutorial_page(
         tutorial=target,
         self_user_id=user_id,
         theme=resolve_render_theme(),
     )
     logger.info(
-        f"使用教程渲染地址：slug={target.get('slug')} user_id={user_id} internal_url={page_url}"
+        f"使用教程渲染：slug={target.get('slug')} user_id={user_id}"
     )
 
-    screenshot_path = Path("/tmp") / f"tutorial-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(
-            page_url, screenshot_path, options=TUTORIAL_SCREENSHOT_OPTIONS,
-        )
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("生成", str(exc)))
-        return
-
-    logger.info(
-        f"使用教程截图成功：slug={target.get('slug')} file={screenshot_path}"
-    )
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("生成", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=TUTORIAL_SCREENSHOT_OPTIONS,
+        file_prefix="tutorial",
+        failure_action="生成",
+    ):
         return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info(f"使用教程截图成功：slug={target.get('slug')}")
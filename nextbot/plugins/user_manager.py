@@ -1,33 +1,33 @@
-import base64
 import re
-from pathlib import Path
 
 from nonebot import on_command
 from nonebot.adapters import Bot, Event, Message
 from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
-from nextbot.command_config import command_control, raise_command_usage
+from sqlalchemy.orm import Query, Session
+from nextbot.command_config import command_control, get_current_user, raise_command_usage
 from nextbot.message_parser import (
     parse_command_args_with_fallback,
     resolve_user_id_arg_with_fallback,
 )
 from nextbot.permissions import require_permission
-from nextbot.render_utils import resolve_render_theme
-from nextbot.time_utils import beijing_filename_timestamp, format_beijing_datetime
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
+from nextbot.time_utils import format_beijing_datetime
+from server.screenshot import ScreenshotOptions
 from server.web_server import create_user_info_page
 
-from sqlalchemy import func
-
-from nextbot.db import Server, User, UserSignRecord, get_session
+from nextbot.db import Server, User, UserSignRecord, db_session, get_session, run_db
 from nextbot.tshock_api import (
     TShockRequestError,
+    fan_out,
     get_error_reason,
+    get_request_error_reason,
     is_success,
     request_server_api,
 )
 from nextbot.text_utils import EMOJI_USER, reply_block, reply_failure, reply_success
+from nextbot.user_cache import is_same_user_name, is_user_name_taken
 
 
 USER_INFO_SCREENSHOT_OPTIONS = ScreenshotOptions(
@@ -60,57 +60,37 @@ def _validate_user_name(name: str) -> str | None:
 async def _sync_whitelist_to_all_servers(
     user_id: str, name: str
 ) -> list[tuple[Server, bool, str]]:
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
-    results: list[tuple[Server, bool, str]] = []
-    for server in servers:
+    async def sync_one(server: Server) -> tuple[bool, str]:
         # 先查询白名单，判断用户名是否已存在
-        try:
-            wl_response = await request_server_api(server, "/nextbot/whitelist")
-        except TShockRequestError:
-            logger.info(
-                f"白名单同步失败：server_id={server.id} user_id={user_id} name={name} reason=无法连接服务器"
-            )
-            results.append((server, False, "无法连接服务器"))
-            continue
-
+        wl_response = await request_server_api(server, "/nextbot/whitelist")
         if not is_success(wl_response):
             reason = get_error_reason(wl_response)
             logger.info(
                 f"白名单查询失败：server_id={server.id} user_id={user_id} name={name} "
                 f"http_status={wl_response.http_status} api_status={wl_response.api_status} reason={reason}"
             )
-            results.append((server, False, reason))
-            continue
+            return False, reason
 
         existing_users = wl_response.payload.get("users", [])
         if name in existing_users:
             logger.info(
                 f"白名单已存在：server_id={server.id} user_id={user_id} name={name}"
             )
-            results.append((server, True, "already"))
-            continue
+            return True, "already"
 
         # 添加白名单
-        try:
-            response = await request_server_api(
-                server,
-                f"/nextbot/whitelist/add/{name}",
-            )
-        except TShockRequestError:
-            logger.info(
-                f"白名单同步失败：server_id={server.id} user_id={user_id} name={name} reason=无法连接服务器"
-            )
-            results.append((server, False, "无法连接服务器"))
-            continue
-
+        response = await request_server_api(
+            server,
+            f"/nextbot/whitelist/add/{name}",
+        )
         if is_success(response):
-            results.append((server, True, ""))
-            continue
+            return True, ""
 
         reason = get_error_reason(response)
         logger.info(
@@ -118,7 +98,20 @@ async def _sync_whitelist_to_all_servers(
             f"server_id={server.id} user_id={user_id} name={name} "
             f"http_status={response.http_status} api_status={response.api_status} reason={reason}"
         )
-        results.append((server, False, reason))
+        return False, reason
+
+    results: list[tuple[Server, bool, str]] = []
+    for result in await fan_out(servers, sync_one, calls_per_server=2):
+        server = result.server
+        if result.value is None:
+            reason = get_request_error_reason(result.error)
+            logger.info(
+                f"白名单同步失败：server_id={server.id} user_id={user_id} name={name} reason={reason}"
+            )
+            results.append((server, False, reason))
+            continue
+        ok, reason = result.value
+        results.append((server, ok, reason))
     return results
 
 
@@ -147,24 +140,23 @@ async def handle_add_whitelist(
         await bot.send(event, at + " " + reply_failure("注册", f"{invalid_reason}"))
         return
 
-    session = get_session()
+    session = db_session()
     try:
-        exists = session.query(User).filter(User.user_id == user_id).first()
+        exists = await session.first(session.query(User).filter(User.user_id == user_id))
         if exists is not None:
             logger.info(f"账号已注册：user_id={user_id} name={exists.name}")
             await bot.send(event, at + " " + reply_failure("注册", "该账号已注册"))
             return
-        name_exists = session.query(User).filter(func.lower(User.name) == name.lower()).first()
-        if name_exists is not None:
+        if await is_user_name_taken(name):
             logger.info(f"用户名称已存在：name={name}")
             await bot.send(event, at + " " + reply_failure("注册", "用户名称已被占用"))
             return
 
         user = User(user_id=user_id, name=name, group="default")
         session.add(user)
-        session.commit()
+        await session.commit()
     finally:
-        session.close()
+        await session.close()
 
     await _sync_whitelist_to_all_servers(user_id, name)
 
@@ -200,12 +192,7 @@ async def handle_sync_whitelist(
 
     user_id = event.get_user_id()
     at = OBV11MessageSegment.at(int(user_id))
-    session = get_session()
-    try:
-        user = session.query(User).filter(User.user_id == user_id).first()
-    finally:
-        session.close()
-
+    user = get_current_user()
     if user is None:
         await bot.send(event, at + " " + reply_failure("同步", "未注册账号"))
         return
@@ -230,25 +217,28 @@ async def handle_sync_whitelist(
     await bot.send(event, at + "\n" + reply_success("同步白名单") + "\n" + "\n".join(lines))
 
 
+def _sign_dates_query(session: Session, user_id: str, days: int) -> Query:
+    return (
+        session.query(UserSignRecord)
+        .filter(UserSignRecord.user_id == user_id)
+        .order_by(UserSignRecord.sign_date.desc())
+        .limit(days)
+    )
+
+
 def _get_sign_dates(user_id: str, days: int) -> list[str]:
     session = get_session()
     try:
-        records = (
-            session.query(UserSignRecord)
-            .filter(UserSignRecord.user_id == user_id)
-            .order_by(UserSignRecord.sign_date.desc())
-            .limit(days)
-            .all()
-        )
+        records = _sign_dates_query(session, user_id, days).all()
         return [r.sign_date for r in records]
     finally:
         session.close()
 
 
 async def _render_and_send_user_info(bot: Bot, event: Event, user: User, days: int) -> None:
-    sign_dates = _get_sign_dates(user.user_id, days)
+    sign_dates = await run_db(_get_sign_dates, user.user_id, days)
     created_at = format_beijing_datetime(user.created_at)
-    page_url = create_user_info_page(
+    render_page = create_user_info_page(
         user_id=user.user_id,
         user_name=user.name,
         coins=int(user.coins or 0),
@@ -262,27 +252,19 @@ async def _render_and_send_user_info(bot: Bot, event: Event, user: User, days: i
         theme=resolve_render_theme(),
     )
     logger.info(
-        f"用户信息渲染地址：user_id={user.user_id} name={user.name} "
-        f"days={days} sign_dates_count={len(sign_dates)} internal_url={page_url}"
+        f"用户信息渲染：user_id={user.user_id} name={user.name} "
+        f"days={days} sign_dates_count={len(sign_dates)}"
     )
-    screenshot_path = Path("/tmp") / f"user-info-{user.user_id}-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(page_url, screenshot_path, options=USER_INFO_SCREENSHOT_OPTIONS)
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", f"{exc}"))
-        return
-
-    logger.info(f"用户信息截图成功：user_id={user.user_id} file={screenshot_path}")
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            raw = screenshot_path.read_bytes()
-            image_uri = f"base64://{base64.b64encode(raw).decode('ascii')}"
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=USER_INFO_SCREENSHOT_OPTIONS,
+        file_prefix=f"user-info-{user.user_id}",
+        failure_action="查询",
+    ):
         return
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info(f"用户信息截图成功：user_id={user.user_id}")
 
 
 @info_matcher.handle()
@@ -302,7 +284,7 @@ async def handle_user_info(
     if len(args) != 1:
         raise_command_usage()
 
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event,
         arg,
         "用户信息",
@@ -319,11 +301,11 @@ async def handle_user_info(
         await bot.send(event, reply_failure("查询", "用户参数解析失败"))
         return
 
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == target_user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == target_user_id))
     finally:
-        session.close()
+        await session.close()
 
     if user is None:
         await bot.send(event, reply_failure("查询", "用户不存在"))
@@ -350,11 +332,11 @@ async def handle_self_info(
         raise_command_usage()
 
     user_id = event.get_user_id()
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == user_id))
     finally:
-        session.close()
+        await session.close()
 
     if user is None:
         await bot.send(event, reply_failure("查询", "未注册账号"))
@@ -376,7 +358,7 @@ async def handle_self_info(
 async def handle_rename(bot: Bot, event: Event, arg: Message = CommandArg()) -> None:
     at = OBV11MessageSegment.at(int(event.get_user_id()))
 
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event, arg, "更改用户名称", arg_index=0,
     )
     if parse_error == "missing":
@@ -400,40 +382,36 @@ async def handle_rename(bot: Bot, event: Event, arg: Message = CommandArg()) ->
         await bot.send(event, at + " " + reply_failure("更改", f"{invalid_reason}"))
         return
 
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == target_user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == target_user_id))
         if user is None:
             await bot.send(event, at + " " + reply_failure("更改", "未找到该用户"))
             return
 
         old_name = str(user.name)
-        if old_name.lower() == new_name.lower():
+        if is_same_user_name(old_name, new_name):
             await bot.send(event, at + " " + reply_failure("更改", "新用户名与当前相同"))
             return
 
-        name_exists = session.query(User).filter(
-            func.lower(User.name) == new_name.lower(),
-            User.user_id != target_user_id,
-        ).first()
-        if name_exists is not None:
+        if await is_user_name_taken(new_name, exclude_user_id=target_user_id):
             await bot.send(event, at + " " + reply_failure("更改", "用户名称已被占用"))
             return
 
         user.name = new_name
-        session.commit()
+        await session.commit()
     finally:
-        session.close()
+        await session.close()
 
     logger.info(
         f"更改用户名称成功：user_id={target_user_id} old_name={old_name} new_name={new_name}"
     )
 
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
     lines: list[str] = [
         reply_success("更改"),
@@ -445,7 +423,8 @@ async def handle_rename(bot: Bot, event: Event, arg: Message = CommandArg()) ->
         lines.append("🖥️ 同步服务器白名单结果：ℹ️ 暂无服务器")
     else:
         lines.append("🖥️ 同步服务器白名单结果：")
-        for server in servers:
+
+        async def rename_one(server: Server) -> tuple[bool, str, bool, str]:
             remove_ok = False
             add_ok = False
             remove_msg = ""
@@ -472,7 +451,13 @@ async def handle_rename(bot: Bot, event: Event, arg: Message = CommandArg()) ->
                     add_msg = get_error_reason(response)
             except TShockRequestError:
                 add_msg = "无法连接服务器"
+            return remove_ok, remove_msg, add_ok, add_msg
 
+        for result in await fan_out(servers, rename_one, calls_per_server=2):
+            server = result.server
+            remove_ok, remove_msg, add_ok, add_msg = result.value or (
+                False, "无法连接服务器", False, "无法连接服务器"
+            )
             if remove_ok and add_ok:
                 lines.append(f"{server.id}.{server.name}：✅ 同步成功")
             else:
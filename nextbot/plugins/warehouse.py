@@ -1,25 +1,35 @@
 from __future__ import annotations
 
-import base64
-import json
-from pathlib import Path
+from dataclasses import dataclass
 
 from nonebot import on_command
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from nonebot.adapters import Bot, Event, Message
 from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 from nonebot.params import CommandArg
 
+from nextbot import item_catalog
 from nextbot.command_config import command_control, get_current_param, raise_command_usage
-from nextbot.db import WAREHOUSE_CAPACITY, Server, User, WarehouseItem, get_session
+from nextbot.db import (
+    WAREHOUSE_CAPACITY,
+    Server,
+    User,
+    WarehouseItem,
+    db_session,
+    get_session,
+    run_db,
+    run_db_transaction,
+)
 from nextbot.message_parser import (
     parse_command_args_with_fallback,
     resolve_user_id_arg_with_fallback,
 )
 from nextbot.permissions import require_permission
 from nextbot.progression import PROGRESSION_KEY_TO_ZH, TIER_OPTIONS, parse_tier
-from nextbot.render_utils import resolve_render_theme
+from nextbot.render_utils import resolve_render_theme, send_rendered_image
+from nextbot.server_status import check_player_online
 from nextbot.text_utils import (
     EMOJI_CHART,
     EMOJI_COIN,
@@ -31,11 +41,11 @@ from nextbot.text_utils import (
     reply_failure,
     reply_success,
 )
-from nextbot.time_utils import beijing_filename_timestamp, db_now_utc_naive
+from nextbot.time_utils import db_now_utc_naive
 from nextbot.tshock_api import TShockRequestError, get_error_reason, is_success, request_server_api
 from nextbot.warehouse_lock import warehouse_lock
-from server.screenshot import RenderScreenshotError, ScreenshotOptions, screenshot_url
-from server.web_server import create_warehouse_page
+from server.screenshot import ScreenshotOptions
+from server.web_server import RenderPage, create_warehouse_page
 
 WAREHOUSE_SCREENSHOT_OPTIONS = ScreenshotOptions(
     viewport_width=1200,
@@ -44,53 +54,14 @@ WAREHOUSE_SCREENSHOT_OPTIONS = ScreenshotOptions(
 )
 
 
-def _to_base64_image_uri(path: Path) -> str:
-    raw = path.read_bytes()
-    encoded = base64.b64encode(raw).decode("ascii")
-    return f"base64://{encoded}"
-
-
-_DICTS_DIR = Path(__file__).resolve().parent.parent.parent / "server" / "assets" / "dicts"
-_item_name_map: dict[int, str] | None = None
-_prefix_name_map: dict[int, str] | None = None
-
-
-def _load_dict_file(filename: str) -> dict[int, str]:
-    path = _DICTS_DIR / filename
-    try:
-        raw = json.loads(path.read_text(encoding="utf-8"))
-    except (OSError, json.JSONDecodeError):
-        logger.warning(f"加载 dict 失败：{path}")
-        return {}
-    out: dict[int, str] = {}
-    if isinstance(raw, list):
-        for entry in raw:
-            if not isinstance(entry, dict):
-                continue
-            try:
-                eid = int(entry.get("id", 0))
-            except (TypeError, ValueError):
-                continue
-            name = str(entry.get("name", "")).strip()
-            if eid > 0 and name:
-                out[eid] = name
-    return out
-
-
 def _item_display_name(item_id: int) -> str:
-    global _item_name_map
-    if _item_name_map is None:
-        _item_name_map = _load_dict_file("item.json")
-    return _item_name_map.get(int(item_id), f"物品 ID:{item_id}")
+    return item_catalog.name(item_id) or f"物品 ID:{item_id}"
 
 
 def _prefix_display_name(prefix_id: int) -> str:
-    global _prefix_name_map
-    if _prefix_name_map is None:
-        _prefix_name_map = _load_dict_file("prefix.json")
     if int(prefix_id) <= 0:
         return ""
-    return _prefix_name_map.get(int(prefix_id), f"前缀 ID:{prefix_id}")
+    return item_catalog.prefix_name(prefix_id) or f"前缀 ID:{prefix_id}"
 
 
 def _format_item_label(item_id: int, prefix_id: int, quantity: int) -> str:
@@ -201,29 +172,19 @@ async def _send_warehouse_image(
     bot: Bot,
     event: Event,
     *,
-    page_url: str,
+    render_page: RenderPage,
     file_prefix: str,
 ) -> None:
-    screenshot_path = Path("/tmp") / f"{file_prefix}-{beijing_filename_timestamp()}.png"
-    try:
-        await screenshot_url(
-            page_url, screenshot_path, options=WAREHOUSE_SCREENSHOT_OPTIONS,
-        )
-    except RenderScreenshotError as exc:
-        await bot.send(event, reply_failure("查询", str(exc)))
-        return
-
-    logger.info(f"仓库截图成功：file={screenshot_path}")
-    if bot.adapter.get_name() == "OneBot V11":
-        try:
-            image_uri = _to_base64_image_uri(screenshot_path)
-        except OSError:
-            await bot.send(event, reply_failure("查询", "读取截图文件失败"))
-            return
-        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+    if not await send_rendered_image(
+        bot,
+        event,
+        render_page,
+        options=WAREHOUSE_SCREENSHOT_OPTIONS,
+        file_prefix=file_prefix,
+        failure_action="查询",
+    ):
         return
-
-    await bot.send(event, f"✅ 截图成功，文件：{screenshot_path}")
+    logger.info("仓库截图成功")
 
 
 list_self_matcher = on_command("我的仓库")
@@ -251,23 +212,23 @@ async def handle_list_self(bot: Bot, event: Event, arg: Message = CommandArg())
         raise_command_usage()
 
     user_id = event.get_user_id()
-    user = _load_user(user_id)
+    user = await run_db(_load_user, user_id)
     if user is None:
         at = OBV11MessageSegment.at(int(user_id))
         await bot.send(event, at + " " + reply_failure("查询", "未注册账号"))
         return
 
-    slots = _load_warehouse_slots(user_id)
-    page_url = create_warehouse_page(
+    slots = await run_db(_load_warehouse_slots, user_id)
+    render_page = create_warehouse_page(
         owner_user_id=user_id,
         owner_user_name=str(user.name),
         slots=slots,
         theme=resolve_render_theme(),
     )
     logger.info(
-        f"我的仓库渲染：user_id={user_id} used={len(slots)} internal_url={page_url}"
+        f"我的仓库渲染：user_id={user_id} used={len(slots)}"
     )
-    await _send_warehouse_image(bot, event, page_url=page_url, file_prefix="warehouse-self")
+    await _send_warehouse_image(bot, event, render_page=render_page, file_prefix="warehouse-self")
 
 
 @list_user_matcher.handle()
@@ -281,7 +242,7 @@ async def handle_list_self(bot: Bot, event: Event, arg: Message = CommandArg())
 )
 @require_permission("warehouse.list_user")
 async def handle_list_user(bot: Bot, event: Event, arg: Message = CommandArg()) -> None:
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event, arg, "用户仓库", arg_index=0,
     )
     if parse_error == "missing":
@@ -299,22 +260,22 @@ async def handle_list_user(bot: Bot, event: Event, arg: Message = CommandArg())
     if len(args) != 1:
         raise_command_usage()
 
-    user = _load_user(target_user_id)
+    user = await run_db(_load_user, target_user_id)
     if user is None:
         await bot.send(event, reply_failure("查询", "未找到该用户"))
         return
 
-    slots = _load_warehouse_slots(target_user_id)
-    page_url = create_warehouse_page(
+    slots = await run_db(_load_warehouse_slots, target_user_id)
+    render_page = create_warehouse_page(
         owner_user_id=target_user_id,
         owner_user_name=str(user.name),
         slots=slots,
         theme=resolve_render_theme(),
     )
     logger.info(
-        f"用户仓库渲染：user_id={target_user_id} used={len(slots)} internal_url={page_url}"
+        f"用户仓库渲染：user_id={target_user_id} used={len(slots)}"
     )
-    await _send_warehouse_image(bot, event, page_url=page_url, file_prefix="warehouse-user")
+    await _send_warehouse_image(bot, event, render_page=render_page, file_prefix="warehouse-user")
 
 
 @add_matcher.handle()
@@ -330,7 +291,7 @@ async def handle_list_user(bot: Bot, event: Event, arg: Message = CommandArg())
 async def handle_add(bot: Bot, event: Event, arg: Message = CommandArg()) -> None:
     at = OBV11MessageSegment.at(int(event.get_user_id()))
 
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event, arg, "添加仓库物品", arg_index=0,
     )
     if parse_error == "missing":
@@ -395,17 +356,17 @@ async def handle_add(bot: Bot, event: Event, arg: Message = CommandArg()) -> Non
         await bot.send(event, at + " " + reply_failure("添加", "价值必须为非负整数"))
         return
 
-    user = _load_user(target_user_id)
+    user = await run_db(_load_user, target_user_id)
     if user is None:
         await bot.send(event, at + " " + reply_failure("添加", "未找到该用户"))
         return
 
     async with warehouse_lock(target_user_id):
-        session = get_session()
+        session = db_session()
         try:
             occupied = {
-                int(s) for (s,) in session.query(WarehouseItem.slot_index)
-                .filter(WarehouseItem.user_id == target_user_id).all()
+                int(s) for (s,) in await session.all(session.query(WarehouseItem.slot_index)
+                .filter(WarehouseItem.user_id == target_user_id))
             }
             free_slot = next(
                 (i for i in range(1, WAREHOUSE_CAPACITY + 1) if i not in occupied),
@@ -438,13 +399,13 @@ async def handle_add(bot: Bot, event: Event, arg: Message = CommandArg()) -> Non
                 )
             )
             try:
-                session.commit()
+                await session.commit()
             except IntegrityError:
                 # Defensive: with the per-user lock above, two concurrent adds
                 # for the same user can't both pick the same slot. This guard
                 # only triggers if some other path (e.g. WebUI bypassing the
                 # lock) inserts in the meantime — surface a friendly error.
-                session.rollback()
+                await session.rollback()
                 logger.warning(
                     f"添加仓库物品冲突：target={target_user_id} slot={free_slot}"
                 )
@@ -457,7 +418,7 @@ async def handle_add(bot: Bot, event: Event, arg: Message = CommandArg()) -> Non
                 return
             used_after = len(occupied) + 1
         finally:
-            session.close()
+            await session.close()
 
     logger.info(
         f"添加仓库物品成功：target={target_user_id} slot={free_slot} item={item_id} "
@@ -494,7 +455,7 @@ async def handle_add(bot: Bot, event: Event, arg: Message = CommandArg()) -> Non
 async def handle_remove(bot: Bot, event: Event, arg: Message = CommandArg()) -> None:
     at = OBV11MessageSegment.at(int(event.get_user_id()))
 
-    target_user_id, parse_error = resolve_user_id_arg_with_fallback(
+    target_user_id, parse_error = await resolve_user_id_arg_with_fallback(
         event, arg, "删除仓库物品", arg_index=0,
     )
     if parse_error == "missing":
@@ -532,7 +493,7 @@ async def handle_remove(bot: Bot, event: Event, arg: Message = CommandArg()) ->
             await bot.send(event, at + " " + reply_failure("删除", "数量必须为正整数"))
             return
 
-    target_user = _load_user(target_user_id)
+    target_user = await run_db(_load_user, target_user_id)
     target_name = str(target_user.name) if target_user is not None else "未知用户"
 
     async with warehouse_lock(target_user_id):
@@ -546,15 +507,14 @@ async def _remove_single(
     bot: Bot, event: Event, at: object,
     target_user_id: str, target_name: str, slot_index: int, quantity_arg: int | None,
 ) -> None:
-    session = get_session()
+    session = db_session()
     try:
-        item = (
+        item = await session.first(
             session.query(WarehouseItem)
             .filter(
                 WarehouseItem.user_id == target_user_id,
                 WarehouseItem.slot_index == slot_index,
             )
-            .first()
         )
         if item is None:
             await bot.send(event, at + " " + reply_failure("删除", "该格子为空"))
@@ -578,14 +538,13 @@ async def _remove_single(
         else:
             item.quantity = current_qty - remove_qty
             remaining = int(item.quantity)
-        session.commit()
-        used_after = (
+        await session.commit()
+        used_after = await session.count(
             session.query(WarehouseItem)
             .filter(WarehouseItem.user_id == target_user_id)
-            .count()
         )
     finally:
-        session.close()
+        await session.close()
 
     logger.info(
         f"删除仓库物品成功：target={target_user_id} slot={slot_index} "
@@ -612,15 +571,14 @@ async def _remove_many(
     bot: Bot, event: Event, at: object,
     target_user_id: str, target_name: str, slot_indexes: list[int],
 ) -> None:
-    session = get_session()
+    session = db_session()
     try:
-        items = (
+        items = await session.all(
             session.query(WarehouseItem)
             .filter(
                 WarehouseItem.user_id == target_user_id,
                 WarehouseItem.slot_index.in_(slot_indexes),
             )
-            .all()
         )
         item_map = {int(it.slot_index): it for it in items}
         total_qty = 0
@@ -636,14 +594,13 @@ async def _remove_many(
         if processed == 0:
             await bot.send(event, at + " " + reply_failure("删除", "未找到任何可删除的格子"))
             return
-        session.commit()
-        used_after = (
+        await session.commit()
+        used_after = await session.count(
             session.query(WarehouseItem)
             .filter(WarehouseItem.user_id == target_user_id)
-            .count()
         )
     finally:
-        session.close()
+        await session.close()
 
     logger.info(
         f"批量删除仓库物品：target={target_user_id} processed={processed} "
@@ -704,7 +661,7 @@ async def handle_drop(bot: Bot, event: Event, arg: Message = CommandArg()) -> No
             await bot.send(event, at + " " + reply_failure("丢弃", "数量必须为正整数"))
             return
 
-    user = _load_user(user_id)
+    user = await run_db(_load_user, user_id)
     if user is None:
         await bot.send(event, at + " " + reply_failure("丢弃", "未注册账号"))
         return
@@ -720,15 +677,14 @@ async def _drop_single(
     bot: Bot, event: Event, at: object,
     user_id: str, slot_index: int, quantity_arg: int | None,
 ) -> None:
-    session = get_session()
+    session = db_session()
     try:
-        item = (
+        item = await session.first(
             session.query(WarehouseItem)
             .filter(
                 WarehouseItem.user_id == user_id,
                 WarehouseItem.slot_index == slot_index,
             )
-            .first()
         )
         if item is None:
             await bot.send(event, at + " " + reply_failure("丢弃", "该格子为空"))
@@ -752,14 +708,13 @@ async def _drop_single(
         else:
             item.quantity = current_qty - drop_qty
             remaining = int(item.quantity)
-        session.commit()
-        used_after = (
+        await session.commit()
+        used_after = await session.count(
             session.query(WarehouseItem)
             .filter(WarehouseItem.user_id == user_id)
-            .count()
         )
     finally:
-        session.close()
+        await session.close()
 
     logger.info(
         f"丢弃仓库物品成功：user_id={user_id} slot={slot_index} "
@@ -785,15 +740,14 @@ async def _drop_many(
     bot: Bot, event: Event, at: object,
     user_id: str, slot_indexes: list[int],
 ) -> None:
-    session = get_session()
+    session = db_session()
     try:
-        items = (
+        items = await session.all(
             session.query(WarehouseItem)
             .filter(
                 WarehouseItem.user_id == user_id,
                 WarehouseItem.slot_index.in_(slot_indexes),
             )
-            .all()
         )
         item_map = {int(it.slot_index): it for it in items}
         total_qty = 0
@@ -809,14 +763,13 @@ async def _drop_many(
         if processed == 0:
             await bot.send(event, at + " " + reply_failure("丢弃", "未找到任何可丢弃的格子"))
             return
-        session.commit()
-        used_after = (
+        await session.commit()
+        used_after = await session.count(
             session.query(WarehouseItem)
             .filter(WarehouseItem.user_id == user_id)
-            .count()
         )
     finally:
-        session.close()
+        await session.close()
 
     logger.info(
         f"批量丢弃仓库物品：user_id={user_id} processed={processed} "
@@ -886,7 +839,7 @@ async def handle_recycle(bot: Bot, event: Event, arg: Message = CommandArg()) ->
             await bot.send(event, at + " " + reply_failure("回收", "数量必须为正整数"))
             return
 
-    if _load_user(user_id) is None:
+    if await run_db(_load_user, user_id) is None:
         await bot.send(event, at + " " + reply_failure("回收", "未注册账号"))
         return
 
@@ -899,12 +852,26 @@ async def handle_recycle(bot: Bot, event: Event, arg: Message = CommandArg()) ->
             await _recycle_many(bot, event, at, user_id, slot_indexes, ratio)
 
 
+@dataclass(frozen=True)
+class RecycleOutcome:
+    error: str = ""
+    item_id: int = 0
+    prefix_id: int = 0
+    unit_value: int = 0
+    quantity: int = 0
+    remaining: int = 0
+    refund: int = 0
+    coins_after: int = 0
+    used_after: int = 0
+    skipped_empty: int = 0
+    skipped_no_value: int = 0
+
+
 async def _recycle_single(
     bot: Bot, event: Event, at: object,
     user_id: str, slot_index: int, quantity_arg: int | None, ratio: float,
 ) -> None:
-    session = get_session()
-    try:
+    def apply_recycle(session: Session) -> RecycleOutcome:
         user = session.query(User).filter(User.user_id == user_id).first()
         item = (
             session.query(WarehouseItem)
@@ -915,20 +882,14 @@ async def _recycle_single(
             .first()
         )
         if item is None:
-            await bot.send(event, at + " " + reply_failure("回收", "该格子为空"))
-            return
+            return RecycleOutcome(error="该格子为空")
 
         current_qty = int(item.quantity)
         unit_value = int(item.value or 0)
         if unit_value <= 0:
-            await bot.send(event, at + " " + reply_failure("回收", "物品无价值，不可回收"))
-            return
+            return RecycleOutcome(error="物品无价值，不可回收")
         if quantity_arg is not None and quantity_arg > current_qty:
-            await bot.send(
-                event,
-                at + " " + reply_failure("回收", f"数量超过该格当前数量（{current_qty}）"),
-            )
-            return
+            return RecycleOutcome(error=f"数量超过该格当前数量（{current_qty}）")
 
         recycle_qty = quantity_arg if quantity_arg is not None else current_qty
         refund = int(unit_value * recycle_qty * ratio)
@@ -942,15 +903,35 @@ async def _recycle_single(
             item.quantity = current_qty - recycle_qty
             remaining = int(item.quantity)
         user.coins = int(user.coins or 0) + refund
-        coins_after = int(user.coins)
-        session.commit()
+        session.flush()
         used_after = (
             session.query(WarehouseItem)
             .filter(WarehouseItem.user_id == user_id)
             .count()
         )
-    finally:
-        session.close()
+        return RecycleOutcome(
+            item_id=item_id,
+            prefix_id=prefix_id,
+            unit_value=unit_value,
+            quantity=recycle_qty,
+            remaining=remaining,
+            refund=refund,
+            coins_after=int(user.coins),
+            used_after=used_after,
+        )
+
+    outcome = await run_db_transaction(apply_recycle)
+    if outcome.error:
+        await bot.send(event, at + " " + reply_failure("回收", outcome.error))
+        return
+    item_id = outcome.item_id
+    prefix_id = outcome.prefix_id
+    unit_value = outcome.unit_value
+    recycle_qty = outcome.quantity
+    remaining = outcome.remaining
+    refund = outcome.refund
+    coins_after = outcome.coins_after
+    used_after = outcome.used_after
 
     logger.info(
         f"回收仓库物品成功：user_id={user_id} slot={slot_index} "
@@ -981,8 +962,7 @@ async def _recycle_many(
     bot: Bot, event: Event, at: object,
     user_id: str, slot_indexes: list[int], ratio: float,
 ) -> None:
-    session = get_session()
-    try:
+    def apply_recycle(session: Session) -> RecycleOutcome:
         user = session.query(User).filter(User.user_id == user_id).first()
         items = (
             session.query(WarehouseItem)
@@ -1010,18 +990,33 @@ async def _recycle_many(
             session.delete(it)
             processed += 1
         if processed == 0:
-            await bot.send(event, at + " " + reply_failure("回收", "未找到任何可回收的格子"))
-            return
+            return RecycleOutcome(error="未找到任何可回收的格子")
         user.coins = int(user.coins or 0) + total_refund
-        coins_after = int(user.coins)
-        session.commit()
+        session.flush()
         used_after = (
             session.query(WarehouseItem)
             .filter(WarehouseItem.user_id == user_id)
             .count()
         )
-    finally:
-        session.close()
+        return RecycleOutcome(
+            quantity=processed,
+            refund=total_refund,
+            coins_after=int(user.coins),
+            used_after=used_after,
+            skipped_empty=skipped_empty,
+            skipped_no_value=skipped_no_value,
+        )
+
+    outcome = await run_db_transaction(apply_recycle)
+    if outcome.error:
+        await bot.send(event, at + " " + reply_failure("回收", outcome.error))
+        return
+    processed = outcome.quantity
+    total_refund = outcome.refund
+    coins_after = outcome.coins_after
+    used_after = outcome.used_after
+    skipped_empty = outcome.skipped_empty
+    skipped_no_value = outcome.skipped_no_value
 
     logger.info(
         f"批量回收仓库物品：user_id={user_id} processed={processed} "
@@ -1064,26 +1059,7 @@ async def _check_player_online(
     server: Server, player_name: str,
 ) -> tuple[bool | None, str]:
     """返回 (在线?, 错误原因)。None 表示查询失败；True/False 表示在线状态。"""
-    try:
-        resp = await request_server_api(
-            server, "/v2/server/status", params={"players": "true"},
-        )
-    except TShockRequestError:
-        return None, "无法连接服务器"
-    if not is_success(resp):
-        return None, get_error_reason(resp)
-    players = resp.payload.get("players")
-    if not isinstance(players, list):
-        return None, "返回数据格式错误"
-    name_lower = player_name.lower()
-    for p in players:
-        if isinstance(p, dict):
-            nickname = str(p.get("nickname", "")).strip()
-        else:
-            nickname = str(p).strip()
-        if nickname.lower() == name_lower:
-            return True, ""
-    return False, ""
+    return await check_player_online(server, player_name)
 
 
 async def _load_world_progress(
@@ -1166,12 +1142,12 @@ async def handle_claim(bot: Bot, event: Event, arg: Message = CommandArg()) -> N
             await bot.send(event, at + " " + reply_failure("领取", "数量必须为正整数"))
             return
 
-    user = _load_user(user_id)
+    user = await run_db(_load_user, user_id)
     if user is None:
         await bot.send(event, at + " " + reply_failure("领取", "未注册账号"))
         return
 
-    server = _load_server(server_id)
+    server = await run_db(_load_server, server_id)
     if server is None:
         await bot.send(event, at + " " + reply_failure("领取", "服务器不存在"))
         return
@@ -1211,15 +1187,14 @@ async def _claim_single(
     slot_index: int, quantity_arg: int | None,
     progress: dict[str, bool],
 ) -> None:
-    session = get_session()
+    session = db_session()
     try:
-        item = (
+        item = await session.first(
             session.query(WarehouseItem)
             .filter(
                 WarehouseItem.user_id == user_id,
                 WarehouseItem.slot_index == slot_index,
             )
-            .first()
         )
         if item is None:
             await bot.send(event, at + " " + reply_failure("领取", "该格子为空"))
@@ -1264,14 +1239,13 @@ async def _claim_single(
         else:
             item.quantity = current_qty - claim_qty
             remaining = int(item.quantity)
-        session.commit()
-        used_after = (
+        await session.commit()
+        used_after = await session.count(
             session.query(WarehouseItem)
             .filter(WarehouseItem.user_id == user_id)
-            .count()
         )
     finally:
-        session.close()
+        await session.close()
 
     logger.info(
         f"领取仓库物品成功：user_id={user_id} server_id={server.id} slot={slot_index} "
@@ -1302,15 +1276,14 @@ async def _claim_many(
     slot_indexes: list[int],
     progress: dict[str, bool],
 ) -> None:
-    session = get_session()
+    session = db_session()
     try:
-        items = (
+        items = await session.all(
             session.query(WarehouseItem)
             .filter(
                 WarehouseItem.user_id == user_id,
                 WarehouseItem.slot_index.in_(slot_indexes),
             )
-            .all()
         )
         item_map = {int(it.slot_index): it for it in items}
 
@@ -1342,7 +1315,7 @@ async def _claim_many(
                 skipped_give_failed += 1
                 continue
             session.delete(it)
-            session.commit()
+            await session.commit()
             total_qty += slot_qty
             processed += 1
 
@@ -1350,13 +1323,12 @@ async def _claim_many(
             await bot.send(event, at + " " + reply_failure("领取", "未找到任何可领取的格子"))
             return
 
-        used_after = (
+        used_after = await session.count(
             session.query(WarehouseItem)
             .filter(WarehouseItem.user_id == user_id)
-            .count()
         )
     finally:
-        session.close()
+        await session.close()
 
     logger.info(
         f"批量领取仓库物品：user_id={user_id} server_id={server.id} "
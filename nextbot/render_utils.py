@@ -1,8 +1,33 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
 from nonebot import get_driver
+from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
+from nonebot.log import logger
+
+from nextbot.text_utils import reply_failure
+from nextbot.time_utils import beijing_filename_timestamp, beijing_now
+from server.screenshot import (
+    RenderScreenshotError,
+    ScreenshotOptions,
+    screenshot_html,
+    screenshot_url,
+)
 
-from nextbot.time_utils import beijing_now
+if TYPE_CHECKING:
+    from server.web_server import RenderPage
+
+_FALLBACK_RENDER_DIR = Path(tempfile.gettempdir()) / "nextbot-render"
+_DEFAULT_RETENTION_HOURS = 24.0
+_CLEANUP_INTERVAL_SECONDS = 600.0
+_last_cleanup_at: dict[Path, float] = {}
 
 
 def resolve_render_theme() -> str:
@@ -13,3 +38,126 @@ def resolve_render_theme() -> str:
     if theme == "auto":
         return "light" if 6 <= beijing_now().hour < 20 else "dark"
     return theme if theme in {"dark", "light"} else "dark"
+
+
+def _use_direct_render() -> bool:
+    """render_mode=direct（默认）时浏览器直接加载 HTML。
+
+    render_mode=http 时经由本地 Web Server 的 /render 路由。
+    """
+    mode = str(getattr(get_driver().config, "render_mode", "direct")).strip().lower()
+    return mode != "http"
+
+
+async def _screenshot_page(page: RenderPage | str, options: ScreenshotOptions) -> bytes:
+    if isinstance(page, str):
+        return await screenshot_url(page, options=options)
+    if not _use_direct_render():
+        return await screenshot_url(page.publish(), options=options)
+    try:
+        html = await asyncio.to_thread(page.render_html)
+    except OSError as exc:
+        raise RenderScreenshotError("读取页面模板失败") from exc
+    return await screenshot_html(html, options=options)
+
+
+def _get_render_debug_dir() -> Path | None:
+    raw_value = str(getattr(get_driver().config, "render_debug_dir", "") or "").strip()
+    return Path(raw_value) if raw_value else None
+
+
+def _get_retention_seconds() -> float:
+    raw_value = getattr(
+        get_driver().config, "render_debug_retention_hours", _DEFAULT_RETENTION_HOURS
+    )
+    try:
+        return max(0.0, float(raw_value)) * 3600
+    except (TypeError, ValueError):
+        return _DEFAULT_RETENTION_HOURS * 3600
+
+
+def _is_expired(path: Path, now: float, retention_seconds: float) -> bool:
+    try:
+        return now - path.stat().st_mtime > retention_seconds
+    except OSError:
+        return False
+
+
+def _cleanup_expired(directory: Path, retention_seconds: float) -> None:
+    now = time.time()
+    last_cleanup = _last_cleanup_at.get(directory, 0.0)
+    if now - last_cleanup < _CLEANUP_INTERVAL_SECONDS:
+        return
+    _last_cleanup_at[directory] = now
+    expired = [
+        path
+        for path in directory.glob("*.png")
+        if _is_expired(path, now, retention_seconds)
+    ]
+    removed = 0
+    for path in expired:
+        with suppress(OSError):
+            path.unlink()
+            removed += 1
+    if removed:
+        logger.info(f"已清理过期截图：dir={directory} count={removed}")
+
+
+def _save_image(directory: Path, file_prefix: str, image: bytes) -> Path:
+    """写入截图文件并顺带清理过期文件，在线程中执行。"""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{file_prefix}-{beijing_filename_timestamp()}.png"
+    path.write_bytes(image)
+    _cleanup_expired(directory, _get_retention_seconds())
+    return path
+
+
+def _to_base64_image_uri(image: bytes) -> str:
+    return f"base64://{base64.b64encode(image).decode('ascii')}"
+
+
+async def send_rendered_image(  # noqa: PLR0913
+    bot: Any,
+    event: Any,
+    page: RenderPage | str,
+    *,
+    options: ScreenshotOptions,
+    file_prefix: str,
+    failure_action: str = "查询",
+    failure_prefix: Any = "",
+) -> bool:
+    """截图渲染页并发送图片，失败时回复错误信息，返回是否发送成功。
+
+    page 为 create_*_page 返回的 RenderPage，也可以直接传入页面地址。
+    截图全程在内存中完成；配置了 render_debug_dir 时额外保存一份 PNG 便于排查。
+    非 OneBot V11 适配器无法发送图片，退回为发送文件路径。
+    """
+    try:
+        image = await _screenshot_page(page, options)
+    except RenderScreenshotError as exc:
+        await bot.send(event, failure_prefix + reply_failure(failure_action, f"{exc}"))
+        return False
+
+    debug_dir = _get_render_debug_dir()
+    if bot.adapter.get_name() == "OneBot V11":
+        if debug_dir is not None:
+            try:
+                await asyncio.to_thread(_save_image, debug_dir, file_prefix, image)
+            except OSError as exc:
+                logger.warning(f"保存调试截图失败：dir={debug_dir} reason={exc}")
+        # 大图的 base64 编码耗时可达数十毫秒，放到线程中避免阻塞事件循环
+        image_uri = await asyncio.to_thread(_to_base64_image_uri, image)
+        await bot.send(event, OBV11MessageSegment.image(file=image_uri))
+        return True
+
+    try:
+        path = await asyncio.to_thread(
+            _save_image, debug_dir or _FALLBACK_RENDER_DIR, file_prefix, image
+        )
+    except OSError:
+        await bot.send(
+            event, failure_prefix + reply_failure(failure_action, "保存截图文件失败")
+        )
+        return False
+    await bot.send(event, f"✅ 截图成功，文件：{path}")
+    return True
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from nonebot import get_driver
+from nonebot.log import logger
+
+from nextbot.db import Server, db_session
+from nextbot.tshock_api import (
+    TShockRequestError,
+    fan_out,
+    get_error_reason,
+    get_request_error_reason,
+    is_success,
+    request_server_api,
+)
+
+DEFAULT_POLL_INTERVAL_SECONDS = 10.0
+DEFAULT_MAX_AGE_SECONDS = 20.0
+# 轮询失败后按间隔翻倍退避，最长间隔
+_MAX_POLL_BACKOFF_SECONDS = 300.0
+# 每台服务器的下次轮询时间加上最多 20% 间隔的随机抖动，避免所有请求挤在同一时刻
+_POLL_JITTER_RATIO = 0.2
+
+
+@dataclass(frozen=True)
+class ServerStatus:
+    server_id: int
+    address: str
+    ok: bool
+    error: str = ""
+    players: tuple[str, ...] = ()
+    playercount: int = 0
+    maxplayers: int = 0
+    fetched_at: float = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def has_player(self, player_name: str) -> bool:
+        name_lower = player_name.lower()
+        return any(nickname.lower() == name_lower for nickname in self.players)
+
+
+@dataclass
+class _ServerPresence:
+    # 小写玩家名 -> (是否在线, 状态变化时间)；上下线事件与 /v2/server/status 共同维护
+    players: dict[str, tuple[bool, float]]
+    # 最近一次与 /v2/server/status 对账的时间，超过 max_age 后不再信任
+    reconciled_at: float
+
+
+# 服务器 ID -> 最近一次状态；ID 会随删除服务器前移，读取时用地址校验
+_snapshot: dict[int, ServerStatus] = {}
+# 服务器地址 -> 在线玩家索引
+_presence: dict[str, _ServerPresence] = {}
+_snapshot_lock = threading.Lock()
+_poller_task: asyncio.Task | None = None
+
+
+def _read_float_config(name: str, default: float) -> float:
+    try:
+        raw_value = getattr(get_driver().config, name, default)
+    except ValueError:
+        return default
+    try:
+        value = float(raw_value)
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+def get_poll_interval_seconds() -> float:
+    return _read_float_config(
+        "server_status_poll_interval_seconds", DEFAULT_POLL_INTERVAL_SECONDS
+    )
+
+
+def get_max_age_seconds() -> float:
+    return _read_float_config(
+        "server_status_max_age_seconds", DEFAULT_MAX_AGE_SECONDS
+    )
+
+
+def _address(server: Server) -> str:
+    return f"{server.ip}:{server.restapi_port}"
+
+
+def _parse_count(value: Any, default: int) -> int:
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_status(server: Server, payload: dict[str, Any]) -> ServerStatus:
+    players = payload.get("players")
+    if not isinstance(players, list):
+        return _failed_status(server, "返回数据格式错误")
+
+    nicknames: list[str] = []
+    for player in players:
+        if isinstance(player, dict):
+            nickname = str(player.get("nickname", "")).strip()
+            if nickname:
+                nicknames.append(nickname)
+                continue
+        nicknames.append(str(player).strip())
+    return ServerStatus(
+        server_id=int(server.id),
+        address=_address(server),
+        ok=True,
+        players=tuple(nicknames),
+        # 人数字段只用于展示，缺失或格式不对时不影响在线判断
+        playercount=_parse_count(payload.get("playercount"), len(nicknames)),
+        maxplayers=_parse_count(payload.get("maxplayers"), 0),
+        fetched_at=time.monotonic(),
+    )
+
+
+def _failed_status(server: Server, error: str) -> ServerStatus:
+    return ServerStatus(
+        server_id=int(server.id),
+        address=_address(server),
+        ok=False,
+        error=error,
+        fetched_at=time.monotonic(),
+    )
+
+
+def _reconcile_presence(status: ServerStatus, requested_at: float) -> None:
+    # 调用方需持有 _snapshot_lock
+    if not status.ok:
+        _presence.pop(status.address, None)
+        return
+    players = {nickname.lower(): (True, requested_at) for nickname in status.players}
+    previous = _presence.get(status.address)
+    if previous is not None:
+        # 请求发出后才收到的上下线事件比本次返回的玩家列表更新，予以保留
+        players.update({
+            key: record
+            for key, record in previous.players.items()
+            if record[1] > requested_at
+        })
+    _presence[status.address] = _ServerPresence(
+        players=players, reconciled_at=requested_at
+    )
+
+
+def record_player_event(server: Server, player_name: str, *, online: bool) -> None:
+    """记录 TShock 插件推送的上下线事件。"""
+    key = player_name.strip().lower()
+    if not key:
+        return
+    address = _address(server)
+    with _snapshot_lock:
+        presence = _presence.get(address)
+        if presence is None:
+            # 尚未对账的服务器先记下事件，下次对账时与玩家列表合并
+            presence = _ServerPresence(players={}, reconciled_at=0.0)
+            _presence[address] = presence
+        presence.players[key] = (online, time.monotonic())
+
+
+def lookup_presence(
+    server: Server, player_name: str, max_age: float | None = None
+) -> bool | None:
+    """从在线玩家索引判断玩家是否在线，索引过期或不存在时返回 None。"""
+    limit = get_max_age_seconds() if max_age is None else max_age
+    with _snapshot_lock:
+        presence = _presence.get(_address(server))
+        if presence is None or time.monotonic() - presence.reconciled_at > limit:
+            return None
+        record = presence.players.get(player_name.strip().lower())
+    return record is not None and record[0]
+
+
+async def fetch_server_status(server: Server) -> ServerStatus:
+    """请求 /v2/server/status 并更新快照，失败时返回 ok=False 的状态而不是抛出异常。"""
+    requested_at = time.monotonic()
+    try:
+        response = await request_server_api(
+            server, "/v2/server/status", params={"players": "true"},
+        )
+    except TShockRequestError as exc:
+        status = _failed_status(server, get_request_error_reason(exc))
+    else:
+        if is_success(response):
+            status = _parse_status(server, response.payload)
+        else:
+            status = _failed_status(server, get_error_reason(response))
+
+    with _snapshot_lock:
+        _snapshot[status.server_id] = status
+        _reconcile_presence(status, requested_at)
+    return status
+
+
+def get_cached_status(
+    server: Server, max_age: float | None = None
+) -> ServerStatus | None:
+    """快照中足够新的成功状态，没有时返回 None。"""
+    limit = get_max_age_seconds() if max_age is None else max_age
+    with _snapshot_lock:
+        status = _snapshot.get(int(server.id))
+    if status is None or not status.ok or status.address != _address(server):
+        return None
+    if status.age > limit:
+        return None
+    return status
+
+
+async def get_server_status(
+    server: Server, max_age: float | None = None
+) -> ServerStatus:
+    """优先读取快照，快照过期或上次查询失败时再实时请求。"""
+    status = get_cached_status(server, max_age)
+    if status is not None:
+        return status
+    return await fetch_server_status(server)
+
+
+async def check_player_online(
+    server: Server, player_name: str
+) -> tuple[bool | None, str]:
+    """返回 (在线?, 错误原因)。None 表示查询失败；True/False 表示在线状态。
+
+    优先查在线玩家索引，索引过期时才实时请求一次并据此对账。
+    """
+    online = lookup_presence(server, player_name)
+    if online is not None:
+        return online, ""
+    status = await fetch_server_status(server)
+    if not status.ok:
+        return None, status.error
+    online = lookup_presence(server, player_name)
+    return (status.has_player(player_name) if online is None else online), ""
+
+
+async def _load_servers() -> list[Server]:
+    session = db_session()
+    try:
+        return await session.all(session.query(Server).order_by(Server.id.asc()))
+    finally:
+        await session.close()
+
+
+async def _poll_forever() -> None:
+    interval = get_poll_interval_seconds()
+    failures: dict[str, int] = {}
+    next_poll_at: dict[str, float] = {}
+    while True:
+        sleep_seconds = interval
+        try:
+            servers = await _load_servers()
+            addresses = {_address(server) for server in servers}
+            now = time.monotonic()
+            due = [
+                server
+                for server in servers
+                if next_poll_at.get(_address(server), 0.0) <= now
+            ]
+            for result in await fan_out(due, fetch_server_status):
+                address = _address(result.server)
+                ok = result.value is not None and result.value.ok
+                failures[address] = 0 if ok else failures.get(address, 0) + 1
+                delay = (
+                    interval
+                    if ok
+                    else min(
+                        interval * 2 ** failures[address], _MAX_POLL_BACKOFF_SECONDS
+                    )
+                )
+                jitter = random.uniform(0, interval * _POLL_JITTER_RATIO)
+                next_poll_at[address] = time.monotonic() + delay + jitter
+
+            # 清理已删除的服务器
+            for address in set(next_poll_at) - addresses:
+                next_poll_at.pop(address, None)
+                failures.pop(address, None)
+            with _snapshot_lock:
+                for server_id in [
+                    key
+                    for key, status in _snapshot.items()
+                    if status.address not in addresses
+                ]:
+                    _snapshot.pop(server_id, None)
+                for address in set(_presence) - addresses:
+                    _presence.pop(address, None)
+
+            if next_poll_at:
+                sleep_seconds = min(next_poll_at.values()) - time.monotonic()
+            sleep_seconds = min(max(sleep_seconds, 1.0), interval)
+        except Exception as exc:  # noqa: BLE001
+            logger.exception(f"服务器状态轮询异常：reason={exc}")
+        await asyncio.sleep(sleep_seconds)
+
+
+def start_status_poller() -> None:
+    global _poller_task  # noqa: PLW0603
+    if _poller_task is not None and not _poller_task.done():
+        return
+    _poller_task = asyncio.get_running_loop().create_task(_poll_forever())
+    logger.info(f"服务器状态轮询已启动：interval={get_poll_interval_seconds():g}s")
+
+
+async def stop_status_poller() -> None:
+    global _poller_task  # noqa: PLW0603
+    task = _poller_task
+    _poller_task = None
+    if task is None or task.done():
+        return
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from nonebot import get_bots
+import bisect
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+from nonebot import get_bots, get_driver
+from nonebot.log import logger
 from sqlalchemy import func
 from sqlalchemy.dialects.sqlite import insert
 
 from nextbot.db import (
     CommandConfig,
+    CommandMetric,
     Group,
     Server,
     SystemStat,
@@ -17,6 +25,50 @@ from nextbot.db import (
 from nextbot.time_utils import beijing_now_text, db_now_utc_naive, format_beijing_datetime
 
 
+DEFAULT_STATS_FLUSH_INTERVAL_SECONDS = 5.0
+
+COMMAND_OUTCOMES = ("success", "denied", "disabled", "banned", "usage_error", "error")
+# 命令耗时直方图的桶上界（毫秒），超过最后一个上界的计入溢出桶
+COMMAND_LATENCY_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+@dataclass
+class _CommandMetricDelta:
+    invoke_count: int = 0
+    outcome_counts: dict[str, int] = field(default_factory=dict)
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    latency_buckets: list[int] = field(
+        default_factory=lambda: [0] * (len(COMMAND_LATENCY_BUCKETS_MS) + 1)
+    )
+
+
+# 待落库的增量；命令路径只做内存累加，由后台线程按间隔批量写入
+_pending_deltas: dict[str, int] = {}
+_pending_command_metrics: dict[str, _CommandMetricDelta] = {}
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flush_stop = threading.Event()
+_flush_thread: threading.Thread | None = None
+_worker_lock = threading.Lock()
+
+
+def _get_flush_interval_seconds() -> float:
+    try:
+        raw_value = getattr(
+            get_driver().config,
+            "stats_flush_interval_seconds",
+            DEFAULT_STATS_FLUSH_INTERVAL_SECONDS,
+        )
+    except ValueError:
+        return DEFAULT_STATS_FLUSH_INTERVAL_SECONDS
+    try:
+        value = float(raw_value)
+    except (TypeError, ValueError):
+        return DEFAULT_STATS_FLUSH_INTERVAL_SECONDS
+    return value if value > 0 else DEFAULT_STATS_FLUSH_INTERVAL_SECONDS
+
+
 def increment_stat(stat_key: str, delta: int = 1) -> None:
     key = str(stat_key).strip()
     if not key:
@@ -26,10 +78,75 @@ def increment_stat(stat_key: str, delta: int = 1) -> None:
     if amount == 0:
         return
 
-    now = db_now_utc_naive()
-    engine = get_engine()
+    with _pending_lock:
+        _pending_deltas[key] = _pending_deltas.get(key, 0) + amount
+
+
+def record_command_execution(command_key: str, outcome: str, latency_ms: float) -> None:
+    key = str(command_key).strip()
+    if not key:
+        return
+    if outcome not in COMMAND_OUTCOMES:
+        outcome = "error"
+    elapsed = max(float(latency_ms), 0.0)
+    bucket_index = bisect.bisect_left(COMMAND_LATENCY_BUCKETS_MS, elapsed)
 
-    with engine.begin() as connection:
+    with _pending_lock:
+        delta = _pending_command_metrics.get(key)
+        if delta is None:
+            delta = _CommandMetricDelta()
+            _pending_command_metrics[key] = delta
+        delta.invoke_count += 1
+        delta.outcome_counts[outcome] = delta.outcome_counts.get(outcome, 0) + 1
+        delta.total_latency_ms += elapsed
+        delta.max_latency_ms = max(delta.max_latency_ms, elapsed)
+        delta.latency_buckets[bucket_index] += 1
+
+
+def get_pending_stat_delta(stat_key: str) -> int:
+    with _pending_lock:
+        return _pending_deltas.get(str(stat_key).strip(), 0)
+
+
+def _parse_latency_buckets(raw_value: str | None) -> list[int]:
+    size = len(COMMAND_LATENCY_BUCKETS_MS) + 1
+    try:
+        parsed = json.loads(raw_value or "[]")
+    except json.JSONDecodeError:
+        parsed = []
+    if not isinstance(parsed, list):
+        parsed = []
+    buckets = [
+        int(item) if isinstance(item, (int, float)) else 0 for item in parsed[:size]
+    ]
+    return buckets + [0] * (size - len(buckets))
+
+
+def _merge_command_metrics(
+    target: dict[str, _CommandMetricDelta],
+    source: dict[str, _CommandMetricDelta],
+) -> None:
+    for key, delta in source.items():
+        current = target.get(key)
+        if current is None:
+            target[key] = delta
+            continue
+        current.invoke_count += delta.invoke_count
+        for outcome, count in delta.outcome_counts.items():
+            current.outcome_counts[outcome] = (
+                current.outcome_counts.get(outcome, 0) + count
+            )
+        current.total_latency_ms += delta.total_latency_ms
+        current.max_latency_ms = max(current.max_latency_ms, delta.max_latency_ms)
+        current.latency_buckets = [
+            a + b for a, b in zip(current.latency_buckets, delta.latency_buckets)
+        ]
+
+
+def _write_stat_deltas(connection: Any, deltas: dict[str, int], now: Any) -> None:
+    for key, amount in deltas.items():
+        if amount == 0:
+            continue
         statement = insert(SystemStat).values(
             stat_key=key,
             stat_value=amount,
@@ -45,6 +162,130 @@ def increment_stat(stat_key: str, delta: int = 1) -> None:
         connection.execute(upsert)
 
 
+def _write_command_metrics(
+    connection: Any,
+    metrics: dict[str, _CommandMetricDelta],
+    now: Any,
+) -> None:
+    for key, delta in metrics.items():
+        row = connection.execute(
+            CommandMetric.__table__.select().where(CommandMetric.command_key == key)
+        ).first()
+        buckets = delta.latency_buckets
+        if row is not None:
+            buckets = [
+                a + b
+                for a, b in zip(
+                    _parse_latency_buckets(row.latency_buckets_json), buckets
+                )
+            ]
+        counts = {
+            f"{outcome}_count": delta.outcome_counts.get(outcome, 0)
+            for outcome in COMMAND_OUTCOMES
+        }
+        statement = insert(CommandMetric).values(
+            command_key=key,
+            invoke_count=delta.invoke_count,
+            total_latency_ms=delta.total_latency_ms,
+            max_latency_ms=delta.max_latency_ms,
+            latency_buckets_json=json.dumps(buckets),
+            updated_at=now,
+            **counts,
+        )
+        columns = CommandMetric.__table__.c
+        upsert = statement.on_conflict_do_update(
+            index_elements=[CommandMetric.command_key],
+            set_={
+                "invoke_count": columns.invoke_count + delta.invoke_count,
+                "total_latency_ms": (
+                    columns.total_latency_ms + delta.total_latency_ms
+                ),
+                "max_latency_ms": func.max(
+                    columns.max_latency_ms, delta.max_latency_ms
+                ),
+                "latency_buckets_json": json.dumps(buckets),
+                "updated_at": now,
+                **{name: columns[name] + value for name, value in counts.items()},
+            },
+        )
+        connection.execute(upsert)
+
+
+def flush_stats() -> int:
+    """把累积的增量在一个事务内写入 system_stat 和 command_metric。
+
+    返回写入的 key 数量。读取方需持有 ``_flush_lock``，否则可能在增量已取出、
+    尚未提交时读到两边都不含这部分增量的状态，或在提交后重复计入。
+    """
+    with _flush_lock:
+        with _pending_lock:
+            if not _pending_deltas and not _pending_command_metrics:
+                return 0
+            deltas = dict(_pending_deltas)
+            metrics = dict(_pending_command_metrics)
+            _pending_deltas.clear()
+            _pending_command_metrics.clear()
+
+        now = db_now_utc_naive()
+        try:
+            with get_engine().begin() as connection:
+                _write_stat_deltas(connection, deltas, now)
+                _write_command_metrics(connection, metrics, now)
+        except Exception:
+            # 写入失败时把增量放回去，等下一轮重试
+            with _pending_lock:
+                for key, amount in deltas.items():
+                    _pending_deltas[key] = _pending_deltas.get(key, 0) + amount
+                _merge_command_metrics(_pending_command_metrics, metrics)
+            raise
+        return len(deltas) + len(metrics)
+
+
+def _flush_stats_logged() -> None:
+    try:
+        flush_stats()
+    except Exception:  # noqa: BLE001
+        logger.exception("统计数据落库失败")
+
+
+def _stats_flush_worker(interval: float) -> None:
+    while not _flush_stop.wait(interval):
+        _flush_stats_logged()
+
+
+def start_stats_flush_worker() -> None:
+    global _flush_thread  # noqa: PLW0603
+    with _worker_lock:
+        if _flush_thread is not None:
+            return
+
+        interval = _get_flush_interval_seconds()
+        _flush_stop.clear()
+        _flush_thread = threading.Thread(
+            target=_stats_flush_worker,
+            args=(interval,),
+            name="nextbot-stats-flush",
+            daemon=True,
+        )
+        _flush_thread.start()
+        logger.info(f"统计落库线程已启动：interval={interval}s")
+
+
+def stop_stats_flush_worker() -> None:
+    global _flush_thread  # noqa: PLW0603
+    with _worker_lock:
+        thread = _flush_thread
+        _flush_thread = None
+        _flush_stop.set()
+    if thread is not None:
+        thread.join(timeout=5)
+    try:
+        flushed = flush_stats()
+        logger.info(f"统计数据已落库：key_count={flushed}")
+    except Exception:  # noqa: BLE001
+        logger.exception("关闭时统计数据落库失败")
+
+
 def get_stat_value(stat_key: str, default: int = 0) -> int:
     key = str(stat_key).strip()
     if not key:
@@ -52,13 +293,102 @@ def get_stat_value(stat_key: str, default: int = 0) -> int:
 
     session = get_session()
     try:
-        row = session.query(SystemStat).filter(SystemStat.stat_key == key).first()
-        if row is None:
-            return int(default)
-        return int(row.stat_value)
+        # 与 flush_stats 互斥，保证待落库增量和库中的值来自同一时刻
+        with _flush_lock:
+            pending = get_pending_stat_delta(key)
+            row = session.query(SystemStat).filter(SystemStat.stat_key == key).first()
+    finally:
+        session.close()
+    if row is None:
+        return int(default) + pending
+    return int(row.stat_value) + pending
+
+
+def _estimate_latency_percentile(buckets: list[int], percentile: float) -> int | None:
+    total = sum(buckets)
+    if total <= 0:
+        return None
+    threshold = total * percentile
+    seen = 0
+    for index, count in enumerate(buckets):
+        seen += count
+        if seen >= threshold:
+            if index < len(COMMAND_LATENCY_BUCKETS_MS):
+                return COMMAND_LATENCY_BUCKETS_MS[index]
+            return None
+    return None
+
+
+def get_command_metrics() -> list[dict[str, Any]]:
+    """返回每个命令的执行指标（已落库 + 待落库），按调用次数降序。"""
+    session = get_session()
+    try:
+        with _flush_lock:
+            rows = session.query(CommandMetric).all()
+            with _pending_lock:
+                pending = {
+                    key: _CommandMetricDelta(
+                        invoke_count=delta.invoke_count,
+                        outcome_counts=dict(delta.outcome_counts),
+                        total_latency_ms=delta.total_latency_ms,
+                        max_latency_ms=delta.max_latency_ms,
+                        latency_buckets=list(delta.latency_buckets),
+                    )
+                    for key, delta in _pending_command_metrics.items()
+                }
+        display_names = {
+            str(key): str(name)
+            for key, name in session.query(
+                CommandConfig.command_key, CommandConfig.display_name
+            ).all()
+        }
     finally:
         session.close()
 
+    merged: dict[str, _CommandMetricDelta] = {}
+    for row in rows:
+        merged[str(row.command_key)] = _CommandMetricDelta(
+            invoke_count=int(row.invoke_count or 0),
+            outcome_counts={
+                outcome: int(getattr(row, f"{outcome}_count") or 0)
+                for outcome in COMMAND_OUTCOMES
+            },
+            total_latency_ms=float(row.total_latency_ms or 0.0),
+            max_latency_ms=float(row.max_latency_ms or 0.0),
+            latency_buckets=_parse_latency_buckets(row.latency_buckets_json),
+        )
+    _merge_command_metrics(merged, pending)
+
+    result: list[dict[str, Any]] = []
+    for key, delta in merged.items():
+        invoke_count = delta.invoke_count
+        result.append(
+            {
+                "command_key": key,
+                "display_name": display_names.get(key, key),
+                "invoke_count": invoke_count,
+                **{
+                    f"{outcome}_count": delta.outcome_counts.get(outcome, 0)
+                    for outcome in COMMAND_OUTCOMES
+                },
+                "avg_latency_ms": (
+                    round(delta.total_latency_ms / invoke_count, 1)
+                    if invoke_count
+                    else 0.0
+                ),
+                "max_latency_ms": round(delta.max_latency_ms, 1),
+                "p50_latency_ms": _estimate_latency_percentile(
+                    delta.latency_buckets, 0.5
+                ),
+                "p95_latency_ms": _estimate_latency_percentile(
+                    delta.latency_buckets, 0.95
+                ),
+                "latency_buckets": list(delta.latency_buckets),
+            }
+        )
+    result.sort(key=lambda item: (-int(item["invoke_count"]), str(item["command_key"])))
+    return result
+
 
 def increment_command_execute_total() -> None:
     increment_stat(STAT_COMMAND_EXECUTE_TOTAL, 1)
@@ -89,15 +419,20 @@ def get_dashboard_metrics() -> dict[str, int | str | list[str]]:
             or 0
         )
         total_coins = int(session.query(func.sum(User.coins)).scalar() or 0)
-        command_total_row = (
-            session.query(SystemStat)
-            .filter(SystemStat.stat_key == STAT_COMMAND_EXECUTE_TOTAL)
-            .first()
-        )
+        with _flush_lock:
+            command_total_row = (
+                session.query(SystemStat)
+                .filter(SystemStat.stat_key == STAT_COMMAND_EXECUTE_TOTAL)
+                .first()
+            )
+            command_execute_pending = get_pending_stat_delta(STAT_COMMAND_EXECUTE_TOTAL)
         command_execute_count = int(command_total_row.stat_value) if command_total_row else 0
         command_execute_updated_at = (
             command_total_row.updated_at if command_total_row else None
         )
+        if command_execute_pending:
+            command_execute_count += command_execute_pending
+            command_execute_updated_at = db_now_utc_naive()
     finally:
         session.close()
 
@@ -1,17 +1,52 @@
 from __future__ import annotations
 
+import asyncio
+import math
+import os
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
 
 import httpx
+from nonebot.log import logger
 
 from nextbot.db import Server
 
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Sequence
+
 
 class TShockRequestError(Exception):
     pass
 
 
+class TShockServerUnavailableError(TShockRequestError):
+    """服务器处于熔断状态，本次请求没有发出。"""
+
+    def __init__(self, failures: int, retry_in: int | None = None) -> None:
+        if retry_in is None:
+            message = "服务器暂时不可用，正在重新探测"
+        else:
+            message = (
+                f"服务器暂时不可用（连续 {failures} 次无法连接，{retry_in} 秒后重试）"
+            )
+        super().__init__(message)
+
+
+T = TypeVar("T")
+
+DEFAULT_FAN_OUT_CONCURRENCY = 8
+# 未指定 deadline 时按请求超时推算，再留出的余量（秒）
+FAN_OUT_DEADLINE_MARGIN = 1.0
+
+# 连续无法连接达到阈值后熔断，熔断时长从 BASE 开始每次翻倍，最长 MAX 秒
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_BACKOFF = 5.0
+BREAKER_MAX_BACKOFF = 120.0
+_LATENCY_SMOOTHING = 0.3
+
+
 @dataclass
 class TShockResponse:
     http_status: int
@@ -25,6 +60,12 @@ def is_success(response: TShockResponse) -> bool:
     )
 
 
+def get_request_error_reason(exc: TShockRequestError | None) -> str:
+    if isinstance(exc, TShockServerUnavailableError):
+        return str(exc)
+    return "无法连接服务器"
+
+
 def get_error_reason(response: TShockResponse) -> str:
     error_msg = str(response.payload.get("error", "")).strip()
     if error_msg:
@@ -44,25 +85,298 @@ def get_error_reason(response: TShockResponse) -> str:
     return "返回数据格式错误"
 
 
-async def request_server_api(
+@dataclass(frozen=True)
+class TShockClientSettings:
+    timeout: float = 5.0
+    connect_timeout: float = 3.0
+    max_connections: int = 10
+    keepalive_expiry: float = 30.0
+
+
+@dataclass
+class _PooledClient:
+    base_url: str
+    client: httpx.AsyncClient
+    loop: asyncio.AbstractEventLoop
+
+
+_settings: TShockClientSettings | None = None
+# NoneBot 与 WebUI 各自运行在独立线程的事件循环中，httpx 的连接不能跨事件循环复用，
+# 所以连接池按 (事件循环, 服务器 ID) 区分
+_clients: dict[tuple[asyncio.AbstractEventLoop, int], _PooledClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _read_setting(name: str) -> Any:
+    try:
+        from nonebot import get_driver
+
+        raw_value = getattr(get_driver().config, name, None)
+    except ValueError:
+        raw_value = None
+    if raw_value is None:
+        raw_value = os.environ.get(name.upper())
+    return raw_value
+
+
+def _parse_positive_float(raw_value: Any, default: float) -> float:
+    if raw_value is None or isinstance(raw_value, bool):
+        return default
+    try:
+        value = float(str(raw_value).strip())
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def load_client_settings() -> TShockClientSettings:
+    global _settings  # noqa: PLW0603
+    if _settings is None:
+        defaults = TShockClientSettings()
+        _settings = TShockClientSettings(
+            timeout=_parse_positive_float(
+                _read_setting("tshock_api_timeout"), defaults.timeout
+            ),
+            connect_timeout=_parse_positive_float(
+                _read_setting("tshock_api_connect_timeout"),
+                defaults.connect_timeout,
+            ),
+            max_connections=int(
+                _parse_positive_float(
+                    _read_setting("tshock_api_max_connections"),
+                    defaults.max_connections,
+                )
+            ),
+            keepalive_expiry=_parse_positive_float(
+                _read_setting("tshock_api_keepalive_expiry"),
+                defaults.keepalive_expiry,
+            ),
+        )
+    return _settings
+
+
+def _build_client(base_url: str) -> httpx.AsyncClient:
+    settings = load_client_settings()
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+    )
+
+
+async def _close_pooled(pooled: _PooledClient) -> None:
+    try:
+        if pooled.loop is asyncio.get_running_loop():
+            await pooled.client.aclose()
+        elif pooled.loop.is_running():
+            asyncio.run_coroutine_threadsafe(pooled.client.aclose(), pooled.loop)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(
+            f"关闭 TShock 连接池失败：base_url={pooled.base_url} reason={exc}"
+        )
+
+
+async def _get_client(server: Server) -> httpx.AsyncClient:
+    base_url = f"http://{server.ip}:{server.restapi_port}"
+    loop = asyncio.get_running_loop()
+    key = (loop, int(server.id))
+    stale: _PooledClient | None = None
+    with _clients_lock:
+        pooled = _clients.get(key)
+        if pooled is None or pooled.base_url != base_url or pooled.client.is_closed:
+            # 服务器地址变化（包括删除服务器后 ID 前移）时丢弃旧连接池
+            stale = pooled
+            pooled = _PooledClient(
+                base_url=base_url, client=_build_client(base_url), loop=loop
+            )
+            _clients[key] = pooled
+    if stale is not None:
+        await _close_pooled(stale)
+    return pooled.client
+
+
+async def close_server_clients(server_id: int | None = None) -> None:
+    """关闭服务器的连接池，不指定 server_id 时关闭全部。
+
+    修改、删除服务器和退出时调用。
+    """
+    with _clients_lock:
+        keys = [key for key in _clients if server_id is None or key[1] == server_id]
+        closing = [_clients.pop(key) for key in keys]
+    for pooled in closing:
+        await _close_pooled(pooled)
+
+
+@dataclass
+class ServerHealth:
+    # closed：正常；open：熔断中，直接失败；half_open：熔断到期，放行一个探测请求
+    state: str = "closed"
+    consecutive_failures: int = 0
+    # 连续熔断次数，决定下一次熔断时长
+    open_count: int = 0
+    retry_at: float = 0.0
+    probing: bool = False
+    latency_ms: float | None = None
+    last_error: str = ""
+    last_success_at: float | None = None
+    last_failure_at: float | None = None
+
+
+# 按地址而不是服务器 ID 记录，删除服务器导致 ID 前移时不会串到别的服务器
+_health: dict[str, ServerHealth] = {}
+_health_lock = threading.Lock()
+
+
+def _health_key(server: Server) -> str:
+    return f"{server.ip}:{server.restapi_port}"
+
+
+def _describe_request_error(exc: httpx.RequestError) -> str:
+    if isinstance(exc, httpx.TimeoutException):
+        return "请求超时"
+    if isinstance(exc, httpx.ConnectError):
+        return "连接被拒绝或无法访问"
+    return exc.__class__.__name__
+
+
+def _before_request(key: str, *, probe: bool) -> None:
+    with _health_lock:
+        health = _health.get(key)
+        if health is None or health.state == "closed" or probe:
+            return
+        now = time.monotonic()
+        if health.state == "open" and now >= health.retry_at:
+            health.state = "half_open"
+        if health.state == "half_open":
+            if not health.probing:
+                health.probing = True
+                return
+            raise TShockServerUnavailableError(health.consecutive_failures)
+        raise TShockServerUnavailableError(
+            health.consecutive_failures, math.ceil(health.retry_at - now)
+        )
+
+
+def _record_success(key: str, elapsed: float) -> None:
+    latency_ms = elapsed * 1000
+    with _health_lock:
+        health = _health.setdefault(key, ServerHealth())
+        recovered = health.state != "closed"
+        health.state = "closed"
+        health.consecutive_failures = 0
+        health.open_count = 0
+        health.probing = False
+        health.last_success_at = time.time()
+        if health.latency_ms is None:
+            health.latency_ms = latency_ms
+        else:
+            health.latency_ms += _LATENCY_SMOOTHING * (latency_ms - health.latency_ms)
+    if recovered:
+        logger.info(f"服务器恢复连接：server={key} latency_ms={latency_ms:.0f}")
+
+
+def _record_failure(key: str, reason: str) -> None:
+    with _health_lock:
+        health = _health.setdefault(key, ServerHealth())
+        health.consecutive_failures += 1
+        health.probing = False
+        health.last_error = reason
+        health.last_failure_at = time.time()
+        if (
+            health.state == "closed"
+            and health.consecutive_failures < BREAKER_FAILURE_THRESHOLD
+        ):
+            return
+        health.open_count += 1
+        backoff = min(
+            BREAKER_BASE_BACKOFF * 2 ** (health.open_count - 1), BREAKER_MAX_BACKOFF
+        )
+        health.state = "open"
+        health.retry_at = time.monotonic() + backoff
+        failures = health.consecutive_failures
+    logger.warning(
+        f"服务器熔断：server={key} failures={failures} "
+        f"retry_in={backoff:.0f}s reason={reason}"
+    )
+
+
+def _release_probe(key: str) -> None:
+    with _health_lock:
+        health = _health.get(key)
+        if health is not None:
+            health.probing = False
+
+
+def get_server_health(server: Server) -> dict[str, Any] | None:
+    """服务器最近的连接状况，没有请求记录时返回 None。供 WebUI 展示，不会发起请求。"""
+    with _health_lock:
+        health = _health.get(_health_key(server))
+        if health is None:
+            return None
+        now = time.time()
+        state = health.state
+        retry_in = 0
+        if state == "open":
+            retry_in = max(0, math.ceil(health.retry_at - time.monotonic()))
+            if retry_in == 0:
+                state = "half_open"
+        return {
+            "state": state,
+            "consecutive_failures": health.consecutive_failures,
+            "latency_ms": (
+                None if health.latency_ms is None else round(health.latency_ms)
+            ),
+            "last_error": health.last_error,
+            "last_success_seconds_ago": (
+                None if health.last_success_at is None
+                else max(0, int(now - health.last_success_at))
+            ),
+            "retry_in_seconds": retry_in,
+        }
+
+
+async def request_server_api(  # noqa: PLR0913
     server: Server,
     path: str,
     params: dict[str, str] | None = None,
     *,
-    timeout: float = 5.0,
+    timeout: float | None = None,
     include_token: bool = True,
+    probe: bool = False,
 ) -> TShockResponse:
+    """请求 TShock REST API。
+
+    连续无法连接的服务器会被熔断，熔断期间直接抛出 TShockServerUnavailableError；
+    probe=True 时无视熔断照常请求，用于手动测试连通性。
+    """
     request_path = path if path.startswith("/") else f"/{path}"
     query = dict(params or {})
     if include_token and "token" not in query:
         query["token"] = server.token
 
-    url = f"http://{server.ip}:{server.restapi_port}{request_path}"
+    client = await _get_client(server)
+    key = _health_key(server)
+    _before_request(key, probe=probe)
+    started = time.monotonic()
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(url, params=query)
+        response = await client.get(
+            request_path,
+            params=query,
+            timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+        )
     except httpx.RequestError as exc:
+        _record_failure(key, _describe_request_error(exc))
         raise TShockRequestError from exc
+    except BaseException:
+        # 被取消（例如 fan_out 超过截止时间）时不计入成败，只释放探测名额
+        _release_probe(key)
+        raise
+    # 能收到 HTTP 响应即说明服务器可达，业务错误不影响熔断
+    _record_success(key, time.monotonic() - started)
 
     try:
         payload = response.json() if response.content else {}
@@ -75,3 +389,75 @@ async def request_server_api(
         payload=payload,
         api_status=api_status,
     )
+
+
+@dataclass
+class FanOutResult(Generic[T]):
+    server: Server
+    value: T | None = None
+    # 无法连接或超过截止时间时为 TShockRequestError，value 为 None
+    error: TShockRequestError | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def fan_out(
+    servers: Sequence[Server],
+    coro_factory: Callable[[Server], Awaitable[T]],
+    *,
+    concurrency: int = DEFAULT_FAN_OUT_CONCURRENCY,
+    calls_per_server: int = 1,
+    deadline: float | None = None,
+) -> list[FanOutResult[T]]:
+    """对多台服务器并发执行 coro_factory(server)，结果顺序与 servers 一致。
+
+    同时最多 concurrency 台在请求，deadline 秒后仍未完成的服务器按无法连接处理，
+    总耗时取决于最慢的一台而不是各台之和。calls_per_server 为 coro_factory 内
+    顺序发出的请求数；deadline 未指定时取请求超时、calls_per_server 与排队轮数
+    三者之积，单台不会因为多次请求而被提前判为超时。
+    """
+    if not servers:
+        return []
+    concurrency = max(1, concurrency)
+    if deadline is None:
+        waves = -(-len(servers) // concurrency)
+        deadline = (
+            load_client_settings().timeout * max(1, calls_per_server) * waves
+            + FAN_OUT_DEADLINE_MARGIN
+        )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(server: Server) -> FanOutResult[T]:
+        async with semaphore:
+            try:
+                value = await coro_factory(server)
+            except TShockRequestError as exc:
+                return FanOutResult(server=server, error=exc)
+        return FanOutResult(server=server, value=value)
+
+    tasks = [asyncio.ensure_future(run(server)) for server in servers]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results: list[FanOutResult[T]] = []
+    for server, task in zip(servers, tasks):
+        if task in pending:
+            logger.info(
+                f"服务器请求超时：server_id={server.id} deadline={deadline:g}s"
+            )
+            results.append(
+                FanOutResult(
+                    server=server, error=TShockRequestError("deadline exceeded")
+                )
+            )
+            continue
+        results.append(task.result())
+    return results
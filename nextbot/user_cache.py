@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Literal
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from nextbot.db import User, get_session, run_db
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from sqlalchemy.orm import Query
+
+_SESSION_DIRTY_KEY = "nextbot_dirty_user_ids"
+_SESSION_NAME_CHANGES_KEY = "nextbot_user_name_changes"
+_ALL_USERS = "*"
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """用户行中权限 / 封禁判断和展示用到的字段，只读。"""
+
+    id: int
+    user_id: str
+    name: str
+    group: str
+    permissions: str
+    is_banned: bool
+    ban_reason: str
+
+
+_SNAPSHOT_FIELDS = tuple(UserSnapshot.__dataclass_fields__)
+
+NameIndex = dict[str, list[tuple[int, str]]]
+NameChange = tuple[int, str | None, str]
+
+
+@dataclass
+class _UserCacheState:
+    # user_id -> 快照；None 表示未注册，同样缓存
+    entries: dict[str, UserSnapshot | None] = field(default_factory=dict)
+    # 每次写入提交加一，读库期间变化则不写回
+    generation: int = 0
+
+
+@dataclass
+class _NameIndexState:
+    # casefold(name) -> [(User.id, user_id)]，按 User.id 升序；None 表示尚未加载
+    index: NameIndex | None = None
+    # User.id -> 在 index 中的键，用于改名 / 删除时定位旧条目
+    keys: dict[int, str] = field(default_factory=dict)
+    generation: int = 0
+
+
+_user_cache = _UserCacheState()
+_user_cache_lock = threading.Lock()
+_name_index = _NameIndexState()
+_name_index_lock = threading.Lock()
+
+
+def _snapshot(user: User) -> UserSnapshot:
+    return UserSnapshot(
+        id=int(user.id),
+        user_id=str(user.user_id),
+        name=str(user.name),
+        group=str(user.group or "guest"),
+        permissions=str(user.permissions or ""),
+        is_banned=bool(user.is_banned),
+        ban_reason=str(user.ban_reason or ""),
+    )
+
+
+def get_cached_user(user_id: str) -> tuple[bool, UserSnapshot | None]:
+    """只查缓存，返回 (是否命中, 快照)。"""
+    key = str(user_id)
+    with _user_cache_lock:
+        if key in _user_cache.entries:
+            return True, _user_cache.entries[key]
+    return False, None
+
+
+def load_user_snapshot(user_id: str) -> UserSnapshot | None:
+    key = str(user_id)
+    with _user_cache_lock:
+        if key in _user_cache.entries:
+            return _user_cache.entries[key]
+        generation = _user_cache.generation
+
+    session = get_session()
+    try:
+        user = session.query(User).filter(User.user_id == key).first()
+        snapshot = _snapshot(user) if user is not None else None
+    finally:
+        session.close()
+
+    with _user_cache_lock:
+        # 读取期间有写入提交则不写回，避免缓存旧数据
+        if generation == _user_cache.generation:
+            _user_cache.entries[key] = snapshot
+    return snapshot
+
+
+def invalidate_user_cache(user_ids: Any = None) -> None:
+    """user_ids 为 None 时清空全部缓存。"""
+    with _user_cache_lock:
+        _user_cache.generation += 1
+        if user_ids is None:
+            _user_cache.entries.clear()
+            return
+        for user_id in user_ids:
+            _user_cache.entries.pop(str(user_id), None)
+
+
+def _name_key(name: str) -> str:
+    return name.strip().casefold()
+
+
+def _build_name_index() -> tuple[NameIndex, dict[int, str]]:
+    session = get_session()
+    try:
+        rows = (
+            session.query(User.id, User.name, User.user_id)
+            .order_by(User.id.asc())
+            .all()
+        )
+    finally:
+        session.close()
+
+    index: NameIndex = {}
+    keys: dict[int, str] = {}
+    for row_id, name, user_id in rows:
+        key = _name_key(str(name or ""))
+        index.setdefault(key, []).append((int(row_id), str(user_id)))
+        keys[int(row_id)] = key
+    return index, keys
+
+
+def _lookup_name(index: NameIndex, name: str) -> list[str]:
+    return [user_id for _, user_id in index.get(_name_key(name), ())]
+
+
+def _lower_name_query(session: Session, name: str) -> Query[Any]:
+    """直接查库按名字找 user_id，走 ix_user_name_lower 表达式索引。
+
+    SQLite 的 lower() 只折叠 ASCII，结果可能比名称索引少；只用于对照和排查。
+    """
+    return (
+        session.query(User.user_id)
+        .filter(func.lower(User.name) == name.lower())
+        .order_by(User.id.asc())
+    )
+
+
+def get_cached_user_ids_by_name(name: str) -> tuple[bool, list[str]]:
+    """只查内存名称索引，返回 (索引是否已加载, user_id 列表)。"""
+    with _name_index_lock:
+        if _name_index.index is None:
+            return False, []
+        return True, _lookup_name(_name_index.index, name)
+
+
+def load_user_ids_by_name(name: str) -> list[str]:
+    """按名称（不区分大小写）查找 user_id，按注册顺序返回；多于一个表示重名。"""
+    with _name_index_lock:
+        if _name_index.index is not None:
+            return _lookup_name(_name_index.index, name)
+        generation = _name_index.generation
+
+    index, keys = _build_name_index()
+    with _name_index_lock:
+        # 构建期间有用户写入提交则不写回，下次调用重新构建
+        if generation == _name_index.generation:
+            _name_index.index = index
+            _name_index.keys = keys
+    return _lookup_name(index, name)
+
+
+async def find_user_ids_by_name(name: str) -> list[str]:
+    """异步版本的 load_user_ids_by_name，索引已加载时不进入数据库线程。"""
+    loaded, user_ids = get_cached_user_ids_by_name(name)
+    if loaded:
+        return user_ids
+    return await run_db(load_user_ids_by_name, name)
+
+
+def is_same_user_name(left: str, right: str) -> bool:
+    return _name_key(left) == _name_key(right)
+
+
+async def is_user_name_taken(name: str, exclude_user_id: str | None = None) -> bool:
+    """名称是否已被其他用户占用。
+
+    与按名字查人使用同一个 casefold 键；SQLite 的 lower() 只处理 ASCII，
+    "STRASSE" 与 "straße" 这类名字用它判重会漏掉。
+    """
+    user_ids = await find_user_ids_by_name(name)
+    return any(user_id != exclude_user_id for user_id in user_ids)
+
+
+def invalidate_name_index() -> None:
+    with _name_index_lock:
+        _name_index.generation += 1
+        _name_index.index = None
+        _name_index.keys = {}
+
+
+def _apply_name_changes(changes: list[NameChange]) -> None:
+    """changes 为 (User.id, 名称, user_id)，名称为 None 表示用户已删除。"""
+    with _name_index_lock:
+        _name_index.generation += 1
+        index = _name_index.index
+        if index is None:
+            return
+        for row_id, name, user_id in changes:
+            old_key = _name_index.keys.pop(row_id, None)
+            if old_key is not None:
+                entries = [item for item in index.get(old_key, ()) if item[0] != row_id]
+                if entries:
+                    index[old_key] = entries
+                else:
+                    index.pop(old_key, None)
+            if name is None:
+                continue
+            key = _name_key(name)
+            entries = index.setdefault(key, [])
+            entries.append((row_id, user_id))
+            entries.sort()
+            _name_index.keys[row_id] = key
+
+
+def _mark_dirty(session: Session, user_ids: set[str]) -> None:
+    pending = session.info.setdefault(_SESSION_DIRTY_KEY, set())
+    pending.update(user_ids)
+
+
+FlushState = Literal["new", "deleted", "dirty"]
+
+
+def _pending_users(session: Session) -> Iterator[tuple[FlushState, User]]:
+    for state, instances in (
+        ("new", session.new),
+        ("deleted", session.deleted),
+        ("dirty", session.dirty),
+    ):
+        for instance in instances:
+            if isinstance(instance, User):
+                yield state, instance
+
+
+def _flushed_user_keys(
+    state: FlushState, user: User
+) -> tuple[set[str], NameChange | None]:
+    """单个写入的用户需要失效的 user_id，以及名称索引的变更。"""
+    if state == "new":
+        return {str(user.user_id)}, (int(user.id), str(user.name), str(user.user_id))
+    if state == "deleted":
+        return {str(user.user_id)}, (int(user.id), None, str(user.user_id))
+
+    attrs = inspect(user).attrs
+    # 只有快照里的字段变化才需要失效，金币等高频字段不影响缓存
+    if not any(attrs[name].history.has_changes() for name in _SNAPSHOT_FIELDS):
+        return set(), None
+    user_ids = {str(user.user_id)}
+    # user_id 本身被修改时，旧值对应的缓存也要失效
+    user_ids.update(
+        str(value)
+        for value in attrs.user_id.history.deleted or ()
+        if value is not None
+    )
+    if not (attrs.name.history.has_changes() or attrs.user_id.history.has_changes()):
+        return user_ids, None
+    return user_ids, (int(user.id), str(user.name), str(user.user_id))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_users(session: Session, _flush_context: Any) -> None:
+    user_ids: set[str] = set()
+    name_changes: list[NameChange] = []
+    for state, user in _pending_users(session):
+        changed_ids, name_change = _flushed_user_keys(state, user)
+        user_ids.update(changed_ids)
+        if name_change is not None:
+            name_changes.append(name_change)
+    if user_ids:
+        _mark_dirty(session, user_ids)
+    if name_changes:
+        session.info.setdefault(_SESSION_NAME_CHANGES_KEY, []).extend(name_changes)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_writes(orm_execute_state: Any) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mappers = orm_execute_state.all_mappers
+    if any(mapper.class_ is User for mapper in mappers):
+        _mark_dirty(orm_execute_state.session, {_ALL_USERS})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    name_changes = session.info.pop(_SESSION_NAME_CHANGES_KEY, None)
+    user_ids = session.info.pop(_SESSION_DIRTY_KEY, None)
+    if not user_ids:
+        return
+    if _ALL_USERS in user_ids:
+        invalidate_user_cache()
+        invalidate_name_index()
+        return
+    invalidate_user_cache(user_ids)
+    if name_changes:
+        _apply_name_changes(name_changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_users(session: Session, _previous_transaction: Any) -> None:
+    session.info.pop(_SESSION_DIRTY_KEY, None)
+    session.info.pop(_SESSION_NAME_CHANGES_KEY, None)
+
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""对比「每个别名一个 on_command」与「单一别名分发 matcher」的消息匹配开销。
+
+分别注册 0 / 100 / 1000 个别名，经 NoneBot 的 handle_event 处理两类群消息：
+不命中任何命令的普通聊天，以及命中最后一个别名的命令消息，统计每条消息的平均耗时。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="命令别名匹配基准测试")
+    parser.add_argument(
+        "--aliases",
+        type=int,
+        nargs="+",
+        default=[0, 100, 1000],
+        help="要测试的别名数量",
+    )
+    parser.add_argument("--messages", type=int, default=500, help="每种场景最多处理的消息条数")
+    parser.add_argument(
+        "--seconds",
+        type=float,
+        default=5.0,
+        help="每种场景的耗时上限，别名很多时旧方案单条消息就要上百毫秒",
+    )
+    return parser.parse_args()
+
+
+def _build_event(text: str) -> Any:
+    from nonebot.adapters.onebot.v11 import GroupMessageEvent
+
+    segments = [{"type": "text", "data": {"text": text}}]
+    return GroupMessageEvent.model_validate(
+        {
+            "time": int(time.time()),
+            "self_id": 10000,
+            "post_type": "message",
+            "sub_type": "normal",
+            "message_type": "group",
+            "message_id": 1,
+            "user_id": 20000,
+            "group_id": 30000,
+            "message": segments,
+            "original_message": segments,
+            "raw_message": text,
+            "font": 0,
+            "sender": {"user_id": 20000},
+            "to_me": False,
+        }
+    )
+
+
+def _reset_matchers() -> None:
+    from nonebot.matcher import matchers
+    from nonebot.rule import TrieRule
+    from pygtrie import CharTrie
+
+    from nextbot import command_config
+
+    matchers.clear()
+    TrieRule.prefix = CharTrie()
+    command_config._alias_prefixes.clear()
+    command_config._alias_prefix_version = -1
+    command_config._alias_dispatch_matcher = None
+    command_config._alias_handlers.clear()
+
+
+async def _measure(bot: Any, text: str, messages: int, seconds: float) -> float:
+    from nonebot.message import handle_event
+
+    event = _build_event(text)
+    await handle_event(bot, event)
+    processed = 0
+    started = time.perf_counter()
+    while processed < messages:
+        await handle_event(bot, event)
+        processed += 1
+        if time.perf_counter() - started >= seconds:
+            break
+    return (time.perf_counter() - started) / processed * 1_000_000
+
+
+async def _run_scenario(
+    bot: Any, mode: str, alias_count: int, messages: int, seconds: float
+) -> None:
+    from nonebot import on_command
+
+    from nextbot import command_config
+
+    hits = 0
+
+    async def handle_bench() -> None:
+        nonlocal hits
+        hits += 1
+
+    aliases = [f"别名{index}" for index in range(alias_count)]
+    _reset_matchers()
+    on_command("基准命令").handle()(handle_bench)
+    if mode == "legacy":
+        for alias in aliases:
+            on_command(alias).handle()(handle_bench)
+    else:
+        command_config._original_handlers["bench.command"] = handle_bench
+        command_config._ensure_runtime_cache_loaded()
+        with command_config._registry_lock:
+            command_config._alias_table = {alias: "bench.command" for alias in aliases}
+            command_config._alias_table_version += 1
+        command_config.register_alias_matchers()
+
+    miss_us = await _measure(bot, "今天天气不错", messages, seconds)
+    hit_text = f"{aliases[-1]} 参数" if aliases else "基准命令 参数"
+    hits = 0
+    hit_us = await _measure(bot, hit_text, messages, seconds)
+    print(
+        f"{mode:<8} 别名 {alias_count:>5}：普通消息 {miss_us / 1000:8.2f} ms/条，"
+        f"命令消息 {hit_us / 1000:8.2f} ms/条（handler 执行 {hits} 次）"
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    import nonebot
+    from nonebot.adapters.onebot.v11 import Adapter, Bot
+
+    bot = Bot(Adapter(nonebot.get_driver()), "10000")
+    for alias_count in args.aliases:
+        for mode in ("legacy", "dispatch"):
+            await _run_scenario(bot, mode, alias_count, args.messages, args.seconds)
+
+
+def main() -> None:
+    args = parse_args()
+    os.environ["NEXTBOT_DATA_DIR"] = tempfile.mkdtemp(prefix="nextbot-bench-")
+    sys.path.insert(0, str(REPO_ROOT))
+
+    import nonebot
+    from nonebot.log import logger
+
+    nonebot.init(command_start=["/", ""])
+    from nextbot import db
+
+    db.init_db()
+    # handle_event 每处理一条消息都会打日志，会淹没匹配本身的开销
+    logger.remove()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
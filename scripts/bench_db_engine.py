@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""对比「每次调用新建 engine」「进程级共享 engine」与「批量计数落库」的命令吞吐。
+
+在临时目录中生成一个合成数据库，模拟一次聊天命令的数据库开销：
+命令计数 UPSERT + 按 QQ 读取 User + 关闭会话。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="数据库 engine 复用基准测试")
+    parser.add_argument("--users", type=int, default=2000, help="合成用户数量")
+    parser.add_argument("--commands", type=int, default=2000, help="每种模式执行的命令次数")
+    return parser.parse_args()
+
+
+def _run(label: str, commands: int, step: Callable[[int], None]) -> float:
+    started = time.perf_counter()
+    for index in range(commands):
+        step(index)
+    elapsed = time.perf_counter() - started
+    rate = commands / elapsed if elapsed > 0 else 0.0
+    print(f"{label}: {commands} 次命令，耗时 {elapsed:.3f}s，{rate:.1f} 命令/秒")
+    return rate
+
+
+def main() -> None:
+    args = parse_args()
+    data_dir = Path(tempfile.mkdtemp(prefix="nextbot-bench-"))
+    os.environ["NEXTBOT_DATA_DIR"] = str(data_dir)
+    sys.path.insert(0, str(REPO_ROOT))
+
+    from sqlalchemy import update
+    from sqlalchemy.engine import Engine, create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from nextbot import db
+    from nextbot.stats import flush_stats, increment_stat
+
+    db.init_db()
+    session = db.get_session()
+    try:
+        session.add_all(
+            db.User(user_id=str(10000 + index), name=f"player{index}")
+            for index in range(args.users)
+        )
+        session.commit()
+    finally:
+        session.close()
+
+    def legacy_engine() -> Engine:
+        # Mirrors the pre-shared-engine get_engine(): a fresh engine per call.
+        return create_engine(
+            db.DATABASE_URL,
+            future=True,
+            connect_args={"check_same_thread": False},
+        )
+
+    def legacy_step(index: int) -> None:
+        with legacy_engine().begin() as connection:
+            connection.execute(
+                update(db.SystemStat)
+                .where(db.SystemStat.stat_key == db.STAT_COMMAND_EXECUTE_TOTAL)
+                .values(stat_value=db.SystemStat.stat_value + 1)
+            )
+        legacy_session = sessionmaker(bind=legacy_engine())()
+        try:
+            legacy_session.query(db.User).filter(
+                db.User.user_id == str(10000 + index % args.users)
+            ).first()
+        finally:
+            legacy_session.close()
+
+    def shared_step(index: int) -> None:
+        # 每条命令立即落库，等价于批量计数之前的逐条 UPSERT
+        increment_stat(db.STAT_COMMAND_EXECUTE_TOTAL, 1)
+        flush_stats()
+        read_user(index)
+
+    def batched_step(index: int) -> None:
+        increment_stat(db.STAT_COMMAND_EXECUTE_TOTAL, 1)
+        read_user(index)
+
+    def read_user(index: int) -> None:
+        shared_session = db.get_session()
+        try:
+            shared_session.query(db.User).filter(
+                db.User.user_id == str(10000 + index % args.users)
+            ).first()
+        finally:
+            shared_session.close()
+
+    print(f"合成数据库：{db.DB_PATH}（{args.users} 个用户）")
+    before = _run("每次新建 engine", args.commands, legacy_step)
+    after = _run("共享 engine", args.commands, shared_step)
+    batched = _run("共享 engine + 批量计数", args.commands, batched_step)
+    flush_stats()
+    if before > 0:
+        print(f"提升：共享 engine {after / before:.2f}x，批量计数 {batched / before:.2f}x")
+    db.dispose_engine()
+
+
+if __name__ == "__main__":
+    main()
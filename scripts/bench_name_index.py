@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""对比按名称解析 QQ 时「SQL lower(name) 查询」与「内存名称索引」的耗时。
+
+在临时目录中生成指定数量的用户，先测 SQL 查询（走 ix_user_name_lower 索引），
+再测内存索引的构建耗时与单次查找耗时。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="用户名称索引基准测试")
+    parser.add_argument("--users", type=int, default=100_000, help="合成用户数量")
+    parser.add_argument("--lookups", type=int, default=5000, help="每种方式的查找次数")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    os.environ["NEXTBOT_DATA_DIR"] = tempfile.mkdtemp(prefix="nextbot-bench-")
+    sys.path.insert(0, str(REPO_ROOT))
+
+    from nextbot import db, user_cache
+
+    db.init_db()
+    with db.get_engine().begin() as conn:
+        conn.execute(
+            db.User.__table__.insert(),
+            [
+                {"user_id": str(10000 + index), "name": f"Player{index}"}
+                for index in range(args.users)
+            ],
+        )
+        conn.exec_driver_sql("ANALYZE")
+
+    rng = random.Random(20240101)
+    tokens = [f"player{rng.randrange(args.users)}" for _ in range(args.lookups)]
+
+    session = db.get_session()
+    try:
+        started = time.perf_counter()
+        for token in tokens:
+            user_cache._lower_name_query(session, token).limit(2).all()
+        sql_elapsed = time.perf_counter() - started
+    finally:
+        session.close()
+
+    started = time.perf_counter()
+    user_cache.load_user_ids_by_name(tokens[0])
+    build_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for token in tokens:
+        loaded, _ = user_cache.get_cached_user_ids_by_name(token)
+        assert loaded
+    index_elapsed = time.perf_counter() - started
+
+    print(f"用户数 {args.users}，查找 {args.lookups} 次")
+    print(f"SQL lower(name) 查询：{sql_elapsed / args.lookups * 1_000_000:8.1f} µs/次")
+    print(f"内存索引查找：      {index_elapsed / args.lookups * 1_000_000:8.1f} µs/次")
+    print(f"内存索引首次构建：  {build_elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""对比「每次截图临时启动 Chromium」「常驻浏览器池」与「浏览器池 + set_content」的截图延迟。
+
+在临时目录中生成一个本地 HTML 页面，分别用三种方式截图若干次，
+输出平均值 / p50 / p95 / 最大值。需要已执行 playwright install chromium。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_SAMPLE_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><style>
+body { font-family: sans-serif; margin: 24px; }
+.row { display: flex; gap: 12px; padding: 8px 0; border-bottom: 1px solid #ddd; }
+</style></head><body>
+<h1>截图基准</h1>
+{rows}
+</body></html>
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="截图延迟基准测试")
+    parser.add_argument("--shots", type=int, default=20, help="每种方式的截图次数")
+    parser.add_argument("--concurrency", type=int, default=1, help="浏览器池模式下的并发截图数")
+    return parser.parse_args()
+
+
+def _summary(label: str, samples: list[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label}: 平均 {statistics.mean(ordered):7.1f} ms，"
+        f"p50 {statistics.median(ordered):7.1f} ms，p95 {p95:7.1f} ms，最大 {ordered[-1]:7.1f} ms"
+    )
+
+
+async def _timed(step: Callable[[], Awaitable[None]]) -> float:
+    started = time.perf_counter()
+    await step()
+    return (time.perf_counter() - started) * 1000
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from server import screenshot
+
+    work_dir = Path(tempfile.mkdtemp(prefix="nextbot-bench-"))
+    page_path = work_dir / "page.html"
+    rows = "\n".join(
+        f'<div class="row"><b>#{index}</b><span>玩家 {index}</span></div>' for index in range(50)
+    )
+    page_path.write_text(_SAMPLE_HTML.replace("{rows}", rows), encoding="utf-8")
+    url = page_path.as_uri()
+    options = screenshot.ScreenshotOptions(
+        viewport_width=1000, viewport_height=800, wait_until="load"
+    )
+    output_path = work_dir / "shot.png"
+
+    once_samples = [
+        await _timed(
+            lambda: screenshot._screenshot_once(screenshot._url_loader(url), output_path, options)
+        )
+        for _ in range(args.shots)
+    ]
+    _summary("每次启动 Chromium", once_samples)
+
+    started = time.perf_counter()
+    await screenshot.start_browser_pool()
+    print(f"浏览器池启动耗时：{(time.perf_counter() - started) * 1000:.1f} ms")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def pooled_shot(index: int) -> float:
+        async with semaphore:
+            return await _timed(
+                lambda: screenshot.screenshot_url(
+                    url, work_dir / f"pool-{index}.png", options=options
+                )
+            )
+
+    pooled_samples = await asyncio.gather(*(pooled_shot(index) for index in range(args.shots)))
+    _summary(f"浏览器池（并发 {args.concurrency}）", list(pooled_samples))
+
+    html = page_path.read_text(encoding="utf-8")
+
+    async def direct_shot() -> float:
+        async with semaphore:
+            return await _timed(lambda: screenshot.screenshot_html(html, options=options))
+
+    direct_samples = await asyncio.gather(*(direct_shot() for _ in range(args.shots)))
+    _summary(f"浏览器池 + set_content（并发 {args.concurrency}）", list(direct_samples))
+    await screenshot.stop_browser_pool()
+
+
+def main() -> None:
+    args = parse_args()
+    sys.path.insert(0, str(REPO_ROOT))
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""构建渲染模板使用的本地静态资源。
+
+1. 用 Tailwind CSS standalone CLI 扫描 server/templates，编译出压缩、按需裁剪的
+   server/assets/css/render.css；
+2. 指定 --inter-font 时，把 Inter 可变字体裁剪为拉丁字符子集并输出
+   server/assets/fonts/inter-latin.woff2；
+3. 指定 --item-atlas 时，把 server/assets/items 下的物品图标打包为几张 WebP 图集，
+   连同坐标表 items.json 输出到 server/assets/sprites。
+
+修改模板中的 Tailwind 类名或物品图标后需要重新执行本脚本并提交生成的文件。
+依赖（仅构建时需要）：uv pip install tailwindcss-bin "fonttools[woff]" pillow
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ASSETS_DIR = REPO_ROOT / "server" / "assets"
+CSS_SOURCE = ASSETS_DIR / "css" / "render.src.css"
+CSS_OUTPUT = ASSETS_DIR / "css" / "render.css"
+FONT_OUTPUT = ASSETS_DIR / "fonts" / "inter-latin.woff2"
+ITEMS_DIR = ASSETS_DIR / "items"
+SPRITES_DIR = ASSETS_DIR / "sprites"
+ATLAS_MAP_OUTPUT = SPRITES_DIR / "items.json"
+
+_ITEM_FILE_PATTERN = re.compile(r"^Item_(\d+)\.png$")
+# 单张图集最多 32x32 格；格子过多的大图集会让只用到少量物品的页面也要解码整张图
+_ATLAS_COLUMNS = 32
+_ATLAS_MAX_ROWS = 32
+
+# 与 render.src.css 中 @font-face 的 unicode-range 保持一致
+_LATIN_UNICODES = (
+    "U+0000-00FF,U+0131,U+0152-0153,U+02BB-02BC,U+02C6,U+02DA,U+02DC,"
+    "U+2000-206F,U+2074,U+20AC,U+2122,U+2191,U+2193,U+2212,U+2215,U+FEFF,U+FFFD"
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="构建渲染模板的 CSS 与字体")
+    parser.add_argument(
+        "--tailwind",
+        default="tailwindcss",
+        help="Tailwind CSS v4 standalone CLI 的路径或命令名",
+    )
+    parser.add_argument(
+        "--inter-font",
+        type=Path,
+        help="Inter 可变字体文件（TTF / WOFF2），不指定则跳过字体构建",
+    )
+    parser.add_argument(
+        "--item-atlas",
+        action="store_true",
+        help="重新打包物品图标图集（WebP 无损压缩较慢，约需一分钟）",
+    )
+    return parser.parse_args()
+
+
+def build_css(tailwind: str) -> None:
+    executable = shutil.which(tailwind)
+    if executable is None:
+        sys.exit(f"找不到 Tailwind CLI：{tailwind}，请先执行 uv pip install tailwindcss-bin")
+    subprocess.run(
+        [executable, "-i", str(CSS_SOURCE), "-o", str(CSS_OUTPUT), "--minify"],
+        cwd=REPO_ROOT,
+        check=True,
+    )
+    print(f"已生成 {CSS_OUTPUT.relative_to(REPO_ROOT)}（{CSS_OUTPUT.stat().st_size} 字节）")
+
+
+def build_font(source: Path) -> None:
+    try:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+        from fontTools.varLib import instancer
+    except ImportError:
+        sys.exit('缺少 fontTools，请先执行 uv pip install "fonttools[woff]"')
+
+    font = TTFont(str(source))
+    # 先裁剪字符集再固定可变轴，字形更少，实例化也更快
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=subset.parse_unicodes(_LATIN_UNICODES))
+    subsetter.subset(font)
+
+    if "fvar" in font:
+        axes = {axis.axisTag for axis in font["fvar"].axes}
+        limits: dict[str, object] = {}
+        if "wght" in axes:
+            limits["wght"] = (400, 900)
+        if "slnt" in axes:
+            limits["slnt"] = 0
+        if "opsz" in axes:
+            limits["opsz"] = None
+        font = instancer.instantiateVariableFont(font, limits)
+
+    FONT_OUTPUT.parent.mkdir(parents=True, exist_ok=True)
+    font.flavor = "woff2"
+    font.save(str(FONT_OUTPUT))
+    print(f"已生成 {FONT_OUTPUT.relative_to(REPO_ROOT)}（{FONT_OUTPUT.stat().st_size} 字节）")
+
+
+def build_item_atlas() -> None:
+    try:
+        from PIL import Image
+    except ImportError:
+        sys.exit("缺少 Pillow，请先执行 uv pip install pillow")
+
+    item_files: dict[int, Path] = {}
+    for path in ITEMS_DIR.iterdir():
+        match = _ITEM_FILE_PATTERN.match(path.name)
+        if match is not None:
+            item_files[int(match.group(1))] = path
+    if not item_files:
+        sys.exit(f"没有找到物品图标：{ITEMS_DIR}")
+
+    images = {item_id: Image.open(path).convert("RGBA") for item_id, path in item_files.items()}
+    cell = max(max(image.size) for image in images.values())
+    item_ids = sorted(images)
+    # 物品按 ID 顺序均分到各张图集，避免最后一张只有寥寥几格
+    sheet_count = math.ceil(len(item_ids) / (_ATLAS_COLUMNS * _ATLAS_MAX_ROWS))
+    per_sheet = math.ceil(len(item_ids) / sheet_count)
+
+    SPRITES_DIR.mkdir(parents=True, exist_ok=True)
+    for old_sheet in SPRITES_DIR.glob("items-*.webp"):
+        old_sheet.unlink()
+
+    sheets: list[dict[str, object]] = []
+    items: dict[str, list[int]] = {}
+    for sheet_index in range(sheet_count):
+        sheet_ids = item_ids[sheet_index * per_sheet:(sheet_index + 1) * per_sheet]
+        width = _ATLAS_COLUMNS * cell
+        height = math.ceil(len(sheet_ids) / _ATLAS_COLUMNS) * cell
+        sheet = Image.new("RGBA", (width, height))
+        for position, item_id in enumerate(sheet_ids):
+            image = images[item_id]
+            x = position % _ATLAS_COLUMNS * cell
+            y = position // _ATLAS_COLUMNS * cell
+            # 小于格子的图标居中放置，与原先 object-fit: contain 的效果一致
+            sheet.paste(image, (x + (cell - image.width) // 2, y + (cell - image.height) // 2))
+            items[str(item_id)] = [sheet_index, x, y]
+
+        buffer = io.BytesIO()
+        sheet.save(buffer, "WEBP", lossless=True, quality=100, method=6)
+        body = buffer.getvalue()
+        # 文件名带内容摘要，坐标表和图集更新后浏览器缓存不会错配
+        file_name = f"items-{sheet_index}.{hashlib.sha256(body).hexdigest()[:10]}.webp"
+        (SPRITES_DIR / file_name).write_bytes(body)
+        sheets.append({"file": file_name, "width": width, "height": height})
+        print(f"已生成 {file_name}（{len(sheet_ids)} 个物品，{len(body)} 字节）")
+
+    atlas = {"cell": cell, "sheets": sheets, "items": items}
+    ATLAS_MAP_OUTPUT.write_text(
+        json.dumps(atlas, ensure_ascii=False, separators=(",", ":")), encoding="utf-8"
+    )
+    print(
+        f"已生成 {ATLAS_MAP_OUTPUT.relative_to(REPO_ROOT)}"
+        f"（{len(items)} 个物品，{ATLAS_MAP_OUTPUT.stat().st_size} 字节）"
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    build_css(args.tailwind)
+    if args.inter_font is not None:
+        build_font(args.inter_font)
+    if args.item_atlas:
+        build_item_atlas()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""对热点查询执行 EXPLAIN QUERY PLAN，热点表上出现 SCAN 时以非零状态退出。
+
+在临时目录中按迁移建库并写入合成数据，逐条检查 _hot_queries 中登记的查询。
+查询直接取自插件里的查询构造函数，不手抄 SQL；新增热点查询时先把查询提成
+构造函数，再在这里登记并运行一次。确实需要按索引顺序扫描的，登记到 ALLOWED_SCANS。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+HOT_TABLES = frozenset({"user", "user_sign_record", "red_packet"})
+# 查询名称 -> 允许出现的 SCAN 明细；只有按索引有序读取并配合 LIMIT 提前结束的才登记
+ALLOWED_SCANS: dict[str, frozenset[str]] = {
+    "金币排行榜分页": frozenset({"SCAN user USING INDEX ix_user_coins"}),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="热点查询执行计划检查")
+    parser.add_argument("--users", type=int, default=5000, help="合成用户数量")
+    parser.add_argument("--days", type=int, default=30, help="合成签到记录覆盖的天数")
+    parser.add_argument("--packets", type=int, default=2000, help="合成红包数量")
+    return parser.parse_args()
+
+
+def _seed(db: Any, *, users: int, days: int, packets: int) -> None:
+    rng = random.Random(20240101)
+    today = datetime(2024, 6, 1, 8, 0, 0)
+    session = db.get_session()
+    try:
+        session.add_all(
+            db.User(
+                user_id=str(10000 + index),
+                name=f"Player{index}",
+                coins=rng.randint(0, 100000),
+            )
+            for index in range(users)
+        )
+        session.add_all(
+            db.UserSignRecord(
+                user_id=str(10000 + index),
+                sign_date=(today - timedelta(days=day)).strftime("%Y-%m-%d"),
+                created_at=today - timedelta(days=day, seconds=-index),
+            )
+            for day in range(days)
+            for index in range(0, users, 3)
+        )
+        session.add_all(
+            db.RedPacket(
+                name=f"packet{index}",
+                sender_user_id=str(10000 + rng.randrange(users)),
+                type="random",
+                total_amount=100,
+                total_count=10,
+                remaining_amount=100,
+                remaining_count=10,
+                status="active" if index % 20 == 0 else "exhausted",
+            )
+            for index in range(packets)
+        )
+        session.commit()
+    finally:
+        session.close()
+    with db.get_engine().begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _hot_queries() -> dict[str, Callable[[Any], Any]]:
+    from nextbot import user_cache
+    from nextbot.plugins import leaderboard, red_packet, user_manager
+
+    today = "2024-06-01"
+    user_id = "10003"
+
+    return {
+        "金币排行榜分页": lambda s: leaderboard._coins_page_query(s, 20, 10),
+        "金币排行榜自身排名": lambda s: _as_count(
+            leaderboard._coins_above_query(s, 5000)
+        ),
+        "今日签到人数": lambda s: _as_count(leaderboard._signin_today_query(s, today)),
+        "今日签到榜分页": lambda s: leaderboard._signin_today_page_query(
+            s, today, 10, 10
+        ),
+        "今日签到榜自身记录": lambda s: leaderboard._signin_today_caller_query(
+            s, today, user_id
+        ),
+        "今日签到榜自身排名": lambda s: _as_count(
+            leaderboard._signin_today_before_query(
+                s, today, datetime(2024, 6, 1, 9, 0, 0)
+            )
+        ),
+        "用户签到日历": lambda s: user_manager._sign_dates_query(s, user_id, 30),
+        "我发出的红包总数": lambda s: _as_count(
+            red_packet._own_packets_query(s, user_id)
+        ),
+        "我发出的红包": lambda s: red_packet._own_packets_page_query(s, user_id, 0, 10),
+        "进行中的红包总数": lambda s: _as_count(red_packet._active_packets_query(s)),
+        "进行中的红包": lambda s: red_packet._active_packets_page_query(s, 0, 10),
+        "按名字查库": lambda s: user_cache._lower_name_query(s, "PLAYER42"),
+    }
+
+
+def _as_count(query: Any) -> Any:
+    # 与 Query.count() 实际执行的语句一致
+    from sqlalchemy import func, select
+
+    return select(func.count()).select_from(query.subquery())
+
+
+def _explain(session: Any, query: Any) -> list[str]:
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(dialect=session.get_bind().dialect)
+    params = tuple(compiled.params[key] for key in compiled.positiontup or ())
+    rows = session.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {compiled}", params
+    ).fetchall()
+    return [str(row[-1]) for row in rows]
+
+
+def _scanned_table(detail: str) -> str | None:
+    # SQLite 3.36+ 输出 "SCAN user"，更早的版本输出 "SCAN TABLE user"；
+    # "SCAN user USING INDEX ..." 同样是逐行扫描，只是按索引顺序读取
+    if not detail.startswith("SCAN "):
+        return None
+    parts = detail.split()[1:]
+    if parts[:1] == ["TABLE"]:
+        parts = parts[1:]
+    return parts[0] if parts else None
+
+
+def _disallowed_scans(label: str, details: list[str]) -> list[str]:
+    allowed = ALLOWED_SCANS.get(label, frozenset())
+    return [
+        detail
+        for detail in details
+        if _scanned_table(detail) in HOT_TABLES
+        and detail.replace("SCAN TABLE ", "SCAN ", 1) not in allowed
+    ]
+
+
+def main() -> int:
+    args = parse_args()
+    data_dir = Path(tempfile.mkdtemp(prefix="nextbot-plan-"))
+    os.environ["NEXTBOT_DATA_DIR"] = str(data_dir)
+    sys.path.insert(0, str(REPO_ROOT))
+
+    import nonebot
+
+    nonebot.init()
+    from nextbot import db
+
+    db.init_db()
+    _seed(db, users=args.users, days=args.days, packets=args.packets)
+
+    failures: list[str] = []
+    session = db.get_session()
+    try:
+        for label, build in _hot_queries().items():
+            details = _explain(session, build(session))
+            scans = _disallowed_scans(label, details)
+            status = "FAIL" if scans else "OK"
+            print(f"[{status}] {label}")
+            for detail in details:
+                print(f"       {detail}")
+            if scans:
+                failures.append(label)
+    finally:
+        session.close()
+
+    if failures:
+        print(f"\n{len(failures)} 条热点查询出现未登记的扫描：{'，'.join(failures)}")
+        return 1
+    print("\n所有热点查询均命中索引")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
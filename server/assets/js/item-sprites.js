@@ -0,0 +1,71 @@
+// 物品图标精灵图：scripts/build_render_assets.py 把 server/assets/items 打包为几张图集，
+// 坐标表为 /assets/sprites/items.json。图标用 background-position 从图集中截取，
+// 整页只需请求坐标表和用到的几张图集；坐标表中没有的物品退回单独的 PNG。
+(() => {
+  const ATLAS_URL = "/assets/sprites/items.json";
+  const SPRITES_BASE = "/assets/sprites/";
+  const ITEMS_BASE = "/assets/items/";
+  const ignoreError = () => {};
+  const imageLoads = new Map();
+  let atlasPromise = null;
+
+  const loadAtlas = () => {
+    if (!atlasPromise) {
+      atlasPromise = fetch(ATLAS_URL)
+        .then((resp) => (resp.ok ? resp.json() : null))
+        .catch(() => null);
+    }
+    return atlasPromise;
+  };
+
+  // 预先加载并解码用到的图片，渲染页据此判断图标已经可以截图
+  const loadImage = (url) => {
+    let loading = imageLoads.get(url);
+    if (!loading) {
+      const img = new Image();
+      img.src = url;
+      loading = img.decode().catch(ignoreError);
+      imageLoads.set(url, loading);
+    }
+    return loading;
+  };
+
+  // 背景定位用百分比，图标元素是任意尺寸的正方形都能正确截取
+  const percent = (offset, total, cell) => (total > cell ? (offset / (total - cell)) * 100 : 0);
+
+  const paint = (el, itemId, atlas) => {
+    const sprite = atlas && atlas.items ? atlas.items[itemId] : undefined;
+    const sheet = sprite ? atlas.sheets[sprite[0]] : undefined;
+    if (!sheet) {
+      const url = `${ITEMS_BASE}Item_${itemId}.png`;
+      el.style.backgroundImage = `url("${url}")`;
+      el.style.backgroundSize = "contain";
+      el.style.backgroundPosition = "center";
+      return loadImage(url);
+    }
+    const cell = atlas.cell;
+    const url = SPRITES_BASE + sheet.file;
+    el.style.backgroundImage = `url("${url}")`;
+    el.style.backgroundSize = `${(sheet.width / cell) * 100}% ${(sheet.height / cell) * 100}%`;
+    el.style.backgroundPosition = `${percent(sprite[1], sheet.width, cell)}% ${percent(sprite[2], sheet.height, cell)}%`;
+    return loadImage(url);
+  };
+
+  // 创建物品图标元素，用法同 <img>：调用方设置尺寸，内边距内的区域绘制图标
+  const create = (itemId) => {
+    const el = document.createElement("div");
+    el.className = "item-sprite";
+    el.setAttribute("role", "img");
+    el.setAttribute("aria-label", `Item ${itemId}`);
+    el.style.backgroundRepeat = "no-repeat";
+    el.style.backgroundOrigin = "content-box";
+    el.style.backgroundClip = "content-box";
+    el.style.imageRendering = "pixelated";
+    const painted = loadAtlas().then((atlas) => paint(el, Number(itemId), atlas));
+    if (window.NextBotRender) window.NextBotRender.waitFor(painted);
+    return el;
+  };
+
+  loadAtlas();
+  window.NextBotItemSprites = { create };
+})();
@@ -0,0 +1,41 @@
+// 渲染页就绪信号：页面绑定完数据后调用 NextBotRender.markReady()，
+// 等字体、页面内所有图片以及经 waitFor 登记的异步任务完成后置 window.__NEXTBOT_READY__ = true，
+// 截图程序据此开始截图。
+(() => {
+  const ignoreError = () => {};
+  const pending = [];
+
+  // 其他脚本（如物品精灵图）登记的异步任务，markReady 时一并等待
+  const waitFor = (task) => {
+    pending.push(Promise.resolve(task).catch(ignoreError));
+  };
+
+  const waitImage = (img) => {
+    // 截图需要整页内容，懒加载的图片改为立即加载
+    if (img.loading === "lazy") img.loading = "eager";
+    const loaded = img.complete
+      ? Promise.resolve()
+      : new Promise((resolve) => {
+        img.addEventListener("load", resolve, { once: true });
+        img.addEventListener("error", resolve, { once: true });
+      });
+    return loaded.then(() => (img.decode ? img.decode().catch(ignoreError) : undefined));
+  };
+
+  const nextFrame = () => new Promise((resolve) => requestAnimationFrame(() => resolve()));
+
+  const markReady = () => {
+    const fontsReady = document.fonts && document.fonts.ready ? document.fonts.ready : Promise.resolve();
+    // 先等一帧，让刚插入的节点完成样式计算，再收集图片
+    nextFrame()
+      .then(() => Promise.all([fontsReady, ...pending, ...Array.from(document.images, waitImage)]))
+      .catch(ignoreError)
+      .then(nextFrame)
+      .then(() => {
+        window.__NEXTBOT_READY__ = true;
+      });
+  };
+
+  window.__NEXTBOT_READY__ = false;
+  window.NextBotRender = { markReady, waitFor };
+})();
@@ -4,6 +4,8 @@ import html
 from pathlib import Path
 from typing import Literal
 
+from server.template_registry import is_dev_mode, load_template, read_template
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 WEBUI_TEMPLATE_DIR = BASE_DIR / "webui" / "templates"
 WEBUI_STATIC_DIR = BASE_DIR / "webui" / "static"
@@ -21,18 +23,57 @@ AppShellMenu = Literal[
 ]
 
 
-def _load_template(name: str) -> str:
-    path = WEBUI_TEMPLATE_DIR / name
-    return path.read_text(encoding="utf-8")
+_APP_SHELL_PLACEHOLDERS = (
+    "__PAGE_TITLE__",
+    "__HEADER_TITLE__",
+    "__PAGE_STYLE_LINKS__",
+    "__NAV_DASHBOARD_ACTIVE__",
+    "__NAV_COMMANDS_ACTIVE__",
+    "__NAV_SERVERS_ACTIVE__",
+    "__NAV_USERS_ACTIVE__",
+    "__NAV_GROUPS_ACTIVE__",
+    "__NAV_WAREHOUSE_ACTIVE__",
+    "__NAV_SHOP_ACTIVE__",
+    "__NAV_LOTTERY_ACTIVE__",
+    "__NAV_SETTINGS_ACTIVE__",
+    "__MAIN_CONTENT__",
+    "__WEBUI_SCRIPT_URL__",
+    "__WEBUI_API_SCRIPT_URL__",
+    "__PAGE_SCRIPT_TAGS__",
+)
+_LOGIN_PLACEHOLDERS = ("__NEXT_PATH__", "__WEBUI_API_SCRIPT_URL__")
+_NAV_PLACEHOLDERS: dict[str, str] = {
+    "dashboard": "__NAV_DASHBOARD_ACTIVE__",
+    "commands": "__NAV_COMMANDS_ACTIVE__",
+    "servers": "__NAV_SERVERS_ACTIVE__",
+    "users": "__NAV_USERS_ACTIVE__",
+    "groups": "__NAV_GROUPS_ACTIVE__",
+    "warehouse": "__NAV_WAREHOUSE_ACTIVE__",
+    "shop": "__NAV_SHOP_ACTIVE__",
+    "lottery": "__NAV_LOTTERY_ACTIVE__",
+    "settings": "__NAV_SETTINGS_ACTIVE__",
+}
+
+# 生产环境下静态文件的版本号只在首次引用时计算
+_asset_urls: dict[str, str] = {}
 
 
 def _asset_url(path: str) -> str:
     normalized = path.lstrip("/")
+    dev_mode = is_dev_mode()
+    if not dev_mode:
+        cached = _asset_urls.get(normalized)
+        if cached is not None:
+            return cached
     file_path = WEBUI_STATIC_DIR / normalized
     if file_path.is_file():
         version = str(int(file_path.stat().st_mtime))
-        return f"/webui/static/{normalized}?v={version}"
-    return f"/webui/static/{normalized}"
+        url = f"/webui/static/{normalized}?v={version}"
+    else:
+        url = f"/webui/static/{normalized}"
+    if not dev_mode:
+        _asset_urls[normalized] = url
+    return url
 
 
 def _render_app_shell_page(  # noqa: PLR0913
@@ -44,8 +85,10 @@ def _render_app_shell_page(  # noqa: PLR0913
     page_style_urls: tuple[str, ...] = (),
     page_script_urls: tuple[str, ...] = (),
 ) -> str:
-    base_template = _load_template("app_shell_base.html")
-    content_html = _load_template(content_template)
+    base_template = load_template(
+        WEBUI_TEMPLATE_DIR / "app_shell_base.html", _APP_SHELL_PLACEHOLDERS
+    )
+    content_html = read_template(WEBUI_TEMPLATE_DIR / content_template)
     style_links_html = "\n  ".join(
         f'<link rel="stylesheet" href="{html.escape(url, quote=True)}" />'
         for url in page_style_urls
@@ -54,51 +97,29 @@ def _render_app_shell_page(  # noqa: PLR0913
         f'<script src="{html.escape(url, quote=True)}"></script>'
         for url in page_script_urls
     )
-    dashboard_active = "is-active" if active_menu == "dashboard" else ""
-    commands_active = "is-active" if active_menu == "commands" else ""
-    servers_active = "is-active" if active_menu == "servers" else ""
-    users_active = "is-active" if active_menu == "users" else ""
-    groups_active = "is-active" if active_menu == "groups" else ""
-    warehouse_active = "is-active" if active_menu == "warehouse" else ""
-    shop_active = "is-active" if active_menu == "shop" else ""
-    lottery_active = "is-active" if active_menu == "lottery" else ""
-    settings_active = "is-active" if active_menu == "settings" else ""
-
-    return (
-        base_template.replace("__PAGE_TITLE__", html.escape(page_title))
-        .replace("__HEADER_TITLE__", html.escape(header_title))
-        .replace("__PAGE_STYLE_LINKS__", style_links_html)
-        .replace("__NAV_DASHBOARD_ACTIVE__", dashboard_active)
-        .replace("__NAV_COMMANDS_ACTIVE__", commands_active)
-        .replace("__NAV_SERVERS_ACTIVE__", servers_active)
-        .replace("__NAV_USERS_ACTIVE__", users_active)
-        .replace("__NAV_GROUPS_ACTIVE__", groups_active)
-        .replace("__NAV_WAREHOUSE_ACTIVE__", warehouse_active)
-        .replace("__NAV_SHOP_ACTIVE__", shop_active)
-        .replace("__NAV_LOTTERY_ACTIVE__", lottery_active)
-        .replace("__NAV_SETTINGS_ACTIVE__", settings_active)
-        .replace("__MAIN_CONTENT__", content_html)
-        .replace(
-            "__WEBUI_SCRIPT_URL__",
-            html.escape(_asset_url("js/webui.js"), quote=True),
-        )
-        .replace(
-            "__WEBUI_API_SCRIPT_URL__",
-            html.escape(_asset_url("js/api.js"), quote=True),
-        )
-        .replace("__PAGE_SCRIPT_TAGS__", script_tags_html)
+    values = {placeholder: "" for placeholder in _NAV_PLACEHOLDERS.values()}
+    values[_NAV_PLACEHOLDERS[active_menu]] = "is-active"
+    values.update(
+        {
+            "__PAGE_TITLE__": html.escape(page_title),
+            "__HEADER_TITLE__": html.escape(header_title),
+            "__PAGE_STYLE_LINKS__": style_links_html,
+            "__MAIN_CONTENT__": content_html,
+            "__WEBUI_SCRIPT_URL__": html.escape(_asset_url("js/webui.js"), quote=True),
+            "__WEBUI_API_SCRIPT_URL__": html.escape(_asset_url("js/api.js"), quote=True),
+            "__PAGE_SCRIPT_TAGS__": script_tags_html,
+        }
     )
+    return base_template.render(values)
 
 
 def render_login_page(*, next_path: str) -> str:
-    escaped_next = html.escape(next_path, quote=True)
-    template = _load_template("login.html")
-    return (
-        template.replace("__NEXT_PATH__", escaped_next)
-        .replace(
-            "__WEBUI_API_SCRIPT_URL__",
-            html.escape(_asset_url("js/api.js"), quote=True),
-        )
+    template = load_template(WEBUI_TEMPLATE_DIR / "login.html", _LOGIN_PLACEHOLDERS)
+    return template.render(
+        {
+            "__NEXT_PATH__": html.escape(next_path, quote=True),
+            "__WEBUI_API_SCRIPT_URL__": html.escape(_asset_url("js/api.js"), quote=True),
+        }
     )
 
 
@@ -193,6 +214,8 @@ def render_warehouse_page() -> str:
             _asset_url("css/warehouse.css"),
         ),
         page_script_urls=(
+            "/assets/js/item-sprites.js",
+            _asset_url("js/item-picker.js"),
             _asset_url("js/warehouse.js"),
         ),
     )
@@ -209,6 +232,7 @@ def render_shop_page() -> str:
             _asset_url("css/shop.css"),
         ),
         page_script_urls=(
+            _asset_url("js/item-picker.js"),
             _asset_url("js/shop.js"),
         ),
     )
@@ -225,6 +249,7 @@ def render_lottery_page() -> str:
             _asset_url("css/lottery.css"),
         ),
         page_script_urls=(
+            _asset_url("js/item-picker.js"),
             _asset_url("js/lottery.js"),
         ),
     )
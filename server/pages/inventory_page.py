@@ -4,7 +4,9 @@ import json
 from pathlib import Path
 from typing import Any
 
+from nextbot.item_catalog import item_names_for, prefix_names_for
 from nextbot.time_utils import beijing_now_text
+from server.template_registry import load_template
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TEMPLATE_PATH = BASE_DIR / "server" / "templates" / "inventory.html"
@@ -71,6 +73,7 @@ def build_payload(
     slots: list[dict[str, Any]],
     theme: str = "light",
 ) -> dict[str, Any]:
+    normalized = _normalize_slots(slots)
     return {
         "generated_at": beijing_now_text(),
         "user_id": str(user_id),
@@ -85,13 +88,15 @@ def build_payload(
         "online_time_text": str(online_time_text),
         "show_stats": bool(show_stats),
         "show_index": bool(show_index),
-        "slots": _normalize_slots(slots),
+        "slots": normalized,
+        "item_names": item_names_for({s["net_id"] for s in normalized if s["net_id"] > 0}),
+        "prefix_names": prefix_names_for({s["prefix_id"] for s in normalized if s["net_id"] > 0}),
         "theme": str(theme).strip() if str(theme).strip() in {"dark", "light"} else "light",
     }
 
 
 def render(payload: dict[str, Any]) -> bytes:
-    template = TEMPLATE_PATH.read_text(encoding="utf-8")
+    template = load_template(TEMPLATE_PATH, ("__INVENTORY_DATA_JSON__",))
     data = {
         "user_id": payload.get("user_id", ""),
         "user_name": payload.get("user_name", ""),
@@ -107,8 +112,10 @@ def render(payload: dict[str, Any]) -> bytes:
         "show_stats": bool(payload.get("show_stats", True)),
         "show_index": bool(payload.get("show_index", True)),
         "slots": payload.get("slots", []),
+        "item_names": payload.get("item_names", {}),
+        "prefix_names": payload.get("prefix_names", {}),
         "theme": str(payload.get("theme", "light")),
     }
     data_json = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
-    content = template.replace("__INVENTORY_DATA_JSON__", data_json)
+    content = template.render({"__INVENTORY_DATA_JSON__": data_json})
     return content.encode("utf-8")
@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Any
 
 from nextbot.time_utils import beijing_now_text
+from server.template_registry import load_template
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TEMPLATE_PATH = BASE_DIR / "server" / "templates" / "lottery_list.html"
@@ -51,7 +52,7 @@ def build_payload(
 
 
 def render(payload: dict[str, Any]) -> bytes:
-    template = TEMPLATE_PATH.read_text(encoding="utf-8")
+    template = load_template(TEMPLATE_PATH, ("__LOTTERY_LIST_DATA_JSON__",))
     data = {
         "generated_at": str(payload.get("generated_at", "")),
         "entries": payload.get("entries", []),
@@ -61,5 +62,5 @@ def render(payload: dict[str, Any]) -> bytes:
         "theme": str(payload.get("theme", "light")),
     }
     data_json = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
-    content = template.replace("__LOTTERY_LIST_DATA_JSON__", data_json)
+    content = template.render({"__LOTTERY_LIST_DATA_JSON__": data_json})
     return content.encode("utf-8")
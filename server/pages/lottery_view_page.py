@@ -5,7 +5,9 @@ from pathlib import Path
 from typing import Any
 
 from nextbot.progression import PROGRESSION_KEY_TO_ZH, PROGRESSION_RANK
+from nextbot.item_catalog import item_names_for, prefix_names_for
 from nextbot.time_utils import beijing_now_text
+from server.template_registry import load_template
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TEMPLATE_PATH = BASE_DIR / "server" / "templates" / "lottery_view.html"
@@ -78,6 +80,8 @@ def build_payload(
     theme: str = "light",
 ) -> dict[str, Any]:
     normalized = _normalize_prizes(prizes)
+    # 神秘奖品不显示名称，也不写入渲染数据
+    visible = [p for p in normalized if p["kind"] == "item" and not p["is_mystery"]]
     return {
         "generated_at": beijing_now_text(),
         "pool_id": int(pool_id),
@@ -85,6 +89,8 @@ def build_payload(
         "pool_description": str(pool_description),
         "cost_per_draw": int(cost_per_draw),
         "prizes": normalized,
+        "item_names": item_names_for({p["item_id"] for p in visible}),
+        "prefix_names": prefix_names_for({p["prefix_id"] for p in visible}),
         "miss_probability": max(0.0, min(100.0, float(miss_probability))),
         "page": max(1, int(page)),
         "total_pages": max(1, int(total_pages)),
@@ -94,7 +100,7 @@ def build_payload(
 
 
 def render(payload: dict[str, Any]) -> bytes:
-    template = TEMPLATE_PATH.read_text(encoding="utf-8")
+    template = load_template(TEMPLATE_PATH, ("__LOTTERY_VIEW_DATA_JSON__",))
     data = {
         "generated_at": str(payload.get("generated_at", "")),
         "pool_id": int(payload.get("pool_id", 0)),
@@ -102,6 +108,8 @@ def render(payload: dict[str, Any]) -> bytes:
         "pool_description": str(payload.get("pool_description", "")),
         "cost_per_draw": int(payload.get("cost_per_draw", 0)),
         "prizes": payload.get("prizes", []),
+        "item_names": payload.get("item_names", {}),
+        "prefix_names": payload.get("prefix_names", {}),
         "miss_probability": float(payload.get("miss_probability", 0.0)),
         "page": int(payload.get("page", 1)),
         "total_pages": int(payload.get("total_pages", 1)),
@@ -109,5 +117,5 @@ def render(payload: dict[str, Any]) -> bytes:
         "theme": str(payload.get("theme", "light")),
     }
     data_json = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
-    content = template.replace("__LOTTERY_VIEW_DATA_JSON__", data_json)
+    content = template.render({"__LOTTERY_VIEW_DATA_JSON__": data_json})
     return content.encode("utf-8")
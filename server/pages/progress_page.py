@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Any
 
 from nextbot.time_utils import beijing_now_text
+from server.template_registry import load_template
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TEMPLATE_PATH = BASE_DIR / "server" / "templates" / "progress.html"
@@ -59,7 +60,7 @@ def build_payload(
 
 
 def render(payload: dict[str, Any]) -> bytes:
-    template = TEMPLATE_PATH.read_text(encoding="utf-8")
+    template = load_template(TEMPLATE_PATH, ("__PROGRESS_DATA_JSON__",))
     data = {
         "server_id": payload.get("server_id", ""),
         "server_name": payload.get("server_name", ""),
@@ -70,5 +71,5 @@ def render(payload: dict[str, Any]) -> bytes:
         "theme": str(payload.get("theme", "dark")),
     }
     data_json = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
-    content = template.replace("__PROGRESS_DATA_JSON__", data_json)
+    content = template.render({"__PROGRESS_DATA_JSON__": data_json})
     return content.encode("utf-8")
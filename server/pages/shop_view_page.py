@@ -5,7 +5,9 @@ from pathlib import Path
 from typing import Any
 
 from nextbot.progression import PROGRESSION_KEY_TO_ZH, PROGRESSION_RANK
+from nextbot.item_catalog import item_names_for, prefix_names_for
 from nextbot.time_utils import beijing_now_text
+from server.template_registry import load_template
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TEMPLATE_PATH = BASE_DIR / "server" / "templates" / "shop_view.html"
@@ -75,6 +77,8 @@ def build_payload(
     theme: str = "light",
 ) -> dict[str, Any]:
     normalized = _normalize_items(items)
+    # 神秘商品不显示名称，也不写入渲染数据
+    visible = [it for it in normalized if it["kind"] == "item" and not it["is_mystery"]]
     return {
         "generated_at": beijing_now_text(),
         "shop_id": int(shop_id),
@@ -84,6 +88,8 @@ def build_payload(
         "user_user_name": str(user_user_name),
         "user_coins": int(user_coins),
         "items": normalized,
+        "item_names": item_names_for({it["item_id"] for it in visible}),
+        "prefix_names": prefix_names_for({it["prefix_id"] for it in visible}),
         "page": max(1, int(page)),
         "total_pages": max(1, int(total_pages)),
         "total": max(0, int(total)),
@@ -92,7 +98,7 @@ def build_payload(
 
 
 def render(payload: dict[str, Any]) -> bytes:
-    template = TEMPLATE_PATH.read_text(encoding="utf-8")
+    template = load_template(TEMPLATE_PATH, ("__SHOP_VIEW_DATA_JSON__",))
     data = {
         "generated_at": str(payload.get("generated_at", "")),
         "shop_id": int(payload.get("shop_id", 0)),
@@ -102,11 +108,13 @@ def render(payload: dict[str, Any]) -> bytes:
         "user_user_name": str(payload.get("user_user_name", "")),
         "user_coins": int(payload.get("user_coins", 0)),
         "items": payload.get("items", []),
+        "item_names": payload.get("item_names", {}),
+        "prefix_names": payload.get("prefix_names", {}),
         "page": int(payload.get("page", 1)),
         "total_pages": int(payload.get("total_pages", 1)),
         "total": int(payload.get("total", 0)),
         "theme": str(payload.get("theme", "light")),
     }
     data_json = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
-    content = template.replace("__SHOP_VIEW_DATA_JSON__", data_json)
+    content = template.render({"__SHOP_VIEW_DATA_JSON__": data_json})
     return content.encode("utf-8")
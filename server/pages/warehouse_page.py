@@ -5,7 +5,9 @@ from pathlib import Path
 from typing import Any
 
 from nextbot.progression import PROGRESSION_KEY_TO_ZH, PROGRESSION_RANK
+from nextbot.item_catalog import item_names_for, prefix_names_for
 from nextbot.time_utils import beijing_now_text
+from server.template_registry import load_template
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TEMPLATE_PATH = BASE_DIR / "server" / "templates" / "warehouse.html"
@@ -79,12 +81,14 @@ def build_payload(
         "capacity": WAREHOUSE_CAPACITY,
         "used": used,
         "slots": normalized,
+        "item_names": item_names_for({s["item_id"] for s in normalized if s["item_id"] > 0}),
+        "prefix_names": prefix_names_for({s["prefix_id"] for s in normalized if s["item_id"] > 0}),
         "theme": str(theme).strip() if str(theme).strip() in {"dark", "light"} else "light",
     }
 
 
 def render(payload: dict[str, Any]) -> bytes:
-    template = TEMPLATE_PATH.read_text(encoding="utf-8")
+    template = load_template(TEMPLATE_PATH, ("__WAREHOUSE_DATA_JSON__",))
     data = {
         "generated_at": str(payload.get("generated_at", "")),
         "owner_user_id": str(payload.get("owner_user_id", "")),
@@ -92,8 +96,10 @@ def render(payload: dict[str, Any]) -> bytes:
         "capacity": int(payload.get("capacity", WAREHOUSE_CAPACITY)),
         "used": int(payload.get("used", 0)),
         "slots": payload.get("slots", []),
+        "item_names": payload.get("item_names", {}),
+        "prefix_names": payload.get("prefix_names", {}),
         "theme": str(payload.get("theme", "light")),
     }
     data_json = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
-    content = template.replace("__WAREHOUSE_DATA_JSON__", data_json)
+    content = template.render({"__WAREHOUSE_DATA_JSON__": data_json})
     return content.encode("utf-8")
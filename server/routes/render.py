@@ -10,13 +10,12 @@ from fastapi.responses import FileResponse, Response
 from server.page_store import get_page
 from server.pages import about_page, admin_list_page, ban_list_page, inventory_page, leaderboard_page, lottery_list_page, lottery_result_page, lottery_view_page, menu_page, progress_page, red_packet_all_page, red_packet_own_page, shop_list_page, shop_view_page, tutorial_page, user_info_page, warehouse_page
 
+from server.static_assets import BOSS_IMGS_DIR, CSS_DIR, DICTS_DIR, FONTS_DIR, ITEMS_DIR, JS_DIR, LOGO_FILES, SPRITES_DIR, guess_content_type
+
 router = APIRouter()
 
-SERVER_DIR = Path(__file__).resolve().parent.parent
-ITEMS_DIR = SERVER_DIR / "assets" / "items"
-DICTS_DIR = SERVER_DIR / "assets" / "dicts"
-BOSS_IMGS_DIR = SERVER_DIR / "assets" / "imgs" / "boss"
-LOGOS_DIR = SERVER_DIR.parent / "logos"
+# 样式、字体和图集坐标表的文件名不带版本号，浏览器缓存一小时，重新构建后最迟一小时生效
+_SHARED_ASSET_HEADERS = {"Cache-Control": "public, max-age=3600"}
 
 
 def _render_page(
@@ -150,9 +149,45 @@ async def get_boss_img_asset(file_path: str) -> FileResponse:
     return FileResponse(path=resolved_path)
 
 
+@router.get("/assets/js/{file_path:path}")
+async def get_js_asset(file_path: str) -> FileResponse:
+    resolved_path = _resolve_static_file(JS_DIR, file_path)
+    return FileResponse(path=resolved_path)
+
+
+@router.get("/assets/css/{file_path:path}")
+async def get_css_asset(file_path: str) -> FileResponse:
+    resolved_path = _resolve_static_file(CSS_DIR, file_path)
+    return FileResponse(
+        path=resolved_path,
+        media_type=guess_content_type(resolved_path),
+        headers=_SHARED_ASSET_HEADERS,
+    )
+
+
+@router.get("/assets/fonts/{file_path:path}")
+async def get_font_asset(file_path: str) -> FileResponse:
+    resolved_path = _resolve_static_file(FONTS_DIR, file_path)
+    return FileResponse(
+        path=resolved_path,
+        media_type=guess_content_type(resolved_path),
+        headers=_SHARED_ASSET_HEADERS,
+    )
+
+
+@router.get("/assets/sprites/{file_path:path}")
+async def get_sprite_asset(file_path: str) -> FileResponse:
+    resolved_path = _resolve_static_file(SPRITES_DIR, file_path)
+    return FileResponse(
+        path=resolved_path,
+        media_type=guess_content_type(resolved_path),
+        headers=_SHARED_ASSET_HEADERS,
+    )
+
+
 @router.get("/assets/imgs/logo-light.png")
 async def get_logo_light_asset() -> FileResponse:
-    logo_path = LOGOS_DIR / "logo__white_background_with_black_text.png"
+    logo_path = LOGO_FILES["/assets/imgs/logo-light.png"]
     if not logo_path.is_file():
         raise HTTPException(status_code=404, detail="Logo not found")
     return FileResponse(path=logo_path)
@@ -160,7 +195,7 @@ async def get_logo_light_asset() -> FileResponse:
 
 @router.get("/assets/imgs/logo-dark.png")
 async def get_logo_dark_asset() -> FileResponse:
-    logo_path = LOGOS_DIR / "logo__black_background_with_white_text.png"
+    logo_path = LOGO_FILES["/assets/imgs/logo-dark.png"]
     if not logo_path.is_file():
         raise HTTPException(status_code=404, detail="Logo not found")
     return FileResponse(path=logo_path)
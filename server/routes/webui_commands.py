@@ -12,6 +12,7 @@ from nextbot.command_config import (
     update_command_aliases,
     update_command_config,
 )
+from nextbot.db import run_db
 from server.pages.console_page import render_commands_page
 from server.routes import (
     api_error,
@@ -102,7 +103,7 @@ async def webui_commands_api_update(command_key: str, request: Request) -> JSONR
         )
 
     try:
-        updated_command = update_command_config(command_key, **update_payload)
+        updated_command = await run_db(update_command_config, command_key, **update_payload)
     except CommandConfigValidationError as exc:
         details = exc.errors or []
         status_code = 422
@@ -157,7 +158,7 @@ async def webui_commands_api_update_aliases(command_key: str, request: Request)
         )
 
     try:
-        updated_command = update_command_aliases(command_key, raw_aliases)
+        updated_command = await run_db(update_command_aliases, command_key, raw_aliases)
     except CommandConfigValidationError as exc:
         details = exc.errors or []
         status_code = 422
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from nonebot.log import logger
 
-from nextbot.stats import get_dashboard_metrics
+from nextbot.db import run_db
+from nextbot.stats import get_command_metrics, get_dashboard_metrics
 from server.routes import api_error, api_success
 
 router = APIRouter()
@@ -13,7 +14,7 @@ router = APIRouter()
 @router.get("/webui/api/dashboard")
 async def webui_dashboard_api() -> JSONResponse:
     try:
-        metrics = get_dashboard_metrics()
+        metrics = await run_db(get_dashboard_metrics)
     except Exception as exc:
         logger.exception(f"加载仪表盘失败：reason={exc}")
         return api_error(
@@ -23,3 +24,50 @@ async def webui_dashboard_api() -> JSONResponse:
         )
 
     return api_success(data=metrics)
+
+
+_COMMAND_METRIC_SORT_KEYS = {
+    "invoke_count": "invoke_count",
+    "avg_latency": "avg_latency_ms",
+    "p95_latency": "p95_latency_ms",
+    "max_latency": "max_latency_ms",
+    "error_count": "error_count",
+}
+
+
+@router.get("/webui/api/dashboard/commands")
+async def webui_dashboard_commands_api(request: Request) -> JSONResponse:
+    sort = str(request.query_params.get("sort") or "invoke_count").strip()
+    sort_key = _COMMAND_METRIC_SORT_KEYS.get(sort)
+    if sort_key is None:
+        return api_error(
+            status_code=422,
+            code="validation_error",
+            message="sort 参数不合法",
+            details=[{"field": "sort", "message": "sort 参数不合法"}],
+        )
+    try:
+        limit = int(request.query_params.get("limit") or 20)
+    except ValueError:
+        limit = 20
+    limit = max(1, min(limit, 100))
+
+    try:
+        metrics = await run_db(get_command_metrics)
+    except Exception as exc:
+        logger.exception(f"加载命令执行指标失败：reason={exc}")
+        return api_error(
+            status_code=500,
+            code="internal_error",
+            message="内部错误",
+        )
+
+    # p95 超过最大桶上界时为 None，按最慢处理
+    metrics.sort(
+        key=lambda item: (
+            item[sort_key] if item[sort_key] is not None else float("inf"),
+            item["invoke_count"],
+        ),
+        reverse=True,
+    )
+    return api_success(data=metrics[:limit], meta={"total": len(metrics), "sort": sort})
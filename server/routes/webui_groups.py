@@ -9,7 +9,8 @@ from fastapi.responses import JSONResponse, Response
 from nonebot.log import logger
 from sqlalchemy import func
 
-from nextbot.db import Group, User, get_session
+from nextbot.db import Group, User, db_session
+from nextbot.permissions import invalidate_permission_cache
 from server.routes import (
     api_error,
     api_success,
@@ -201,10 +202,10 @@ async def webui_groups_list(request: Request) -> JSONResponse:
 
     keyword = str(request.query_params.get("q") or "").strip().lower()
 
-    session = get_session()
+    session = db_session()
     try:
-        groups = session.query(Group).order_by(Group.name.asc()).all()
-        user_count_map = _build_user_count_map(session)
+        groups = await session.all(session.query(Group).order_by(Group.name.asc()))
+        user_count_map = await session.run_sync(_build_user_count_map)
         serialized = [
             _serialize_group(item, user_count_map=user_count_map)
             for item in groups
@@ -238,14 +239,14 @@ async def webui_groups_list(request: Request) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.get("/webui/api/groups/options")
 async def webui_groups_options() -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        groups = session.query(Group.name).order_by(Group.name.asc()).all()
+        groups = await session.all(session.query(Group.name).order_by(Group.name.asc()))
         return api_success(data=[str(item[0]) for item in groups if item[0] is not None])
     except Exception as exc:
         logger.exception(f"加载身份组选项失败：reason={exc}")
@@ -255,7 +256,7 @@ async def webui_groups_options() -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/groups")
@@ -270,9 +271,9 @@ async def webui_groups_create(request: Request) -> JSONResponse:
     except GroupPayloadValidationError as exc:
         return _validation_error(exc)
 
-    session = get_session()
+    session = db_session()
     try:
-        exists = session.query(Group).filter(Group.name == validated.name).first()
+        exists = await session.first(session.query(Group).filter(Group.name == validated.name))
         if exists is not None:
             return api_error(
                 status_code=409,
@@ -281,8 +282,8 @@ async def webui_groups_create(request: Request) -> JSONResponse:
                 details=[{"field": "name", "message": "身份组已存在"}],
             )
 
-        _validate_inherits_targets(
-            session,
+        await session.run_sync(
+            _validate_inherits_targets,
             inherits=validated.inherits,
             self_name=validated.name,
         )
@@ -293,9 +294,10 @@ async def webui_groups_create(request: Request) -> JSONResponse:
             inherits=validated.inherits,
         )
         session.add(group)
-        session.commit()
+        await session.commit()
+        invalidate_permission_cache()
 
-        user_count_map = _build_user_count_map(session)
+        user_count_map = await session.run_sync(_build_user_count_map)
         logger.info(f"创建身份组成功：name={group.name}")
         return api_success(
             status_code=201,
@@ -303,10 +305,10 @@ async def webui_groups_create(request: Request) -> JSONResponse:
             headers={"Location": f"/webui/api/groups/{group.name}"},
         )
     except GroupPayloadValidationError as exc:
-        session.rollback()
+        await session.rollback()
         return _validation_error(exc)
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"创建身份组异常：name={validated.name}，reason={exc}")
         return api_error(
             status_code=500,
@@ -314,7 +316,7 @@ async def webui_groups_create(request: Request) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.put("/webui/api/groups/{group_name}")
@@ -324,9 +326,9 @@ async def webui_groups_update(group_name: str, request: Request) -> JSONResponse
         return error_response
     assert payload is not None
 
-    session = get_session()
+    session = db_session()
     try:
-        group = session.query(Group).filter(Group.name == group_name).first()
+        group = await session.first(session.query(Group).filter(Group.name == group_name))
         if group is None:
             logger.warning(f"更新身份组失败：name={group_name}，reason=身份组不存在")
             return api_error(
@@ -344,24 +346,25 @@ async def webui_groups_update(group_name: str, request: Request) -> JSONResponse
         except GroupPayloadValidationError as exc:
             return _validation_error(exc)
 
-        _validate_inherits_targets(
-            session,
+        await session.run_sync(
+            _validate_inherits_targets,
             inherits=validated.inherits,
             self_name=group_name,
         )
 
         group.permissions = validated.permissions
         group.inherits = validated.inherits
-        session.commit()
+        await session.commit()
+        invalidate_permission_cache()
 
-        user_count_map = _build_user_count_map(session)
+        user_count_map = await session.run_sync(_build_user_count_map)
         logger.info(f"更新身份组成功：name={group_name}")
         return api_success(data=_serialize_group(group, user_count_map=user_count_map))
     except GroupPayloadValidationError as exc:
-        session.rollback()
+        await session.rollback()
         return _validation_error(exc)
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"更新身份组异常：name={group_name}，reason={exc}")
         return api_error(
             status_code=500,
@@ -369,7 +372,7 @@ async def webui_groups_update(group_name: str, request: Request) -> JSONResponse
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.delete("/webui/api/groups/{group_name}")
@@ -383,9 +386,9 @@ async def webui_groups_delete(group_name: str) -> JSONResponse:
             details=[{"field": "name", "message": "系统内置身份组不可删除"}],
         )
 
-    session = get_session()
+    session = db_session()
     try:
-        group = session.query(Group).filter(Group.name == group_name).first()
+        group = await session.first(session.query(Group).filter(Group.name == group_name))
         if group is None:
             logger.warning(f"删除身份组失败：name={group_name}，reason=身份组不存在")
             return api_error(
@@ -395,22 +398,24 @@ async def webui_groups_delete(group_name: str) -> JSONResponse:
             )
 
         session.delete(group)
-        session.flush()
+        await session.flush()
 
-        session.query(User).filter(User.group == group_name).update(
+        await session.update(
+            session.query(User).filter(User.group == group_name),
             {User.group: "guest"},
             synchronize_session=False,
         )
 
-        all_groups = session.query(Group).all()
+        all_groups = await session.all(session.query(Group))
         for item in all_groups:
             item.inherits = _remove_inherit(item.inherits, group_name)
 
-        session.commit()
+        await session.commit()
+        invalidate_permission_cache()
         logger.info(f"删除身份组成功：name={group_name}")
         return Response(status_code=204)
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"删除身份组异常：name={group_name}，reason={exc}")
         return api_error(
             status_code=500,
@@ -418,4 +423,4 @@ async def webui_groups_delete(group_name: str) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from nextbot import item_catalog
+from server.routes import api_success
+
+router = APIRouter()
+
+_MAX_SEARCH_LIMIT = 50
+
+
+@router.get("/webui/api/items/search")
+async def search_items(request: Request) -> JSONResponse:
+    keyword = str(request.query_params.get("q") or "").strip()
+    try:
+        limit = int(request.query_params.get("limit") or item_catalog.DEFAULT_SEARCH_LIMIT)
+    except ValueError:
+        limit = item_catalog.DEFAULT_SEARCH_LIMIT
+    limit = max(1, min(limit, _MAX_SEARCH_LIMIT))
+
+    matches = item_catalog.search(keyword, limit)
+    return api_success(
+        data=[{"id": match.item_id, "name": match.name} for match in matches],
+        meta={"q": keyword, "limit": limit},
+    )
@@ -11,9 +11,7 @@ from nonebot.adapters.onebot.v11 import MessageSegment as OBV11MessageSegment
 from nonebot.log import logger
 
 from nextbot.access_control import get_group_ids
-from sqlalchemy import func
-
-from nextbot.db import User, get_session
+from nextbot.user_cache import find_user_ids_by_name
 from server.routes import api_error, api_success, read_json_object
 
 router = APIRouter()
@@ -26,13 +24,9 @@ def _pick_onebot_bot() -> OBV11Bot | None:
     return None
 
 
-def _resolve_user_id_by_name(name: str) -> str | None:
-    session = get_session()
-    try:
-        user = session.query(User).filter(func.lower(User.name) == name.lower()).order_by(User.id.asc()).first()
-        return str(user.user_id) if user is not None else None
-    finally:
-        session.close()
+async def _resolve_user_id_by_name(name: str) -> str | None:
+    user_ids = await find_user_ids_by_name(name)
+    return user_ids[0] if user_ids else None
 
 
 async def _find_user_group(bot: OBV11Bot, user_id: str) -> int | None:
@@ -101,7 +95,7 @@ async def webui_login_requests_create(request: Request) -> JSONResponse:
     new_device = bool(data.get("newDevice", False))
     new_location = bool(data.get("newLocation", False))
 
-    user_id = _resolve_user_id_by_name(name)
+    user_id = await _resolve_user_id_by_name(name)
     if user_id is None:
         logger.warning(f"发送登入确认失败：name={name}，reason=用户不存在")
         return api_error(
@@ -6,7 +6,7 @@ from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from nonebot.log import logger
 
-from nextbot.db import LotteryPool, LotteryPrize, Server, get_session
+from nextbot.db import LotteryPool, LotteryPrize, Server, db_session, get_session, run_db
 from nextbot.progression import PROGRESSION_KEY_TO_ZH, TIER_OPTIONS
 from nextbot.time_utils import beijing_now
 from server.routes import api_error, api_success, read_json_object
@@ -293,33 +293,34 @@ async def list_lottery_tiers(request: Request) -> JSONResponse:
 
 @router.get("/webui/api/lottery/meta/servers")
 async def list_lottery_servers(request: Request) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
         return api_success(
             data=[{"id": int(s.id), "name": str(s.name)} for s in servers],
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.get("/webui/api/lottery")
 async def list_pools(request: Request) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        pools = session.query(LotteryPool).order_by(LotteryPool.sort_order.asc(), LotteryPool.id.asc()).all()
+        pools = await session.all(
+            session.query(LotteryPool).order_by(LotteryPool.sort_order.asc(), LotteryPool.id.asc())
+        )
         counts: dict[int, int] = {}
         if pools:
-            for pid, in (
+            for pid, in await session.all(
                 session.query(LotteryPrize.pool_id)
                 .filter(LotteryPrize.pool_id.in_([p.id for p in pools]))
-                .all()
             ):
                 counts[int(pid)] = counts.get(int(pid), 0) + 1
         data = [_serialize_pool(p, prize_count=counts.get(int(p.id), 0)) for p in pools]
         return api_success(data=data)
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/lottery")
@@ -339,9 +340,11 @@ async def create_pool(request: Request) -> JSONResponse:
             details=[{"field": "name", "message": "名称不能为空"}],
         )
 
-    session = get_session()
+    session = db_session()
     try:
-        existing = session.query(LotteryPool).filter(LotteryPool.name == validated["name"]).first()
+        existing = await session.first(
+            session.query(LotteryPool).filter(LotteryPool.name == validated["name"])
+        )
         if existing is not None:
             return api_error(
                 status_code=409, code="duplicate_name", message="奖池名称已存在",
@@ -355,8 +358,8 @@ async def create_pool(request: Request) -> JSONResponse:
             cost_per_draw=int(validated.get("cost_per_draw", 0)),
         )
         session.add(pool)
-        session.commit()
-        session.refresh(pool)
+        await session.commit()
+        await session.refresh(pool)
         logger.info(f"WebUI 奖池 create：pool_id={pool.id} name={pool.name}")
         return api_success(
             status_code=201,
@@ -364,7 +367,7 @@ async def create_pool(request: Request) -> JSONResponse:
             headers={"Location": f"/webui/api/lottery/{pool.id}"},
         )
     finally:
-        session.close()
+        await session.close()
 
 # ---------- Export / Import ----------
 
@@ -394,17 +397,16 @@ def _export_prize_dict(prize: LotteryPrize) -> dict[str, Any]:
 
 @router.get("/webui/api/lottery/export")
 async def export_lottery(request: Request) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        pools = (
+        pools = await session.all(
             session.query(LotteryPool)
             .order_by(LotteryPool.sort_order.asc(), LotteryPool.id.asc())
-            .all()
         )
         pool_ids = [int(p.id) for p in pools]
         prizes_by_pool: dict[int, list[LotteryPrize]] = {}
         if pool_ids:
-            prizes = (
+            prizes = await session.all(
                 session.query(LotteryPrize)
                 .filter(LotteryPrize.pool_id.in_(pool_ids))
                 .order_by(
@@ -412,7 +414,6 @@ async def export_lottery(request: Request) -> JSONResponse:
                     LotteryPrize.sort_order.asc(),
                     LotteryPrize.id.asc(),
                 )
-                .all()
             )
             for prize in prizes:
                 prizes_by_pool.setdefault(int(prize.pool_id), []).append(prize)
@@ -440,7 +441,7 @@ async def export_lottery(request: Request) -> JSONResponse:
             "pools": exported,
         })
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/lottery/import")
@@ -479,7 +480,7 @@ async def import_lottery(request: Request) -> JSONResponse:
     if structural:
         return _validation_error_response(structural)
 
-    server_ids = _load_server_id_set()
+    server_ids = await run_db(_load_server_id_set)
 
     # ---- Validate every pool + prize, aggregate errors with path prefixes ----
     aggregated: list[dict[str, str]] = []
@@ -543,19 +544,19 @@ async def import_lottery(request: Request) -> JSONResponse:
         return _validation_error_response(aggregated)
 
     # ---- Apply changes in a single transaction ----
-    session = get_session()
+    session = db_session()
     try:
         created = 0
         updated = 0
         prizes_total = 0
 
         if mode == "replace_all":
-            session.query(LotteryPrize).delete(synchronize_session=False)
-            session.query(LotteryPool).delete(synchronize_session=False)
-            session.flush()
+            await session.delete_rows(session.query(LotteryPrize), synchronize_session=False)
+            await session.delete_rows(session.query(LotteryPool), synchronize_session=False)
+            await session.flush()
 
         existing_by_name: dict[str, LotteryPool] = (
-            {str(p.name): p for p in session.query(LotteryPool).all()}
+            {str(p.name): p for p in await session.all(session.query(LotteryPool))}
             if mode == "merge"
             else {}
         )
@@ -574,9 +575,10 @@ async def import_lottery(request: Request) -> JSONResponse:
                 if "cost_per_draw" in pool_data:
                     existing.cost_per_draw = int(pool_data["cost_per_draw"])
                 # Replace all prizes belonging to this pool.
-                session.query(LotteryPrize).filter(
-                    LotteryPrize.pool_id == existing.id,
-                ).delete(synchronize_session=False)
+                await session.delete_rows(
+                    session.query(LotteryPrize).filter(LotteryPrize.pool_id == existing.id),
+                    synchronize_session=False,
+                )
                 pool_id = int(existing.id)
                 updated += 1
             else:
@@ -588,7 +590,7 @@ async def import_lottery(request: Request) -> JSONResponse:
                     cost_per_draw=int(pool_data.get("cost_per_draw", 0)),
                 )
                 session.add(pool)
-                session.flush()
+                await session.flush()
                 pool_id = int(pool.id)
                 created += 1
 
@@ -615,7 +617,7 @@ async def import_lottery(request: Request) -> JSONResponse:
                 ))
                 prizes_total += 1
 
-        session.commit()
+        await session.commit()
         logger.info(
             f"WebUI 奖池 import：mode={mode} created={created} updated={updated} "
             f"prizes_total={prizes_total}"
@@ -627,25 +629,24 @@ async def import_lottery(request: Request) -> JSONResponse:
             "prizes_total": prizes_total,
         })
     except Exception:
-        session.rollback()
+        await session.rollback()
         raise
     finally:
-        session.close()
+        await session.close()
 
 
 @router.get("/webui/api/lottery/{pool_id}")
 async def get_pool(pool_id: int) -> JSONResponse:
-    label_map = _load_server_label_map()
-    session = get_session()
+    label_map = await run_db(_load_server_label_map)
+    session = db_session()
     try:
-        pool = session.query(LotteryPool).filter(LotteryPool.id == pool_id).first()
+        pool = await session.first(session.query(LotteryPool).filter(LotteryPool.id == pool_id))
         if pool is None:
             return api_error(status_code=404, code="not_found", message="奖池不存在")
-        prizes = (
+        prizes = await session.all(
             session.query(LotteryPrize)
             .filter(LotteryPrize.pool_id == pool_id)
             .order_by(LotteryPrize.sort_order.asc(), LotteryPrize.id.asc())
-            .all()
         )
         data = _serialize_pool(pool, prize_count=len(prizes))
         data["prizes"] = [
@@ -657,7 +658,7 @@ async def get_pool(pool_id: int) -> JSONResponse:
         ]
         return api_success(data=data)
     finally:
-        session.close()
+        await session.close()
 
 
 @router.put("/webui/api/lottery/{pool_id}")
@@ -672,13 +673,15 @@ async def update_pool(pool_id: int, request: Request) -> JSONResponse:
         return _validation_error_response(details)
     assert validated is not None
 
-    session = get_session()
+    session = db_session()
     try:
-        pool = session.query(LotteryPool).filter(LotteryPool.id == pool_id).first()
+        pool = await session.first(session.query(LotteryPool).filter(LotteryPool.id == pool_id))
         if pool is None:
             return api_error(status_code=404, code="not_found", message="奖池不存在")
         if "name" in validated and validated["name"] != pool.name:
-            dup = session.query(LotteryPool).filter(LotteryPool.name == validated["name"]).first()
+            dup = await session.first(
+                session.query(LotteryPool).filter(LotteryPool.name == validated["name"])
+            )
             if dup is not None:
                 return api_error(
                     status_code=409, code="duplicate_name", message="奖池名称已存在",
@@ -693,32 +696,33 @@ async def update_pool(pool_id: int, request: Request) -> JSONResponse:
             pool.enabled = bool(validated["enabled"])
         if "cost_per_draw" in validated:
             pool.cost_per_draw = int(validated["cost_per_draw"])
-        session.commit()
-        prize_count = (
-            session.query(LotteryPrize).filter(LotteryPrize.pool_id == pool_id).count()
+        await session.commit()
+        prize_count = await session.count(
+            session.query(LotteryPrize).filter(LotteryPrize.pool_id == pool_id)
         )
         logger.info(f"WebUI 奖池 update：pool_id={pool.id} name={pool.name}")
         return api_success(data=_serialize_pool(pool, prize_count=prize_count))
     finally:
-        session.close()
+        await session.close()
 
 
 @router.delete("/webui/api/lottery/{pool_id}")
 async def delete_pool(pool_id: int) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        pool = session.query(LotteryPool).filter(LotteryPool.id == pool_id).first()
+        pool = await session.first(session.query(LotteryPool).filter(LotteryPool.id == pool_id))
         if pool is None:
             return api_error(status_code=404, code="not_found", message="奖池不存在")
-        session.query(LotteryPrize).filter(LotteryPrize.pool_id == pool_id).delete(
-            synchronize_session=False
+        await session.delete_rows(
+            session.query(LotteryPrize).filter(LotteryPrize.pool_id == pool_id),
+            synchronize_session=False,
         )
         session.delete(pool)
-        session.commit()
+        await session.commit()
         logger.info(f"WebUI 奖池 delete：pool_id={pool_id}")
         return api_success(data={"id": pool_id})
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/lottery/{pool_id}/prizes")
@@ -728,15 +732,15 @@ async def create_prize(pool_id: int, request: Request) -> JSONResponse:
         return error
     assert payload is not None
 
-    server_ids = _load_server_id_set()
+    server_ids = await run_db(_load_server_id_set)
     validated, details = _validate_prize_payload(payload, valid_server_ids=server_ids)
     if details:
         return _validation_error_response(details)
     assert validated is not None
 
-    session = get_session()
+    session = db_session()
     try:
-        pool = session.query(LotteryPool).filter(LotteryPool.id == pool_id).first()
+        pool = await session.first(session.query(LotteryPool).filter(LotteryPool.id == pool_id))
         if pool is None:
             return api_error(status_code=404, code="not_found", message="奖池不存在")
         prize = LotteryPrize(
@@ -760,9 +764,9 @@ async def create_prize(pool_id: int, request: Request) -> JSONResponse:
             coin_amount=validated["coin_amount"],
         )
         session.add(prize)
-        session.commit()
-        session.refresh(prize)
-        label_map = _load_server_label_map()
+        await session.commit()
+        await session.refresh(prize)
+        label_map = await run_db(_load_server_label_map)
         target_label = (
             label_map.get(int(prize.target_server_id))
             if prize.target_server_id is not None else None
@@ -777,7 +781,7 @@ async def create_prize(pool_id: int, request: Request) -> JSONResponse:
             headers={"Location": f"/webui/api/lottery/{pool_id}/prizes/{prize.id}"},
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.put("/webui/api/lottery/{pool_id}/prizes/{prize_id}")
@@ -787,18 +791,17 @@ async def update_prize(pool_id: int, prize_id: int, request: Request) -> JSONRes
         return error
     assert payload is not None
 
-    server_ids = _load_server_id_set()
+    server_ids = await run_db(_load_server_id_set)
     validated, details = _validate_prize_payload(payload, valid_server_ids=server_ids)
     if details:
         return _validation_error_response(details)
     assert validated is not None
 
-    session = get_session()
+    session = db_session()
     try:
-        prize = (
+        prize = await session.first(
             session.query(LotteryPrize)
             .filter(LotteryPrize.id == prize_id, LotteryPrize.pool_id == pool_id)
-            .first()
         )
         if prize is None:
             return api_error(status_code=404, code="not_found", message="奖品不存在")
@@ -819,8 +822,8 @@ async def update_prize(pool_id: int, prize_id: int, request: Request) -> JSONRes
         prize.show_command = validated["show_command"]
         prize.require_online = validated["require_online"]
         prize.coin_amount = validated["coin_amount"]
-        session.commit()
-        label_map = _load_server_label_map()
+        await session.commit()
+        label_map = await run_db(_load_server_label_map)
         target_label = (
             label_map.get(int(prize.target_server_id))
             if prize.target_server_id is not None else None
@@ -831,23 +834,22 @@ async def update_prize(pool_id: int, prize_id: int, request: Request) -> JSONRes
         )
         return api_success(data=_serialize_prize(prize, target_server_label=target_label))
     finally:
-        session.close()
+        await session.close()
 
 
 @router.delete("/webui/api/lottery/{pool_id}/prizes/{prize_id}")
 async def delete_prize(pool_id: int, prize_id: int) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        prize = (
+        prize = await session.first(
             session.query(LotteryPrize)
             .filter(LotteryPrize.id == prize_id, LotteryPrize.pool_id == pool_id)
-            .first()
         )
         if prize is None:
             return api_error(status_code=404, code="not_found", message="奖品不存在")
         session.delete(prize)
-        session.commit()
+        await session.commit()
         logger.info(f"WebUI 奖池奖品 delete：pool_id={pool_id} prize_id={prize_id}")
         return api_success(data={"id": prize_id})
     finally:
-        session.close()
+        await session.close()
@@ -7,10 +7,10 @@ from nonebot import get_bots
 from nonebot.adapters.onebot.v11 import Bot as OBV11Bot
 from nonebot.log import logger
 
-from sqlalchemy import func
-
 from nextbot.access_control import get_group_ids
-from nextbot.db import User, get_session
+from nextbot.db import Server, db_session
+from nextbot.server_status import record_player_event
+from nextbot.user_cache import find_user_ids_by_name
 from server.routes import api_error, api_success, read_json_object
 
 router = APIRouter()
@@ -25,18 +25,9 @@ def _pick_onebot_bot() -> OBV11Bot | None:
     return None
 
 
-def _resolve_user_id_by_name(name: str) -> str | None:
-    session = get_session()
-    try:
-        user = (
-            session.query(User)
-            .filter(func.lower(User.name) == name.lower())
-            .order_by(User.id.asc())
-            .first()
-        )
-        return str(user.user_id) if user is not None else None
-    finally:
-        session.close()
+async def _resolve_user_id_by_name(name: str) -> str | None:
+    user_ids = await find_user_ids_by_name(name)
+    return user_ids[0] if user_ids else None
 
 
 def _resolve_target_groups_by_mode(mode: str, single_gid: str) -> list[int]:
@@ -68,6 +59,47 @@ def _resolve_chat_target_groups() -> list[int]:
     return _resolve_target_groups_by_mode(mode, single_gid)
 
 
+async def _find_event_server(data: dict, server_name: str) -> Server | None:
+    # 插件可附带 server_id；未附带时按服务器名称匹配
+    session = db_session()
+    try:
+        raw_id = data.get("server_id")
+        if raw_id is not None:
+            try:
+                server_id = int(raw_id)
+            except (TypeError, ValueError):
+                server_id = 0
+            if server_id > 0:
+                return await session.first(
+                    session.query(Server).filter(Server.id == server_id)
+                )
+        return await session.first(
+            session.query(Server).filter(Server.name == server_name)
+        )
+    finally:
+        await session.close()
+
+
+async def _record_presence(
+    data: dict, server_name: str, player_name: str, event: str
+) -> None:
+    if event not in ("online", "offline"):
+        return
+    try:
+        server = await _find_event_server(data, server_name)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(
+            f"记录玩家在线状态失败：server_name={server_name}，reason={exc}"
+        )
+        return
+    if server is None:
+        logger.debug(
+            f"记录玩家在线状态跳过：server_name={server_name}，reason=未找到服务器"
+        )
+        return
+    record_player_event(server, player_name, online=event == "online")
+
+
 @router.post("/webui/api/player-events")
 async def webui_player_events_create(request: Request) -> JSONResponse:
     data, error_response = await read_json_object(request)
@@ -113,6 +145,9 @@ async def webui_player_events_create(request: Request) -> JSONResponse:
                 details=[{"field": "message", "message": "消息内容不能为空"}],
             )
 
+    # 上下线事件先更新在线玩家索引，机器人未连接或未配置通知群时也不受影响
+    await _record_presence(data, server_name, player_name, event)
+
     bot = _pick_onebot_bot()
     if bot is None:
         logger.warning(
@@ -138,7 +173,7 @@ async def webui_player_events_create(request: Request) -> JSONResponse:
             message="未配置有效的通知群",
         )
 
-    bound_user_id = _resolve_user_id_by_name(player_name)
+    bound_user_id = await _resolve_user_id_by_name(player_name)
     display_name = f"{player_name}（{bound_user_id}）" if bound_user_id else player_name
 
     config = nonebot.get_driver().config
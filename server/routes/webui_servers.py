@@ -9,10 +9,12 @@ from fastapi.responses import JSONResponse, Response
 from nonebot.log import logger
 from sqlalchemy import func
 
-from nextbot.db import Server, get_session
+from nextbot.db import Server, db_session, get_session, run_db
 from nextbot.tshock_api import (
     TShockRequestError,
+    close_server_clients,
     get_error_reason,
+    get_server_health,
     is_success,
     request_server_api,
 )
@@ -52,6 +54,7 @@ def _serialize_server(server: Server) -> dict[str, Any]:
         "game_port": str(server.game_port),
         "restapi_port": str(server.restapi_port),
         "token": str(server.token),
+        "health": get_server_health(server),
     }
 
 
@@ -153,9 +156,9 @@ async def webui_servers_list(request: Request) -> JSONResponse:
 
     keyword = str(request.query_params.get("q") or "").strip().lower()
 
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
         serialized = [_serialize_server(item) for item in servers]
         if keyword:
             serialized = [
@@ -188,7 +191,7 @@ async def webui_servers_list(request: Request) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/servers")
@@ -203,9 +206,9 @@ async def webui_servers_create(request: Request) -> JSONResponse:
     except ServerPayloadValidationError as exc:
         return _validation_error(exc)
 
-    session = get_session()
+    session = db_session()
     try:
-        max_id = int(session.query(func.max(Server.id)).scalar() or 0)
+        max_id = int(await session.scalar(session.query(func.max(Server.id))) or 0)
         server = Server(
             id=max_id + 1,
             name=validated.name,
@@ -215,7 +218,7 @@ async def webui_servers_create(request: Request) -> JSONResponse:
             token=validated.token,
         )
         session.add(server)
-        session.commit()
+        await session.commit()
         logger.info(f"创建服务器成功：server_id={server.id}，name={server.name}")
         return api_success(
             status_code=201,
@@ -223,7 +226,7 @@ async def webui_servers_create(request: Request) -> JSONResponse:
             headers={"Location": f"/webui/api/servers/{server.id}"},
         )
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"创建服务器异常：name={validated.name}，reason={exc}")
         return api_error(
             status_code=500,
@@ -231,7 +234,7 @@ async def webui_servers_create(request: Request) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.put("/webui/api/servers/{server_id}")
@@ -246,9 +249,9 @@ async def webui_servers_update(server_id: int, request: Request) -> JSONResponse
     except ServerPayloadValidationError as exc:
         return _validation_error(exc)
 
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
         if server is None:
             logger.warning(f"更新服务器失败：server_id={server_id}，reason=服务器不存在")
             return api_error(
@@ -262,11 +265,12 @@ async def webui_servers_update(server_id: int, request: Request) -> JSONResponse
         server.game_port = validated.game_port
         server.restapi_port = validated.restapi_port
         server.token = validated.token
-        session.commit()
+        await session.commit()
+        await close_server_clients(server_id)
         logger.info(f"更新服务器成功：server_id={server.id}，name={server.name}")
         return api_success(data=_serialize_server(server))
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"更新服务器异常：server_id={server_id}，reason={exc}")
         return api_error(
             status_code=500,
@@ -274,14 +278,14 @@ async def webui_servers_update(server_id: int, request: Request) -> JSONResponse
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.delete("/webui/api/servers/{server_id}")
 async def webui_servers_delete(server_id: int) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
         if server is None:
             logger.warning(f"删除服务器失败：server_id={server_id}，reason=服务器不存在")
             return api_error(
@@ -293,16 +297,18 @@ async def webui_servers_delete(server_id: int) -> JSONResponse:
         deleted_id = int(server.id)
         deleted_name = str(server.name)
         session.delete(server)
-        session.flush()
-        session.query(Server).filter(Server.id > deleted_id).update(
+        await session.flush()
+        await session.update(
+            session.query(Server).filter(Server.id > deleted_id),
             {Server.id: Server.id - 1},
             synchronize_session=False,
         )
-        session.commit()
+        await session.commit()
+        await close_server_clients()
         logger.info(f"删除服务器成功：server_id={deleted_id}，name={deleted_name}")
         return Response(status_code=204)
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"删除服务器异常：server_id={server_id}，reason={exc}")
         return api_error(
             status_code=500,
@@ -310,14 +316,14 @@ async def webui_servers_delete(server_id: int) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/servers/{server_id}/test")
 async def webui_servers_test(server_id: int) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        server = session.query(Server).filter(Server.id == server_id).first()
+        server = await session.first(session.query(Server).filter(Server.id == server_id))
     except Exception as exc:
         logger.exception(f"测试服务器异常：server_id={server_id}，reason={exc}")
         return api_error(
@@ -326,7 +332,7 @@ async def webui_servers_test(server_id: int) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
     if server is None:
         logger.warning(f"测试服务器失败：server_id={server_id}，reason=服务器不存在")
@@ -337,7 +343,7 @@ async def webui_servers_test(server_id: int) -> JSONResponse:
         )
 
     try:
-        response = await request_server_api(server, "/tokentest")
+        response = await request_server_api(server, "/tokentest", probe=True)
     except TShockRequestError:
         logger.warning(f"测试服务器失败：server_id={server_id}，reason=无法连接服务器")
         return api_success(
@@ -392,7 +398,7 @@ def _load_server_or_none(server_id: int) -> Server | None:
 
 @router.get("/webui/api/servers/{server_id}/plugin-config")
 async def webui_servers_plugin_config_get(server_id: int) -> JSONResponse:
-    server = _load_server_or_none(server_id)
+    server = await run_db(_load_server_or_none, server_id)
     if server is None:
         logger.warning(
             f"读取插件配置失败：server_id={server_id}，reason=服务器不存在"
@@ -463,7 +469,7 @@ async def webui_servers_plugin_config_update(
             message="未提供任何更新字段",
         )
 
-    server = _load_server_or_none(server_id)
+    server = await run_db(_load_server_or_none, server_id)
     if server is None:
         logger.warning(
             f"更新插件配置失败：server_id={server_id}，reason=服务器不存在"
@@ -508,7 +514,7 @@ async def webui_servers_plugin_config_update(
 async def webui_servers_plugin_config_verify_nextbot(
     server_id: int,
 ) -> JSONResponse:
-    server = _load_server_or_none(server_id)
+    server = await run_db(_load_server_or_none, server_id)
     if server is None:
         logger.warning(
             f"验证 NextBot 连通性失败：server_id={server_id}，reason=服务器不存在"
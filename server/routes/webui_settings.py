@@ -10,6 +10,7 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, JSONResponse
 from nonebot.log import logger
 
+from nextbot.stats import flush_stats
 from server.pages.console_page import render_settings_page
 from server.routes import api_error, api_success, read_json_object
 from server.settings_service import (
@@ -29,6 +30,10 @@ def _restart_worker() -> None:
     try:
         time.sleep(0.8)
         logger.warning("检测到设置变更，程序即将重启...")
+        try:
+            flush_stats()
+        except Exception:
+            logger.exception("重启前统计数据落库失败")
         os.execv(sys.executable, [sys.executable, *sys.argv])
     except Exception as exc:
         logger.exception(f"重启失败：{exc}")
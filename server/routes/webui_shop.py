@@ -6,7 +6,7 @@ from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from nonebot.log import logger
 
-from nextbot.db import Server, Shop, ShopItem, get_session
+from nextbot.db import Server, Shop, ShopItem, db_session, get_session, run_db
 from nextbot.progression import PROGRESSION_KEY_TO_ZH, TIER_OPTIONS
 from nextbot.time_utils import beijing_now
 from server.routes import api_error, api_success, read_json_object
@@ -266,33 +266,34 @@ async def list_shop_tiers(request: Request) -> JSONResponse:
 
 @router.get("/webui/api/shops/meta/servers")
 async def list_shop_servers(request: Request) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
         return api_success(
             data=[{"id": int(s.id), "name": str(s.name)} for s in servers],
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.get("/webui/api/shops")
 async def list_shops(request: Request) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        shops = session.query(Shop).order_by(Shop.sort_order.asc(), Shop.id.asc()).all()
+        shops = await session.all(
+            session.query(Shop).order_by(Shop.sort_order.asc(), Shop.id.asc())
+        )
         counts: dict[int, int] = {}
         if shops:
-            for sid, in (
+            for sid, in await session.all(
                 session.query(ShopItem.shop_id)
                 .filter(ShopItem.shop_id.in_([s.id for s in shops]))
-                .all()
             ):
                 counts[int(sid)] = counts.get(int(sid), 0) + 1
         data = [_serialize_shop(s, item_count=counts.get(int(s.id), 0)) for s in shops]
         return api_success(data=data)
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/shops")
@@ -312,9 +313,9 @@ async def create_shop(request: Request) -> JSONResponse:
             details=[{"field": "name", "message": "名称不能为空"}],
         )
 
-    session = get_session()
+    session = db_session()
     try:
-        existing = session.query(Shop).filter(Shop.name == validated["name"]).first()
+        existing = await session.first(session.query(Shop).filter(Shop.name == validated["name"]))
         if existing is not None:
             return api_error(
                 status_code=409, code="duplicate_name", message="商店名称已存在",
@@ -327,8 +328,8 @@ async def create_shop(request: Request) -> JSONResponse:
             enabled=bool(validated.get("enabled", True)),
         )
         session.add(shop)
-        session.commit()
-        session.refresh(shop)
+        await session.commit()
+        await session.refresh(shop)
         logger.info(f"WebUI 商店 create：shop_id={shop.id} name={shop.name}")
         return api_success(
             status_code=201,
@@ -336,7 +337,7 @@ async def create_shop(request: Request) -> JSONResponse:
             headers={"Location": f"/webui/api/shops/{shop.id}"},
         )
     finally:
-        session.close()
+        await session.close()
 
 
 # ---------- Export / Import ----------
@@ -367,17 +368,16 @@ def _export_shop_item_dict(item: ShopItem) -> dict[str, Any]:
 
 @router.get("/webui/api/shops/export")
 async def export_shops(request: Request) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        shops = (
+        shops = await session.all(
             session.query(Shop)
             .order_by(Shop.sort_order.asc(), Shop.id.asc())
-            .all()
         )
         shop_ids = [int(s.id) for s in shops]
         items_by_shop: dict[int, list[ShopItem]] = {}
         if shop_ids:
-            items = (
+            items = await session.all(
                 session.query(ShopItem)
                 .filter(ShopItem.shop_id.in_(shop_ids))
                 .order_by(
@@ -385,7 +385,6 @@ async def export_shops(request: Request) -> JSONResponse:
                     ShopItem.sort_order.asc(),
                     ShopItem.id.asc(),
                 )
-                .all()
             )
             for item in items:
                 items_by_shop.setdefault(int(item.shop_id), []).append(item)
@@ -412,7 +411,7 @@ async def export_shops(request: Request) -> JSONResponse:
             "shops": exported,
         })
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/shops/import")
@@ -451,7 +450,7 @@ async def import_shops(request: Request) -> JSONResponse:
     if structural:
         return _validation_error_response(structural)
 
-    server_ids = _load_server_id_set()
+    server_ids = await run_db(_load_server_id_set)
 
     # ---- Validate every shop + item, aggregate errors with path prefixes ----
     aggregated: list[dict[str, str]] = []
@@ -516,20 +515,20 @@ async def import_shops(request: Request) -> JSONResponse:
         return _validation_error_response(aggregated)
 
     # ---- Apply changes in a single transaction ----
-    session = get_session()
+    session = db_session()
     try:
         created = 0
         updated = 0
         items_total = 0
 
         if mode == "replace_all":
-            session.query(ShopItem).delete(synchronize_session=False)
-            session.query(Shop).delete(synchronize_session=False)
-            session.flush()
+            await session.delete_rows(session.query(ShopItem), synchronize_session=False)
+            await session.delete_rows(session.query(Shop), synchronize_session=False)
+            await session.flush()
 
         # Map existing shops by name for fast upsert lookup (only relevant in merge mode).
         existing_by_name: dict[str, Shop] = (
-            {str(s.name): s for s in session.query(Shop).all()}
+            {str(s.name): s for s in await session.all(session.query(Shop))}
             if mode == "merge"
             else {}
         )
@@ -545,9 +544,10 @@ async def import_shops(request: Request) -> JSONResponse:
                 if "enabled" in shop_data:
                     existing.enabled = bool(shop_data["enabled"])
                 # Replace all items belonging to this shop.
-                session.query(ShopItem).filter(
-                    ShopItem.shop_id == existing.id,
-                ).delete(synchronize_session=False)
+                await session.delete_rows(
+                    session.query(ShopItem).filter(ShopItem.shop_id == existing.id),
+                    synchronize_session=False,
+                )
                 shop_id = int(existing.id)
                 updated += 1
             else:
@@ -558,7 +558,7 @@ async def import_shops(request: Request) -> JSONResponse:
                     enabled=bool(shop_data.get("enabled", True)),
                 )
                 session.add(shop)
-                session.flush()
+                await session.flush()
                 shop_id = int(shop.id)
                 created += 1
 
@@ -584,7 +584,7 @@ async def import_shops(request: Request) -> JSONResponse:
                 ))
                 items_total += 1
 
-        session.commit()
+        await session.commit()
         logger.info(
             f"WebUI 商店 import：mode={mode} created={created} updated={updated} "
             f"items_total={items_total}"
@@ -596,25 +596,24 @@ async def import_shops(request: Request) -> JSONResponse:
             "items_total": items_total,
         })
     except Exception:
-        session.rollback()
+        await session.rollback()
         raise
     finally:
-        session.close()
+        await session.close()
 
 
 @router.get("/webui/api/shops/{shop_id}")
 async def get_shop(shop_id: int) -> JSONResponse:
-    label_map = _load_server_label_map()
-    session = get_session()
+    label_map = await run_db(_load_server_label_map)
+    session = db_session()
     try:
-        shop = session.query(Shop).filter(Shop.id == shop_id).first()
+        shop = await session.first(session.query(Shop).filter(Shop.id == shop_id))
         if shop is None:
             return api_error(status_code=404, code="not_found", message="商店不存在")
-        items = (
+        items = await session.all(
             session.query(ShopItem)
             .filter(ShopItem.shop_id == shop_id)
             .order_by(ShopItem.sort_order.asc(), ShopItem.id.asc())
-            .all()
         )
         data = _serialize_shop(shop, item_count=len(items))
         data["items"] = [
@@ -626,7 +625,7 @@ async def get_shop(shop_id: int) -> JSONResponse:
         ]
         return api_success(data=data)
     finally:
-        session.close()
+        await session.close()
 
 
 @router.put("/webui/api/shops/{shop_id}")
@@ -641,13 +640,13 @@ async def update_shop(shop_id: int, request: Request) -> JSONResponse:
         return _validation_error_response(details)
     assert validated is not None
 
-    session = get_session()
+    session = db_session()
     try:
-        shop = session.query(Shop).filter(Shop.id == shop_id).first()
+        shop = await session.first(session.query(Shop).filter(Shop.id == shop_id))
         if shop is None:
             return api_error(status_code=404, code="not_found", message="商店不存在")
         if "name" in validated and validated["name"] != shop.name:
-            dup = session.query(Shop).filter(Shop.name == validated["name"]).first()
+            dup = await session.first(session.query(Shop).filter(Shop.name == validated["name"]))
             if dup is not None:
                 return api_error(
                     status_code=409, code="duplicate_name", message="商店名称已存在",
@@ -660,32 +659,33 @@ async def update_shop(shop_id: int, request: Request) -> JSONResponse:
             shop.sort_order = int(validated["sort_order"])
         if "enabled" in validated:
             shop.enabled = bool(validated["enabled"])
-        session.commit()
-        item_count = (
-            session.query(ShopItem).filter(ShopItem.shop_id == shop_id).count()
+        await session.commit()
+        item_count = await session.count(
+            session.query(ShopItem).filter(ShopItem.shop_id == shop_id)
         )
         logger.info(f"WebUI 商店 update：shop_id={shop.id} name={shop.name}")
         return api_success(data=_serialize_shop(shop, item_count=item_count))
     finally:
-        session.close()
+        await session.close()
 
 
 @router.delete("/webui/api/shops/{shop_id}")
 async def delete_shop(shop_id: int) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        shop = session.query(Shop).filter(Shop.id == shop_id).first()
+        shop = await session.first(session.query(Shop).filter(Shop.id == shop_id))
         if shop is None:
             return api_error(status_code=404, code="not_found", message="商店不存在")
-        session.query(ShopItem).filter(ShopItem.shop_id == shop_id).delete(
-            synchronize_session=False
+        await session.delete_rows(
+            session.query(ShopItem).filter(ShopItem.shop_id == shop_id),
+            synchronize_session=False,
         )
         session.delete(shop)
-        session.commit()
+        await session.commit()
         logger.info(f"WebUI 商店 delete：shop_id={shop_id}")
         return api_success(data={"id": shop_id})
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/shops/{shop_id}/items")
@@ -695,15 +695,15 @@ async def create_shop_item(shop_id: int, request: Request) -> JSONResponse:
         return error
     assert payload is not None
 
-    server_ids = _load_server_id_set()
+    server_ids = await run_db(_load_server_id_set)
     validated, details = _validate_shop_item_payload(payload, valid_server_ids=server_ids)
     if details:
         return _validation_error_response(details)
     assert validated is not None
 
-    session = get_session()
+    session = db_session()
     try:
-        shop = session.query(Shop).filter(Shop.id == shop_id).first()
+        shop = await session.first(session.query(Shop).filter(Shop.id == shop_id))
         if shop is None:
             return api_error(status_code=404, code="not_found", message="商店不存在")
         item = ShopItem(
@@ -726,9 +726,9 @@ async def create_shop_item(shop_id: int, request: Request) -> JSONResponse:
             require_online=validated["require_online"],
         )
         session.add(item)
-        session.commit()
-        session.refresh(item)
-        label_map = _load_server_label_map()
+        await session.commit()
+        await session.refresh(item)
+        label_map = await run_db(_load_server_label_map)
         target_label = (
             label_map.get(int(item.target_server_id))
             if item.target_server_id is not None else None
@@ -743,7 +743,7 @@ async def create_shop_item(shop_id: int, request: Request) -> JSONResponse:
             headers={"Location": f"/webui/api/shops/{shop_id}/items/{item.id}"},
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.put("/webui/api/shops/{shop_id}/items/{item_id}")
@@ -753,18 +753,17 @@ async def update_shop_item(shop_id: int, item_id: int, request: Request) -> JSON
         return error
     assert payload is not None
 
-    server_ids = _load_server_id_set()
+    server_ids = await run_db(_load_server_id_set)
     validated, details = _validate_shop_item_payload(payload, valid_server_ids=server_ids)
     if details:
         return _validation_error_response(details)
     assert validated is not None
 
-    session = get_session()
+    session = db_session()
     try:
-        item = (
+        item = await session.first(
             session.query(ShopItem)
             .filter(ShopItem.id == item_id, ShopItem.shop_id == shop_id)
-            .first()
         )
         if item is None:
             return api_error(status_code=404, code="not_found", message="商品不存在")
@@ -784,8 +783,8 @@ async def update_shop_item(shop_id: int, item_id: int, request: Request) -> JSON
         item.command_template = validated["command_template"]
         item.show_command = validated["show_command"]
         item.require_online = validated["require_online"]
-        session.commit()
-        label_map = _load_server_label_map()
+        await session.commit()
+        label_map = await run_db(_load_server_label_map)
         target_label = (
             label_map.get(int(item.target_server_id))
             if item.target_server_id is not None else None
@@ -796,23 +795,22 @@ async def update_shop_item(shop_id: int, item_id: int, request: Request) -> JSON
         )
         return api_success(data=_serialize_shop_item(item, target_server_label=target_label))
     finally:
-        session.close()
+        await session.close()
 
 
 @router.delete("/webui/api/shops/{shop_id}/items/{item_id}")
 async def delete_shop_item(shop_id: int, item_id: int) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        item = (
+        item = await session.first(
             session.query(ShopItem)
             .filter(ShopItem.id == item_id, ShopItem.shop_id == shop_id)
-            .first()
         )
         if item is None:
             return api_error(status_code=404, code="not_found", message="商品不存在")
         session.delete(item)
-        session.commit()
+        await session.commit()
         logger.info(f"WebUI 商店商品 delete：shop_id={shop_id} item_id={item_id}")
         return api_success(data={"id": item_id})
     finally:
-        session.close()
+        await session.close()
@@ -8,10 +8,9 @@ from typing import Any
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse, Response
 from nonebot.log import logger
-from sqlalchemy import func
 
 from nextbot.access_control import get_owner_ids
-from nextbot.db import Group, Server, User, get_session
+from nextbot.db import Group, Server, User, db_session
 from nextbot.time_utils import db_now_utc_naive, format_beijing_datetime
 from nextbot.tshock_api import (
     TShockRequestError,
@@ -19,6 +18,7 @@ from nextbot.tshock_api import (
     is_success,
     request_server_api,
 )
+from nextbot.user_cache import is_user_name_taken
 from server.routes import (
     api_error,
     api_success,
@@ -196,11 +196,11 @@ def _serialize_user(user: User) -> dict[str, Any]:
 
 
 async def _sync_user_whitelist(user: User) -> list[dict[str, Any]]:
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
     results: list[dict[str, Any]] = []
     for server in servers:
@@ -268,9 +268,9 @@ async def webui_users_list(request: Request) -> JSONResponse:
 
     keyword = str(request.query_params.get("q") or "").strip().lower()
 
-    session = get_session()
+    session = db_session()
     try:
-        users = session.query(User).order_by(User.id.asc()).all()
+        users = await session.all(session.query(User).order_by(User.id.asc()))
         serialized = [_serialize_user(item) for item in users]
         if keyword:
             serialized = [
@@ -308,7 +308,7 @@ async def webui_users_list(request: Request) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/users")
@@ -323,9 +323,11 @@ async def webui_users_create(request: Request) -> JSONResponse:
     except UserPayloadValidationError as exc:
         return _validation_error(exc)
 
-    session = get_session()
+    session = db_session()
     try:
-        if session.query(User).filter(User.user_id == validated.user_id).first() is not None:
+        if await session.first(
+            session.query(User).filter(User.user_id == validated.user_id)
+        ) is not None:
             return api_error(
                 status_code=409,
                 code="conflict",
@@ -333,7 +335,7 @@ async def webui_users_create(request: Request) -> JSONResponse:
                 details=[{"field": "user_id", "message": "用户 QQ 已存在"}],
             )
 
-        if session.query(User).filter(func.lower(User.name) == validated.name.lower()).first() is not None:
+        if await is_user_name_taken(validated.name):
             return api_error(
                 status_code=409,
                 code="conflict",
@@ -341,7 +343,7 @@ async def webui_users_create(request: Request) -> JSONResponse:
                 details=[{"field": "name", "message": "用户名称已被占用"}],
             )
 
-        if session.query(Group).filter(Group.name == validated.group).first() is None:
+        if await session.first(session.query(Group).filter(Group.name == validated.group)) is None:
             return api_error(
                 status_code=422,
                 code="validation_error",
@@ -359,7 +361,7 @@ async def webui_users_create(request: Request) -> JSONResponse:
             group=validated.group,
         )
         session.add(user)
-        session.commit()
+        await session.commit()
         logger.info(f"创建用户成功：user_id={user.user_id}，name={user.name}")
         return api_success(
             status_code=201,
@@ -367,7 +369,7 @@ async def webui_users_create(request: Request) -> JSONResponse:
             headers={"Location": f"/webui/api/users/{user.id}"},
         )
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"创建用户异常：user_id={validated.user_id}，reason={exc}")
         return api_error(
             status_code=500,
@@ -375,7 +377,7 @@ async def webui_users_create(request: Request) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.put("/webui/api/users/{user_id}")
@@ -390,9 +392,9 @@ async def webui_users_update(user_id: int, request: Request) -> JSONResponse:
     except UserPayloadValidationError as exc:
         return _validation_error(exc)
 
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.id == user_id).first()
+        user = await session.first(session.query(User).filter(User.id == user_id))
         if user is None:
             logger.warning(f"更新用户失败：user_id={user_id}，reason=用户不存在")
             return api_error(
@@ -402,9 +404,8 @@ async def webui_users_update(user_id: int, request: Request) -> JSONResponse:
             )
 
         if (
-            session.query(User)
-            .filter(User.user_id == validated.user_id, User.id != user_id)
-            .first()
+            await session.first(session.query(User)
+            .filter(User.user_id == validated.user_id, User.id != user_id))
             is not None
         ):
             return api_error(
@@ -414,12 +415,7 @@ async def webui_users_update(user_id: int, request: Request) -> JSONResponse:
                 details=[{"field": "user_id", "message": "用户 QQ 已存在"}],
             )
 
-        if (
-            session.query(User)
-            .filter(func.lower(User.name) == validated.name.lower(), User.id != user_id)
-            .first()
-            is not None
-        ):
+        if await is_user_name_taken(validated.name, exclude_user_id=str(user.user_id)):
             return api_error(
                 status_code=409,
                 code="conflict",
@@ -427,7 +423,7 @@ async def webui_users_update(user_id: int, request: Request) -> JSONResponse:
                 details=[{"field": "name", "message": "用户名称已被占用"}],
             )
 
-        if session.query(Group).filter(Group.name == validated.group).first() is None:
+        if await session.first(session.query(Group).filter(Group.name == validated.group)) is None:
             return api_error(
                 status_code=422,
                 code="validation_error",
@@ -442,11 +438,11 @@ async def webui_users_update(user_id: int, request: Request) -> JSONResponse:
         user.sign_streak = validated.sign_streak
         user.permissions = validated.permissions
         user.group = validated.group
-        session.commit()
+        await session.commit()
         logger.info(f"更新用户成功：user_id={user_id}，account_id={user.user_id}")
         return api_success(data=_serialize_user(user))
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"更新用户异常：user_id={user_id}，reason={exc}")
         return api_error(
             status_code=500,
@@ -454,14 +450,14 @@ async def webui_users_update(user_id: int, request: Request) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.delete("/webui/api/users/{user_id}")
 async def webui_users_delete(user_id: int) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.id == user_id).first()
+        user = await session.first(session.query(User).filter(User.id == user_id))
         if user is None:
             logger.warning(f"删除用户失败：user_id={user_id}，reason=用户不存在")
             return api_error(
@@ -473,11 +469,11 @@ async def webui_users_delete(user_id: int) -> JSONResponse:
         deleted_user_id = str(user.user_id)
         deleted_name = str(user.name)
         session.delete(user)
-        session.commit()
+        await session.commit()
         logger.info(f"删除用户成功：user_id={user_id}，account_id={deleted_user_id}，name={deleted_name}")
         return Response(status_code=204)
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"删除用户异常：user_id={user_id}，reason={exc}")
         return api_error(
             status_code=500,
@@ -485,14 +481,14 @@ async def webui_users_delete(user_id: int) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
 
 @router.post("/webui/api/users/{user_id}/sync-whitelist")
 async def webui_users_sync_whitelist(user_id: int) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.id == user_id).first()
+        user = await session.first(session.query(User).filter(User.id == user_id))
     except Exception as exc:
         logger.exception(f"同步用户白名单异常：user_id={user_id}，reason={exc}")
         return api_error(
@@ -501,7 +497,7 @@ async def webui_users_sync_whitelist(user_id: int) -> JSONResponse:
             message="内部错误",
         )
     finally:
-        session.close()
+        await session.close()
 
     if user is None:
         logger.warning(f"同步用户白名单失败：user_id={user_id}，reason=用户不存在")
@@ -551,9 +547,9 @@ async def webui_users_ban(user_id: int, request: Request) -> JSONResponse:
             details=[{"field": "reason", "message": "封禁原因不能为空"}],
         )
 
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.id == user_id).first()
+        user = await session.first(session.query(User).filter(User.id == user_id))
         if user is None:
             return api_error(status_code=404, code="not_found", message="用户不存在")
 
@@ -571,23 +567,23 @@ async def webui_users_ban(user_id: int, request: Request) -> JSONResponse:
         user.is_banned = True
         user.banned_at = db_now_utc_naive()
         user.ban_reason = reason
-        session.commit()
+        await session.commit()
 
         user_name = str(user.name)
         user_qq = str(user.user_id)
         logger.info(f"WebUI 封禁用户成功：user_id={user_qq} name={user_name} reason={reason}")
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"WebUI 封禁用户异常：user_id={user_id}，reason={exc}")
         return api_error(status_code=500, code="internal_error", message="内部错误")
     finally:
-        session.close()
+        await session.close()
 
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
     server_results: list[dict[str, Any]] = []
     for server in servers:
@@ -637,21 +633,21 @@ async def webui_users_ban(user_id: int, request: Request) -> JSONResponse:
 
     logger.info(f"WebUI 封禁用户黑名单同步完成：user_id={user_qq} name={user_name} server_count={len(servers)}")
 
-    session = get_session()
+    session = db_session()
     try:
-        refreshed_user = session.query(User).filter(User.id == user_id).first()
+        refreshed_user = await session.first(session.query(User).filter(User.id == user_id))
         user_data = _serialize_user(refreshed_user) if refreshed_user else {}
     finally:
-        session.close()
+        await session.close()
 
     return api_success(data={"user": user_data, "server_results": server_results})
 
 
 @router.post("/webui/api/users/{user_id}/unban")
 async def webui_users_unban(user_id: int) -> JSONResponse:
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.id == user_id).first()
+        user = await session.first(session.query(User).filter(User.id == user_id))
         if user is None:
             return api_error(status_code=404, code="not_found", message="用户不存在")
 
@@ -661,23 +657,23 @@ async def webui_users_unban(user_id: int) -> JSONResponse:
         user.is_banned = False
         user.banned_at = None
         user.ban_reason = ""
-        session.commit()
+        await session.commit()
 
         user_name = str(user.name)
         user_qq = str(user.user_id)
         logger.info(f"WebUI 解封用户成功：user_id={user_qq} name={user_name}")
     except Exception as exc:
-        session.rollback()
+        await session.rollback()
         logger.exception(f"WebUI 解封用户异常：user_id={user_id}，reason={exc}")
         return api_error(status_code=500, code="internal_error", message="内部错误")
     finally:
-        session.close()
+        await session.close()
 
-    session = get_session()
+    session = db_session()
     try:
-        servers = session.query(Server).order_by(Server.id.asc()).all()
+        servers = await session.all(session.query(Server).order_by(Server.id.asc()))
     finally:
-        session.close()
+        await session.close()
 
     server_results: list[dict[str, Any]] = []
     for server in servers:
@@ -725,11 +721,11 @@ async def webui_users_unban(user_id: int) -> JSONResponse:
 
     logger.info(f"WebUI 解封用户黑名单同步完成：user_id={user_qq} name={user_name} server_count={len(servers)}")
 
-    session = get_session()
+    session = db_session()
     try:
-        refreshed_user = session.query(User).filter(User.id == user_id).first()
+        refreshed_user = await session.first(session.query(User).filter(User.id == user_id))
         user_data = _serialize_user(refreshed_user) if refreshed_user else {}
     finally:
-        session.close()
+        await session.close()
 
     return api_success(data={"user": user_data, "server_results": server_results})
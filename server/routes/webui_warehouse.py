@@ -6,7 +6,8 @@ from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from nonebot.log import logger
 
-from nextbot.db import WAREHOUSE_CAPACITY, User, WarehouseItem, get_session
+from nextbot import item_catalog
+from nextbot.db import WAREHOUSE_CAPACITY, User, WarehouseItem, db_session
 from nextbot.progression import PROGRESSION_KEY_TO_ZH, TIER_OPTIONS
 from nextbot.time_utils import db_now_utc_naive
 from nextbot.warehouse_lock import warehouse_lock
@@ -33,24 +34,25 @@ async def list_warehouse(request: Request) -> JSONResponse:
             details=[{"field": "user_id", "message": "user_id 不能为空"}],
         )
 
-    session = get_session()
+    session = db_session()
     try:
-        user = session.query(User).filter(User.user_id == user_id).first()
+        user = await session.first(session.query(User).filter(User.user_id == user_id))
         if user is None:
             return api_error(
                 status_code=404, code="user_not_found", message="未找到该用户",
             )
-        items = (
+        items = await session.all(
             session.query(WarehouseItem)
             .filter(WarehouseItem.user_id == user_id)
             .order_by(WarehouseItem.slot_index.asc())
-            .all()
         )
         slots = [
             {
                 "slot_index": int(it.slot_index),
                 "item_id": int(it.item_id),
+                "item_name": item_catalog.name(it.item_id) or "",
                 "prefix_id": int(it.prefix_id),
+                "prefix_name": item_catalog.prefix_name(it.prefix_id) or "",
                 "quantity": int(it.quantity),
                 "value": int(it.value or 0),
                 "min_tier": str(it.min_tier),
@@ -59,7 +61,7 @@ async def list_warehouse(request: Request) -> JSONResponse:
             for it in items
         ]
     finally:
-        session.close()
+        await session.close()
 
     return api_success(
         data={
@@ -144,20 +146,19 @@ async def upsert_slot(user_id: str, slot_index: int, request: Request) -> JSONRe
     assert validated is not None
 
     async with warehouse_lock(user_id):
-        session = get_session()
+        session = db_session()
         try:
-            user = session.query(User).filter(User.user_id == user_id).first()
+            user = await session.first(session.query(User).filter(User.user_id == user_id))
             if user is None:
                 return api_error(
                     status_code=404, code="user_not_found", message="未找到该用户",
                 )
-            existing = (
+            existing = await session.first(
                 session.query(WarehouseItem)
                 .filter(
                     WarehouseItem.user_id == user_id,
                     WarehouseItem.slot_index == slot_index,
                 )
-                .first()
             )
             if existing is None:
                 session.add(
@@ -180,9 +181,9 @@ async def upsert_slot(user_id: str, slot_index: int, request: Request) -> JSONRe
                 existing.value = validated["value"]
                 existing.min_tier = validated["min_tier"]
                 action = "update"
-            session.commit()
+            await session.commit()
         finally:
-            session.close()
+            await session.close()
 
     logger.info(
         f"WebUI 仓库 {action}：user_id={user_id} slot={slot_index} "
@@ -212,24 +213,23 @@ async def delete_slot(user_id: str, slot_index: int) -> JSONResponse:
         )
 
     async with warehouse_lock(user_id):
-        session = get_session()
+        session = db_session()
         try:
-            existing = (
+            existing = await session.first(
                 session.query(WarehouseItem)
                 .filter(
                     WarehouseItem.user_id == user_id,
                     WarehouseItem.slot_index == slot_index,
                 )
-                .first()
             )
             if existing is None:
                 return api_error(
                     status_code=404, code="slot_empty", message="该格子为空",
                 )
             session.delete(existing)
-            session.commit()
+            await session.commit()
         finally:
-            session.close()
+            await session.close()
 
     logger.info(f"WebUI 仓库 delete：user_id={user_id} slot={slot_index}")
     return api_success(data={"slot_index": slot_index})
@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import re
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager, suppress
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Any, Literal
+from urllib.parse import urlsplit
+
+from nonebot.log import logger
+
+from server.static_assets import read_cached_asset, resolve_asset_path
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
 
 
 class RenderScreenshotError(Exception):
@@ -11,6 +23,17 @@ class RenderScreenshotError(Exception):
 
 WaitUntilState = Literal["commit", "domcontentloaded", "load", "networkidle"]
 
+_DEFAULT_POOL_SIZE = 2
+_DEFAULT_PAGE_MAX_USES = 100
+_SHUTDOWN_TIMEOUT_SECONDS = 10.0
+
+# 直接渲染的 HTML 以此为 base URL，页面中的 /assets/... 请求被拦截并从本地目录返回
+RENDER_ORIGIN = "http://nextbot.render"
+_HEAD_TAG_PATTERN = re.compile(r"<head[^>]*>", re.IGNORECASE)
+_HAS_READY_SIGNAL_JS = "() => typeof window.NextBotRender === 'object'"
+_READY_JS = "() => window.__NEXTBOT_READY__ === true"
+_ASSET_HEADERS = {"Access-Control-Allow-Origin": "*"}
+
 
 @dataclass(frozen=True)
 class ScreenshotOptions:
@@ -19,38 +42,378 @@ class ScreenshotOptions:
     wait_until: WaitUntilState = "networkidle"
     timeout_ms: int = 15000
     full_page: bool = True
+    # 页面引入 render-ready.js 时等待 window.__NEXTBOT_READY__，超时后退回 wait_until
+    wait_for_ready: bool = True
+    ready_timeout_ms: int = 5000
 
 
-async def screenshot_url(
-    url: str,
-    output_path: Path,
-    *,
-    options: ScreenshotOptions | None = None,
-) -> None:
+@dataclass
+class _PooledPage:
+    context: Any
+    page: Any
+    uses: int = 0
+
+
+def _read_int_config(name: str, default: int) -> int:
+    try:
+        from nonebot import get_driver
+
+        raw_value = getattr(get_driver().config, name, default)
+    except ValueError:
+        return default
+    try:
+        return max(1, int(raw_value))
+    except (TypeError, ValueError):
+        return default
+
+
+async def _fulfill_local_asset(route: Any) -> None:
+    # 启用 route 拦截后 Chromium 不再使用 HTTP 缓存，公共 CSS / JS / 字体
+    # 直接从内存返回；set_content 的页面与 RENDER_ORIGIN 不同源，
+    # 字体属于跨域请求，需要带上 CORS 头
+    url_path = urlsplit(route.request.url).path
+    cached = read_cached_asset(url_path)
+    if cached is not None:
+        await route.fulfill(
+            body=cached.body,
+            content_type=cached.content_type,
+            headers=_ASSET_HEADERS,
+        )
+        return
+    asset_path = resolve_asset_path(url_path)
+    if asset_path is None:
+        await route.fulfill(status=404, body="not found")
+        return
+    await route.fulfill(path=str(asset_path))
+
+
+async def _install_asset_route(target: Any) -> None:
+    await target.route(f"{RENDER_ORIGIN}/**", _fulfill_local_asset)
+
+
+def _with_render_base(html: str) -> str:
+    base_tag = f'<base href="{RENDER_ORIGIN}/">'
+    match = _HEAD_TAG_PATTERN.search(html)
+    if match is None:
+        return base_tag + html
+    return html[: match.end()] + base_tag + html[match.end():]
+
+
+def _import_async_playwright() -> Any:
     try:
         from playwright.async_api import async_playwright
     except Exception as exc:  # pragma: no cover
         raise RenderScreenshotError(
             "未安装 playwright，请先执行：uv add playwright && uv run playwright install chromium"
         ) from exc
+    return async_playwright
 
-    render_options = options or ScreenshotOptions()
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+class BrowserPool:
+    """常驻的 headless Chromium，复用固定数量的 context / page 截图。
+
+    浏览器断开后在下一次取页时自动重启；单个页面使用 max_uses 次后关闭重建。
+    所有 Playwright 对象都绑定在首次启动时的事件循环上。
+    """
+
+    def __init__(self, *, size: int, max_uses: int) -> None:
+        self.size = size
+        self.max_uses = max_uses
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._playwright: Any = None
+        self._browser: Any = None
+        self._idle: list[_PooledPage] = []
+        self._semaphore: asyncio.Semaphore | None = None
+        self._start_lock: asyncio.Lock | None = None
+        self._closing = False
+
+    def is_healthy(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self) -> None:
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            self._semaphore = asyncio.Semaphore(self.size)
+            self._start_lock = asyncio.Lock()
+        assert self._start_lock is not None
+        async with self._start_lock:
+            if self._closing:
+                raise RenderScreenshotError("截图服务正在关闭")
+            if self.is_healthy():
+                return
+            if self._browser is not None:
+                logger.warning("截图浏览器已断开，正在重启")
+            await self._close_browser()
+
+            async_playwright = _import_async_playwright()
+            self._playwright = await async_playwright().start()
+            try:
+                self._browser = await self._playwright.chromium.launch(headless=True)
+            except Exception:
+                await self._close_browser()
+                raise
+            self._browser.on("disconnected", self._on_disconnected)
+            logger.info(
+                f"截图浏览器已启动：pool_size={self.size}，page_max_uses={self.max_uses}"
+            )
+
+    def _on_disconnected(self, _browser: Any) -> None:
+        if not self._closing:
+            logger.warning("截图浏览器进程已退出，将在下次截图时重启")
+
+    async def stop(self) -> None:
+        if self.loop is None or self._closing:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._drain(), _SHUTDOWN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("等待截图任务结束超时，强制关闭浏览器")
+        await self._close_browser()
+        logger.info("截图浏览器已关闭")
+
+    async def _drain(self) -> None:
+        assert self._semaphore is not None
+        for _ in range(self.size):
+            await self._semaphore.acquire()
+
+    async def _close_browser(self) -> None:
+        idle, self._idle = self._idle, []
+        browser, self._browser = self._browser, None
+        playwright, self._playwright = self._playwright, None
+        for pooled in idle:
+            await self._discard(pooled)
+        if browser is not None:
+            with suppress(Exception):
+                await browser.close()
+        if playwright is not None:
+            with suppress(Exception):
+                await playwright.stop()
+
+    async def _discard(self, pooled: _PooledPage) -> None:
+        with suppress(Exception):
+            await pooled.context.close()
+
+    async def _take_page(self) -> _PooledPage:
+        while self._idle:
+            pooled = self._idle.pop()
+            if not pooled.page.is_closed():
+                return pooled
+            await self._discard(pooled)
+        context = await self._browser.new_context()
+        await _install_asset_route(context)
+        page = await context.new_page()
+        return _PooledPage(context=context, page=page)
+
+    @asynccontextmanager
+    async def page(self, *, width: int, height: int) -> AsyncIterator[Any]:
+        await self.start()
+        assert self._semaphore is not None
+        async with self._semaphore:
+            # 排队期间浏览器可能已崩溃或被关闭
+            await self.start()
+            pooled = await self._take_page()
+            reusable = False
+            try:
+                await pooled.page.set_viewport_size({"width": width, "height": height})
+                yield pooled.page
+                reusable = True
+            finally:
+                pooled.uses += 1
+                if (
+                    reusable
+                    and not self._closing
+                    and pooled.uses < self.max_uses
+                    and self.is_healthy()
+                    and not pooled.page.is_closed()
+                ):
+                    self._idle.append(pooled)
+                else:
+                    await self._discard(pooled)
+
+
+_browser_pool: BrowserPool | None = None
+
+
+def _get_browser_pool() -> BrowserPool:
+    global _browser_pool  # noqa: PLW0603
+    if _browser_pool is None:
+        _browser_pool = BrowserPool(
+            size=_read_int_config("screenshot_pool_size", _DEFAULT_POOL_SIZE),
+            max_uses=_read_int_config(
+                "screenshot_page_max_uses", _DEFAULT_PAGE_MAX_USES
+            ),
+        )
+    return _browser_pool
+
+
+async def start_browser_pool() -> None:
+    await _get_browser_pool().start()
+
+
+async def stop_browser_pool() -> None:
+    global _browser_pool
+    pool, _browser_pool = _browser_pool, None
+    if pool is not None:
+        await pool.stop()
+
+
+PageLoader = Callable[[Any, ScreenshotOptions], Awaitable[None]]
+
+
+def _initial_wait_until(render_options: ScreenshotOptions) -> WaitUntilState:
+    # 等就绪信号时只需等到 DOM 解析完成，render-ready.js 已经同步执行
+    if render_options.wait_for_ready:
+        return "domcontentloaded"
+    return render_options.wait_until
+
+
+def _is_playwright_timeout(exc: Exception) -> bool:
     try:
-        async with async_playwright() as playwright:
-            browser = await playwright.chromium.launch(headless=True)
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    except ImportError:  # pragma: no cover
+        return False
+    return isinstance(exc, PlaywrightTimeoutError)
+
+
+async def _wait_for_ready(page: Any, render_options: ScreenshotOptions) -> None:
+    if not render_options.wait_for_ready:
+        return
+    if await page.evaluate(_HAS_READY_SIGNAL_JS):
+        try:
+            await page.wait_for_function(
+                _READY_JS, timeout=render_options.ready_timeout_ms
+            )
+        except Exception as exc:
+            if not _is_playwright_timeout(exc):
+                raise
+            logger.warning(
+                f"等待渲染就绪信号超时，改为等待 {render_options.wait_until}："
+                f"timeout_ms={render_options.ready_timeout_ms}"
+            )
+        else:
+            return
+    if render_options.wait_until in {"load", "networkidle"}:
+        await page.wait_for_load_state(
+            render_options.wait_until, timeout=render_options.timeout_ms
+        )
+
+
+def _url_loader(url: str) -> PageLoader:
+    async def load(page: Any, render_options: ScreenshotOptions) -> None:
+        await page.goto(
+            url,
+            wait_until=_initial_wait_until(render_options),
+            timeout=render_options.timeout_ms,
+        )
+        await _wait_for_ready(page, render_options)
+
+    return load
+
+
+def _html_loader(html: str) -> PageLoader:
+    content = _with_render_base(html)
+
+    async def load(page: Any, render_options: ScreenshotOptions) -> None:
+        await page.set_content(
+            content,
+            wait_until=_initial_wait_until(render_options),
+            timeout=render_options.timeout_ms,
+        )
+        await _wait_for_ready(page, render_options)
+
+    return load
+
+
+async def _capture(
+    page: Any, output_path: Path | None, render_options: ScreenshotOptions
+) -> bytes:
+    return await page.screenshot(
+        path=str(output_path) if output_path else None,
+        full_page=render_options.full_page,
+    )
+
+
+async def _screenshot_once(
+    load: PageLoader, output_path: Path | None, render_options: ScreenshotOptions
+) -> bytes:
+    """不经过浏览器池，临时启动一个 Chromium 截图。"""
+    async_playwright = _import_async_playwright()
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        try:
             page = await browser.new_page(
                 viewport={
                     "width": render_options.viewport_width,
                     "height": render_options.viewport_height,
                 }
             )
-            await page.goto(
-                url,
-                wait_until=render_options.wait_until,
-                timeout=render_options.timeout_ms,
-            )
-            await page.screenshot(path=str(output_path), full_page=render_options.full_page)
+            await _install_asset_route(page)
+            await load(page, render_options)
+            return await _capture(page, output_path, render_options)
+        finally:
             await browser.close()
-    except Exception as exc:
-        raise RenderScreenshotError(f"截图失败：{exc}") from exc
+
+
+async def _screenshot_pooled(
+    pool: BrowserPool,
+    load: PageLoader,
+    output_path: Path | None,
+    render_options: ScreenshotOptions,
+) -> bytes:
+    async with pool.page(
+        width=render_options.viewport_width,
+        height=render_options.viewport_height,
+    ) as page:
+        await load(page, render_options)
+        return await _capture(page, output_path, render_options)
+
+
+async def _screenshot(
+    load: PageLoader, output_path: Path | None, options: ScreenshotOptions | None
+) -> bytes:
+    render_options = options or ScreenshotOptions()
+    if output_path is not None:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    pool = _get_browser_pool()
+    if pool.loop is not None and pool.loop is not asyncio.get_running_loop():
+        # 浏览器池绑定在 NoneBot 的事件循环上，其他线程 / 循环中的调用单独启动浏览器
+        try:
+            return await _screenshot_once(load, output_path, render_options)
+        except RenderScreenshotError:
+            raise
+        except Exception as exc:
+            raise RenderScreenshotError(f"截图失败：{exc}") from exc
+
+    for attempt in range(2):
+        try:
+            return await _screenshot_pooled(pool, load, output_path, render_options)
+        except RenderScreenshotError:  # noqa: PERF203
+            raise
+        except Exception as exc:
+            if attempt == 0 and not pool.is_healthy():
+                logger.warning(f"截图时浏览器断开，重启后重试：reason={exc}")
+                continue
+            raise RenderScreenshotError(f"截图失败：{exc}") from exc
+    raise RenderScreenshotError("截图失败")
+
+
+async def screenshot_url(
+    url: str,
+    output_path: Path | None = None,
+    *,
+    options: ScreenshotOptions | None = None,
+) -> bytes:
+    """打开 url 截图并返回 PNG 字节；传入 output_path 时同时写入该文件。"""
+    return await _screenshot(_url_loader(url), output_path, options)
+
+
+async def screenshot_html(
+    html: str,
+    output_path: Path | None = None,
+    *,
+    options: ScreenshotOptions | None = None,
+) -> bytes:
+    """用 set_content 加载 HTML 截图，页面内的 /assets/... 直接读取本地文件。"""
+    return await _screenshot(_html_loader(html), output_path, options)
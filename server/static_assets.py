@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import mimetypes
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import unquote
+
+from server.template_registry import is_dev_mode
+
+SERVER_DIR = Path(__file__).resolve().parent
+ASSETS_DIR = SERVER_DIR / "assets"
+ITEMS_DIR = ASSETS_DIR / "items"
+DICTS_DIR = ASSETS_DIR / "dicts"
+BOSS_IMGS_DIR = ASSETS_DIR / "imgs" / "boss"
+JS_DIR = ASSETS_DIR / "js"
+CSS_DIR = ASSETS_DIR / "css"
+FONTS_DIR = ASSETS_DIR / "fonts"
+SPRITES_DIR = ASSETS_DIR / "sprites"
+LOGOS_DIR = SERVER_DIR.parent / "logos"
+
+LOGO_FILES: dict[str, Path] = {
+    "/assets/imgs/logo-light.png": LOGOS_DIR / "logo__white_background_with_black_text.png",
+    "/assets/imgs/logo-dark.png": LOGOS_DIR / "logo__black_background_with_white_text.png",
+}
+
+# URL 前缀 -> 本地目录，与 server/routes/render.py 中的静态资源路由一致
+ASSET_ROOTS: tuple[tuple[str, Path], ...] = (
+    ("/assets/items/", ITEMS_DIR),
+    ("/assets/dicts/", DICTS_DIR),
+    ("/assets/imgs/boss/", BOSS_IMGS_DIR),
+    ("/assets/js/", JS_DIR),
+    ("/assets/css/", CSS_DIR),
+    ("/assets/fonts/", FONTS_DIR),
+    ("/assets/sprites/", SPRITES_DIR),
+)
+
+# 渲染页共用的资源读入内存后复用；单个物品图标数量多且按页面变化，不缓存
+_CACHED_PREFIXES = ("/assets/js/", "/assets/css/", "/assets/fonts/", "/assets/sprites/")
+_CONTENT_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".json": "application/json",
+    ".webp": "image/webp",
+    ".woff2": "font/woff2",
+}
+
+
+@dataclass(frozen=True)
+class CachedAsset:
+    body: bytes
+    content_type: str
+    mtime_ns: int
+
+
+_cached_assets: dict[str, CachedAsset] = {}
+_cached_assets_lock = threading.Lock()
+
+
+def resolve_file_under(root: Path, raw_path: str) -> Path | None:
+    """把 URL 中的相对路径解析到 root 下的文件，越界或不存在时返回 None。"""
+    file_path = (root / unquote(raw_path).strip()).resolve()
+    try:
+        file_path.relative_to(root.resolve())
+    except ValueError:
+        return None
+    return file_path if file_path.is_file() else None
+
+
+def resolve_asset_path(url_path: str) -> Path | None:
+    """按渲染页面使用的 /assets/... 路径查找本地文件。"""
+    logo_path = LOGO_FILES.get(url_path)
+    if logo_path is not None:
+        return logo_path if logo_path.is_file() else None
+    for prefix, root in ASSET_ROOTS:
+        if url_path.startswith(prefix):
+            return resolve_file_under(root, url_path[len(prefix):])
+    return None
+
+
+def guess_content_type(path: Path) -> str:
+    content_type = _CONTENT_TYPES.get(path.suffix.lower())
+    if content_type is not None:
+        return content_type
+    return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+
+def read_cached_asset(url_path: str) -> CachedAsset | None:
+    """读取 JS / CSS / 字体等公共资源，结果缓存在内存中。
+
+    不属于公共资源或文件不存在时返回 None。生产环境首次读取后不再访问磁盘，
+    ENVIRONMENT=dev 时按文件修改时间刷新，规则与模板缓存一致。
+    """
+    if not url_path.startswith(_CACHED_PREFIXES):
+        return None
+    with _cached_assets_lock:
+        cached = _cached_assets.get(url_path)
+    if cached is not None and not is_dev_mode():
+        return cached
+
+    asset_path = resolve_asset_path(url_path)
+    if asset_path is None:
+        return None
+    try:
+        mtime_ns = asset_path.stat().st_mtime_ns
+        if cached is not None and cached.mtime_ns == mtime_ns:
+            return cached
+        asset = CachedAsset(
+            body=asset_path.read_bytes(),
+            content_type=guess_content_type(asset_path),
+            mtime_ns=mtime_ns,
+        )
+    except OSError:
+        return None
+    with _cached_assets_lock:
+        _cached_assets[url_path] = asset
+    return asset
+
+
+def clear_asset_cache() -> None:
+    with _cached_assets_lock:
+        _cached_assets.clear()
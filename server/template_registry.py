@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+    from pathlib import Path
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """按占位符切分好的模板：parts 比 slots 多一段，渲染时交替拼接。"""
+
+    parts: tuple[str, ...]
+    slots: tuple[str, ...]
+    mtime_ns: int
+
+    def render(self, values: Mapping[str, str]) -> str:
+        pieces = [self.parts[0]]
+        for slot, part in zip(self.slots, self.parts[1:]):
+            pieces.append(values[slot])
+            pieces.append(part)
+        return "".join(pieces)
+
+
+_templates: dict[tuple[Path, tuple[str, ...]], CompiledTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def is_dev_mode() -> bool:
+    """NoneBot ENVIRONMENT=dev 时为开发模式，模板和静态资源版本号随文件变化刷新。"""
+    try:
+        from nonebot import get_driver
+
+        return get_driver().env == "dev"
+    except ValueError:
+        return False
+
+
+def _compile(path: Path, placeholders: tuple[str, ...]) -> CompiledTemplate:
+    mtime_ns = path.stat().st_mtime_ns
+    text = path.read_text(encoding="utf-8")
+    if not placeholders:
+        return CompiledTemplate(parts=(text,), slots=(), mtime_ns=mtime_ns)
+    # 长的占位符优先，避免某个占位符是另一个的前缀时被截断
+    ordered = sorted(placeholders, key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(name) for name in ordered))
+    parts: list[str] = []
+    slots: list[str] = []
+    position = 0
+    for match in pattern.finditer(text):
+        parts.append(text[position:match.start()])
+        slots.append(match.group(0))
+        position = match.end()
+    parts.append(text[position:])
+    return CompiledTemplate(parts=tuple(parts), slots=tuple(slots), mtime_ns=mtime_ns)
+
+
+def load_template(path: Path, placeholders: Sequence[str]) -> CompiledTemplate:
+    """读取并切分模板，结果按 (路径, 占位符) 缓存。
+
+    生产环境首次加载后不再访问磁盘；ENVIRONMENT=dev 时每次检查文件修改时间，
+    模板被编辑后自动重新加载。
+    """
+    key = (path, tuple(placeholders))
+    with _templates_lock:
+        cached = _templates.get(key)
+    if cached is not None:
+        if not is_dev_mode():
+            return cached
+        try:
+            if path.stat().st_mtime_ns == cached.mtime_ns:
+                return cached
+        except OSError:
+            return cached
+
+    compiled = _compile(path, key[1])
+    with _templates_lock:
+        _templates[key] = compiled
+    return compiled
+
+
+def read_template(path: Path) -> str:
+    """读取不含占位符的模板全文，缓存规则同 load_template。"""
+    return load_template(path, ()).parts[0]
+
+
+def clear_template_cache() -> None:
+    with _templates_lock:
+        _templates.clear()
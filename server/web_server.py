@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import threading
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, Callable
 
 import uvicorn
 from fastapi import FastAPI
@@ -21,6 +22,7 @@ from server.routes.webui_users import router as webui_users_router
 from server.routes.webui_lottery import router as webui_lottery_router
 from server.routes.webui_shop import router as webui_shop_router
 from server.routes.webui_warehouse import router as webui_warehouse_router
+from server.routes.webui_items import router as webui_items_router
 from server.routes.webui import add_webui_auth_middleware, router as webui_router
 from server.server_config import WebServerSettings, get_server_settings
 
@@ -28,10 +30,52 @@ _server_started = False
 _server_lock = threading.Lock()
 
 
+_PAGE_RENDERERS: dict[str, Callable[[dict[str, Any]], bytes]] = {
+    "about": about_page.render,
+    "admin_list": admin_list_page.render,
+    "ban_list": ban_list_page.render,
+    "inventory": inventory_page.render,
+    "leaderboard": leaderboard_page.render,
+    "lottery_list": lottery_list_page.render,
+    "lottery_result": lottery_result_page.render,
+    "lottery_view": lottery_view_page.render,
+    "menu": menu_page.render,
+    "progress": progress_page.render,
+    "red_packet_all": red_packet_all_page.render,
+    "red_packet_own": red_packet_own_page.render,
+    "shop_list": shop_list_page.render,
+    "shop_view": shop_view_page.render,
+    "tutorial": tutorial_page.render,
+    "user_info": user_info_page.render,
+    "warehouse": warehouse_page.render,
+}
+
+
 def _build_internal_base_url(settings: WebServerSettings) -> str:
     return f"http://127.0.0.1:{settings.port}"
 
 
+@dataclass(frozen=True)
+class RenderPage:
+    """一次渲染请求：页面类型和模板数据。
+
+    截图时直接生成 HTML 交给浏览器，不经过 page_store 和本地 HTTP；
+    需要分享链接时再调用 publish 写入 page_store。
+    """
+
+    page_type: str
+    payload: dict[str, Any]
+
+    def render_html(self) -> str:
+        return _PAGE_RENDERERS[self.page_type](self.payload).decode("utf-8")
+
+    def publish(self) -> str:
+        """写入 page_store，返回内部渲染地址（有效期见 PAGE_EXPIRE_SECONDS）。"""
+        token = create_page(self.page_type, self.payload)
+        settings = get_server_settings()
+        return f"{_build_internal_base_url(settings)}/render/{self.page_type}/{token}"
+
+
 def create_inventory_page(
     *,
     user_id: str,
@@ -48,7 +92,7 @@ def create_inventory_page(
     show_index: bool = True,
     slots: list[dict[str, Any]] = [],
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = inventory_page.build_payload(
         user_id=user_id,
         user_name=user_name,
@@ -65,9 +109,7 @@ def create_inventory_page(
         slots=slots,
         theme=theme,
     )
-    token = create_page("inventory", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/inventory/{token}"
+    return RenderPage("inventory", payload)
 
 
 def create_progress_page(
@@ -76,16 +118,14 @@ def create_progress_page(
     server_name: str,
     progress: dict[str, Any],
     theme: str = "dark",
-) -> str:
+) -> RenderPage:
     payload = progress_page.build_payload(
         server_id=server_id,
         server_name=server_name,
         progress=progress,
         theme=theme,
     )
-    token = create_page("progress", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/progress/{token}"
+    return RenderPage("progress", payload)
 
 
 def create_leaderboard_page(
@@ -97,7 +137,7 @@ def create_leaderboard_page(
     entries: list[dict[str, Any]],
     self_entry: dict[str, Any] | None = None,
     theme: str = "dark",
-) -> str:
+) -> RenderPage:
     payload = leaderboard_page.build_payload(
         title=title,
         value_label=value_label,
@@ -107,9 +147,7 @@ def create_leaderboard_page(
         self_entry=self_entry,
         theme=theme,
     )
-    token = create_page("leaderboard", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/leaderboard/{token}"
+    return RenderPage("leaderboard", payload)
 
 
 def create_ban_list_page(
@@ -118,34 +156,28 @@ def create_ban_list_page(
     total_pages: int,
     entries: list[dict[str, Any]],
     theme: str = "dark",
-) -> str:
+) -> RenderPage:
     payload = ban_list_page.build_payload(
         page=page, total_pages=total_pages, entries=entries, theme=theme,
     )
-    token = create_page("ban_list", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/ban_list/{token}"
+    return RenderPage("ban_list", payload)
 
 
 def create_about_page(
     *,
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = about_page.build_payload(theme=theme)
-    token = create_page("about", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/about/{token}"
+    return RenderPage("about", payload)
 
 
 def create_admin_list_page(
     *,
     admins: list[dict[str, str]],
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = admin_list_page.build_payload(admins=admins, theme=theme)
-    token = create_page("admin_list", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/admin_list/{token}"
+    return RenderPage("admin_list", payload)
 
 
 def create_user_info_page(
@@ -161,7 +193,7 @@ def create_user_info_page(
     sign_dates: list[str],
     days: int = 90,
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = user_info_page.build_payload(
         user_id=user_id,
         user_name=user_name,
@@ -175,9 +207,7 @@ def create_user_info_page(
         days=days,
         theme=theme,
     )
-    token = create_page("user_info", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/user_info/{token}"
+    return RenderPage("user_info", payload)
 
 
 def create_menu_page(
@@ -185,11 +215,9 @@ def create_menu_page(
     title: str,
     commands: list[dict[str, str]],
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = menu_page.build_payload(title=title, commands=commands, theme=theme)
-    token = create_page("menu", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/menu/{token}"
+    return RenderPage("menu", payload)
 
 
 def create_red_packet_own_page(
@@ -198,13 +226,11 @@ def create_red_packet_own_page(
     total_pages: int,
     entries: list[dict[str, Any]],
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = red_packet_own_page.build_payload(
         page=page, total_pages=total_pages, entries=entries, theme=theme,
     )
-    token = create_page("red_packet_own", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/red_packet_own/{token}"
+    return RenderPage("red_packet_own", payload)
 
 
 def create_red_packet_all_page(
@@ -213,13 +239,11 @@ def create_red_packet_all_page(
     total_pages: int,
     entries: list[dict[str, Any]],
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = red_packet_all_page.build_payload(
         page=page, total_pages=total_pages, entries=entries, theme=theme,
     )
-    token = create_page("red_packet_all", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/red_packet_all/{token}"
+    return RenderPage("red_packet_all", payload)
 
 
 def create_tutorial_page(
@@ -227,15 +251,13 @@ def create_tutorial_page(
     tutorial: dict[str, Any],
     self_user_id: str,
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = tutorial_page.build_payload(
         tutorial=tutorial,
         self_user_id=self_user_id,
         theme=theme,
     )
-    token = create_page("tutorial", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/tutorial/{token}"
+    return RenderPage("tutorial", payload)
 
 
 def create_warehouse_page(
@@ -244,16 +266,14 @@ def create_warehouse_page(
     owner_user_name: str,
     slots: list[dict[str, Any]],
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = warehouse_page.build_payload(
         owner_user_id=owner_user_id,
         owner_user_name=owner_user_name,
         slots=slots,
         theme=theme,
     )
-    token = create_page("warehouse", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/warehouse/{token}"
+    return RenderPage("warehouse", payload)
 
 
 def create_lottery_list_page(
@@ -263,13 +283,11 @@ def create_lottery_list_page(
     total_pages: int = 1,
     total: int = 0,
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = lottery_list_page.build_payload(
         entries=entries, page=page, total_pages=total_pages, total=total, theme=theme,
     )
-    token = create_page("lottery_list", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/lottery_list/{token}"
+    return RenderPage("lottery_list", payload)
 
 
 def create_lottery_view_page(
@@ -284,15 +302,13 @@ def create_lottery_view_page(
     total_pages: int = 1,
     total: int = 0,
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = lottery_view_page.build_payload(
         pool_id=pool_id, pool_name=pool_name, pool_description=pool_description,
         cost_per_draw=cost_per_draw, prizes=prizes, miss_probability=miss_probability,
         page=page, total_pages=total_pages, total=total, theme=theme,
     )
-    token = create_page("lottery_view", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/lottery_view/{token}"
+    return RenderPage("lottery_view", payload)
 
 
 def create_lottery_result_page(
@@ -310,7 +326,7 @@ def create_lottery_result_page(
     item_slots_used: int = 0,
     command_results: list[dict[str, Any]] | None = None,
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = lottery_result_page.build_payload(
         pool_id=pool_id, pool_name=pool_name,
         user_user_id=user_user_id, user_user_name=user_user_name,
@@ -320,9 +336,7 @@ def create_lottery_result_page(
         item_slots_used=item_slots_used, command_results=command_results,
         theme=theme,
     )
-    token = create_page("lottery_result", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/lottery_result/{token}"
+    return RenderPage("lottery_result", payload)
 
 
 def create_shop_list_page(
@@ -332,7 +346,7 @@ def create_shop_list_page(
     total_pages: int = 1,
     total: int = 0,
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = shop_list_page.build_payload(
         entries=entries,
         page=page,
@@ -340,9 +354,7 @@ def create_shop_list_page(
         total=total,
         theme=theme,
     )
-    token = create_page("shop_list", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/shop_list/{token}"
+    return RenderPage("shop_list", payload)
 
 
 def create_shop_view_page(
@@ -358,7 +370,7 @@ def create_shop_view_page(
     total_pages: int = 1,
     total: int = 0,
     theme: str = "light",
-) -> str:
+) -> RenderPage:
     payload = shop_view_page.build_payload(
         shop_id=shop_id,
         shop_name=shop_name,
@@ -372,9 +384,7 @@ def create_shop_view_page(
         total=total,
         theme=theme,
     )
-    token = create_page("shop_view", payload)
-    settings = get_server_settings()
-    return f"{_build_internal_base_url(settings)}/render/shop_view/{token}"
+    return RenderPage("shop_view", payload)
 
 
 def create_app(settings: WebServerSettings | None = None) -> FastAPI:
@@ -402,6 +412,7 @@ def create_app(settings: WebServerSettings | None = None) -> FastAPI:
     app.include_router(webui_warehouse_router)
     app.include_router(webui_shop_router)
     app.include_router(webui_lottery_router)
+    app.include_router(webui_items_router)
 
     @app.get("/health")
     async def health() -> dict[str, str]:
@@ -813,7 +813,7 @@
       const result = api.unwrapData(response);
       if (!result) throw new Error("保存失败");
       closeAliasModal();
-      setStatus("保存成功，需要重启后生效", "success");
+      setStatus("保存成功，已立即生效", "success");
       await loadCommands({ clearStatus: false });
     } catch (error) {
       let message = error instanceof Error ? error.message : "保存失败";
@@ -15,6 +15,10 @@
   const commandExecuteCountNode = document.getElementById("command_execute_count");
   const dashboardUpdatedAtNode = document.getElementById("dashboard-updated-at");
   const connectedBotIdsNode = document.getElementById("connected_bot_ids");
+  const commandMetricsSortNode = document.getElementById("command-metrics-sort");
+  const commandMetricsEmptyNode = document.getElementById("command-metrics-empty");
+  const commandMetricsWrapNode = document.getElementById("command-metrics-wrap");
+  const commandMetricsBodyNode = document.getElementById("command-metrics-body");
 
   const requiredNodesReady = Boolean(
     reloadButton &&
@@ -31,7 +35,11 @@
       commandEnabledCountNode &&
       commandExecuteCountNode &&
       dashboardUpdatedAtNode &&
-      connectedBotIdsNode
+      connectedBotIdsNode &&
+      commandMetricsSortNode &&
+      commandMetricsEmptyNode &&
+      commandMetricsWrapNode &&
+      commandMetricsBodyNode
   );
   if (!requiredNodesReady) {
     return;
@@ -130,6 +138,88 @@
     renderConnectedBotIds(data.connected_bot_ids);
   };
 
+  const formatLatency = (value) => {
+    if (value === null || value === undefined) {
+      return "> 10s";
+    }
+    const parsed = Number(value);
+    if (!Number.isFinite(parsed)) {
+      return "--";
+    }
+    if (parsed >= 1000) {
+      return `${(parsed / 1000).toFixed(2)} s`;
+    }
+    return `${parsed.toFixed(parsed >= 100 ? 0 : 1)} ms`;
+  };
+
+  const createCell = (text, className = "") => {
+    const cell = document.createElement("td");
+    if (className) {
+      cell.className = className;
+    }
+    cell.textContent = text;
+    return cell;
+  };
+
+  const createCountCell = (value, warn = false) => {
+    const count = Number(value) || 0;
+    const className = warn && count > 0 ? "num-cell metric-count-warn" : "num-cell";
+    return createCell(formatNumber(count), className);
+  };
+
+  const renderCommandMetrics = (items) => {
+    const list = Array.isArray(items) ? items : [];
+    if (list.length === 0) {
+      commandMetricsBodyNode.replaceChildren();
+      commandMetricsWrapNode.classList.add("hidden");
+      commandMetricsEmptyNode.classList.remove("hidden");
+      return;
+    }
+
+    const fragment = document.createDocumentFragment();
+    list.forEach((item) => {
+      const row = document.createElement("tr");
+
+      const nameCell = document.createElement("td");
+      nameCell.textContent = String(item.display_name || item.command_key || "--");
+      const keyNode = document.createElement("span");
+      keyNode.className = "metric-command-key";
+      keyNode.textContent = String(item.command_key || "");
+      nameCell.appendChild(keyNode);
+      row.appendChild(nameCell);
+
+      row.appendChild(createCountCell(item.invoke_count));
+      row.appendChild(createCountCell(item.success_count));
+      row.appendChild(createCountCell(item.denied_count));
+      row.appendChild(createCountCell(item.disabled_count));
+      row.appendChild(createCountCell(item.banned_count));
+      row.appendChild(createCountCell(item.usage_error_count));
+      row.appendChild(createCountCell(item.error_count, true));
+      row.appendChild(createCell(formatLatency(item.avg_latency_ms), "num-cell"));
+      row.appendChild(createCell(formatLatency(item.p50_latency_ms), "num-cell"));
+      row.appendChild(createCell(formatLatency(item.p95_latency_ms), "num-cell"));
+      row.appendChild(createCell(formatLatency(item.max_latency_ms), "num-cell"));
+      fragment.appendChild(row);
+    });
+
+    commandMetricsBodyNode.replaceChildren(fragment);
+    commandMetricsEmptyNode.classList.add("hidden");
+    commandMetricsWrapNode.classList.remove("hidden");
+  };
+
+  const loadCommandMetrics = async () => {
+    const sort = encodeURIComponent(commandMetricsSortNode.value || "invoke_count");
+    const payload = await api.apiRequest(`/webui/api/dashboard/commands?sort=${sort}&limit=20`, {
+      method: "GET",
+      headers: {
+        Accept: "application/json",
+      },
+      action: "加载命令指标",
+      expectedStatus: 200,
+    });
+    renderCommandMetrics(api.unwrapData(payload));
+  };
+
   const loadDashboardData = async () => {
     if (loading) {
       return;
@@ -149,6 +239,7 @@
       });
 
       renderMetrics(api.unwrapData(payload));
+      await loadCommandMetrics();
       hasLoaded = true;
       setStatus("");
     } catch (error) {
@@ -162,5 +253,11 @@
     void loadDashboardData();
   });
 
+  commandMetricsSortNode.addEventListener("change", () => {
+    loadCommandMetrics().catch((error) => {
+      setStatus(error instanceof Error ? error.message : "加载失败", "error");
+    });
+  });
+
   void loadDashboardData();
 })();
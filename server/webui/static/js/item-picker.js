@@ -0,0 +1,66 @@
+(function () {
+  "use strict";
+
+  // 物品名称搜索：在搜索框输入名称或 ID，从 /webui/api/items/search 取候选，
+  // 选中后写回物品 ID 输入框，浏览器不需要下载整份物品字典。
+  const api = window.NextBotWebUIApi;
+  const DEBOUNCE_MS = 150;
+  const SEARCH_LIMIT = 20;
+
+  function attach(searchInput, idInput) {
+    if (!api || !searchInput || !idInput) return;
+
+    const list = document.createElement("datalist");
+    list.id = searchInput.id + "-options";
+    searchInput.setAttribute("list", list.id);
+    searchInput.insertAdjacentElement("afterend", list);
+
+    const idByLabel = new Map();
+    let timer = null;
+    let latest = 0;
+
+    async function refresh(keyword) {
+      const current = ++latest;
+      let matches;
+      try {
+        const payload = await api.apiRequest(
+          "/webui/api/items/search?limit=" + SEARCH_LIMIT + "&q=" + encodeURIComponent(keyword),
+          {
+            method: "GET",
+            headers: { "Accept": "application/json" },
+            action: "搜索",
+            expectedStatus: 200,
+          }
+        );
+        matches = api.unwrapData(payload);
+      } catch (err) {
+        return;
+      }
+      // 输入较快时旧请求可能后返回，只保留最后一次的结果
+      if (current !== latest || !Array.isArray(matches)) return;
+      idByLabel.clear();
+      while (list.firstChild) list.removeChild(list.firstChild);
+      matches.forEach(function (m) {
+        const label = m.name + "（ID " + m.id + "）";
+        idByLabel.set(label, m.id);
+        const opt = document.createElement("option");
+        opt.value = label;
+        list.appendChild(opt);
+      });
+    }
+
+    searchInput.addEventListener("input", function () {
+      const value = searchInput.value.trim();
+      if (idByLabel.has(value)) {
+        idInput.value = String(idByLabel.get(value));
+        idInput.dispatchEvent(new Event("input", { bubbles: true }));
+        return;
+      }
+      clearTimeout(timer);
+      if (!value) return;
+      timer = setTimeout(function () { refresh(value); }, DEBOUNCE_MS);
+    });
+  }
+
+  window.NextBotItemPicker = { attach: attach };
+})();
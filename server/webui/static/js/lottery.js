@@ -460,6 +460,7 @@
     els.prizeFieldWeight.value = (prize && prize.weight !== null && prize.weight !== undefined) ? String(prize.weight) : "";
     els.prizeFieldSortOrder.value = prize ? prize.sort_order : 0;
     els.prizeFieldEnabled.checked = prize ? !!prize.enabled : true;
+    els.prizeFieldItemSearch.value = "";
     els.prizeFieldItemId.value = prize ? (prize.item_id || 1) : 1;
     els.prizeFieldPrefixId.value = prize ? (prize.prefix_id || 0) : 0;
     els.prizeFieldQuantity.value = prize ? (prize.quantity || 1) : 1;
@@ -751,6 +752,7 @@
     els.prizeKindItemFields = $("prize-kind-item-fields");
     els.prizeKindCommandFields = $("prize-kind-command-fields");
     els.prizeKindCoinFields = $("prize-kind-coin-fields");
+    els.prizeFieldItemSearch = $("prize-field-item-search");
     els.prizeFieldItemId = $("prize-field-item-id");
     els.prizeFieldPrefixId = $("prize-field-prefix-id");
     els.prizeFieldQuantity = $("prize-field-quantity");
@@ -779,6 +781,7 @@
   }
 
   function bindEvents() {
+    if (window.NextBotItemPicker) window.NextBotItemPicker.attach(els.prizeFieldItemSearch, els.prizeFieldItemId);
     els.reloadBtn.addEventListener("click", loadPools);
     els.poolCreateBtn.addEventListener("click", () => openPoolModal(null));
     els.poolModalForm.addEventListener("submit", submitPoolModal);
@@ -233,6 +233,7 @@
     game_port: String(item?.game_port || ""),
     restapi_port: String(item?.restapi_port || ""),
     token: String(item?.token || ""),
+    health: item?.health && typeof item.health === "object" ? item.health : null,
   });
 
   const updatePagination = () => {
@@ -269,14 +270,49 @@
     button.setAttribute("aria-label", button.title);
   };
 
-  const buildResultBadge = (serverId) => {
+  // 未手动测试时展示后端记录的最近请求状况，不额外发送 /tokentest
+  const buildHealthBadge = (badge, health) => {
+    if (!health) {
+      badge.textContent = "未测试";
+      return badge;
+    }
+
+    if (health.state === "open") {
+      badge.classList.add("danger");
+      badge.textContent = "暂不可用";
+      badge.title = `连续 ${health.consecutive_failures} 次无法连接（${health.last_error || "未知原因"}），${health.retry_in_seconds} 秒后重试`;
+      return badge;
+    }
+
+    if (health.state === "half_open") {
+      badge.classList.add("warning");
+      badge.textContent = "等待探测";
+      badge.title = health.last_error || "";
+      return badge;
+    }
+
+    if (health.consecutive_failures > 0) {
+      badge.classList.add("warning");
+      badge.textContent = "连接不稳定";
+      badge.title = `最近 ${health.consecutive_failures} 次请求失败：${health.last_error || "未知原因"}`;
+      return badge;
+    }
+
+    badge.classList.add("success");
+    badge.textContent = health.latency_ms === null ? "正常" : `正常 · ${health.latency_ms}ms`;
+    if (health.last_success_seconds_ago !== null) {
+      badge.title = `${health.last_success_seconds_ago} 秒前请求成功`;
+    }
+    return badge;
+  };
+
+  const buildResultBadge = (server) => {
     const badge = document.createElement("span");
     badge.className = "result-badge";
 
-    const result = testResultMap.get(serverId);
+    const result = testResultMap.get(server.id);
     if (!result || result.status === "idle") {
-      badge.textContent = "未测试";
-      return badge;
+      return buildHealthBadge(badge, server.health);
     }
 
     if (result.status === "loading") {
@@ -372,7 +408,7 @@
       tokenCell.appendChild(tokenWrap);
 
       const resultCell = document.createElement("td");
-      resultCell.appendChild(buildResultBadge(server.id));
+      resultCell.appendChild(buildResultBadge(server));
 
       const actionCell = document.createElement("td");
       actionCell.className = "actions-cell";
@@ -1053,6 +1089,8 @@
 
   reloadButton?.addEventListener("click", () => {
     currentPage = 1;
+    // 手动测试的结果已记入后端的连接状况，刷新后统一展示最新状况
+    testResultMap.clear();
     void loadServers();
   });
 
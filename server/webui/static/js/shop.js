@@ -457,6 +457,7 @@
     els.itemFieldPrice.value = item ? item.price : 0;
     els.itemFieldSortOrder.value = item ? item.sort_order : 0;
     els.itemFieldEnabled.checked = item ? !!item.enabled : true;
+    els.itemFieldItemSearch.value = "";
     els.itemFieldItemId.value = item ? (item.item_id || 1) : 1;
     els.itemFieldPrefixId.value = item ? (item.prefix_id || 0) : 0;
     els.itemFieldQuantity.value = item ? (item.quantity || 1) : 1;
@@ -761,6 +762,7 @@
     els.itemFieldEnabled = $("item-field-enabled");
     els.itemKindItemFields = $("item-kind-item-fields");
     els.itemKindCommandFields = $("item-kind-command-fields");
+    els.itemFieldItemSearch = $("item-field-item-search");
     els.itemFieldItemId = $("item-field-item-id");
     els.itemFieldPrefixId = $("item-field-prefix-id");
     els.itemFieldQuantity = $("item-field-quantity");
@@ -788,6 +790,7 @@
   }
 
   function bindEvents() {
+    if (window.NextBotItemPicker) window.NextBotItemPicker.attach(els.itemFieldItemSearch, els.itemFieldItemId);
     els.shopReloadBtn.addEventListener("click", loadShops);
     els.shopCreateBtn.addEventListener("click", () => openShopModal(null));
     els.shopModalForm.addEventListener("submit", submitShopModal);
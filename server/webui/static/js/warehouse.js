@@ -18,9 +18,6 @@
 
   const TIER_RANK = new Map();   // tier key -> rank index for tier-chip styling
 
-  const itemNameMap = new Map();
-  const prefixNameMap = new Map();
-
   const els = {};
 
   function $(id) { return document.getElementById(id); }
@@ -56,31 +53,6 @@
 
   // ---------- Data load ----------
 
-  async function loadDicts() {
-    try {
-      const [itemRes, prefixRes] = await Promise.all([
-        fetch("/assets/dicts/item.json"),
-        fetch("/assets/dicts/prefix.json"),
-      ]);
-      if (itemRes.ok) {
-        const list = await itemRes.json();
-        if (Array.isArray(list)) list.forEach(function (e) {
-          const id = Number(e && e.id || 0);
-          const name = String(e && e.name || "").trim();
-          if (id > 0 && name) itemNameMap.set(id, name);
-        });
-      }
-      if (prefixRes.ok) {
-        const list = await prefixRes.json();
-        if (Array.isArray(list)) list.forEach(function (e) {
-          const id = Number(e && e.id || 0);
-          const name = String(e && e.name || "").trim();
-          if (id > 0 && name) prefixNameMap.set(id, name);
-        });
-      }
-    } catch (e) { /* fall back to numeric ids */ }
-  }
-
   async function loadTiers() {
     try {
       const payload = await api.apiRequest("/webui/api/warehouse/tiers", {
@@ -197,11 +169,7 @@
     const iconWrap = document.createElement("div");
     iconWrap.className = "wh-slot-icon";
     if (occupied) {
-      const img = document.createElement("img");
-      img.src = "/assets/items/Item_" + slot.item_id + ".png";
-      img.alt = String(slot.item_id);
-      img.addEventListener("error", function () { img.style.display = "none"; });
-      iconWrap.appendChild(img);
+      iconWrap.appendChild(NextBotItemSprites.create(slot.item_id));
     } else {
       const empty = document.createElement("div");
       empty.className = "wh-slot-empty-icon";
@@ -219,9 +187,9 @@
       cell.appendChild(stack);
     }
 
-    const itemName = itemNameMap.get(Number(slot.item_id)) || ("ID:" + slot.item_id);
+    const itemName = slot.item_name || ("ID:" + slot.item_id);
     const prefixId = Number(slot.prefix_id || 0);
-    const prefixName = prefixId > 0 ? (prefixNameMap.get(prefixId) || "前缀 ID:" + prefixId) : "";
+    const prefixName = prefixId > 0 ? (slot.prefix_name || "前缀 ID:" + prefixId) : "";
 
     if (prefixName) {
       const prefixEl = document.createElement("div");
@@ -261,6 +229,7 @@
     hideAlert(els.modalAlert);
     els.modalTitle.textContent = slot ? "编辑物品" : "添加物品";
     els.fieldSlot.value = "#" + slotIndex;
+    els.fieldItemSearch.value = "";
     els.fieldItemId.value = slot ? String(slot.item_id) : "";
     els.fieldPrefixId.value = slot ? String(slot.prefix_id) : "0";
     els.fieldQuantity.value = slot ? String(slot.quantity) : "1";
@@ -447,6 +416,7 @@
     els.modalForm = $("wh-modal-form");
     els.modalDelete = $("wh-modal-delete");
     els.fieldSlot = $("wh-field-slot");
+    els.fieldItemSearch = $("wh-field-item-search");
     els.fieldItemId = $("wh-field-item-id");
     els.fieldPrefixId = $("wh-field-prefix-id");
     els.fieldQuantity = $("wh-field-quantity");
@@ -459,6 +429,7 @@
   }
 
   function bindEvents() {
+    if (window.NextBotItemPicker) window.NextBotItemPicker.attach(els.fieldItemSearch, els.fieldItemId);
     els.searchInput.addEventListener("input", function () {
       const keyword = (els.searchInput.value || "").trim().toLowerCase();
       if (searchTimer) clearTimeout(searchTimer);
@@ -506,7 +477,7 @@
   document.addEventListener("DOMContentLoaded", async function () {
     bindElements();
     bindEvents();
-    await Promise.all([loadDicts(), loadTiers()]);
+    await loadTiers();
 
     try {
       const params = new URLSearchParams(window.location.search);
@@ -0,0 +1,87 @@
+"""金币读-判断-写并发回归测试：并发转账/签到不能丢失更新或重复发放。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+
+os.environ["NEXTBOT_DATA_DIR"] = tempfile.mkdtemp(prefix="nextbot-test-")
+
+import nonebot
+import pytest
+
+nonebot.init()
+
+from nextbot import db
+from nextbot.plugins.economy import _apply_sign, _apply_transfer
+
+TARGET_ID = "20000"
+SENDER_IDS = [str(10000 + index) for index in range(8)]
+
+
+@pytest.fixture(autouse=True)
+def _reset_users() -> None:
+    db.init_db()
+    session = db.get_session()
+    try:
+        session.query(db.UserSignRecord).delete()
+        session.query(db.User).delete()
+        session.add(db.User(user_id=TARGET_ID, name="Target", coins=0))
+        for index, user_id in enumerate(SENDER_IDS):
+            session.add(db.User(user_id=user_id, name=f"Sender{index}", coins=1000))
+        session.commit()
+    finally:
+        session.close()
+
+
+def _coins(user_id: str) -> int:
+    session = db.get_session()
+    try:
+        user = session.query(db.User).filter(db.User.user_id == user_id).one()
+        return int(user.coins)
+    finally:
+        session.close()
+
+
+def test_concurrent_transfers_keep_total() -> None:
+    async def run_round() -> None:
+        results = await asyncio.gather(*[
+            db.run_db_transaction(_apply_transfer, sender_id, TARGET_ID, 200)
+            for sender_id in SENDER_IDS
+        ])
+        assert all(result.code == "ok" for result in results)
+
+    for _ in range(5):
+        asyncio.run(run_round())
+
+    assert _coins(TARGET_ID) == 200 * len(SENDER_IDS) * 5
+    assert all(_coins(sender_id) == 0 for sender_id in SENDER_IDS)
+
+
+def test_concurrent_sign_pays_once() -> None:
+    async def sign_many() -> list[str]:
+        results = await asyncio.gather(*[
+            db.run_db_transaction(
+                _apply_sign,
+                TARGET_ID,
+                today_text="2026-01-01",
+                base_reward=50,
+                enable_streak=True,
+                streak_bonus_per_day=5,
+                max_streak_bonus=50,
+            )
+            for _ in range(8)
+        ])
+        return [result.code for result in results]
+
+    codes = asyncio.run(sign_many())
+
+    assert codes.count("signed") == 1
+    assert codes.count("already_signed") == 7
+    assert _coins(TARGET_ID) == 50
+    session = db.get_session()
+    try:
+        assert session.query(db.UserSignRecord).count() == 1
+    finally:
+        session.close()